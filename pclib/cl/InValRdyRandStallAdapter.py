@@ -3,7 +3,6 @@
 #=========================================================================
 # Randomly stalls an input interface.
 
-from copy        import deepcopy
 from random      import Random
 from pymtl       import *
 
@@ -42,7 +41,7 @@ class InValRdyRandStallAdapter (object):
   def xtick( s ):
 
     if s.in_.rdy and s.in_.val:
-      s.data = deepcopy(s.in_.msg)
+      s.data = s.in_.msg.copy()
 
     s.in_.rdy.next = ( s.data == None ) and ( s.rgen.random() > s.stall_prob )
 
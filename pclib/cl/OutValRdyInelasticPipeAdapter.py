@@ -5,8 +5,6 @@
 # nstages is set to zero, then this essentially models a single-entry
 # bypass queue.
 
-from copy        import deepcopy
-from collections import deque
 from pymtl       import *
 from pclib.cl    import OutValRdyQueueAdapter
 from pipelines   import Pipeline
@@ -17,6 +15,8 @@ from pipelines   import Pipeline
 
 class OutValRdyInelasticPipeAdapter (object):
 
+  __slots__ = ( 'nstages', 'out_q', 'pipe' )
+
   def __init__( s, out, nstages=1 ):
 
     s.nstages    = nstages
@@ -25,14 +25,13 @@ class OutValRdyInelasticPipeAdapter (object):
     s.out_q      = OutValRdyQueueAdapter( out )
 
     # instantiate a cycle-level pipeline
-    if s.nstages > 0:
-      s.pipe       = Pipeline( s.nstages )
+    s.pipe       = Pipeline( s.nstages ) if s.nstages > 0 else None
 
   def full( s ):
     if s.nstages == 0:
       return s.out_q.full()
     else:
-      return not s.pipe.data[0] == None
+      return s.pipe.full()
 
   def enq( s, item ):
     assert not s.full()
@@ -59,8 +58,16 @@ class OutValRdyInelasticPipeAdapter (object):
         # Advance the pipeline
         s.pipe.advance()
 
+  # Tick many adapters at once, from a single tick block.
+
+  @staticmethod
+  def xtick_all( adapters ):
+    xtick = OutValRdyInelasticPipeAdapter.xtick
+    for adapter in adapters:
+      xtick( adapter )
+
   def __str__( s ):
     if s.nstages > 0:
-      return ''.join([ ("*" if x != None else ' ') for x in s.pipe.data ])
+      return ''.join([ ("*" if x is not None else ' ') for x in s.pipe ])
     else:
       return ""
@@ -1,77 +1,106 @@
 #=========================================================================
 # adapters
 #=========================================================================
-
-from copy        import deepcopy
-from collections import deque
+# The adapters are queues (see queues.py) which also drive the val/rdy
+# interface they are attached to. They keep track of the values they
+# last drove and only write the ports when these values change, since
+# writing a port is much more expensive than comparing two integers.
+# Nobody else should write the ports an adapter is attached to.
 
 from pymtl       import *
+from queues      import Queue
 
 #-------------------------------------------------------------------------
 # InValRdyQueueAdapter
 #-------------------------------------------------------------------------
 
-class InValRdyQueueAdapter (object):
+class InValRdyQueueAdapter (Queue):
+
+  __slots__ = ( 'in_', '_rdy' )
 
   def __init__( s, in_, size=1 ):
+    super( InValRdyQueueAdapter, s ).__init__( size )
     s.in_  = in_
-    s.data = deque( maxlen = size )
+    s._rdy = None
 
   def empty( s ):
-    return len( s.data ) == 0
+    return s._count == 0
 
   def deq( s ):
-    assert not s.empty()
-    item = s.data.popleft()
-    s.in_.rdy.next = ( len( s.data ) != s.data.maxlen )
+    assert s._count != 0
+    item = Queue.deq( s )
+    if not s._rdy:
+      s.in_.rdy.next = s._rdy = True
     return item
 
   def first( s ):
-    return s.data[0]
+    return s._items[ s._head ]
 
   def clear( s ):
-    s.data.clear()
-    s.in_.rdy.next = 1
-
-  def __len__( s ):
-    return len(s.data)
+    Queue.clear( s )
+    s.in_.rdy.next = s._rdy = True
 
   def xtick( s ):
     if s.in_.rdy and s.in_.val:
-      s.data.append( deepcopy(s.in_.msg) )
-    s.in_.rdy.next = ( len( s.data ) != s.data.maxlen )
+      s.enq( s.in_.msg.copy() )
+    rdy = s._count != s.size
+    if rdy is not s._rdy:
+      s.in_.rdy.next = s._rdy = rdy
+
+  # Tick many adapters at once, from a single tick block.
+
+  @staticmethod
+  def xtick_all( adapters ):
+    xtick = InValRdyQueueAdapter.xtick
+    for adapter in adapters:
+      xtick( adapter )
 
 #-------------------------------------------------------------------------
 # OutValRdyQueueAdapter
 #-------------------------------------------------------------------------
 
-class OutValRdyQueueAdapter (object):
+class OutValRdyQueueAdapter (Queue):
+
+  __slots__ = ( 'out', '_val', '_msg' )
 
   def __init__( s, out, size=1 ):
+    super( OutValRdyQueueAdapter, s ).__init__( size )
     s.out  = out
-    s.data = deque( maxlen = size )
+    s._val = None
+    s._msg = None
 
   def full( s ):
-    return len( s.data ) == s.data.maxlen
+    return s._count == s.size
 
   def enq( s, item ):
-    assert not s.full()
-    s.data.append( item )
-    if len( s.data ) != 0:
-      s.out.msg.next = s.data[0]
-    s.out.val.next = ( len( s.data ) != 0 )
+    Queue.enq( s, item )
+    s._drive()
 
   def clear( s ):
-    s.data.clear()
-    s.out.val.next = 0
-
-  def __len__( s ):
-    return len(s.data)
+    Queue.clear( s )
+    s.out.val.next = s._val = False
 
   def xtick( s ):
-    if s.out.rdy and s.out.val:
-      s.data.popleft()
-    if len( s.data ) != 0:
-      s.out.msg.next = s.data[0]
-    s.out.val.next = ( len( s.data ) != 0 )
-
+    if s.out.val and s.out.rdy:
+      Queue.deq( s )
+    s._drive()
+
+  # Tick many adapters at once, from a single tick block.
+
+  @staticmethod
+  def xtick_all( adapters ):
+    xtick = OutValRdyQueueAdapter.xtick
+    for adapter in adapters:
+      xtick( adapter )
+
+  # Drive the item at the head of the queue if it changed
+
+  def _drive( s ):
+    if s._count:
+      item = s._items[ s._head ]
+      if item is not s._msg:
+        s.out.msg.next = s._msg = item
+      if s._val is not True:
+        s.out.val.next = s._val = True
+    elif s._val is not False:
+      s.out.val.next = s._val = False
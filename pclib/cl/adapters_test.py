@@ -22,18 +22,22 @@ from pclib.test import TestSource, TestSink
 
 class TestModelCL (Model):
 
-  def __init__( s ):
+  def __init__( s, size=1, batch=False ):
 
     s.in_   = InValRdyBundle  (16)
     s.out   = OutValRdyBundle (16)
 
-    s.in_q  = InValRdyQueueAdapter  ( s.in_ )
-    s.out_q = OutValRdyQueueAdapter ( s.out )
+    s.in_q  = InValRdyQueueAdapter  ( s.in_, size )
+    s.out_q = OutValRdyQueueAdapter ( s.out, size )
 
     @s.tick_cl
     def block():
-      s.in_q.xtick()
-      s.out_q.xtick()
+      if batch:
+        InValRdyQueueAdapter.xtick_all( [ s.in_q ] )
+        OutValRdyQueueAdapter.xtick_all( [ s.out_q ] )
+      else:
+        s.in_q.xtick()
+        s.out_q.xtick()
       if not s.in_q.empty() and not s.out_q.full():
         s.out_q.enq( s.in_q.deq() )
 
@@ -46,12 +50,12 @@ class TestModelCL (Model):
 
 class TestHarness (Model):
 
-  def __init__( s, msgs, src_delay, sink_delay ):
+  def __init__( s, msgs, src_delay, sink_delay, size=1, batch=False ):
 
     # Instantiate models
 
     s.src   = TestSource  ( 16, msgs,  src_delay  )
-    s.model = TestModelCL ()
+    s.model = TestModelCL ( size, batch )
     s.sink  = TestSink    ( 16, msgs, sink_delay )
 
     # Connect
@@ -82,12 +86,15 @@ random_msgs = [ rgen.randint(0,0xffff) for _ in xrange(20) ]
 #-------------------------------------------------------------------------
 
 test_case_table = mk_test_case_table([
-  (              "msgs         src_delay sink_delay"),
-  [ "basic_0x0",  basic_msgs,  0,        0          ],
-  [ "random_0x0", random_msgs, 0,        0          ],
-  [ "random_9x0", random_msgs, 9,        0          ],
-  [ "random_0x9", random_msgs, 0,        9          ],
-  [ "random_9x9", random_msgs, 9,        9          ],
+  (                    "msgs         src_delay sink_delay size batch"),
+  [ "basic_0x0",        basic_msgs,  0,        0,         1,   False ],
+  [ "random_0x0",       random_msgs, 0,        0,         1,   False ],
+  [ "random_9x0",       random_msgs, 9,        0,         1,   False ],
+  [ "random_0x9",       random_msgs, 0,        9,         1,   False ],
+  [ "random_9x9",       random_msgs, 9,        9,         1,   False ],
+  [ "random_0x9_size3", random_msgs, 0,        9,         3,   False ],
+  [ "random_9x9_size3", random_msgs, 9,        9,         3,   False ],
+  [ "random_3x5_batch", random_msgs, 3,        5,         2,   True  ],
 ])
 
 #-------------------------------------------------------------------------
@@ -97,6 +104,7 @@ test_case_table = mk_test_case_table([
 @pytest.mark.parametrize( **test_case_table )
 def test( test_params, dump_vcd ):
   run_sim( TestHarness( test_params.msgs,
-                        test_params.src_delay, test_params.sink_delay ),
+                        test_params.src_delay, test_params.sink_delay,
+                        test_params.size, test_params.batch ),
            dump_vcd )
 
@@ -3,30 +3,55 @@
 #=======================================================================
 # Collection of pipelines for cycle-level modeling.
 
-from pymtl       import *
-from collections import deque
+from pymtl import *
 
 #-----------------------------------------------------------------------
 # Pipeline
 #-----------------------------------------------------------------------
+# Items are inserted in the first stage and removed from the last one.
+# The stages are stored in a preallocated ring buffer, advancing the
+# pipeline just moves the index of the first stage, and an occupancy
+# counter tracks the number of items in flight. As for queues, the
+# instance dictionary is only allocated for annotated pipelines.
 class Pipeline( object ):
 
+  __slots__ = ( 'stages', '_items', '_head', '_count', '__dict__' )
+
   def __init__( self, stages=1 ):
     assert stages > 0
     self.stages = stages
-    self.data   = deque( [None]*stages, maxlen = stages )
+    self._items = [ None ] * stages
+    self._head  = 0
+    self._count = 0
 
   def insert( self, item ):
-    self.data[0] = item
+    head = self._head
+    self._count += ( item is not None ) - ( self._items[ head ] is not None )
+    self._items[ head ] = item
 
   def remove( self ):
-    item = self.data[-1]
-    self.data[-1] = None
+    tail = self._head - 1
+    item = self._items[ tail ]
+    if item is not None:
+      self._items[ tail ] = None
+      self._count -= 1
     return item
 
   def ready( self ):
-    return self.data[-1] != None
+    return self._items[ self._head - 1 ] is not None
+
+  def full( self ):
+    return self._items[ self._head ] is not None
+
+  def empty( self ):
+    return self._count == 0
+
+  def nitems( self ):
+    return self._count
 
   def advance( self ):
-    self.data.rotate()
+    self._head = ( self._head or self.stages ) - 1
 
+  def __iter__( self ):
+    for i in xrange( self.stages ):
+      yield self._items[ ( self._head + i ) % self.stages ]
@@ -44,6 +44,31 @@ def test_Pipeline( dump_vcd, stages ):
 
   assert not pipeline.ready()
 
+#-------------------------------------------------------------------------
+# test_Pipeline_occupancy
+#-------------------------------------------------------------------------
+def test_Pipeline_occupancy():
+
+  pipeline = Pipeline( 3 )
+
+  pipeline.insert( 'a' )
+  assert pipeline.full() and pipeline.nitems() == 1
+  pipeline.advance()
+  assert not pipeline.full()
+  pipeline.insert( 'b' )
+  pipeline.advance()
+  assert list( pipeline ) == [ None, 'b', 'a' ]
+  assert pipeline.ready() and pipeline.nitems() == 2
+
+  # Removing leaves a bubble
+
+  assert pipeline.remove() == 'a'
+  assert pipeline.remove() is None
+  assert pipeline.nitems() == 1
+  pipeline.advance()
+  assert pipeline.remove() == 'b'
+  assert pipeline.empty()
+
 #-------------------------------------------------------------------------
 # TestValRdyPipeline
 #-------------------------------------------------------------------------
@@ -5,34 +5,71 @@
 
 from pymtl       import *
 from pclib.ifcs  import InValRdyBundle, OutValRdyBundle
-from collections import deque
 
 #-----------------------------------------------------------------------
 # Queue
 #-----------------------------------------------------------------------
+# Fixed-capacity queue stored in a preallocated ring buffer, with an
+# occupancy counter so that all operations are O(1). Tools can still
+# annotate queues (e.g., the C++ translator), the instance dictionary is
+# only allocated for queues which are annotated.
 class Queue( object ):
 
+  __slots__ = ( 'size', '_items', '_head', '_tail', '_count', '__dict__' )
+
   def __init__( self, size=1 ):
-    self.data = deque( maxlen=size )
+    assert size > 0
+    self.size   = size
+    self._items = [ None ] * size
+    self._head  = 0
+    self._tail  = 0
+    self._count = 0
 
   def is_empty( self ):
-    return len( self.data ) == 0
+    return self._count == 0
 
   def is_full( self ):
-    return len( self.data ) == self.data.maxlen
+    return self._count == self.size
 
   def enq( self, item ):
-    assert not self.is_full()
-    self.data.append( item )
+    assert self._count != self.size
+    tail = self._tail
+    self._items[ tail ] = item
+    tail += 1
+    self._tail   = tail if tail != self.size else 0
+    self._count += 1
 
   def deq( self ):
-    return self.data.popleft()
+    if not self._count:
+      raise IndexError( "deq from an empty queue" )
+    head = self._head
+    item = self._items[ head ]
+    self._items[ head ] = None
+    head += 1
+    self._head   = head if head != self.size else 0
+    self._count -= 1
+    return item
 
   def peek( self ):
-    return self.data[0]
+    if not self._count:
+      raise IndexError( "peek into an empty queue" )
+    return self._items[ self._head ]
+
+  def clear( self ):
+    self._items[:] = [ None ] * self.size
+    self._head  = 0
+    self._tail  = 0
+    self._count = 0
 
   def nitems( self ):
-    return len( self.data )
+    return self._count
+
+  def __len__( self ):
+    return self._count
+
+  def __iter__( self ):
+    for i in xrange( self._count ):
+      yield self._items[ ( self._head + i ) % self.size ]
 
 #-----------------------------------------------------------------------
 # InValRdyQueue
@@ -41,33 +78,33 @@ class InValRdyQueue( Model ):
 
   def __init__( s, dtype, size=1, pipe=False ):
     s.in_  = InValRdyBundle( dtype )
-    s.data = deque( maxlen = size )
+    s.data = Queue( size )
     s.deq  = s._pipe_deq if pipe else s._simple_deq
 
   def is_empty( s ):
-    return len( s.data ) == 0
+    return s.data.is_empty()
 
   def empty( s ):
-    return s.is_empty()
+    return s.data.is_empty()
 
   def deq( s ):
     pass
 
   def _simple_deq( s ):
-    return s.data.popleft()
+    return s.data.deq()
 
   def _pipe_deq( s ):
-    data = s.data.popleft()
-    s.in_.rdy.next = len( s.data ) != s.data.maxlen
+    data = s.data.deq()
+    s.in_.rdy.next = 1
     return data
 
   def peek( s ):
-    return s.data[0]
+    return s.data.peek()
 
   def xtick( s ):
     if s.in_.rdy and s.in_.val:
-      s.data.append( s.in_.msg[:] )
-    s.in_.rdy.next = len( s.data ) != s.data.maxlen
+      s.data.enq( s.in_.msg.copy() )
+    s.in_.rdy.next = not s.data.is_full()
 
 #-----------------------------------------------------------------------
 # OutValRdyQueue
@@ -76,35 +113,32 @@ class OutValRdyQueue( Model ):
 
   def __init__( s, dtype, size=1, bypass=False ):
     s.out  = OutValRdyBundle( dtype )
-    s.data = deque( maxlen = size )
+    s.data = Queue( size )
     s.enq  = s._bypass_enq if bypass else s._simple_enq
 
   def is_full( s ):
-    return len( s.data ) == s.data.maxlen
+    return s.data.is_full()
 
   def full( s ):
-    return s.is_full()
+    return s.data.is_full()
 
-  def enq( s ):
-     s.data.append( item )
+  def enq( s, item ):
+    s.data.enq( item )
 
   def _simple_enq( s, item ):
-    assert not s.is_full()
-    s.data.append( item )
+    s.data.enq( item )
 
   def _bypass_enq( s, item ):
-    assert not s.is_full()
-    s.data.append( item )
-    if len( s.data ) != 0:
-      s.out.msg.next = s.data[0]
-    s.out.val.next = len( s.data ) != 0
+    s.data.enq( item )
+    s.out.msg.next = s.data.peek()
+    s.out.val.next = 1
 
   def xtick( s ):
     if s.out.rdy and s.out.val:
-      s.data.popleft()
-    if len( s.data ) != 0:
-      s.out.msg.next = s.data[0]
-    s.out.val.next = len( s.data ) != 0
+      s.data.deq()
+    if not s.data.is_empty():
+      s.out.msg.next = s.data.peek()
+    s.out.val.next = not s.data.is_empty()
 
 class ChildReqRespQueueAdapter( Model ):
 
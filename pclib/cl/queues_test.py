@@ -45,6 +45,30 @@ def test_Queue( size ):
   with pytest.raises( IndexError ):
     queue.deq()
 
+#-------------------------------------------------------------------------
+# test_Queue_wraparound
+#-------------------------------------------------------------------------
+def test_Queue_wraparound():
+
+  queue = Queue( 3 )
+
+  # Keep the queue half full while the ring buffer wraps around
+
+  expected = []
+  for i in range( 10 ):
+    queue.enq( i )
+    expected.append( i )
+    if len( queue ) == 2:
+      assert queue.deq() == expected.pop( 0 )
+    assert list( queue ) == expected
+    assert queue.nitems() == len( expected )
+    assert queue.peek() == expected[0]
+
+  queue.clear()
+  assert queue.is_empty()
+  with pytest.raises( IndexError ):
+    queue.peek()
+
 #------------------------------------------------------------------------
 # InValRdyQueueHarness
 #------------------------------------------------------------------------
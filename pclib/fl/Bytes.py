@@ -2,7 +2,8 @@
 # Bytes
 #=========================================================================
 # Simple class that encapsulates a byte array but with extra support for
-# reading and writing Bits.
+# reading and writing Bits. Integer accessors and bulk copies to/from
+# buffers avoid creating Bits objects altogether.
 #
 # Author : Christopher Batten
 # Date   : May 26, 2014
@@ -10,6 +11,12 @@
 from pymtl import Bits
 import struct
 import binascii
+import ctypes
+
+# Precompiled little-endian formats for accesses of common sizes
+
+_structs = { n : struct.Struct( '<' + fmt )
+             for n, fmt in [ (1,'B'), (2,'H'), (4,'I'), (8,'Q') ] }
 
 class Bytes (object):
 
@@ -53,13 +60,12 @@ class Bytes (object):
         num_bytes  = 1
 
       if isinstance( value, Bits ):
-        bits = value
         assert value.nbits % 8 == 0
+        value = value.uint()
       else:
-        bits = Bits( num_bytes*8, value )
+        value = Bits( num_bytes*8, value ).uint()
 
-      for i in range(num_bytes):
-        self.mem[start_addr+i] = bits[i*8:i*8+8]
+      self.write_uint( start_addr, num_bytes, value )
 
   #-----------------------------------------------------------------------
   # getitem
@@ -68,20 +74,101 @@ class Bytes (object):
   def __getitem__( self, key ):
 
     if isinstance( key, slice ):
-
       start_addr = int(key.start)
-      num_bytes = int(key.stop) - int(key.start)
-      bits = Bits( 8*num_bytes )
+      num_bytes  = int(key.stop) - int(key.start)
+      return Bits( 8*num_bytes, self.read_uint( start_addr, num_bytes ) )
+
+    else:
+      return Bits( 8, self.mem[ int(key) ] )
 
-      for i in range(num_bytes):
-        bits[i*8:i*8+8] = \
-          struct.unpack_from("<B",buffer(self.mem,start_addr+i,1))[0]
+  #-----------------------------------------------------------------------
+  # read_uint
+  #-----------------------------------------------------------------------
+  # Return the little-endian unsigned integer stored in nbytes starting
+  # at addr, without going through Bits.
 
-      return bits
+  def read_uint( self, addr, nbytes ):
 
-    else:
-      idx = int(key)
-      return Bits( 8, struct.unpack_from("<B",buffer(self.mem,idx,1))[0] )
+    if addr < 0 or addr + nbytes > len( self.mem ):
+      raise IndexError( 'Bytes access out of range' )
+
+    fmt = _structs.get( nbytes )
+    if fmt:
+      return fmt.unpack_from( self.mem, addr )[0]
+    if nbytes == 0:
+      return 0
+    return int( binascii.hexlify( self.mem[addr:addr+nbytes][::-1] ), 16 )
+
+  #-----------------------------------------------------------------------
+  # write_uint
+  #-----------------------------------------------------------------------
+  # Store the low nbytes of value in little-endian order at addr.
+
+  def write_uint( self, addr, nbytes, value ):
+
+    if addr < 0 or addr + nbytes > len( self.mem ):
+      raise IndexError( 'Bytes access out of range' )
+
+    value &= (1 << 8*nbytes) - 1
+
+    fmt = _structs.get( nbytes )
+    if fmt:
+      fmt.pack_into( self.mem, addr, value )
+    elif nbytes:
+      self.mem[addr:addr+nbytes] = \
+        binascii.unhexlify( '%0*x' % ( 2*nbytes, value ) )[::-1]
+
+  #-----------------------------------------------------------------------
+  # read_word/write_word
+  #-----------------------------------------------------------------------
+
+  def read_word( self, addr ):
+    return _structs[4].unpack_from( self.mem, addr )[0]
+
+  def write_word( self, addr, value ):
+    _structs[4].pack_into( self.mem, addr, value & 0xffffffff )
+
+  #-----------------------------------------------------------------------
+  # read_into
+  #-----------------------------------------------------------------------
+  # Copy the bytes starting at addr into buf, which can be any object
+  # exporting a writable buffer (bytearray, array.array, NumPy array)
+  # and is filled entirely.
+
+  def read_into( self, addr, buf ):
+
+    nbytes = len( buffer( buf ) )
+    if addr < 0 or addr + nbytes > len( self.mem ):
+      raise IndexError( 'Bytes access out of range' )
+
+    if nbytes:
+      ctypes.memmove( ( ctypes.c_char * nbytes ).from_buffer( buf ),
+                      ( ctypes.c_char * nbytes ).from_buffer( self.mem, addr ),
+                      nbytes )
+
+  #-----------------------------------------------------------------------
+  # write_from
+  #-----------------------------------------------------------------------
+  # Copy the contents of buf to the bytes starting at addr. buf can be any
+  # object exporting a buffer (str, bytearray, array.array, NumPy array)
+  # or a memoryview.
+
+  def write_from( self, addr, buf ):
+
+    data = buf.tobytes() if isinstance( buf, memoryview ) else buffer( buf )
+    if addr < 0 or addr + len( data ) > len( self.mem ):
+      raise IndexError( 'Bytes access out of range' )
+
+    self.mem[addr:addr+len(data)] = data
+
+  #-----------------------------------------------------------------------
+  # view
+  #-----------------------------------------------------------------------
+  # Return a memoryview of nbytes starting at addr sharing the storage of
+  # this object, e.g., for numpy.frombuffer.
+
+  def view( self, addr, nbytes ):
+    return memoryview( self.mem )[addr:addr+nbytes]
 
   #-----------------------------------------------------------------------
   # eq
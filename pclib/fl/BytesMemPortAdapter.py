@@ -3,11 +3,22 @@
 #=========================================================================
 # These classes provides the Bytes interface, but the implementation
 # essentially turns reads/writes into memory requests sent over a
-# port-based memory interface. We use greenlets to enable us to wait
-# until the response has come back before returning to the function
-# accessing the list.
+# port-based memory interface. The read and write generators wait until
+# the response has come back, for use in generator-based FL code (see
+# pymtl/tools/simulation/coroutines.py). Greenlet-based FL code uses
+# the Bytes interface, which runs the same generators and switches back
+# to the parent greenlet while waiting.
+#
+# Slices wider than the data field are read or written with several
+# requests in flight. With posted_writes, writes do not wait for their
+# response, and fence() waits until they are all done (fence_gen() in
+# generator-based FL code).
 
-from greenlet import greenlet
+from pymtl import Bits
+
+from pymtl.tools.simulation.coroutines import Return, wait
+
+from MemPortPipe import MemPortPipe
 
 class BytesMemPortAdapter (object):
 
@@ -15,7 +26,8 @@ class BytesMemPortAdapter (object):
   # Constructor
   #-----------------------------------------------------------------------
 
-  def __init__( s, memreq, memresp ):
+  def __init__( s, memreq, memresp, posted_writes=False,
+                max_outstanding=None ):
 
     # Shorter names
 
@@ -27,135 +39,86 @@ class BytesMemPortAdapter (object):
     s.memreq  = memreq
     s.memresp = memresp
 
-    # Shorter names
+    # Requests are sent by a MemPortPipe, which can have up to
+    # max_outstanding requests in flight
 
-    s.trace = " "
+    s.pipe          = MemPortPipe( memreq, memresp, max_outstanding )
+    s.posted_writes = posted_writes
 
   #-----------------------------------------------------------------------
   # __getitem__
   #-----------------------------------------------------------------------
 
   def __getitem__( s, key ):
-
-    # Calculate base address and length for request
-
-    if isinstance( key, slice ):
-      addr   = int(key.start)
-      nbytes = int(key.stop) - int(key.start)
-    else:
-      addr   = int(key)
-      nbytes = 1
-
-    len_ = nbytes if nbytes < s.memreq.msg.data.nbits/8 else 0
-
-    # Create a memory request to send out memory request port
-
-    s.trace = "r"
-
-    memreq_msg        = s.MemReqMsgType()
-    memreq_msg.type_  = s.MemReqMsgType.TYPE_READ
-    memreq_msg.addr   = addr
-    memreq_msg.opaque = 0
-    memreq_msg.len    = len_
-    memreq_msg.data   = 0
-
-    s.memreq.msg.next  = memreq_msg
-    s.memreq.val.next  = 1
-    s.memresp.rdy.next = 1
-
-    # Yield so we wait at least one cycle for the response
-
-    greenlet.getcurrent().parent.switch(0)
-
-    # If memory request is not ready yet then yeild
-
-    s.memreq.val.next  = 1
-    s.memresp.rdy.next = 1
-
-    while not s.memreq.rdy:
-      s.trace = ";"
-      greenlet.getcurrent().parent.switch(0)
-
-    # If memory response has not arrived, then yield
-
-    s.memreq.val.next  = 0
-    s.memresp.rdy.next = 1
-
-    while not s.memresp.val:
-      s.trace = ":"
-      greenlet.getcurrent().parent.switch(0)
-
-    # When memory response has arrived, return the corresponding data
-
-    s.trace = " "
-    s.memreq.val.next  = 0
-    s.memresp.rdy.next = 0
-    return s.memresp.msg.data[0:nbytes*8]
+    return wait( s.read( *s._get_range( key ) ) )
 
   #-----------------------------------------------------------------------
   # __setitem__
   #-----------------------------------------------------------------------
 
   def __setitem__( s, key, value ):
+    addr, nbytes = s._get_range( key )
+    wait( s.write( addr, value, nbytes ) )
+
+  #-----------------------------------------------------------------------
+  # _get_range
+  #-----------------------------------------------------------------------
+  # Calculate base address and length for request
 
-    # Calculate base address and length for request
+  def _get_range( s, key ):
 
     if isinstance( key, slice ):
-      addr   = int(key.start)
-      nbytes = int(key.stop) - int(key.start)
+      return int(key.start), int(key.stop) - int(key.start)
     else:
-      addr   = int(key)
-      nbytes = 1
-
-    len_ = nbytes if nbytes < s.memreq.msg.data.nbits/8 else 0
-
-    # Create a memory request to send out memory request port
-
-    s.trace = "w"
-
-    memreq_msg        = s.MemReqMsgType()
-    memreq_msg.type_  = s.MemReqMsgType.TYPE_WRITE
-    memreq_msg.opaque = 0
-    memreq_msg.addr   = addr
-    memreq_msg.len    = len_
-    memreq_msg.data   = value
+      return int(key), 1
 
-    s.memreq.msg.next  = memreq_msg
-    s.memreq.val.next  = 1
-    s.memresp.rdy.next = 1
-
-    # Yield so we wait at least one cycle for the response
+  #-----------------------------------------------------------------------
+  # read
+  #-----------------------------------------------------------------------
+  # Generator reading nbytes starting at addr, pauses until the responses
+  # have come back and returns the data. Reads wider than the data field
+  # are sent as several back-to-back requests.
 
-    greenlet.getcurrent().parent.switch(0)
+  def read( s, addr, nbytes=1 ):
 
-    # If memory request is not ready yet then yeild
+    data = yield s.pipe.transfer( s.MemReqMsgType.TYPE_READ, addr, nbytes )
+    raise Return( Bits( nbytes*8, data ) )
 
-    s.memreq.val.next  = 1
-    s.memresp.rdy.next = 1
+  #-----------------------------------------------------------------------
+  # write
+  #-----------------------------------------------------------------------
+  # Generator writing value to nbytes starting at addr, pauses until the
+  # responses have come back. Posted writes only pause if too many
+  # requests are in flight, see fence().
 
-    while not s.memreq.rdy:
-      s.trace = ";"
-      greenlet.getcurrent().parent.switch(0)
+  def write( s, addr, value, nbytes=1 ):
 
-    # If memory response has not arrived, then yield
+    yield s.pipe.transfer( s.MemReqMsgType.TYPE_WRITE, addr, nbytes,
+                           int( value ), s.posted_writes )
 
-    s.memreq.val.next  = 0
-    s.memresp.rdy.next = 1
+  #-----------------------------------------------------------------------
+  # fence
+  #-----------------------------------------------------------------------
+  # Wait until all posted writes are done. Posted writes are only sent
+  # while the adapter is waiting on something, so FL code must call
+  # fence() (or fence_gen() in generator-based FL code) before it stops
+  # using the adapter.
 
-    while not s.memresp.val:
-      s.trace = ":"
-      greenlet.getcurrent().parent.switch(0)
+  def fence( s ):
+    wait( s.fence_gen() )
 
-    # When memory response has arrived, then we are done
+  #-----------------------------------------------------------------------
+  # fence_gen
+  #-----------------------------------------------------------------------
+  # Generator waiting until all posted writes are done, see fence().
 
-    s.trace = " "
-    s.memreq.val.next  = 0
-    s.memresp.rdy.next = 0
+  def fence_gen( s ):
+    return s.pipe.fence()
 
   #-----------------------------------------------------------------------
   # line_trace
   #-----------------------------------------------------------------------
 
   def line_trace( s ):
-    return s.trace
+    return s.pipe.trace
 
@@ -27,6 +27,14 @@ def mem_copy( mem, src_ptr, dest_ptr, nbytes ):
   for i in range(nbytes):
     mem[dest_ptr+i] = mem[src_ptr+i]
 
+# Same function for generator-based FL code, blocking points are yields.
+
+def mem_copy_gen( mem, src_ptr, dest_ptr, nbytes ):
+
+  for i in range(nbytes):
+    data = yield mem.read( src_ptr+i )
+    yield mem.write( dest_ptr+i, data )
+
 #-------------------------------------------------------------------------
 # Test for underlying mem_copy
 #-------------------------------------------------------------------------
@@ -59,7 +67,8 @@ class MemCopy (Model):
   # Constructor
   #-----------------------------------------------------------------------
 
-  def __init__( s, mem_ifc_types, src_ptr, dest_ptr, nbytes ):
+  def __init__( s, mem_ifc_types, src_ptr, dest_ptr, nbytes,
+                fl_mode='greenlet' ):
 
     s.src_ptr  = src_ptr
     s.dest_ptr = dest_ptr
@@ -88,11 +97,24 @@ class MemCopy (Model):
     # BytesMemPortAdapter object will return the data and the underlying
     # mem_copy function will move onto writing the memory.
 
-    @s.tick_fl
-    def logic():
-      if not s.reset:
-        mem_copy( s.mem, s.src_ptr, s.dest_ptr, s.nbytes )
-        s.done = True
+    if fl_mode == 'greenlet':
+
+      @s.tick_fl
+      def logic():
+        if not s.reset:
+          mem_copy( s.mem, s.src_ptr, s.dest_ptr, s.nbytes )
+          s.done = True
+
+    # The generator version pauses at each yield instead, the same
+    # BytesMemPortAdapter object creates the memory requests.
+
+    else:
+
+      @s.tick_fl
+      def logic():
+        if not s.reset:
+          yield mem_copy_gen( s.mem, s.src_ptr, s.dest_ptr, s.nbytes )
+          s.done = True
 
   #-----------------------------------------------------------------------
   # done
@@ -114,11 +136,12 @@ class MemCopy (Model):
 
 class TestHarness( Model ):
 
-  def __init__( s, src_ptr, dest_ptr, nbytes, stall_prob, latency ):
+  def __init__( s, src_ptr, dest_ptr, nbytes, stall_prob, latency,
+                fl_mode='greenlet' ):
 
     # Instantiate models
 
-    s.mcopy = MemCopy( MemMsg4B(), src_ptr, dest_ptr, nbytes )
+    s.mcopy = MemCopy( MemMsg4B(), src_ptr, dest_ptr, nbytes, fl_mode )
     s.mem   = TestMemory( MemMsg4B(), 1, stall_prob, latency )
 
     # Connect models
@@ -136,9 +159,10 @@ class TestHarness( Model ):
 # test
 #-------------------------------------------------------------------------
 
+@pytest.mark.parametrize( "fl_mode", [ 'greenlet', 'generator' ] )
 @pytest.mark.parametrize( "stall_prob,latency",
                           [ (0,0), (0.2,2), (0.5,4) ] )
-def test( dump_vcd, stall_prob, latency ):
+def test( dump_vcd, stall_prob, latency, fl_mode ):
 
   # Test data we want to write into memory
 
@@ -150,7 +174,8 @@ def test( dump_vcd, stall_prob, latency ):
 
   # Instantiate and elaborate the model
 
-  th = TestHarness( 0x1000, 0x2000, len(data_bytes), stall_prob, latency )
+  th = TestHarness( 0x1000, 0x2000, len(data_bytes), stall_prob, latency,
+                    fl_mode )
   th.vcd_file = dump_vcd
   th.elaborate()
 
@@ -189,3 +214,111 @@ def test( dump_vcd, stall_prob, latency ):
 
   assert result == data
 
+
+#-------------------------------------------------------------------------
+# VVAdd
+#-------------------------------------------------------------------------
+# Adds two vectors of n words, either one word at a time or with bulk
+# reads of both vectors and posted writes.
+
+class VVAdd (Model):
+
+  def __init__( s, fl_mode, pipelined, dest, src0, src1, n ):
+
+    s.memreq  = InValRdyBundle  ( MemMsg4B().req  )
+    s.memresp = OutValRdyBundle ( MemMsg4B().resp )
+    s.mem     = BytesMemPortAdapter( s.memreq, s.memresp,
+                                     posted_writes=pipelined )
+    s.done    = False
+
+    if fl_mode == 'greenlet' and not pipelined:
+
+      @s.tick_fl
+      def logic():
+        if not s.reset and not s.done:
+          for i in range(n):
+            s.mem[dest+4*i:dest+4*i+4] = \
+              s.mem[src0+4*i:src0+4*i+4] + s.mem[src1+4*i:src1+4*i+4]
+          s.done = True
+
+    elif fl_mode == 'greenlet':
+
+      @s.tick_fl
+      def logic():
+        if not s.reset and not s.done:
+          a = s.mem[src0:src0+4*n]
+          b = s.mem[src1:src1+4*n]
+          for i in range(n):
+            s.mem[dest+4*i:dest+4*i+4] = a[32*i:32*i+32] + b[32*i:32*i+32]
+          s.mem.fence()
+          s.done = True
+
+    elif not pipelined:
+
+      @s.tick_fl
+      def logic():
+        if not s.reset and not s.done:
+          for i in range(n):
+            a = yield s.mem.read( src0+4*i, 4 )
+            b = yield s.mem.read( src1+4*i, 4 )
+            yield s.mem.write( dest+4*i, a + b, 4 )
+          s.done = True
+
+    else:
+
+      @s.tick_fl
+      def logic():
+        if not s.reset and not s.done:
+          a = yield s.mem.read( src0, 4*n )
+          b = yield s.mem.read( src1, 4*n )
+          for i in range(n):
+            yield s.mem.write( dest+4*i, a[32*i:32*i+32] + b[32*i:32*i+32], 4 )
+          yield s.mem.fence_gen()
+          s.done = True
+
+class VVAddHarness( Model ):
+
+  def __init__( s, fl_mode, pipelined, n, stall_prob, latency ):
+
+    s.vvadd = VVAdd( fl_mode, pipelined, 0x3000, 0x1000, 0x2000, n )
+    s.mem   = TestMemory( MemMsg4B(), 1, stall_prob, latency )
+
+    s.connect( s.vvadd.memreq,  s.mem.reqs[0]  )
+    s.connect( s.vvadd.memresp, s.mem.resps[0] )
+
+#-------------------------------------------------------------------------
+# test_vvadd
+#-------------------------------------------------------------------------
+
+@pytest.mark.parametrize( "fl_mode", [ 'greenlet', 'generator' ] )
+@pytest.mark.parametrize( "stall_prob,latency", [ (0,0), (0,4), (0.5,4) ] )
+def test_vvadd( stall_prob, latency, fl_mode ):
+
+  n    = 16
+  src0 = [ random.randint(0,0xffff) for _ in range(n) ]
+  src1 = [ random.randint(0,0xffff) for _ in range(n) ]
+
+  ncycles = {}
+  for pipelined in [ False, True ]:
+
+    th = VVAddHarness( fl_mode, pipelined, n, stall_prob, latency )
+    th.elaborate()
+
+    th.mem.write_mem( 0x1000, struct.pack( "<{}I".format(n), *src0 ) )
+    th.mem.write_mem( 0x2000, struct.pack( "<{}I".format(n), *src1 ) )
+
+    sim = SimulationTool( th )
+    sim.reset()
+    while not th.vvadd.done:
+      sim.cycle()
+
+    result = struct.unpack( "<{}I".format(n),
+                            buffer( th.mem.read_mem( 0x3000, 4*n ) ) )
+    assert list( result ) == [ a + b for a, b in zip( src0, src1 ) ]
+
+    ncycles[ pipelined ] = sim.ncycles
+
+  # Requests are sent back-to-back instead of waiting for each response
+
+  if latency:
+    assert ncycles[ True ] < ncycles[ False ] / 2
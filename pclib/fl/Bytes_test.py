@@ -5,6 +5,7 @@
 from pymtl import Bits
 from Bytes import Bytes
 
+import array
 import pytest
 
 #-------------------------------------------------------------------------
@@ -123,3 +124,74 @@ def test_reading_bits():
   mem[0:8] = Bits( 64, 0xdeadbeefcafecade )
   assert mem[0:8] == Bits( 64, 0xdeadbeefcafecade )
 
+
+#-------------------------------------------------------------------------
+# test_uint
+#-------------------------------------------------------------------------
+@pytest.mark.parametrize( "nbytes", [ 1, 2, 3, 4, 8, 16 ] )
+def test_uint( nbytes ):
+
+  mem   = Bytes(32)
+  value = int( ''.join( '{:02x}'.format( i+1 ) for i in range(nbytes) ), 16 )
+
+  mem.write_uint( 4, nbytes, value )
+  assert mem.read_uint( 4, nbytes ) == value
+  assert mem[4:4+nbytes] == Bits( 8*nbytes, value )
+  assert mem.mem[4:4+nbytes] == bytearray( range( nbytes, 0, -1 ) )
+
+  # Only the low nbytes are written
+
+  mem.write_uint( 4, nbytes, -1 )
+  assert mem.read_uint( 4, nbytes ) == (1 << 8*nbytes) - 1
+  assert mem.read_uint( 4+nbytes, 1 ) == 0
+
+  with pytest.raises( IndexError ):
+    mem.read_uint( 32 - nbytes + 1, nbytes )
+  with pytest.raises( IndexError ):
+    mem.write_uint( 32 - nbytes + 1, nbytes, 0 )
+
+#-------------------------------------------------------------------------
+# test_word
+#-------------------------------------------------------------------------
+def test_word():
+
+  mem = Bytes(8)
+
+  mem.write_word( 4, 0xdeadbeef )
+  assert mem.read_word( 4 ) == 0xdeadbeef
+  assert mem[4:8] == Bits( 32, 0xdeadbeef )
+
+#-------------------------------------------------------------------------
+# test_bulk
+#-------------------------------------------------------------------------
+def test_bulk():
+
+  mem = Bytes(16)
+
+  # Write from any buffer
+
+  mem.write_from( 0, array.array( 'I', [ 0x04030201, 0x08070605 ] ) )
+  mem.write_from( 8, memoryview( bytearray( "\x09\x0a" ) ) )
+  mem.write_from( 10, "\x0b" )
+  assert mem.mem == bytearray( range( 1, 12 ) + [ 0 ]*5 )
+
+  # Read into any writable buffer
+
+  words = array.array( 'I', [ 0, 0 ] )
+  mem.read_into( 4, words )
+  assert list( words ) == [ 0x08070605, 0x000b0a09 ]
+
+  data = bytearray(3)
+  mem.read_into( 1, data )
+  assert data == bytearray( "\x02\x03\x04" )
+
+  # Views share the storage
+
+  view = mem.view( 12, 4 )
+  view[0] = "\xff"
+  assert mem[12] == 0xff
+
+  with pytest.raises( IndexError ):
+    mem.write_from( 15, "\x00\x00" )
+  with pytest.raises( IndexError ):
+    mem.read_into( 15, bytearray(2) )
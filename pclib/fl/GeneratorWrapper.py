@@ -0,0 +1,23 @@
+#=========================================================================
+# GeneratorWrapper
+#=========================================================================
+# Same interface as GreenletWrapper for generator functions (see
+# pymtl/tools/simulation/coroutines.py). The first call starts the
+# generator with the given arguments, each call resumes it until it
+# pauses again.
+
+from pymtl.tools.simulation.coroutines import Coroutine
+
+class GeneratorWrapper:
+
+  def __init__( self, func ):
+    self.func      = func
+    self.coroutine = None
+
+  def __call__( self, *args, **kwargs ):
+    if self.coroutine is None:
+      self.coroutine = Coroutine( self.func( *args, **kwargs ) )
+    self.coroutine.step()
+
+  def done( self ):
+    return self.coroutine is not None and self.coroutine.done()
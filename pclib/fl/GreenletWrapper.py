@@ -5,11 +5,14 @@
 # greenlet and then check and see if we are finished executing that
 # function.
 
-from greenlet import greenlet
-
 class GreenletWrapper:
 
   def __init__( self, func ):
+
+    # Imported here so that only users of greenlets need greenlet
+
+    from greenlet import greenlet
+
     self.func_greenlet = greenlet(func)
 
   def __call__( self, *args, **kwargs ):
@@ -17,4 +20,3 @@ class GreenletWrapper:
 
   def done( self ):
     return self.func_greenlet.dead
-
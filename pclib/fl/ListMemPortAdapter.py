@@ -3,11 +3,22 @@
 #=========================================================================
 # These classes provides a list interface, but the implementation
 # essentially turns reads/writes into memory requests sent over a
-# port-based memory interface. We use greenlets to enable us to wait
-# until the response has come back before returning to the function
-# accessing the list.
+# port-based memory interface. The read and write generators wait until
+# the response has come back, for use in generator-based FL code (see
+# pymtl/tools/simulation/coroutines.py). Greenlet-based FL code uses
+# the list interface, which runs the same generators and switches back
+# to the parent greenlet while waiting.
+#
+# Iterating over the list reads all elements with several requests in
+# flight. With posted_writes, writes do not wait for their response,
+# and fence() waits until they are all done (fence_gen() in
+# generator-based FL code).
 
-from greenlet import greenlet
+from pymtl import Bits
+
+from pymtl.tools.simulation.coroutines import Return, wait
+
+from MemPortPipe import MemPortPipe
 
 #-------------------------------------------------------------------------
 # ListMemPortAdapter
@@ -19,7 +30,8 @@ class ListMemPortAdapter (object):
   # Constructor
   #-----------------------------------------------------------------------
 
-  def __init__( s, memreq, memresp ):
+  def __init__( s, memreq, memresp, posted_writes=False,
+                max_outstanding=None ):
 
     # Shorter names
 
@@ -31,128 +43,99 @@ class ListMemPortAdapter (object):
     s.memreq  = memreq
     s.memresp = memresp
 
+    # Requests are sent by a MemPortPipe, which can have up to
+    # max_outstanding requests in flight
+
+    s.pipe          = MemPortPipe( memreq, memresp, max_outstanding )
+    s.posted_writes = posted_writes
+
     s.size = 0
     s.base = 0
     s.base_set = False
-    s.trace = " "
 
   #-----------------------------------------------------------------------
   # __getitem__
   #-----------------------------------------------------------------------
 
   def __getitem__( s, key ):
-
-    # Calculate base address and length for request
-
-    if isinstance( key, slice ):
-      addr   = int(key.start)
-      nbytes = int(key.stop) - int(key.start)
-    else:
-      addr   = int(key)
-      nbytes = 4
-
-    len_ = nbytes if nbytes < s.memreq.msg.data.nbits/8 else 0
-
-    # Create a memory request to send out memory request port
-
-    s.trace = "r"
-
-    memreq_msg       = s.MemReqMsgType()
-    memreq_msg.type_ = s.MemReqMsgType.TYPE_READ
-    memreq_msg.addr  = s.base + 4 * addr
-    memreq_msg.len   = len_
-
-    s.memreq.msg.next  = memreq_msg
-    s.memreq.val.next  = 1
-    s.memresp.rdy.next = 1
-
-    # Yield so we wait at least one cycle for the ready/response
-
-    greenlet.getcurrent().parent.switch(0)
-
-    # If memory request is not ready yet then yeild
-
-    s.memreq.val.next  = 1
-    s.memresp.rdy.next = 1
-
-    while not s.memreq.rdy:
-      s.trace = ";"
-      greenlet.getcurrent().parent.switch(0)
-
-    # If memory response has not arrived, then yield
-
-    s.memreq.val.next  = 0
-    s.memresp.rdy.next = 1
-
-    while not s.memresp.val:
-      s.trace = ":"
-      greenlet.getcurrent().parent.switch(0)
-
-    # When memory response has arrived, return the corresponding data
-
-    s.trace = " "
-    s.memreq.val.next  = 0
-    s.memresp.rdy.next = 0
-    return s.memresp.msg.data[0:nbytes*8].int()
+    return wait( s.read( *s._get_range( key ) ) )
 
   #-----------------------------------------------------------------------
   # __setitem__
   #-----------------------------------------------------------------------
 
   def __setitem__( s, key, value ):
+    addr, nbytes = s._get_range( key )
+    wait( s.write( addr, value, nbytes ) )
+
+  #-----------------------------------------------------------------------
+  # _get_range
+  #-----------------------------------------------------------------------
+  # Calculate base address and length for request
 
-    # Calculate base address and length for request
+  def _get_range( s, key ):
 
     if isinstance( key, slice ):
-      addr   = int(key.start)
-      nbytes = int(key.stop) - int(key.start)
+      return int(key.start), int(key.stop) - int(key.start)
     else:
-      addr   = int(key)
-      nbytes = 4
-
-    len_ = nbytes if nbytes < s.memreq.msg.data.nbits/8 else 0
+      return int(key), 4
 
-    # Create a memory request to send out memory request port
-
-    s.trace = "w"
+  #-----------------------------------------------------------------------
+  # read
+  #-----------------------------------------------------------------------
+  # Generator reading the element at index addr, pauses until the
+  # response has come back and returns the data.
 
-    memreq_msg       = s.MemReqMsgType()
-    memreq_msg.type_ = s.MemReqMsgType.TYPE_WRITE
-    memreq_msg.addr  = s.base + 4 * addr
-    memreq_msg.len   = len_
-    memreq_msg.data  = value
+  def read( s, addr, nbytes=4 ):
 
-    s.memreq.msg.next  = memreq_msg
-    s.memreq.val.next  = 1
-    s.memresp.rdy.next = 1
+    data = yield s.pipe.transfer( s.MemReqMsgType.TYPE_READ,
+                                  s.base + 4 * addr, nbytes )
+    raise Return( Bits( nbytes*8, data ).int() )
 
-    # Yield so we wait at least one cycle for the response
+  #-----------------------------------------------------------------------
+  # read_range
+  #-----------------------------------------------------------------------
+  # Generator returning the list of elements from index start to stop,
+  # read with several requests in flight.
 
-    greenlet.getcurrent().parent.switch(0)
+  def read_range( s, start, stop ):
 
-    # If memory request is not ready yet then yeild
+    nelems = max( stop - start, 0 )
+    data   = yield s.pipe.transfer( s.MemReqMsgType.TYPE_READ,
+                                    s.base + 4 * start, 4 * nelems )
+    raise Return( [ Bits( 32, (data >> 32*i) & 0xffffffff ).int()
+                    for i in xrange( nelems ) ] )
 
-    s.memreq.val.next  = 1
-    s.memresp.rdy.next = 1
+  #-----------------------------------------------------------------------
+  # write
+  #-----------------------------------------------------------------------
+  # Generator writing value to the element at index addr, pauses until
+  # the response has come back. Posted writes only pause if too many
+  # requests are in flight, see fence().
 
-    while not s.memreq.rdy:
-      s.trace = ";"
-      greenlet.getcurrent().parent.switch(0)
+  def write( s, addr, value, nbytes=4 ):
 
-    # If memory response has not arrived, then yield
+    yield s.pipe.transfer( s.MemReqMsgType.TYPE_WRITE, s.base + 4 * addr,
+                           nbytes, int( value ), s.posted_writes )
 
-    s.memreq.val.next  = 0
-    s.memresp.rdy.next = 1
+  #-----------------------------------------------------------------------
+  # fence
+  #-----------------------------------------------------------------------
+  # Wait until all posted writes are done. Posted writes are only sent
+  # while the adapter is waiting on something, so FL code must call
+  # fence() (or fence_gen() in generator-based FL code) before it stops
+  # using the adapter.
 
-    while not s.memresp.val:
-      s.trace = ":"
-      greenlet.getcurrent().parent.switch(0)
+  def fence( s ):
+    wait( s.fence_gen() )
 
-    # When memory response has arrived, then we are done
+  #-----------------------------------------------------------------------
+  # fence_gen
+  #-----------------------------------------------------------------------
+  # Generator waiting until all posted writes are done, see fence().
 
-    s.trace = " "
-    s.memreq.val.next  = 0
-    s.memresp.rdy.next = 0
+  def fence_gen( s ):
+    return s.pipe.fence()
 
   def set_base( s, addr ):
     s.base = addr
@@ -165,13 +148,12 @@ class ListMemPortAdapter (object):
     return s.size
 
   def __iter__( s ):
-    for x in range(s.size):
-      yield s[x]
+    return iter( wait( s.read_range( 0, s.size ) ) )
 
   #-----------------------------------------------------------------------
   # line_trace
   #-----------------------------------------------------------------------
 
   def line_trace( s ):
-    return s.trace
+    return s.pipe.trace
 
@@ -14,7 +14,8 @@
 # change the users of this adapter so they no longer use ReqRespBundles.
 #
 
-from greenlet import greenlet
+# greenlet is imported by the methods that need it, so that importing
+# pclib.fl does not load it
 
 #-------------------------------------------------------------------------
 # ListMemPortAdapterOld
@@ -48,6 +49,8 @@ class ListMemPortAdapterOld (object):
 
   def __getitem__( s, key ):
 
+    from greenlet import greenlet
+
     # Calculate base address and length for request
 
     if isinstance( key, slice ):
@@ -107,6 +110,8 @@ class ListMemPortAdapterOld (object):
 
   def __setitem__( s, key, value ):
 
+    from greenlet import greenlet
+
     # Calculate base address and length for request
 
     if isinstance( key, slice ):
@@ -0,0 +1,95 @@
+#=========================================================================
+# ListMemPortAdapter_test
+#=========================================================================
+
+from __future__ import print_function
+
+import pytest
+import random
+import struct
+
+from pymtl      import *
+from pclib.ifcs import InValRdyBundle, OutValRdyBundle
+from pclib.ifcs import MemMsg4B
+
+from pclib.test import TestMemory
+
+from ListMemPortAdapter import ListMemPortAdapter
+
+#-------------------------------------------------------------------------
+# ListScale
+#-------------------------------------------------------------------------
+# An example model that multiplies all the elements of a list in memory
+# by a constant, iterating over the list and writing the results back
+# with posted writes.
+
+class ListScale (Model):
+
+  def __init__( s, base, size, factor ):
+
+    s.memreq  = InValRdyBundle  ( MemMsg4B().req  )
+    s.memresp = OutValRdyBundle ( MemMsg4B().resp )
+
+    s.lst = ListMemPortAdapter( s.memreq, s.memresp, posted_writes=True )
+    s.lst.set_base( base )
+    s.lst.set_size( size )
+
+    s.done = False
+
+    @s.tick_fl
+    def logic():
+      if not s.reset and not s.done:
+        for i, x in enumerate( s.lst ):
+          s.lst[i] = factor * x
+        s.lst.fence()
+        s.done = True
+
+  def line_trace( s ):
+    return "(" + s.lst.line_trace() + ")"
+
+#-------------------------------------------------------------------------
+# TestHarness
+#-------------------------------------------------------------------------
+
+class TestHarness( Model ):
+
+  def __init__( s, base, size, factor, stall_prob, latency ):
+
+    s.scale = ListScale( base, size, factor )
+    s.mem   = TestMemory( MemMsg4B(), 1, stall_prob, latency )
+
+    s.connect( s.scale.memreq,  s.mem.reqs[0]  )
+    s.connect( s.scale.memresp, s.mem.resps[0] )
+
+  def line_trace( s ):
+    return s.scale.line_trace() + " " + s.mem.line_trace()
+
+#-------------------------------------------------------------------------
+# test
+#-------------------------------------------------------------------------
+
+@pytest.mark.parametrize( "stall_prob,latency",
+                          [ (0,0), (0.2,2), (0.5,4) ] )
+def test( dump_vcd, stall_prob, latency ):
+
+  data = [ random.randint(-1000,1000) for _ in range(16) ]
+
+  th = TestHarness( 0x1000, len(data), 3, stall_prob, latency )
+  th.vcd_file = dump_vcd
+  th.elaborate()
+
+  th.mem.write_mem( 0x1000, struct.pack( "<{}i".format(len(data)), *data ) )
+
+  sim = SimulationTool( th )
+
+  print()
+
+  sim.reset()
+  while not th.scale.done:
+    sim.print_line_trace()
+    sim.cycle()
+
+  result_bytes = th.mem.read_mem( 0x1000, 4*len(data) )
+  result = struct.unpack( "<{}i".format(len(data)), buffer(result_bytes) )
+
+  assert list( result ) == [ 3*x for x in data ]
@@ -0,0 +1,197 @@
+#=========================================================================
+# MemPortPipe
+#=========================================================================
+# Sends memory requests over a port-based memory interface on behalf of
+# the FL memory port adapters, with several requests in flight. Requests
+# are sent in order, back-to-back, each with its own opaque field, and
+# responses are matched to requests by their opaque field. All blocking
+# methods are generators (see pymtl/tools/simulation/coroutines.py).
+#
+# The ports are only driven while one of the generators is running,
+# since nobody would see the requests or responses going through while
+# the FL code is blocked on something else. Requests issued in between
+# (e.g., posted writes) are queued and sent by the next blocking call.
+
+import collections
+
+from pymtl.tools.simulation.coroutines import Return
+
+class MemPortPipe (object):
+
+  #-----------------------------------------------------------------------
+  # Constructor
+  #-----------------------------------------------------------------------
+  # At most max_outstanding requests can be in flight, by default as many
+  # as there are values of the opaque field.
+
+  def __init__( s, memreq, memresp, max_outstanding=None ):
+
+    s.MemReqMsgType = memreq.msg.dtype
+
+    s.memreq  = memreq
+    s.memresp = memresp
+
+    nopaques = 2**s.MemReqMsgType.opaque.nbits
+    if max_outstanding is not None:
+      nopaques = min( nopaques, max_outstanding )
+
+    s.data_nbytes = s.MemReqMsgType.data.nbits/8
+
+    s.free     = collections.deque( range( nopaques ) )
+    s.pending  = collections.deque()
+    s.inflight = 0
+    s.posted   = set()
+    s.resps    = {}
+    s.trace    = " "
+
+  #-----------------------------------------------------------------------
+  # transfer
+  #-----------------------------------------------------------------------
+  # Generator accessing nbytes starting at addr, split in requests of the
+  # size of the data field which are all sent back-to-back. Returns the
+  # data of the responses as a single integer, or None for posted
+  # requests.
+
+  def transfer( s, type_, addr, nbytes, data=0, posted=False ):
+
+    opaques = collections.deque()
+    values  = []
+
+    for offset in xrange( 0, nbytes, s.data_nbytes ):
+
+      # Collect the oldest response first if it holds the last opaque
+
+      if opaques and not s.free:
+        values.append( ( yield s.response( opaques.popleft() ) ) )
+
+      size   = min( s.data_nbytes, nbytes - offset )
+      opaque = yield s.issue( type_, addr + offset, size,
+                              ( data >> 8*offset ) & ((1 << 8*size) - 1),
+                              posted )
+      if not posted:
+        opaques.append( opaque )
+
+    while opaques:
+      values.append( ( yield s.response( opaques.popleft() ) ) )
+
+    if posted:
+      raise Return( None )
+
+    result = 0
+    mask   = (1 << 8*s.data_nbytes) - 1
+    for i, value in enumerate( values ):
+      result |= ( value & mask ) << ( 8*s.data_nbytes*i )
+    raise Return( result & ((1 << 8*nbytes) - 1) )
+
+  #-----------------------------------------------------------------------
+  # issue
+  #-----------------------------------------------------------------------
+  # Generator queueing a request and returning its opaque field, only
+  # waits if too many requests are already in flight. The responses to
+  # posted requests are dropped, others are returned by response().
+
+  def issue( s, type_, addr, nbytes, data=0, posted=False ):
+
+    if not s.free:
+      s._drive()
+      while not s.free:
+        yield
+        s._pump()
+      s._idle()
+
+    opaque = s.free.popleft()
+
+    memreq_msg        = s.MemReqMsgType()
+    memreq_msg.type_  = type_
+    memreq_msg.opaque = opaque
+    memreq_msg.addr   = addr
+    memreq_msg.len    = nbytes if nbytes < s.data_nbytes else 0
+    memreq_msg.data   = data
+
+    s.pending.append( memreq_msg )
+    s.inflight += 1
+    if posted:
+      s.posted.add( opaque )
+
+    s.trace = "w" if type_ == s.MemReqMsgType.TYPE_WRITE else "r"
+
+    raise Return( opaque )
+
+  #-----------------------------------------------------------------------
+  # response
+  #-----------------------------------------------------------------------
+  # Generator returning the data of the response to the request with the
+  # given opaque field, waits until it has arrived.
+
+  def response( s, opaque ):
+
+    if opaque not in s.resps:
+      s._drive()
+      while opaque not in s.resps:
+        yield
+        s._pump()
+      s._idle()
+
+    s.free.append( opaque )
+    raise Return( s.resps.pop( opaque ) )
+
+  #-----------------------------------------------------------------------
+  # fence
+  #-----------------------------------------------------------------------
+  # Generator waiting until the responses to all requests have arrived.
+
+  def fence( s ):
+
+    if s.inflight:
+      s._drive()
+      while s.inflight:
+        yield
+        s._pump()
+      s._idle()
+
+  #-----------------------------------------------------------------------
+  # _pump
+  #-----------------------------------------------------------------------
+  # Account for the request and response transferred in the last cycle,
+  # then drive the ports for the next one.
+
+  def _pump( s ):
+
+    if s.memreq.val and s.memreq.rdy:
+      s.pending.popleft()
+
+    if s.memresp.val and s.memresp.rdy:
+      opaque = s.memresp.msg.opaque.uint()
+      s.inflight -= 1
+      if opaque in s.posted:
+        s.posted.remove( opaque )
+        s.free.append( opaque )
+      else:
+        s.resps[ opaque ] = s.memresp.msg.data.uint()
+
+    s.trace = ";" if s.pending else ":"
+    s._drive()
+
+  #-----------------------------------------------------------------------
+  # _drive
+  #-----------------------------------------------------------------------
+
+  def _drive( s ):
+
+    if s.pending:
+      s.memreq.msg.next = s.pending[0]
+      s.memreq.val.next = 1
+    else:
+      s.memreq.val.next = 0
+
+    s.memresp.rdy.next = 1 if s.inflight else 0
+
+  #-----------------------------------------------------------------------
+  # _idle
+  #-----------------------------------------------------------------------
+
+  def _idle( s ):
+
+    s.trace = " "
+    s.memreq.val.next  = 0
+    s.memresp.rdy.next = 0
@@ -3,11 +3,13 @@
 #=========================================================================
 # These classes provide part of a standard Python deque interface, but
 # the implementation essentially turns the popleft() and append() methods
-# into a val/rdy port-based interface. We use greenlets to enable us to
-# wait until data is ready via the val/rdy interface before returning to
-# function calling the popleft() or append() method.
+# into a val/rdy port-based interface. The deq() and enq() generators
+# wait until data is ready via the val/rdy interface, for use in
+# generator-based FL code (see pymtl/tools/simulation/coroutines.py).
+# Greenlet-based FL code calls popleft() and append(), which run the
+# same generators and switch back to the parent greenlet while waiting.
 
-from greenlet import greenlet
+from pymtl.tools.simulation.coroutines import Return, wait
 
 #=========================================================================
 # InQueuePortProxy
@@ -29,6 +31,15 @@ class InQueuePortProxy (object):
   #-----------------------------------------------------------------------
 
   def popleft( s ):
+    return wait( s.deq() )
+
+  #-----------------------------------------------------------------------
+  # deq
+  #-----------------------------------------------------------------------
+  # Generator returning the next message once the input interface is
+  # valid.
+
+  def deq( s ):
 
     # Set the rdy signal
 
@@ -37,19 +48,19 @@ class InQueuePortProxy (object):
 
     # Yield so we wait at least one cycle for the response
 
-    greenlet.getcurrent().parent.switch(0)
+    yield
 
     # If input interface is not valid then yield
 
     while not s.in_.val:
       s.trace = ":"
-      greenlet.getcurrent().parent.switch(0)
+      yield
 
     # Input interface is valid so reset rdy signal and return message
 
     s.trace = " "
     s.in_.rdy.next = 0
-    return s.in_.msg
+    raise Return( s.in_.msg )
 
   #-----------------------------------------------------------------------
   # line_trace
@@ -78,6 +89,14 @@ class OutQueuePortProxy (object):
   #-----------------------------------------------------------------------
 
   def append( s, msg ):
+    wait( s.enq( msg ) )
+
+  #-----------------------------------------------------------------------
+  # enq
+  #-----------------------------------------------------------------------
+  # Generator sending msg, returns once the output interface is ready.
+
+  def enq( s, msg ):
 
     # Set the val signal and message
 
@@ -87,13 +106,13 @@ class OutQueuePortProxy (object):
 
     # Yield so we wait at least one cycle for the rdy
 
-    greenlet.getcurrent().parent.switch(0)
+    yield
 
     # If output interface is not ready then yield
 
     while not s.out.rdy:
       s.trace = ":"
-      greenlet.getcurrent().parent.switch(0)
+      yield
 
     # Output interface is ready so reset val signal
 
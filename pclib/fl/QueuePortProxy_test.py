@@ -24,6 +24,14 @@ def queue_copy( n, in_queue, out_queue ):
   for _ in range(n):
     out_queue.append( in_queue.popleft() )
 
+# Same function for generator-based FL code, blocking points are yields.
+
+def queue_copy_gen( n, in_queue, out_queue ):
+
+  for _ in range(n):
+    msg = yield in_queue.deq()
+    yield out_queue.enq( msg )
+
 #-------------------------------------------------------------------------
 # Test for underlying queue_copy
 #-------------------------------------------------------------------------
@@ -45,7 +53,7 @@ def test_queue_copy():
 # interface to an output val/rdy interface.
 class QueueCopy( Model ):
 
-  def __init__( s, dtype, nmsgs ):
+  def __init__( s, dtype, nmsgs, fl_mode='greenlet' ):
 
     s.nmsgs = nmsgs
 
@@ -75,9 +83,20 @@ class QueueCopy( Model ):
     # queue port proxy objects include infinite internal queues so the
     # output queue can never stall.
 
-    @s.tick_fl
-    def logic():
-      queue_copy( s.nmsgs, s.in_queue, s.out_queue )
+    if fl_mode == 'greenlet':
+
+      @s.tick_fl
+      def logic():
+        queue_copy( s.nmsgs, s.in_queue, s.out_queue )
+
+    # The generator version pauses at each yield instead, using the
+    # same queue port proxy objects.
+
+    else:
+
+      @s.tick_fl
+      def logic():
+        yield queue_copy_gen( s.nmsgs, s.in_queue, s.out_queue )
 
   #-----------------------------------------------------------------------
   # line_trace
@@ -92,10 +111,11 @@ class QueueCopy( Model ):
 
 class TestHarness (Model):
 
-  def __init__( s, src_msgs, sink_msgs, src_delay, sink_delay ):
+  def __init__( s, src_msgs, sink_msgs, src_delay, sink_delay,
+                fl_mode='greenlet' ):
 
     s.src   = TestSource ( 32, src_msgs,  src_delay  )
-    s.qcopy = QueueCopy  ( 32, len(src_msgs)         )
+    s.qcopy = QueueCopy  ( 32, len(src_msgs), fl_mode )
     s.sink  = TestSink   ( 32, sink_msgs, sink_delay )
 
     s.connect( s.src.out,   s.qcopy.in_ )
@@ -117,7 +137,8 @@ class TestHarness (Model):
   ( 10, 5  ),
   (  5, 10 ),
 ])
-def test( dump_vcd, src_delay, sink_delay ):
+@pytest.mark.parametrize( "fl_mode", [ 'greenlet', 'generator' ] )
+def test( dump_vcd, src_delay, sink_delay, fl_mode ):
 
   # Test messages
 
@@ -127,7 +148,7 @@ def test( dump_vcd, src_delay, sink_delay ):
 
   # Instantiate and elaborate the model
 
-  model = TestHarness( src_msgs, sink_msgs, src_delay, sink_delay )
+  model = TestHarness( src_msgs, sink_msgs, src_delay, sink_delay, fl_mode )
   model.vcd_file = dump_vcd
   model.elaborate()
 
@@ -2,12 +2,15 @@
 from Bytes                 import Bytes
 from BytesMemPortAdapter   import BytesMemPortAdapter
 from GreenletWrapper       import GreenletWrapper
+from GeneratorWrapper      import GeneratorWrapper
 from ListBytesProxy        import ListBytesProxy
 from QueuePortProxy        import InQueuePortProxy,OutQueuePortProxy
 from Queue                 import Queue
 from ListMemPortAdapter    import ListMemPortAdapter
 from ListMemPortAdapterOld import ListMemPortAdapterOld
 
+from pymtl.tools.simulation.coroutines import Return, wait
+
 # Other names
 
 from QueuePortProxy import InQueuePortProxy  as InValRdyQueueAdapter
@@ -69,7 +69,7 @@ class TestRandomDelay( Model ):
       # counter.
 
       if in_go:
-        s.buf      = s.in_.msg[:]
+        s.buf      = s.in_.msg.copy()
         s.buf_full = True
         s.counter  = s.rgen.randint( 1, s.max_random_delay )
 
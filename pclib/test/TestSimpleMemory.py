@@ -115,7 +115,7 @@ class TestSimpleMemory (Model):
           s.memreq_type[i] = s.memreq[i].type_
           s.memreq_addr[i] = s.memreq[i].addr
           s.memreq_len[i]  = s.memreq[i].len_
-          s.memreq_data[i] = s.memreq[i].data[:]
+          s.memreq_data[i] = s.memreq[i].data.copy()
 
           # When len is zero, then we use all of the data
 
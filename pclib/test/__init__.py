@@ -15,5 +15,6 @@ from SparseMemoryImage   import SparseMemoryImage
 
 from test_utils import mk_test_case_table
 from test_utils import run_test_vector_sim
+from test_utils import run_test_vector_sim_batch
 from test_utils import run_sim
 
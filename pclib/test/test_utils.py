@@ -176,3 +176,120 @@ def run_test_vector_sim( model, test_vectors, dump_vcd=None, test_verilog=False
   sim.cycle()
   sim.cycle()
 
+
+#-------------------------------------------------------------------------
+# run_test_vector_sim_batch
+#-------------------------------------------------------------------------
+# Same test vector format as run_test_vector_sim, but the model is
+# translated and all rows are simulated with a single call into the
+# Verilator wrapper's run_cycles loop. Inputs which are not listed in
+# the test vectors keep their value after reset. Requires NumPy.
+
+def run_test_vector_sim_batch( model, test_vectors, dump_vcd=None ):
+
+  import numpy
+
+  # First row in test vectors contains port names
+
+  if isinstance(test_vectors[0],str):
+    port_names = test_vectors[0].split()
+  else:
+    port_names = test_vectors[0]
+
+  # Remaining rows contain the actual test vectors
+
+  test_vectors = test_vectors[1:]
+  ncycles      = len( test_vectors )
+
+  # Setup the model
+
+  model.vcd_file = dump_vcd
+  model = TranslationTool( model )
+  model.elaborate()
+
+  # Create a simulator
+
+  sim = SimulationTool( model )
+
+  # Reset model
+
+  sim.reset()
+  print ""
+
+  # Compute the word offset of each port in a stimulus/response record
+
+  def get_layout( ports ):
+    layout = {}
+    offset = 0
+    for name, nbits in ports:
+      nwords = (nbits-1)/32 + 1
+      layout[ name ] = ( offset, nwords, nbits )
+      offset += nwords
+    return layout, max( offset, 1 )
+
+  in_layout,  in_nwords  = get_layout( model.run_inports  )
+  out_layout, out_nwords = get_layout( model.run_outports )
+
+  def pack( buf, row, entry, value ):
+    offset, nwords, nbits = entry
+    value = int( value ) & ((1 << nbits) - 1)
+    for i in range( nwords ):
+      buf[ row, offset+i ] = (value >> (32*i)) & 0xffffffff
+
+  def unpack( buf, row, entry ):
+    offset, nwords, nbits = entry
+    value = 0
+    for i in range( nwords ):
+      value |= int( buf[ row, offset+i ] ) << (32*i)
+    return Bits( nbits, value )
+
+  def lookup( layout, port_name ):
+    if port_name not in layout:
+      raise Exception("Could not find port: {}".format(port_name))
+    return layout[ port_name ]
+
+  # Build the stimulus buffer, holding undriven inputs at their current
+  # value
+
+  in_buf  = numpy.zeros( ( ncycles, in_nwords  ), dtype=numpy.uint32 )
+  out_buf = numpy.zeros( ( ncycles, out_nwords ), dtype=numpy.uint32 )
+
+  for port in model.get_inports():
+    if port.name in in_layout:
+      for row_num in range( ncycles ):
+        pack( in_buf, row_num, in_layout[ port.name ], port.uint() )
+
+  for row_num, row in enumerate( test_vectors ):
+    for port_name, in_value in zip( port_names, row ):
+      if port_name[-1] != "*":
+        pack( in_buf, row_num, lookup( in_layout, port_name ), in_value )
+
+  # Run the simulation
+
+  model.run_cycles( ncycles, in_buf, out_buf )
+  sim.ncycles += ncycles
+
+  # Check test outputs
+
+  for row_num, row in enumerate( test_vectors ):
+    for port_name, ref_value in zip( port_names, row ):
+      if port_name[-1] == "*":
+
+        out_value = unpack( out_buf, row_num,
+                            lookup( out_layout, port_name[0:-1] ) )
+
+        if ( ref_value != '?' ) and ( out_value != ref_value ):
+
+          error_msg = """
+ run_test_vector_sim_batch received an incorrect value!
+  - row number     : {row_number}
+  - port name      : {port_name}
+  - expected value : {expected_msg}
+  - actual value   : {actual_msg}
+"""
+          raise RunTestVectorSimError( error_msg.format(
+            row_number   = row_num+1,
+            port_name    = port_name,
+            expected_msg = ref_value,
+            actual_msg   = out_value
+          ))
@@ -9,7 +9,7 @@ class PyMTLError( Exception ):
 #-----------------------------------------------------------------------
 
 from model.Model      import Model
-from model.signals    import Wire, InPort, OutPort
+from model.signals    import Wire, InPort, OutPort, MemoryArray
 from model.PortBundle import PortBundle, create_PortBundles
 
 #-----------------------------------------------------------------------
@@ -27,34 +27,83 @@ from datatypes.SignalValue import CreateWrappedClass
 #-----------------------------------------------------------------------
 # tools
 #-----------------------------------------------------------------------
+# The translation tools pull in the translators, cffi and the C++ and
+# Verilator helpers, which most simulations never use. They are bound
+# to stand-ins importing the actual tool on the first call, so that even
+# "from pymtl import *" does not load them. The stand-ins are defined in
+# pymtl.tools.translation so that both namespaces share them.
+
+import importlib as _importlib
+
+def _lazy_tool( module, name ):
+
+  def tool( *args, **kwargs ):
+    func = getattr( _importlib.import_module( module, __name__ ), name )
+    return func( *args, **kwargs )
+
+  tool.__name__ = name
+  tool.__doc__  = 'Imports and calls {}.{}.'.format( module, name )
+  return tool
 
 from tools.simulation.SimulationTool import SimulationTool
-from tools.translation.verilator_sim import TranslationTool
-from tools.translation.cpp_sim       import get_cpp
 from tools.integration.verilog       import VerilogModel
 from tools.integration.systemc       import SystemCModel
 
+from tools.translation               import TranslationTool, get_cpp
+
 #-----------------------------------------------------------------------
 # py.test decorators
 #-----------------------------------------------------------------------
+# Importing py.test takes longer than importing the rest of pymtl. When
+# running under py.test these are regular skipif marks, otherwise the
+# marks (and the search for the tools they require) are only created
+# when first used.
+
+import sys as _sys
 
-from pytest          import mark            as _mark
 from distutils.spawn import find_executable as _find_executable
 from os.path         import exists          as _exists
 
 _has = lambda x: _find_executable( x ) != None
 
-requires_xcc = _mark.skipif( not( _has('maven-gcc') and _has('maven-objdump') ),
-                             reason='requires cross-compiler toolchain' )
+class _LazySkipIf( object ):
+
+  def __init__( self, condition, reason ):
+    self._condition = condition
+    self._reason    = reason
+    self._marker    = None
+
+  def _get_mark( self ):
+    if self._marker is None:
+      from pytest import mark
+      self._marker = mark.skipif( self._condition(), reason=self._reason )
+    return self._marker
+
+  def __call__( self, *args, **kwargs ):
+    return self._get_mark()( *args, **kwargs )
+
+  def __getattr__( self, name ):
+    if name.startswith( '_' ):
+      raise AttributeError( name )
+    return getattr( self._get_mark(), name )
+
+def _skipif( condition, reason ):
+  if 'pytest' in _sys.modules:
+    from pytest import mark
+    return mark.skipif( condition(), reason=reason )
+  return _LazySkipIf( condition, reason )
+
+requires_xcc = _skipif( lambda: not( _has('maven-gcc') and _has('maven-objdump') ),
+                        reason='requires cross-compiler toolchain' )
 
-requires_vmh = _mark.skipif( not _exists('../tests/build/vmh'),
-                             reason='requires vmh files' )
+requires_vmh = _skipif( lambda: not _exists('../tests/build/vmh'),
+                        reason='requires vmh files' )
 
-requires_iverilog  = _mark.skipif( not( _has('iverilog') ),
-                                   reason='requires iverilog' )
+requires_iverilog  = _skipif( lambda: not( _has('iverilog') ),
+                              reason='requires iverilog' )
 
-requires_verilator = _mark.skipif( not( _has('verilator') ),
-                                   reason='requires verilator' )
+requires_verilator = _skipif( lambda: not( _has('verilator') ),
+                              reason='requires verilator' )
 
 #-----------------------------------------------------------------------
 # pymtl namespace
@@ -68,6 +117,7 @@ __all__ = [ # Model Construction
             'InPort',
             'OutPort',
             'Wire',
+            'MemoryArray',
             'PortBundle',
             'create_PortBundles',
             # Message Types
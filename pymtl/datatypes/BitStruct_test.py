@@ -120,6 +120,24 @@ def test_bitstruct_call():
     y.addr = 8
     assert x.addr != y.addr
 
+#-----------------------------------------------------------------------
+# Test copies keep the type and fields
+#-----------------------------------------------------------------------
+
+def test_bitstruct_copy():
+
+  x = MemMsg( 16, 32 )()
+  x.addr = 0xbeef
+  x.data = 0xabcd1234
+
+  y = x.copy()
+  assert type( y ) == type( x )
+  assert y.addr == 0xbeef and y.data == 0xabcd1234
+
+  y.addr = 0xcafe
+  assert x.addr == 0xbeef
+  assert y.addr == 0xcafe
+
 #-----------------------------------------------------------------------
 # Test two instances with same params
 #-----------------------------------------------------------------------
@@ -5,8 +5,6 @@
 
 from SignalValue import SignalValue
 
-import copy
-
 #-----------------------------------------------------------------------
 # _get_nbits
 #-----------------------------------------------------------------------
@@ -53,6 +51,52 @@ class Bits( SignalValue ):
 
     self._target_bits = self
 
+  #---------------------------------------------------------------------
+  # __getattr__
+  #---------------------------------------------------------------------
+  # Simulators only allocate the shadow state (_next) of nets which are
+  # written in sequential blocks. Allocate it on demand for any other
+  # Bits object the first time it is accessed.
+  def __getattr__( self, name ):
+    if name == '_next':
+      return self._alloc_next( self )
+    raise AttributeError( "'{}' object has no attribute '{}'"
+                          .format( self.__class__.__name__, name ) )
+
+  #---------------------------------------------------------------------
+  # _alloc_next
+  #---------------------------------------------------------------------
+  # Default shadow state allocator, SimulationTool replaces it with one
+  # that also installs the sequential update hook.
+  @staticmethod
+  def _alloc_next( bits ):
+    bits._next = bits()
+    return bits._next
+
+  #---------------------------------------------------------------------
+  # copy
+  #---------------------------------------------------------------------
+  # Return a detached copy carrying only the value. Nets in a simulator
+  # hold hooks and shadow state bound to the simulator which must not be
+  # copied. The copy skips __init__, since the value is already known
+  # to fit, which makes it cheap enough to snapshot every message handed
+  # off by cycle-level models.
+  def copy( self ):
+    clone = object.__new__( self.__class__ )
+    clone.__dict__.update(
+      nbits = self.nbits, _max = self._max, _min = self._min,
+      _mask = self._mask, slice = slice( None ), _uint = self._uint,
+    )
+    clone._target_bits = clone
+    return clone
+
+  #---------------------------------------------------------------------
+  # __deepcopy__
+  #---------------------------------------------------------------------
+  # Deep copies only carry the value, see copy.
+  def __deepcopy__( self, memo ):
+    return self.copy()
+
   #---------------------------------------------------------------------
   # __call__
   #---------------------------------------------------------------------
@@ -127,6 +171,20 @@ class Bits( SignalValue ):
       )
     self._next._uint = (value & self._mask)
 
+  #---------------------------------------------------------------------
+  # flop
+  #---------------------------------------------------------------------
+  # Specialized version of SignalValue.flop(). The shadow state has
+  # already been masked and range checked by write_next(), so we can
+  # compare and copy the raw integers, skipping all work when the
+  # register keeps its value.
+  def flop( self ):
+    next_uint = self._next._uint
+    if next_uint != self._uint:
+      self._uint = next_uint
+      self.notify_sim_comb_update()
+      for func in self._slices: func()
+
   #---------------------------------------------------------------------
   # bit_length
   #---------------------------------------------------------------------
@@ -191,7 +249,7 @@ class Bits( SignalValue ):
 
       # Open-ended range ( [:] ), return a copy of self
       if start is None and stop is None:
-        return copy.copy( self )
+        return self.copy()
 
       # Open-ended range on left ( [:N] )
       elif start is None:
@@ -490,17 +548,31 @@ class BitSlice( Bits ):
     self._offset      = offset
     self.slice        = slice( offset, offset + nbits )
 
-    # Take the notify_sim_* methods and the _slices function pointer list
-    # from the original Bits instance. This ensures writes to the BitSlice
-    # object made in a simulator will trigger the appropriate callbacks
-    # attached to the Bits instance.
+    # Take the notify_sim_comb_update method and the _slices function
+    # pointer list from the original Bits instance. This ensures writes
+    # to the BitSlice object made in a simulator will trigger the
+    # appropriate callbacks attached to the Bits instance.
     self.notify_sim_comb_update = self._target_bits.notify_sim_comb_update
-    self.notify_sim_seq_update  = self._target_bits.notify_sim_seq_update
 
   @property
   def _slices( self ):
     return self._target_bits._slices
 
+  #---------------------------------------------------------------------
+  # copy
+  #---------------------------------------------------------------------
+  # Copies of slices are plain Bits, detached from the sliced object.
+  def copy( self ):
+    return Bits( self.nbits, self._uint )
+
+  #---------------------------------------------------------------------
+  # notify_sim_seq_update
+  #---------------------------------------------------------------------
+  # The sequential update hook may be installed on the target lazily
+  # (see Bits._alloc_next), so look it up when the slice is written.
+  def notify_sim_seq_update( self ):
+    self._target_bits.notify_sim_seq_update()
+
   #---------------------------------------------------------------------
   # write_value
   #---------------------------------------------------------------------
@@ -543,3 +543,27 @@ def test_slice_bits():
   assert data[ :x]   == 0b01
   with pytest.raises( IndexError ):
     assert data[x:x] == 0b1
+
+def test_copy():
+
+  data = Bits( 8, 0b1101 )
+
+  # Copies are detached values of the same width
+  x = data.copy()
+  assert x == data and x.nbits == 8 and x is not data
+  x[0] = 0
+  assert data == 0b1101
+  assert x    == 0b1100
+
+  # Copying a slice gives a plain Bits of the slice width
+  y = data[2:6].copy()
+  assert type( y ) == Bits
+  assert y.nbits == 4 and y == 0b11
+  y[0] = 0
+  assert data == 0b1101
+
+  # Full slice and deepcopy are copies too
+  import copy
+  for z in [ data[:], copy.deepcopy( data ) ]:
+    z[1] = 1
+    assert data == 0b1101
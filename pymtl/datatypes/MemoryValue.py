@@ -0,0 +1,308 @@
+#=======================================================================
+# MemoryValue.py
+#=======================================================================
+# Module containing the MemoryValue class.
+
+from array import array
+from Bits  import Bits, _get_nbits
+
+#-----------------------------------------------------------------------
+# _get_storage
+#-----------------------------------------------------------------------
+# Utility function returning storage for nentries values of nbits each,
+# all initialized to value. Uses the smallest unsigned array typecode
+# that fits nbits, falling back to a plain list for wider values.
+def _get_storage( nbits, nentries, value=0 ):
+  for typecode in 'BHIL':
+    if array( typecode ).itemsize * 8 >= nbits:
+      return array( typecode, [value] ) * nentries
+  return [value] * nentries
+
+#-----------------------------------------------------------------------
+# _get_entry_class
+#-----------------------------------------------------------------------
+# Utility function returning the class of the entry views handed out by
+# a memory whose entries have the same type as dtype. Memories of plain
+# Bits use _MemoryEntry, memories of other Bits subclasses (BitStructs)
+# get a subclass of both so that bitfield properties are available on
+# each entry and writes to them are forwarded to the memory.
+_entry_classes = {}
+
+def _get_entry_class( dtype ):
+  dtype_class = type( dtype )
+  if dtype_class is Bits:
+    return _MemoryEntry
+  try:
+    return _entry_classes[ dtype_class ]
+  except KeyError:
+    entry_class = type( '_MemoryEntry_' + dtype_class.__name__,
+                        ( _MemoryEntry, dtype_class ), {} )
+    return _entry_classes.setdefault( dtype_class, entry_class )
+
+#-----------------------------------------------------------------------
+# MemoryValue
+#-----------------------------------------------------------------------
+# Value type backing a MemoryArray during simulation. All entries live
+# in a single compact array; .next writes to individual entries are
+# buffered in a dirty dictionary and applied when the simulator flops
+# the memory, which is enqueued on the register queue only once per
+# cycle regardless of how many entries were written. Writing .next of
+# the memory itself fills every entry with the same value, which is
+# flopped as a single full-array value. Combinational blocks reading
+# any entry are sensitive to the memory as a whole. Entries have the
+# same type as dtype when one is given, Bits otherwise.
+class MemoryValue( object ):
+
+  constant         = False
+  _fanout          = ()
+  _field_callbacks = ()
+
+  #---------------------------------------------------------------------
+  # __init__
+  #---------------------------------------------------------------------
+  def __init__( self, nbits, nentries, dtype=None ):
+
+    nbits = int( nbits )
+    if not (nbits > 0 ):
+      raise ValueError('The value of nbits must be > 0!')
+
+    self.nbits    = nbits
+    self.nentries = nentries
+
+    # Shared by all _MemoryEntry objects to avoid recomputing them on
+    # every access.
+    self._max     = (2**nbits)- 1
+    self._min     = -2**(nbits- 1) if nbits > 1 else 0
+    self._mask    = ( 1 << nbits ) - 1
+
+    self._data    = _get_storage( nbits, nentries )
+    self._dirty   = {}
+    self._fill    = None
+
+    # Type of the entries (and of their copies), Bits unless a dtype
+    # such as a BitStruct is given.
+    if dtype is None:
+      dtype = Bits( nbits )
+    self._dtype_class = type( dtype )
+    self._entry_class = _get_entry_class( dtype )
+
+    # Functions called with the index of each entry whose value changed
+    # (used for VCD tracing).
+    self._entry_callbacks = []
+
+  #---------------------------------------------------------------------
+  # __len__
+  #---------------------------------------------------------------------
+  def __len__( self ):
+    return self.nentries
+
+  #---------------------------------------------------------------------
+  # __getitem__
+  #---------------------------------------------------------------------
+  # Return a view of the entry at addr. Writes to the view (or to
+  # slices or bitfields of it) are forwarded to the memory.
+  def __getitem__( self, addr ):
+    return self._entry_class( self, int( addr ) )
+
+  #---------------------------------------------------------------------
+  # __iter__
+  #---------------------------------------------------------------------
+  def __iter__( self ):
+    entry_class = self._entry_class
+    for i in xrange( self.nentries ):
+      yield entry_class( self, i )
+
+  #---------------------------------------------------------------------
+  # write_value
+  #---------------------------------------------------------------------
+  # Combinationally update the entry at addr.
+  def write_value( self, addr, value ):
+    if self._data[ addr ] != value:
+      self._data[ addr ] = value
+      self.notify_sim_comb_update()
+      for func in self._entry_callbacks: func( addr )
+
+  #---------------------------------------------------------------------
+  # write_next
+  #---------------------------------------------------------------------
+  # Buffer a sequential update of the entry at addr, the first write in
+  # a cycle notifies the simulator.
+  def write_next( self, addr, value ):
+    if not self._dirty and self._fill is None:
+      self.notify_sim_seq_update()
+    self._dirty[ addr ] = value
+
+  #---------------------------------------------------------------------
+  # fill_next
+  #---------------------------------------------------------------------
+  # Buffer a sequential update of every entry to value. Entry writes
+  # buffered earlier in the cycle are overridden, later ones still
+  # apply on top of the fill.
+  def fill_next( self, value ):
+    value = int( value )
+    if not (self._min <= value <= self._max):
+      raise ValueError(
+        'Value is too big to be represented with Bits({})!\n'
+        '({} bits are needed to represent value = {} in two\'s complement.)'
+        .format( self.nbits, _get_nbits(value), value )
+      )
+    if not self._dirty and self._fill is None:
+      self.notify_sim_seq_update()
+    self._fill  = value & self._mask
+    self._dirty = {}
+
+  next = property( fset=fill_next )
+  n    = property( fset=fill_next )
+
+  #---------------------------------------------------------------------
+  # read_next
+  #---------------------------------------------------------------------
+  # Return the pending value of the entry at addr.
+  def read_next( self, addr ):
+    if self._fill is not None:
+      return self._dirty.get( addr, self._fill )
+    return self._dirty.get( addr, self._data[ addr ] )
+
+  #---------------------------------------------------------------------
+  # flop
+  #---------------------------------------------------------------------
+  # Apply all buffered sequential updates.
+  def flop( self ):
+
+    # A fill replaces the whole array at once, entries are compared
+    # one by one only if someone needs to know which ones changed
+    if self._fill is not None:
+      old  = self._data
+      data = self._data = _get_storage( self.nbits, self.nentries,
+                                        self._fill )
+      for addr, value in self._dirty.iteritems():
+        data[ addr ] = value
+      self._fill = None
+
+      changed = []
+      if self._entry_callbacks:
+        changed = [ i for i in xrange( self.nentries ) if data[i] != old[i] ]
+      notify = old != data
+
+    else:
+      data    = self._data
+      changed = []
+      for addr, value in self._dirty.iteritems():
+        if data[ addr ] != value:
+          data[ addr ] = value
+          changed.append( addr )
+      notify = bool( changed )
+
+    self._dirty = {}
+
+    if notify:
+      self.notify_sim_comb_update()
+      for func in self._entry_callbacks:
+        for addr in changed:
+          func( addr )
+
+  #---------------------------------------------------------------------
+  # uint_list
+  #---------------------------------------------------------------------
+  # Return the current value of all entries as a list of integers.
+  def uint_list( self ):
+    return list( self._data )
+
+  #---------------------------------------------------------------------
+  # is_constant
+  #---------------------------------------------------------------------
+  def is_constant( self ):
+    return self.constant
+
+  #---------------------------------------------------------------------
+  # notify_sim_comb_update
+  #---------------------------------------------------------------------
+  # Hook replaced by SimulationTool, see SignalValue.
+  def notify_sim_comb_update( self ):
+    pass
+
+  #---------------------------------------------------------------------
+  # notify_sim_seq_update
+  #---------------------------------------------------------------------
+  # Hook replaced by SimulationTool, see SignalValue.
+  def notify_sim_seq_update( self ):
+    pass
+
+  #---------------------------------------------------------------------
+  # register_callback
+  #---------------------------------------------------------------------
+  # See SignalValue.register_callback.
+  def register_callback( self, func_id ):
+    if func_id not in self._fanout:
+      self._fanout += ( func_id, )
+
+  #---------------------------------------------------------------------
+  # register_entry_callback
+  #---------------------------------------------------------------------
+  def register_entry_callback( self, func_ptr ):
+    self._entry_callbacks.append( func_ptr )
+
+#-----------------------------------------------------------------------
+# _MemoryEntry
+#-----------------------------------------------------------------------
+# Bits view of a single MemoryValue entry. Created on every indexing
+# operation, so the constructor avoids the checks done by Bits.
+class _MemoryEntry( Bits ):
+
+  #---------------------------------------------------------------------
+  # __init__
+  #---------------------------------------------------------------------
+  def __init__( self, mem, addr ):
+
+    self.nbits        = mem.nbits
+    self._max         = mem._max
+    self._min         = mem._min
+    self._mask        = mem._mask
+    self.slice        = slice( None )
+    self._uint        = mem._data[ addr ]
+    self._target_bits = self
+
+    self._mem         = mem
+    self._addr        = addr
+
+  #---------------------------------------------------------------------
+  # _next
+  #---------------------------------------------------------------------
+  # Pending value of the entry, read by BitSlice.write_next to merge
+  # multiple partial writes within the same cycle.
+  @property
+  def _next( self ):
+    return Bits( self.nbits, self._mem.read_next( self._addr ) )
+
+  #---------------------------------------------------------------------
+  # write_value
+  #---------------------------------------------------------------------
+  def write_value( self, value ):
+    super( _MemoryEntry, self ).write_value( value )
+    self._mem.write_value( self._addr, self._uint )
+
+  #---------------------------------------------------------------------
+  # write_next
+  #---------------------------------------------------------------------
+  def write_next( self, value ):
+    value = int( value )
+    if not (self._min <= value <= self._max):
+      raise ValueError(
+        'Value is too big to be represented with Bits({})!\n'
+        '({} bits are needed to represent value = {} in two\'s complement.)'
+        .format( self.nbits, _get_nbits(value), value )
+      )
+    self._mem.write_next( self._addr, value & self._mask )
+
+  #---------------------------------------------------------------------
+  # __copy__
+  #---------------------------------------------------------------------
+  # Copies have the type of the memory dtype, detached from the memory.
+  def copy( self ):
+    return self._mem._dtype_class( self.nbits, self._uint )
+
+  def __copy__( self ):
+    return self._mem._dtype_class( self.nbits, self._uint )
+
+  def __deepcopy__( self, memo ):
+    return self._mem._dtype_class( self.nbits, self._uint )
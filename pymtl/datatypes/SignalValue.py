@@ -13,9 +13,10 @@ import copy
 # (InPort, OutPort, Wire), needs to subclass SignalValue.
 class SignalValue( object ):
 
-  constant    = False
-  _callbacks  = []
-  _slices     = []
+  constant         = False
+  _fanout          = ()
+  _field_callbacks = ()
+  _slices          = []
 
   #---------------------------------------------------------------------
   # Write v property
@@ -141,10 +142,19 @@ class SignalValue( object ):
   #---------------------------------------------------------------------
   # register_callback
   #---------------------------------------------------------------------
-  def register_callback( self, func_ptr ):
-    if not self._callbacks:
-      self._callbacks = []
-    self._callbacks.append( func_ptr )
+  # Add the event queue id of a callback to the fan-out of this value,
+  # the tuple of ids enqueued when it changes. Each id is added once.
+  def register_callback( self, func_id ):
+    if func_id not in self._fanout:
+      self._fanout += ( func_id, )
+
+  #---------------------------------------------------------------------
+  # register_field_callback
+  #---------------------------------------------------------------------
+  # Register a callback only interested in the bits set in mask (e.g., a
+  # combinational block reading a single BitStruct field).
+  def register_field_callback( self, func_id, mask ):
+    self._field_callbacks += ( ( mask, func_id ), )
 
   #---------------------------------------------------------------------
   # register_slice
@@ -161,6 +171,14 @@ class SignalValue( object ):
   def bitfields( self ):
     return {}
 
+  #---------------------------------------------------------------------
+  # copy
+  #---------------------------------------------------------------------
+  # Return a copy of the value detached from any simulator. Bits provides
+  # a cheaper implementation.
+  def copy( self ):
+    return copy.deepcopy( self )
+
 
 #-----------------------------------------------------------------------
 # SignalValueWrapper
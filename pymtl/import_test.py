@@ -0,0 +1,69 @@
+#=======================================================================
+# import_test.py
+#=======================================================================
+# Importing pymtl must not load the translation tools and their
+# dependencies, nor py.test, until they are used. See also
+# scripts/bench_import.py.
+
+import subprocess
+import sys
+import os
+
+_root = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), '..' )
+
+def run_python( src ):
+  env = dict( os.environ, PYTHONPATH=_root )
+  return subprocess.check_output( [ sys.executable, '-c', src ], env=env,
+                                  cwd=_root ).split()
+
+#-----------------------------------------------------------------------
+# test_lazy_import
+#-----------------------------------------------------------------------
+def test_lazy_import():
+
+  loaded = run_python( '\n'.join([
+    'import sys',
+    'from pymtl import *',
+    'for x in sorted( sys.modules ): print( x )',
+  ]))
+
+  assert 'pymtl.tools.simulation.SimulationTool' in loaded
+  for name in [ 'pytest', 'cffi', 'pyparsing', 'greenlet',
+                'pymtl.tools.translation.verilog',
+                'pymtl.tools.translation.cpp' ]:
+    assert name not in loaded
+
+#-----------------------------------------------------------------------
+# test_lazy_tools
+#-----------------------------------------------------------------------
+def test_lazy_tools():
+
+  out = run_python( '\n'.join([
+    'from pymtl import *',
+    '@requires_verilator',
+    'def f(): pass',
+    'print( hasattr( f, "pytestmark" ) )',
+    'try: TranslationTool( 0 )',
+    'except AttributeError: print( "called" )',
+  ]))
+
+  assert out == [ 'True', 'called' ]
+
+#-----------------------------------------------------------------------
+# test_lazy_translation
+#-----------------------------------------------------------------------
+def test_lazy_translation():
+
+  loaded = run_python( '\n'.join([
+    'import sys',
+    'import pymtl',
+    'from pymtl.tools.translation import TranslationTool, get_cpp',
+    'assert TranslationTool is pymtl.TranslationTool',
+    'assert get_cpp         is pymtl.get_cpp',
+    'for x in sorted( sys.modules ): print( x )',
+  ]))
+
+  for name in [ 'cffi', 'pymtl.tools.translation.verilog',
+                'pymtl.tools.translation.verilator_sim',
+                'pymtl.tools.translation.cpp' ]:
+    assert name not in loaded
@@ -19,6 +19,9 @@ class PyMTLConnectError(Exception):
 # Class representing a structural connection between Signal objects.
 class ConnectionEdge(object):
 
+  __slots__ = ( 'nbits', 'src_node', 'src_slice', 'dest_node', 'dest_slice',
+                '__weakref__' )
+
   #---------------------------------------------------------------------
   # __init__
   #---------------------------------------------------------------------
@@ -56,9 +59,8 @@ class ConnectionEdge(object):
     self.dest_slice = dest._addr
 
     # Add ourselves to the src_node and dest_node connectivity lists
-    # TODO: is this the right way to do this?
-    src .connections += [ self ]
-    dest.connections += [ self ]
+    src .add_connection( self )
+    dest.add_connection( self )
 
   #---------------------------------------------------------------------
   # is_dest
@@ -96,6 +98,9 @@ class ConnectionEdge(object):
     when .parent attributes of nodes are initialized!
     '''
 
+    # Submodule checks compare parents instead of searching the
+    # (possibly very long) list of submodules of the parent
+
     a = self.src_node
     b = self.dest_node
 
@@ -109,17 +114,17 @@ class ConnectionEdge(object):
       self.swap_direction()
 
     # Model InPort connected to InPort of a submodule
-    elif ( a.parent in b.parent._submodules and
+    elif ( a.parent.parent is b.parent and
            isinstance( a, InPort  ) and isinstance( b, InPort  )):
       self.swap_direction()
 
     # Model OutPort connected to OutPort of a submodule
-    elif ( b.parent in a.parent._submodules and
+    elif ( b.parent.parent is a.parent and
            isinstance( a, OutPort ) and isinstance( b, OutPort )):
       self.swap_direction()
 
     # Model OutPort connected to InPort of a submodule
-    elif ( a.parent in b.parent._submodules and
+    elif ( a.parent.parent is b.parent and
            isinstance( a, InPort ) and isinstance( b, OutPort )):
       self.swap_direction()
 
@@ -134,12 +139,12 @@ class ConnectionEdge(object):
       self.swap_direction()
 
     # Wire connected to InPort of a submodule
-    elif ( a.parent in b.parent._submodules and
+    elif ( a.parent.parent is b.parent and
            isinstance( a, InPort  ) and isinstance( b, Wire )):
       self.swap_direction()
 
     # Wire connected to OutPort of a submodule
-    elif ( b.parent in a.parent._submodules and
+    elif ( b.parent.parent is a.parent and
            isinstance( a, Wire ) and isinstance( b, OutPort )):
       self.swap_direction()
 
@@ -184,7 +189,7 @@ class ConnectionEdge(object):
 
     # Check if the connection is an internal connection for the node
     return (( self.src_node.parent == self.dest_node.parent ) or
-            ( other.parent in node.parent._submodules ))
+            ( other.parent.parent is node.parent ))
 
   #---------------------------------------------------------------------
   # __repr__
@@ -11,7 +11,7 @@ translation into HDLs, etc).
 
 from metaclasses    import MetaCollectArgs
 from ConnectionEdge import ConnectionEdge, PyMTLConnectError
-from signals        import Signal, InPort, OutPort, Wire, Constant
+from signals        import Signal, InPort, OutPort, Wire, Constant, MemoryArray
 from signal_lists   import PortList, WireList
 from PortBundle     import PortBundle
 from ..datatypes    import Bits
@@ -312,6 +312,15 @@ class Model( object ):
     >>> @s.tick_fl
     >>> def my_logic()
     >>>   s.out.next = s.in_
+
+    Blocks written as generators instead pause until the next clock
+    cycle at every yield, and can wait on adapters without greenlets
+    (see pymtl/tools/simulation/coroutines.py).
+
+    >>> @s.tick_fl
+    >>> def my_logic()
+    >>>   msg = yield s.in_queue.deq()
+    >>>   yield s.out_queue.enq( msg )
     """
 
     return self.tick( func )
@@ -481,6 +490,10 @@ class Model( object ):
     """Get a list of all Wires defined in this model."""
     return self._wires
 
+  def get_memories( self ):
+    """Get a list of all MemoryArrays defined in this model."""
+    return self._memories
+
   def get_submodules( self ):
     """Get a list of all child Models instaniated in this model."""
     return self._submodules
@@ -532,6 +545,7 @@ class Model( object ):
 
     # Initialize lists for signals, submodules and connections
     current_model._wires          = []
+    current_model._memories       = []
     current_model._inports        = []
     current_model._outports       = []
     current_model._hports         = []
@@ -560,6 +574,9 @@ class Model( object ):
   def _check_type( self, current_model, name, obj, nested=False ):
     """Specialize elaboration actions based on object type."""
 
+    # Many signals share the same name, intern it to store it only once
+    name = intern( name )
+
     if   isinstance( obj, Wire ):
       obj.name              = name
       obj.parent            = current_model
@@ -579,6 +596,13 @@ class Model( object ):
       if not nested:
         current_model._hports  += [ obj ]
 
+    elif isinstance( obj, MemoryArray ):
+      obj.name                 = name
+      obj.parent               = current_model
+      obj._entry.name          = name + '[?]'
+      obj._entry.parent        = current_model
+      current_model._memories += [ obj ]
+
     # TODO: clean this up...
     elif isinstance( obj, PortBundle ):
       obj.name = name
@@ -9,6 +9,7 @@ from Model            import Model
 from signals          import InPort, OutPort, Wire
 from ConnectionEdge   import ConnectionEdge, PyMTLConnectError
 from ..datatypes.Bits import Bits
+from ..datatypes.BitStruct import BitStructDefinition, BitField
 
 import pytest
 
@@ -406,6 +407,32 @@ def test_ModelArgsHashWithDefault():
   cmp_class_name_eq  ( M( arg1=3 ), M( arg1=3 ) )
   cmp_class_name_neq ( M( arg1=3 ), M( arg1=5 ) )
 
+#-----------------------------------------------------------------------
+# ModelArgs
+#-----------------------------------------------------------------------
+# Arguments are collected in order: positional, keyword, then the missing
+# defaults starting from the last one. The constructor prototype is
+# introspected once per class, subclasses with their own constructor do
+# not reuse the prototype of their base class.
+
+class ModelArgsSub( ModelArgsHashWithDefault ):
+  def __init__( s, arg3, arg1=5 ):
+    s.arg3 = arg3
+    s.arg1 = arg1
+
+def test_ModelArgs():
+
+  M = ModelArgsHashWithDefault
+
+  assert M(           )._args.items() == [ ('arg2',2), ('arg1',1) ]
+  assert M( 3         )._args.items() == [ ('arg1',3), ('arg2',2) ]
+  assert M( 3, 4      )._args.items() == [ ('arg1',3), ('arg2',4) ]
+  assert M( arg2=4    )._args.items() == [ ('arg2',4), ('arg1',1) ]
+  assert M[2]( 3 )[1]._args.items()   == [ ('arg1',3), ('arg2',2) ]
+
+  assert ModelArgsSub( 7 )._args.items() == [ ('arg3',7), ('arg1',5) ]
+  assert M( 3 )._args.items()            == [ ('arg1',3), ('arg2',2) ]
+
 #-----------------------------------------------------------------------
 # ClassNameCollision
 #-----------------------------------------------------------------------
@@ -478,3 +505,47 @@ def test_ClassNameCollision():
 #   model2.elaborate()
 #   assert model1.class_name != model2.class_name
 
+
+#-----------------------------------------------------------------------
+# SignalSlots
+#-----------------------------------------------------------------------
+
+class SignalSlotsMsg( BitStructDefinition ):
+  def __init__( s ):
+    s.opcode = BitField( 2 )
+    s.data   = BitField( 6 )
+
+class SignalSlots( Model ):
+  def __init__( s ):
+    s.in_  = InPort ( SignalSlotsMsg() )
+    s.out  = OutPort( 8 )
+    s.op   = OutPort( 2 )
+    s.lst  = [ Wire( 8 ) for x in range( 2 ) ]
+    s.free = Wire( 8 )
+    s.connect( s.in_, s.out    )
+    s.connect( s.op,  s.in_.opcode )
+
+def test_SignalSlots():
+  m = inst_elab_model( SignalSlots )
+
+  # Signals created with the same bitwidth share their dtype
+  assert m.out.dtype is m.lst[0].dtype is m.free.dtype
+  assert m.out.dtype.nbits == 8
+
+  # BitStruct fields are still accessible, private names are not
+  assert m.in_.data.nbits == 6
+  with pytest.raises( AttributeError ):
+    m.in_._data
+
+  # Unconnected signals have no connection list, connected ones do
+  assert m.free.connections == ()
+  assert len( m.out.connections ) == 1
+  assert len( m.in_.connections ) == 2
+  assert m.op.connections[0].src_slice == slice( 6, 8 )
+
+  # Annotations by tools are still possible
+  m.free.annotation = 1
+  assert m.free.annotation == 1
+
+  # Names are interned
+  assert m.lst[1].name is intern( 'lst[1]' )
@@ -56,6 +56,30 @@ class MetaListConstructor( type ):
 
     return lambda *args, **kwargs : [ cls(*args, **kwargs) for x in range(n) ]
 
+#-----------------------------------------------------------------------
+# _get_arg_info
+#-----------------------------------------------------------------------
+def _get_arg_info( cls ):
+  """Return the names of the constructor arguments of cls (except the
+  first, which is self) and the (name, default value) pairs of the
+  arguments with default values, starting from the last one.
+
+  Introspecting the constructor prototype is expensive, so the result is
+  computed on the first instantiation and stored on the class itself
+  (not inherited, subclasses may define a different constructor).
+  """
+
+  try:
+    return cls.__dict__[ '_arg_info' ]
+  except KeyError:
+    argspec  = inspect.getargspec( cls.__init__ )
+    defaults = argspec.defaults or ()
+    ndefault = len( argspec.args ) - len( defaults )
+    info     = ( tuple( argspec.args[1:] ),
+                 tuple( reversed( zip( argspec.args[ndefault:], defaults ) ) ) )
+    setattr( cls, '_arg_info', info )
+    return info
+
 #-----------------------------------------------------------------------
 # MetaCollectArgs
 #-----------------------------------------------------------------------
@@ -79,33 +103,26 @@ class MetaCollectArgs( MetaListConstructor ):
 
     # Get the constructor prototype
 
-    argspec = inspect.getargspec( self.__init__ )
+    names, defaults = _get_arg_info( self )
 
-    # Create an argument dictionary
+    # Create an argument dictionary from all positional arguments and
+    # all keyword arguments. Items are inserted one by one, which is much
+    # cheaper than going through the generic OrderedDict.update.
 
     argdict = collections.OrderedDict()
 
-    # Collect all positional arguments (except first, which is self)
-
-    for i, arg_value in enumerate( args ):
-      key, value = argspec.args[i+1], arg_value
+    for key, value in zip( names, args ):
       argdict[ key ] = value
 
-    # Collect all keyword arguments
-
-    for key, value in kwargs.items():
+    for key, value in kwargs.iteritems():
       argdict[ key ] = value
 
-    # Handle default arguments. Iterate backwards through default values,
-    # matching the default value to the corresponding argument name, then
-    # add the corresponding argument as long as we did not already add it
-    # above.
+    # Handle default arguments, add the corresponding argument as long as
+    # we did not already add it above.
 
-    if argspec.defaults:
-      for i, default_value in enumerate( reversed(argspec.defaults) ):
-        arg_name = argspec.args[ len(argspec.args) - i - 1 ]
-        if arg_name not in argdict:
-          argdict[ arg_name ] = default_value
+    for arg_name, default_value in defaults:
+      if arg_name not in argdict:
+        argdict[ arg_name ] = default_value
 
     # Create the instance
 
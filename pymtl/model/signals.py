@@ -7,15 +7,44 @@ hardware models."""
 from metaclasses      import MetaListConstructor
 from ..datatypes.Bits import Bits
 
+#-----------------------------------------------------------------------
+# _get_dtype
+#-----------------------------------------------------------------------
+# Signals created with an integer bitwidth share a single Bits dtype per
+# bitwidth, dtypes are only used as prototypes and are never written.
+_bits_dtypes = {}
+
+def _get_dtype( dtype ):
+  if not isinstance( dtype, int ):
+    return dtype
+  try:
+    return _bits_dtypes[ dtype ]
+  except KeyError:
+    return _bits_dtypes.setdefault( dtype, Bits( dtype ) )
+
+# Shared by all Signals, slice objects are immutable
+_full_slice = slice( None )
+
 #-----------------------------------------------------------------------
 # Signal
 #-----------------------------------------------------------------------
 class Signal( object ):
   """Base class implementing any Signal (port, wire, constant) that can
-  carry a SignalValue."""
+  carry a SignalValue.
+
+  Signals use __slots__ to keep large designs small. Tools can still
+  annotate Signals with extra attributes, the instance dictionary is
+  only allocated for Signals which are annotated. Until a Signal is
+  connected its connections attribute is an empty tuple, it is turned
+  into a list of ConnectionEdges by add_connection().
+  """
 
   __metaclass__ = MetaListConstructor
 
+  __slots__ = ( 'dtype', 'nbits', 'slice', 'name', 'parent', 'connections',
+                '_addr', '_signal', '_signalvalue', '__dict__',
+                '__weakref__' )
+
   #---------------------------------------------------------------------
   # __init__
   #---------------------------------------------------------------------
@@ -32,14 +61,13 @@ class Signal( object ):
     >>> Signal( 5 )  # Equivalent to Signal( Bits( 5 ) )
     """
 
-    is_int             = isinstance( dtype, int )
-    self.dtype         = dtype if not is_int else Bits( dtype )
+    self.dtype         = _get_dtype( dtype )
     self.nbits         = self.dtype.nbits
-    self.slice         = slice( None )
+    self.slice         = _full_slice
 
     self.name          = "NO NAME: not elaborated yet!"
     self.parent        = None
-    self.connections   = []
+    self.connections   = ()
 
     self._addr         = None
     self._signal       = self
@@ -52,11 +80,25 @@ class Signal( object ):
     """Proxy attribute accesses to the underlying dtype so we can refer
     to fields when the dtype is a BitStruct."""
 
-    if name in self.dtype.bitfields:
-      return self[ self.dtype.bitfields[ name ] ]
+    # Private names are never fields, this also covers unset slots
+    if not name.startswith( '_' ):
+      bitfields = self.dtype.bitfields
+      if name in bitfields:
+        return self[ bitfields[ name ] ]
     raise AttributeError( "'{}' object has no attribute '{}'"
                           .format( self.__class__.__name__, name ) )
 
+  #---------------------------------------------------------------------
+  # add_connection
+  #---------------------------------------------------------------------
+  def add_connection( self, edge ):
+    """Add a ConnectionEdge to the connections of this Signal."""
+
+    if self.connections:
+      self.connections.append( edge )
+    else:
+      self.connections = [ edge ]
+
   #---------------------------------------------------------------------
   # __getitem__
   #---------------------------------------------------------------------
@@ -116,6 +158,8 @@ class Signal( object ):
 #-----------------------------------------------------------------------
 class InPort( Signal ):
 
+  __slots__ = ()
+
   #---------------------------------------------------------------------
   # __init__
   #---------------------------------------------------------------------
@@ -138,6 +182,8 @@ class InPort( Signal ):
 #-----------------------------------------------------------------------
 class OutPort( Signal ):
 
+  __slots__ = ()
+
   #---------------------------------------------------------------------
   # __init__
   #---------------------------------------------------------------------
@@ -161,6 +207,8 @@ class OutPort( Signal ):
 # User visible implementation of a wire.
 class Wire( Signal ):
 
+  __slots__ = ()
+
   #---------------------------------------------------------------------
   # __init__
   #---------------------------------------------------------------------
@@ -184,6 +232,8 @@ class Wire( Signal ):
 class Constant( Signal ):
   """Hidden class implementing a constant valued Signal."""
 
+  __slots__ = ()
+
   #---------------------------------------------------------------------
   # __init__
   #---------------------------------------------------------------------
@@ -229,6 +279,8 @@ class _SignalSlice( object ):
   connecting Signals.
   """
 
+  __slots__ = ( 'nbits', 'slice', '_addr', '_signal' )
+
   #---------------------------------------------------------------------
   # __init__
   #---------------------------------------------------------------------
@@ -259,6 +311,13 @@ class _SignalSlice( object ):
   def connections( self, value ):
     self._signal.connections = value
 
+  #---------------------------------------------------------------------
+  # add_connection
+  #---------------------------------------------------------------------
+  def add_connection( self, edge ):
+    """Add a ConnectionEdge to our parent Signal's connections."""
+    self._signal.add_connection( edge )
+
   #---------------------------------------------------------------------
   # __getitem__
   #---------------------------------------------------------------------
@@ -269,3 +328,65 @@ class _SignalSlice( object ):
     return self._signal[self._addr.start+addr]
 
 
+
+#-----------------------------------------------------------------------
+# MemoryArray
+#-----------------------------------------------------------------------
+class MemoryArray( object ):
+  """Array of storage elements, each carrying data of type dtype.
+
+  Unlike a list of Wires, a MemoryArray is not broken up into one net
+  per entry: the simulator backs it with a single compact array of
+  integers (see MemoryValue), and the Verilog translator declares it as
+  a single reg array. Entries are accessed by indexing and written with
+  .next (or .value) like any other signal:
+
+  >>> s.mem = MemoryArray( Bits( 32 ), 1024 )
+  >>> s.mem[ s.addr ].next = s.wdata
+
+  If the dtype parameter provided is an integer value instead of a
+  SignalValue, the dtype will instead be set to Bits( dtype ).
+  MemoryArrays cannot be structurally connected.
+  """
+
+  #---------------------------------------------------------------------
+  # __init__
+  #---------------------------------------------------------------------
+  def __init__( self, dtype, nentries ):
+
+    self.dtype         = _get_dtype( dtype )
+    self.nentries      = nentries
+
+    self.name          = "NO NAME: not elaborated yet!"
+    self.parent        = None
+
+    self._signalvalue  = None
+
+    # All entries share a single prototype Wire, translation tools use
+    # it to determine the type of an indexed entry.
+    self._entry        = Wire( self.dtype )
+
+  #---------------------------------------------------------------------
+  # __len__
+  #---------------------------------------------------------------------
+  def __len__( self ):
+    return self.nentries
+
+  #---------------------------------------------------------------------
+  # __getitem__
+  #---------------------------------------------------------------------
+  def __getitem__( self, addr ):
+    """Indexing returns the prototype Wire shared by all entries."""
+
+    return self._entry
+
+  #---------------------------------------------------------------------
+  # fullname
+  #---------------------------------------------------------------------
+  @property
+  def fullname( self ):
+    """Return MemoryArray name formatted as
+    "parent_model_name.memory_name"."""
+
+    parent_name = self.parent.name if self.parent else '?'
+    return "{}.{}".format( parent_name, self.name )
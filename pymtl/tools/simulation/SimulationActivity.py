@@ -0,0 +1,307 @@
+#=========================================================================
+# SimulationActivity.py
+#=========================================================================
+
+from __future__ import print_function
+
+import collections
+import csv
+import json
+
+from array import array
+
+from ...datatypes.Bits        import Bits
+from ...datatypes.MemoryValue import MemoryValue
+
+#-------------------------------------------------------------------------
+# SimulationActivity
+#-------------------------------------------------------------------------
+# Per-net switching activity of a simulation, a compact alternative to
+# dumping a VCD file to estimate activity factors or to find the nets
+# triggering the most combinational evaluations.
+#
+# Like the VCD callbacks, a callback is registered with every net using
+# the callbacks designed for slices, which are called every time the
+# value of the net changes. It counts the changes of the net and the
+# number of bits which toggled in preallocated arrays indexed by the id
+# of the net in the event queue. Memories count the writes changing one
+# of their entries, without toggles.
+#
+# If window is set, the counts are also kept per window of that many
+# cycles. Windows are delimited by the clock edges, the changes made by
+# the sequential blocks of a cycle and the combinational logic they
+# trigger are counted in the window of that cycle.
+#
+# Nets are named after all the ports and wires connected to them, the
+# first name is the one closest to the top of the hierarchy.
+class SimulationActivity( object ):
+
+  #-----------------------------------------------------------------------
+  # __init__
+  #-----------------------------------------------------------------------
+  def __init__( self, sim, window = None ):
+
+    nets  = sim._event_queue.nets
+    nnets = len( nets )
+
+    self.ncycles  = 0
+    self.window   = window
+    self.windows  = []
+    self.nets     = nets
+    self.names    = _get_net_names( sim.signal_values, nnets )
+    self._changes = array( 'L', [ 0 ] ) * nnets
+    self._toggles = array( 'L', [ 0 ] ) * nnets
+    self._zeros   = array( 'L', [ 0 ] ) * nnets
+
+    for net_id, net in enumerate( nets ):
+      if isinstance( net, MemoryValue ):
+        net.register_entry_callback( self._create_mem_callback( net_id ) )
+      else:
+        net.register_slice( self._create_callback( net_id, net ) )
+
+    # Count the cycles before any other sequential block runs
+
+    sim._sequential_blocks.insert( 0, self._tick )
+
+  #-----------------------------------------------------------------------
+  # _create_callback
+  #-----------------------------------------------------------------------
+  def _create_callback( self, net_id, net ):
+
+    changes = self._changes
+    toggles = self._toggles
+
+    if not isinstance( net, Bits ):
+      def callback():
+        changes[ net_id ] += 1
+      return callback
+
+    last = [ net._uint ]
+
+    def callback():
+      uint = net._uint
+      changes[ net_id ] += 1
+      toggles[ net_id ] += bin( uint ^ last[0] ).count( '1' )
+      last[0] = uint
+
+    return callback
+
+  def _create_mem_callback( self, net_id ):
+
+    changes = self._changes
+
+    def callback( addr ):
+      changes[ net_id ] += 1
+
+    return callback
+
+  #-----------------------------------------------------------------------
+  # _tick
+  #-----------------------------------------------------------------------
+  # Close the current window every window cycles, the counters are
+  # copied then cleared in place since the callbacks reference them.
+  def _tick( self ):
+    if self.window and self.ncycles and self.ncycles % self.window == 0:
+      self.windows.append( ( array( 'L', self._changes ),
+                             array( 'L', self._toggles ) ) )
+      self._changes[:] = self._zeros
+      self._toggles[:] = self._zeros
+    self.ncycles += 1
+
+  #-----------------------------------------------------------------------
+  # clear
+  #-----------------------------------------------------------------------
+  # Reset all the counters, e.g., to leave out the reset of the design.
+  def clear( self ):
+    self.ncycles     = 0
+    self.windows     = []
+    self._changes[:] = self._zeros
+    self._toggles[:] = self._zeros
+
+  #-----------------------------------------------------------------------
+  # changes
+  #-----------------------------------------------------------------------
+  # Number of value changes of each net, indexed by net id.
+  def changes( self ):
+    return self._total( 0, self._changes )
+
+  #-----------------------------------------------------------------------
+  # toggles
+  #-----------------------------------------------------------------------
+  # Number of bit toggles of each net, indexed by net id.
+  def toggles( self ):
+    return self._total( 1, self._toggles )
+
+  def _total( self, i, current ):
+    total = list( current )
+    for window in self.windows:
+      total = [ x + y for x, y in zip( total, window[i] ) ]
+    return total
+
+  #-----------------------------------------------------------------------
+  # window_changes
+  #-----------------------------------------------------------------------
+  # Number of value changes of each net in each window, including the
+  # current one.
+  def window_changes( self ):
+    return [ list( x[0] ) for x in self.windows ] + [ list( self._changes ) ]
+
+  #-----------------------------------------------------------------------
+  # net_stats
+  #-----------------------------------------------------------------------
+  # Return a list with a dictionary per named net holding its names,
+  # width, changes, toggles, activity factor (toggles per bit per cycle)
+  # and the number of combinational evaluations its changes triggered
+  # (at most, since blocks are only queued once). Sorted by decreasing
+  # triggered evaluations by default, sort can be any other key, ties
+  # are sorted by decreasing changes.
+  def net_stats( self, sort = 'evals' ):
+
+    changes = self.changes()
+    toggles = self.toggles()
+    stats   = []
+
+    for net_id, names in enumerate( self.names ):
+      if not names:
+        continue
+      net    = self.nets[ net_id ]
+      nbits  = _get_nbits( net )
+      fanout = len( net._fanout ) + len( net._field_callbacks )
+      stats.append( collections.OrderedDict([
+        ( 'name',     names[0]                                     ),
+        ( 'aliases',  names[1:]                                    ),
+        ( 'nbits',    nbits                                        ),
+        ( 'changes',  changes[ net_id ]                            ),
+        ( 'toggles',  toggles[ net_id ]                            ),
+        ( 'activity', _ratio( toggles[ net_id ], nbits * self.ncycles ) ),
+        ( 'fanout',   fanout                                       ),
+        ( 'evals',    changes[ net_id ] * fanout                   ),
+      ]) )
+
+    return sorted( stats, key = lambda x: ( x[ sort ], x['changes'] ),
+                   reverse = True )
+
+  #-----------------------------------------------------------------------
+  # model_stats
+  #-----------------------------------------------------------------------
+  # Return a dictionary mapping the path of every model to the number of
+  # nets in its subtree, and their changes, toggles and activity factor.
+  # A net connected to several models of a subtree is counted once.
+  def model_stats( self ):
+
+    changes = self.changes()
+    toggles = self.toggles()
+    subtree = collections.defaultdict( set )
+
+    for net_id, names in enumerate( self.names ):
+      for name in names:
+        path = name.split( '.' )[:-1]
+        for i in range( len( path ) ):
+          subtree[ '.'.join( path[:i+1] ) ].add( net_id )
+
+    stats = collections.OrderedDict()
+    for path in sorted( subtree ):
+      net_ids = subtree[ path ]
+      nbits   = sum( _get_nbits( self.nets[ x ] ) for x in net_ids )
+      ntoggle = sum( toggles[ x ] for x in net_ids )
+      stats[ path ] = collections.OrderedDict([
+        ( 'nets',     len( net_ids )                              ),
+        ( 'changes',  sum( changes[ x ] for x in net_ids )        ),
+        ( 'toggles',  ntoggle                                     ),
+        ( 'activity', _ratio( ntoggle, nbits * self.ncycles )     ),
+      ])
+
+    return stats
+
+  #-----------------------------------------------------------------------
+  # print_report
+  #-----------------------------------------------------------------------
+  # Print the n nets triggering the most evaluations to the commandline.
+  def print_report( self, n = 20 ):
+    stats = self.net_stats()
+    print("-"*72)
+    print("Simulation Activity")
+    print("-"*72)
+    print()
+    print("ncycles:               {:8}".format( self.ncycles ))
+    print("nets:                  {:8}".format( len( stats ) ))
+    print()
+    print("   evals   changes   toggles  activity  fanout  net")
+    print("--------  --------  --------  --------  ------  ---")
+    for x in stats[:n]:
+      print("{:8}  {:8}  {:8}  {:8.4f}  {:6}  {}".format(
+                   x['evals'], x['changes'], x['toggles'], x['activity'],
+                   x['fanout'], x['name'] ))
+    print("-"*72)
+
+  #-----------------------------------------------------------------------
+  # write_csv
+  #-----------------------------------------------------------------------
+  # Write the statistics of every named net to a CSV file, one row per
+  # net, aliases separated by spaces.
+  def write_csv( self, filename ):
+    with open( filename, 'wb' ) as f:
+      writer = csv.writer( f )
+      writer.writerow( [ 'name', 'aliases', 'nbits', 'changes', 'toggles',
+                         'activity', 'fanout', 'evals' ] )
+      for x in self.net_stats():
+        writer.writerow( [ x['name'], ' '.join( x['aliases'] ), x['nbits'],
+                           x['changes'], x['toggles'], x['activity'],
+                           x['fanout'], x['evals'] ] )
+
+  #-----------------------------------------------------------------------
+  # write_json
+  #-----------------------------------------------------------------------
+  # Write the statistics of every named net and every model to a JSON
+  # file. If windows are enabled, the changes of each net per window are
+  # included as well.
+  def write_json( self, filename ):
+
+    nets = self.net_stats()
+
+    if self.window:
+      index   = dict( ( names[0], i ) for i, names in enumerate( self.names )
+                      if names )
+      windows = self.window_changes()
+      for x in nets:
+        x['windows'] = [ w[ index[ x['name'] ] ] for w in windows ]
+
+    with open( filename, 'w' ) as f:
+      json.dump( collections.OrderedDict([
+        ( 'ncycles', self.ncycles       ),
+        ( 'window',  self.window        ),
+        ( 'nets',    nets               ),
+        ( 'models',  self.model_stats() ),
+      ]), f, indent = 1 )
+
+#-------------------------------------------------------------------------
+# _get_net_names
+#-------------------------------------------------------------------------
+# List the hierarchical names of the signals of each net, indexed by net
+# id, the names closest to the top of the hierarchy first.
+def _get_net_names( signal_values, nnets ):
+
+  names = [ [] for _ in range( nnets ) ]
+
+  for name, svalue in signal_values.items():
+    net_id = getattr( svalue, '_net_id', None )
+    if net_id is not None:
+      names[ net_id ].append( name )
+
+  for x in names:
+    x.sort( key = lambda name: ( name.count( '.' ), name ) )
+
+  return names
+
+#-------------------------------------------------------------------------
+# _get_nbits
+#-------------------------------------------------------------------------
+# Width of a net, wrapped types (see CreateWrappedClass) have no width.
+def _get_nbits( net ):
+  return net.nbits or 0
+
+#-------------------------------------------------------------------------
+# _ratio
+#-------------------------------------------------------------------------
+def _ratio( x, y ):
+  return float( x ) / y if y else 0.0
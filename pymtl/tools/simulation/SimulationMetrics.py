@@ -4,7 +4,36 @@
 
 from __future__ import print_function
 
+import json
 import pickle
+import sys
+import types
+
+from array import array
+
+#-------------------------------------------------------------------------
+# Counters
+#-------------------------------------------------------------------------
+# Index of each counter collected per cycle. Counters for events caused
+# by input changes (pre-tick) are followed by the same counter for events
+# caused by clocked logic (post-tick).
+
+COUNTERS = (
+  'input_add_events',
+  'clock_add_events',
+  'input_add_callbk',
+  'clock_add_callbk',
+  'input_comb_evals',
+  'clock_comb_evals',
+  'slice_comb_evals',
+  'redun_comb_evals',
+)
+
+_ADD_EVENTS = 0
+_ADD_CALLBK = 2
+_COMB_EVALS = 4
+_SLICE      = 6
+_REDUN      = 7
 
 #-------------------------------------------------------------------------
 # SimulationMetrics
@@ -12,29 +41,90 @@ import pickle
 # Utility class for storing various SimulationTool metrics. Useful for
 # gaining insight into simulator performace and determining the simulation
 # efficiency of hardware model implementations.
+#
+# The counters of the current cycle are kept in a list, and added to the
+# totals and the series of the counters at the end of every cycle. The
+# series are stored in arrays of 32-bit unsigned integers, grown by
+# chunks of preallocated entries. The aggregate argument selects what the
+# series hold:
+#
+# - 'cycle'  : one entry per cycle (the default)
+# - 'window' : one entry per window of window cycles
+# - 'total'  : no series, only the totals
+#
+# An eval is redundant if it already ran in the same cycle. Instead of
+# clearing a flag per eval every cycle, we keep the last cycle each eval
+# ran in.
 class SimulationMetrics( object ):
 
   #-----------------------------------------------------------------------
   # __init__
   #-----------------------------------------------------------------------
-  def __init__( self ):
+  def __init__( self, aggregate = 'cycle', window = 1000, chunk = 4096 ):
+
+    if aggregate not in ( 'cycle', 'window', 'total' ):
+      raise ValueError( "aggregate must be 'cycle', 'window' or 'total'" )
+
+    periods = { 'cycle' : 1, 'window' : window, 'total' : 0 }
+
+    self.aggregate                               = aggregate
+    self.period                                  = periods[ aggregate ]
+    self._chunk                                  = chunk
     self._ncycles                                = 0
-    self._pre_tick                               = True
+    self._phase                                  = 0
+    self._counts                                 = [ 0 ] * len( COUNTERS )
+    self._totals                                 = [ 0 ] * len( COUNTERS )
+    self._series                                 = [ array( 'I' )
+                                                     for x in COUNTERS ]
     self.num_modules                             = 0
     self.num_tick_blocks                         = 0
     self.num_posedge_clk_blocks                  = 0
     self.num_combinational_blocks                = 0
     self.num_slice_blocks                        = 0
-    self.input_add_events_per_cycle              = [ 0 ]
-    self.clock_add_events_per_cycle              = [ 0 ]
-    self.input_add_callbk_per_cycle              = [ 0 ]
-    self.clock_add_callbk_per_cycle              = [ 0 ]
-    self.input_comb_evals_per_cycle              = [ 0 ]
-    self.clock_comb_evals_per_cycle              = [ 0 ]
-    self.slice_comb_evals_per_cycle              = [ 0 ]
-    self.redun_comb_evals_per_cycle              = [ 0 ]
     self.is_slice                                = dict()
-    self.has_run                                 = dict()
+    self.last_run                                = dict()
+    self.num_nets                                = 0
+    self.num_shadow_nets                         = 0
+    self.net_bytes                               = 0
+    self.shadow_bytes                            = 0
+
+  #-----------------------------------------------------------------------
+  # series
+  #-----------------------------------------------------------------------
+  # Return the values of a counter (see COUNTERS) per cycle or window,
+  # including the current one, or a single total if only the totals are
+  # kept.
+  def series( self, name ):
+    i = COUNTERS.index( name )
+    if not self.period:
+      return [ self._totals[i] + self._counts[i] ]
+    nslots = self._ncycles // self.period + 1
+    values = list( self._series[i][:nslots] )
+    values.extend( [ 0 ] * ( nslots - len( values ) ) )
+    values[-1] += self._counts[i]
+    return values
+
+  #-----------------------------------------------------------------------
+  # total
+  #-----------------------------------------------------------------------
+  # Return the total of a counter (see COUNTERS), including the current
+  # cycle.
+  def total( self, name ):
+    i = COUNTERS.index( name )
+    return self._totals[i] + self._counts[i]
+
+  #-----------------------------------------------------------------------
+  # *_per_cycle
+  #-----------------------------------------------------------------------
+  # Series of each counter, per window if aggregated by window.
+  input_add_events_per_cycle = property( lambda s: s.series( COUNTERS[0] ) )
+  clock_add_events_per_cycle = property( lambda s: s.series( COUNTERS[1] ) )
+  input_add_callbk_per_cycle = property( lambda s: s.series( COUNTERS[2] ) )
+  clock_add_callbk_per_cycle = property( lambda s: s.series( COUNTERS[3] ) )
+  input_comb_evals_per_cycle = property( lambda s: s.series( COUNTERS[4] ) )
+  clock_comb_evals_per_cycle = property( lambda s: s.series( COUNTERS[5] ) )
+  slice_comb_evals_per_cycle = property( lambda s: s.series( COUNTERS[6] ) )
+  redun_comb_evals_per_cycle = property( lambda s: s.series( COUNTERS[7] ) )
 
   #-----------------------------------------------------------------------
   # comb_evals_per_cycle
@@ -52,6 +142,19 @@ class SimulationMetrics( object ):
     return [ x+y for x,y in zip( self.input_add_events_per_cycle,
                                  self.clock_add_events_per_cycle ) ]
 
+  #-----------------------------------------------------------------------
+  # callbk_per_event
+  #-----------------------------------------------------------------------
+  # Average number of callbacks placed on the event queue by each call
+  # to add_event().
+  @property
+  def callbk_per_event( self ):
+    events = self.total( 'input_add_events' ) + \
+             self.total( 'clock_add_events' )
+    callbk = self.total( 'input_add_callbk' ) + \
+             self.total( 'clock_add_callbk' )
+    return float( callbk ) / events if events else 0.0
+
   #-----------------------------------------------------------------------
   # reg_model
   #-----------------------------------------------------------------------
@@ -67,29 +170,72 @@ class SimulationMetrics( object ):
   #-----------------------------------------------------------------------
   # Register an eval block in the design.
   def reg_eval( self, eval, is_slice = False ):
-    self.has_run [ eval ] = False
+    self.last_run[ eval ] = -1
     self.is_slice[ eval ] = is_slice
     if is_slice:
       self.num_slice_blocks += 1
 
+  #-----------------------------------------------------------------------
+  # reg_nets
+  #-----------------------------------------------------------------------
+  # Register the SignalValue objects created for the nets in the design.
+  # Only the size of each net is recorded, shadow state is accounted for
+  # separately by reg_seq_state() when it is allocated.
+  def reg_nets( self, svalues ):
+    for svalue in svalues:
+      self.num_nets  += 1
+      self.net_bytes += _sizeof_net( svalue,
+                                     skip=( '_next', 'notify_sim_seq_update' ) )
+
+  #-----------------------------------------------------------------------
+  # reg_seq_state
+  #-----------------------------------------------------------------------
+  # Register the shadow state and sequential update callback allocated
+  # for a net written with .next.
+  def reg_seq_state( self, svalue ):
+    self.num_shadow_nets += 1
+    self.shadow_bytes    += _sizeof_net( svalue._next )
+    self.shadow_bytes    += _sizeof_func( svalue.notify_sim_seq_update )
+
+  #-----------------------------------------------------------------------
+  # memory_footprint
+  #-----------------------------------------------------------------------
+  # Return the number of nets, the number of nets with shadow state and a
+  # sequential update callback, and the bytes used by each.
+  def memory_footprint( self ):
+    return {
+      'nets'         : self.num_nets,
+      'shadow_nets'  : self.num_shadow_nets,
+      'net_bytes'    : self.net_bytes,
+      'shadow_bytes' : self.shadow_bytes,
+      'total_bytes'  : self.net_bytes + self.shadow_bytes,
+    }
+
   #-----------------------------------------------------------------------
   # incr_metrics_cycle
   #-----------------------------------------------------------------------
-  # Should be called at the end of each simulation cycle. Initializes data
-  # structure storage to collect data for the next simulation cycle.
+  # Should be called at the end of each simulation cycle. Adds the
+  # counters of the cycle to the totals and to the series, then clears
+  # them for the next cycle.
   def incr_metrics_cycle( self ):
-    self._pre_tick                   = True
-    self._ncycles                   += 1
-    self.input_add_events_per_cycle += [ 0 ]
-    self.clock_add_events_per_cycle += [ 0 ]
-    self.input_add_callbk_per_cycle += [ 0 ]
-    self.clock_add_callbk_per_cycle += [ 0 ]
-    self.input_comb_evals_per_cycle += [ 0 ]
-    self.clock_comb_evals_per_cycle += [ 0 ]
-    self.slice_comb_evals_per_cycle += [ 0 ]
-    self.redun_comb_evals_per_cycle += [ 0 ]
-    for key in self.has_run:
-      self.has_run[ key ] = False
+
+    counts = self._counts
+    totals = self._totals
+
+    for i, n in enumerate( counts ):
+      totals[i] += n
+
+    if self.period:
+      slot = self._ncycles // self.period
+      if slot >= len( self._series[0] ):
+        for series in self._series:
+          series.extend( array( 'I', [ 0 ] ) * self._chunk )
+      for series, n in zip( self._series, counts ):
+        series[ slot ] += n
+
+    counts[:]      = [ 0 ] * len( COUNTERS )
+    self._phase    = 0
+    self._ncycles += 1
 
   #-----------------------------------------------------------------------
   # start_tick
@@ -97,51 +243,45 @@ class SimulationMetrics( object ):
   # Should be called before sequential logic blocks are executed.  Allows
   # collection of unique metrics for each phase of eval execution.
   def start_tick( self ):
-    self._pre_tick                   = False
+    self._phase = 1
 
   #-----------------------------------------------------------------------
   # incr_add_events
   #-----------------------------------------------------------------------
   # Increment the number of times add_event() was called.
   def incr_add_events( self ):
-    if self._pre_tick:
-      self.input_add_events_per_cycle[ self._ncycles ] += 1
-    else:
-      self.clock_add_events_per_cycle[ self._ncycles ] += 1
+    self._counts[ _ADD_EVENTS + self._phase ] += 1
 
   #-----------------------------------------------------------------------
-  # incr_add_events
+  # incr_add_callbk
   #-----------------------------------------------------------------------
   # Increment the number of callbacks we attempted to place on the event
   # queue.
-  def incr_add_callbk( self ):
-    if self._pre_tick:
-      self.input_add_callbk_per_cycle[ self._ncycles ] += 1
-    else:
-      self.clock_add_callbk_per_cycle[ self._ncycles ] += 1
+  def incr_add_callbk( self, n = 1 ):
+    self._counts[ _ADD_CALLBK + self._phase ] += n
 
   #-----------------------------------------------------------------------
   # incr_comb_evals
   #-----------------------------------------------------------------------
   # Increment the number of evals we actually executed.
   def incr_comb_evals( self, eval ):
-    if self._pre_tick:
-      self.input_comb_evals_per_cycle[ self._ncycles ] += 1
-    else:
-      self.clock_comb_evals_per_cycle[ self._ncycles ] += 1
 
-    if   self.has_run[ eval ]:
-      self.redun_comb_evals_per_cycle[ self._ncycles ] += 1
+    counts = self._counts
+    counts[ _COMB_EVALS + self._phase ] += 1
+
+    if self.last_run[ eval ] == self._ncycles:
+      counts[ _REDUN ] += 1
     else:
-      self.has_run[ eval ] = True
+      self.last_run[ eval ] = self._ncycles
 
-    if   self.is_slice[ eval ]:
-      self.slice_comb_evals_per_cycle[ self._ncycles ] += 1
+    if self.is_slice[ eval ]:
+      counts[ _SLICE ] += 1
 
   #-----------------------------------------------------------------------
   # print_metrics
   #-----------------------------------------------------------------------
-  # Print metrics to the commandline.
+  # Print metrics to the commandline. The detailed table has one row per
+  # cycle or window, and is not printed if only the totals are kept.
   def print_metrics( self, detailed = True ):
     print("-"*72)
     print("Simulation Metrics")
@@ -153,36 +293,144 @@ class SimulationMetrics( object ):
     print("@posedge_clk blocks:   {:4}".format(self.num_posedge_clk_blocks  ))
     print("@combinational blocks: {:4}".format(self.num_combinational_blocks))
     print("slice blocks:          {:4}".format(self.num_slice_blocks        ))
+    print("nets:                  {:4}".format(self.num_nets                ))
+    print("nets with shadow state:{:4}".format(self.num_shadow_nets         ))
+    print("net memory (bytes):    {:4}".format(self.net_bytes               ))
+    print("shadow memory (bytes): {:4}".format(self.shadow_bytes            ))
+    print("callbacks per event:   {:4.2f}".format(self.callbk_per_event     ))
+    print("comb evals:            {:4}".format(
+      self.total( 'input_comb_evals' ) + self.total( 'clock_comb_evals' )  ))
+    print("redundant comb evals:  {:4}".format(
+      self.total( 'redun_comb_evals' )                                     ))
     print("-"*72)
-    if not detailed:
+    if not detailed or not self.period:
       return
+    series = [ self.series( name ) for name in COUNTERS ]
     print()
     print("          pre-tick          post-tick         other       ")
-    print("cycle     adde  clbk  eval  adde  clbk  eval  slice  redun")
+    print("{:8}  adde  clbk  eval  adde  clbk  eval  slice  redun".format(
+      "cycle" if self.period == 1 else "window" ))
     print("--------  ----  ----  ----  ----  ----  ----  -----  -----")
-    for i in range( self._ncycles ):
+    for i in range( ( self._ncycles + self.period - 1 ) // self.period ):
       print("{:8}  {:4}  {:4}  {:4}  {:4}  {:4}  {:4}  {:5}  {:5}".format(
-                   i, self.input_add_events_per_cycle[ i ],
-                      self.input_add_callbk_per_cycle[ i ],
-                      self.input_comb_evals_per_cycle[ i ],
-                      self.clock_add_events_per_cycle[ i ],
-                      self.clock_add_callbk_per_cycle[ i ],
-                      self.clock_comb_evals_per_cycle[ i ],
-                      self.slice_comb_evals_per_cycle[ i ],
-                      self.redun_comb_evals_per_cycle[ i ],
-                   ))
+                   i * self.period, series[0][i], series[2][i], series[4][i],
+                                    series[1][i], series[3][i], series[5][i],
+                                    series[6][i], series[7][i] ))
     print("-"*72)
 
+  #-----------------------------------------------------------------------
+  # write_metrics
+  #-----------------------------------------------------------------------
+  # Write the metrics of the cycles simulated so far to a binary file, in
+  # a columnar format: a line of JSON describing the design and the
+  # layout of the file, followed by the series of each counter in the
+  # order of COUNTERS, as arrays of 32-bit unsigned integers in native
+  # byte order. Read it back with load_metrics(), or with numpy:
+  #
+  #   numpy.fromfile( f, dtype=numpy.uint32 ).reshape( len( counters ), -1 )
+  #
+  # after reading the header line from f.
+  def write_metrics( self, filename ):
+
+    nslots = ( self._ncycles + self.period - 1 ) // self.period \
+             if self.period else 0
+
+    header = {
+      'aggregate' : self.aggregate,
+      'period'    : self.period,
+      'ncycles'   : self._ncycles,
+      'nslots'    : nslots,
+      'counters'  : COUNTERS,
+      'typecode'  : 'I',
+      'itemsize'  : array( 'I' ).itemsize,
+      'byteorder' : sys.byteorder,
+      'totals'    : dict( zip( COUNTERS, self._totals ) ),
+      'design'    : {
+        'modules'             : self.num_modules,
+        'tick_blocks'         : self.num_tick_blocks,
+        'posedge_clk_blocks'  : self.num_posedge_clk_blocks,
+        'combinational_blocks': self.num_combinational_blocks,
+        'slice_blocks'        : self.num_slice_blocks,
+      },
+      'memory'    : self.memory_footprint(),
+    }
+
+    with open( filename, 'wb' ) as f:
+      f.write( json.dumps( header, sort_keys=True ) + '\n' )
+      for series in self._series:
+        series[:nslots].tofile( f )
+
   #-----------------------------------------------------------------------
   # pickle_metrics
   #-----------------------------------------------------------------------
-  # Pickle metrics to a file.  Useful for loading in Python later for
-  # for creating matplotlib plots.
+  # Pickle metrics to a file. Useful for loading in Python later for
+  # for creating matplotlib plots, write_metrics() produces much smaller
+  # files for long simulations.
   def pickle_metrics( self, filename ):
-    del self.is_slice
-    del self.has_run
     pickle.dump( self, open( filename, 'wb' ) )
 
+  # The eval blocks are not picklable, and only needed while simulating
+
+  def __getstate__( self ):
+    state = self.__dict__.copy()
+    del state['is_slice']
+    del state['last_run']
+    return state
+
+#-------------------------------------------------------------------------
+# load_metrics
+#-------------------------------------------------------------------------
+# Read a file written by SimulationMetrics.write_metrics(). Returns the
+# header and a dictionary mapping each counter to its series.
+def load_metrics( filename ):
+
+  with open( filename, 'rb' ) as f:
+    header = json.loads( f.readline() )
+    series = {}
+    for name in header['counters']:
+      series[ name ] = array( str( header['typecode'] ) )
+      series[ name ].fromfile( f, header['nslots'] )
+
+  if header['byteorder'] != sys.byteorder:
+    for x in series.values():
+      x.byteswap()
+
+  return header, series
+
+#-------------------------------------------------------------------------
+# _sizeof_net
+#-------------------------------------------------------------------------
+# Measure the memory owned by a SignalValue: the object, its attribute
+# dictionary, and the attribute values which are private to it (ints,
+# slices, shadow state and callback closures). Values shared with other
+# objects (the simulator, dtypes, callback lists) are not counted.
+_shared_attrs = ( '_alloc_next', )
+
+def _sizeof_net( svalue, skip=() ):
+  nbytes = sys.getsizeof( svalue ) + sys.getsizeof( svalue.__dict__ )
+  seen   = set()
+  for name, value in svalue.__dict__.items():
+    if name in skip or name in _shared_attrs or id( value ) in seen:
+      continue
+    seen.add( id( value ) )
+    if   isinstance( value, (int, long, slice) ):
+      nbytes += sys.getsizeof( value )
+    elif isinstance( value, types.FunctionType ) and value.__closure__:
+      nbytes += _sizeof_func( value )
+  return nbytes
+
+#-------------------------------------------------------------------------
+# _sizeof_func
+#-------------------------------------------------------------------------
+# Measure a callback closure: the function object, its closure tuple and
+# cells, but not the objects the cells refer to.
+def _sizeof_func( func ):
+  nbytes = sys.getsizeof( func )
+  if func.__closure__:
+    nbytes += sys.getsizeof( func.__closure__ )
+    nbytes += sum( sys.getsizeof( c ) for c in func.__closure__ )
+  return nbytes
+
 #-------------------------------------------------------------------------
 # DummyMetrics
 #-------------------------------------------------------------------------
@@ -195,8 +443,10 @@ class DummyMetrics( object ):
 
   def reg_model( self, model ): pass
   def reg_eval( self, eval, is_slice = False ): pass
+  def reg_nets( self, svalues ): pass
+  def reg_seq_state( self, svalue ): pass
   def incr_metrics_cycle( self ): pass
   def start_tick( self ): pass
   def incr_add_events( self ): pass
-  def incr_add_callbk( self ): pass
+  def incr_add_callbk( self, n = 1 ): pass
   def incr_comb_evals( self, eval ): pass
@@ -0,0 +1,116 @@
+#=======================================================================
+# SimulationMetrics_test.py
+#=======================================================================
+
+import pickle
+
+from pymtl import *
+
+from SimulationMetrics import SimulationMetrics, load_metrics, COUNTERS
+
+#-----------------------------------------------------------------------
+# Chain
+#-----------------------------------------------------------------------
+# A register followed by two combinational blocks, with a slice.
+
+class Chain( Model ):
+
+  def __init__( s ):
+
+    s.in_ = InPort ( 8 )
+    s.out = OutPort( 8 )
+    s.hi  = OutPort( 4 )
+    s.reg = Wire   ( 8 )
+    s.tmp = Wire   ( 8 )
+
+    s.connect( s.hi, s.tmp[4:8] )
+
+    @s.posedge_clk
+    def seq():
+      s.reg.next = s.in_
+
+    @s.combinational
+    def comb0():
+      s.tmp.value = s.reg + 1
+
+    @s.combinational
+    def comb1():
+      s.out.value = s.tmp + 1
+
+def run( metrics, ncycles=10 ):
+  model = Chain()
+  model.elaborate()
+  sim = SimulationTool( model, collect_metrics=metrics )
+  for i in range( ncycles ):
+    model.in_.value = i
+    sim.cycle()
+  assert model.out == ncycles + 1
+  return sim.metrics
+
+#-----------------------------------------------------------------------
+# test_aggregate
+#-----------------------------------------------------------------------
+# Windows and totals add up the per-cycle counters.
+def test_aggregate():
+
+  cycle  = run( True )
+  window = run( SimulationMetrics( aggregate='window', window=4 ) )
+  total  = run( SimulationMetrics( aggregate='total' ) )
+
+  for name in COUNTERS:
+    per_cycle = cycle.series( name )
+    assert len( per_cycle ) == 11
+    assert window.series( name ) == [ sum( per_cycle[0:4] ),
+                                      sum( per_cycle[4:8] ),
+                                      sum( per_cycle[8:11] ) ]
+    assert total.series( name ) == [ sum( per_cycle ) ]
+    assert total.total( name )  == sum( per_cycle )
+
+  # Every cycle evaluates both blocks once after the clock edge
+
+  assert cycle.clock_comb_evals_per_cycle[1:10] == [ 2 ] * 9
+
+#-----------------------------------------------------------------------
+# test_redundant
+#-----------------------------------------------------------------------
+# An eval is only redundant if it runs twice in the same cycle.
+def test_redundant():
+
+  metrics = SimulationMetrics( chunk=2 )
+  evals   = [ lambda: None, lambda: None ]
+  for x in evals:
+    metrics.reg_eval( x )
+
+  for i in range( 5 ):
+    metrics.incr_comb_evals( evals[0] )
+    metrics.incr_comb_evals( evals[0] )
+    metrics.incr_comb_evals( evals[1] )
+    metrics.incr_metrics_cycle()
+
+  assert metrics.redun_comb_evals_per_cycle == [ 1 ] * 5 + [ 0 ]
+  assert metrics.input_comb_evals_per_cycle == [ 3 ] * 5 + [ 0 ]
+
+#-----------------------------------------------------------------------
+# test_write_metrics
+#-----------------------------------------------------------------------
+def test_write_metrics( tmpdir ):
+
+  metrics  = run( SimulationMetrics( aggregate='window', window=3 ) )
+  filename = str( tmpdir.join( 'metrics.bin' ) )
+  metrics.write_metrics( filename )
+
+  header, series = load_metrics( filename )
+  assert header['ncycles'] == 10
+  assert header['nslots']  == 4
+  assert header['design']['combinational_blocks'] == \
+         metrics.num_combinational_blocks
+  for name in COUNTERS:
+    assert list( series[ name ] ) == metrics.series( name )
+    assert header['totals'][ name ] == metrics.total( name )
+
+  # Pickling leaves the metrics usable
+
+  metrics.pickle_metrics( str( tmpdir.join( 'metrics.pkl' ) ) )
+  loaded = pickle.load( open( str( tmpdir.join( 'metrics.pkl' ) ), 'rb' ) )
+  assert loaded.comb_evals_per_cycle == metrics.comb_evals_per_cycle
+  assert metrics.last_run
@@ -0,0 +1,144 @@
+#=========================================================================
+# SimulationProfile.py
+#=========================================================================
+
+from __future__ import print_function
+
+import collections
+
+from timeit import default_timer
+
+#-------------------------------------------------------------------------
+# SimulationProfile
+#-------------------------------------------------------------------------
+# Wall-clock profile of the blocks of a design. When profiling is enabled,
+# SimulationTool wraps every sequential block, combinational block and
+# slice callback with a timer (see wrap()) counting the calls to the
+# block, the total time spent in it, and its self time: the total time
+# minus the time spent in other profiled blocks it called. Slice
+# callbacks are called directly by the writes to the nets they read, so
+# they are usually nested in other blocks.
+#
+# Time is attributed to the hierarchical path of the model of the block
+# (e.g., 'top.router[3]') and the name of the block, all the blocks of
+# a model with the same name and kind share the same entry.
+class SimulationProfile( object ):
+
+  #-----------------------------------------------------------------------
+  # __init__
+  #-----------------------------------------------------------------------
+  def __init__( self, timer = default_timer ):
+    self.timer   = timer
+    self.entries = collections.OrderedDict()
+    self._child  = [ 0.0 ]
+
+  #-----------------------------------------------------------------------
+  # wrap
+  #-----------------------------------------------------------------------
+  # Return a function calling func and accounting for it. kind is one of
+  # 'tick', 'comb' or 'slice'. The model and name of the block default to
+  # func._model and func.__name__.
+  #
+  # Each entry is a list [ calls, total time, self time ], updated in
+  # place by the wrapper. _child accumulates the time spent in the
+  # profiled blocks called by the block currently running.
+  def wrap( self, func, kind, model = None, name = None ):
+
+    if model is None: model = func._model
+    if name  is None: name  = func.__name__
+
+    key   = ( _model_path( model ), name, kind )
+    entry = self.entries.setdefault( key, [ 0, 0.0, 0.0 ] )
+    timer = self.timer
+    child = self._child
+
+    def profiled():
+      outer    = child[0]
+      child[0] = 0.0
+      start    = timer()
+      try:
+        func()
+      finally:
+        elapsed   = timer() - start
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] += elapsed - child[0]
+        child[0]  = outer + elapsed
+
+    return profiled
+
+  #-----------------------------------------------------------------------
+  # clear
+  #-----------------------------------------------------------------------
+  # Reset all the counters, e.g., to leave out the reset of the design.
+  def clear( self ):
+    for entry in self.entries.values():
+      entry[:] = [ 0, 0.0, 0.0 ]
+
+  #-----------------------------------------------------------------------
+  # stats
+  #-----------------------------------------------------------------------
+  # Return a list of ( path, name, kind, calls, total, self ) tuples for
+  # the blocks which were called, times are in seconds. Sorted by
+  # decreasing self time by default, sort can also be 'total' or 'calls'.
+  def stats( self, sort = 'self' ):
+    column = { 'calls' : 3, 'total' : 4, 'self' : 5 }[ sort ]
+    stats  = [ key + tuple( entry ) for key, entry in self.entries.items()
+               if entry[0] ]
+    return sorted( stats, key = lambda x: x[ column ], reverse = True )
+
+  #-----------------------------------------------------------------------
+  # total_time
+  #-----------------------------------------------------------------------
+  # Time spent in all the profiled blocks.
+  @property
+  def total_time( self ):
+    return sum( entry[2] for entry in self.entries.values() )
+
+  #-----------------------------------------------------------------------
+  # print_report
+  #-----------------------------------------------------------------------
+  # Print the n blocks with the largest self time (all blocks if n is
+  # None) to the commandline.
+  def print_report( self, n = 20, sort = 'self' ):
+    stats = self.stats( sort )
+    total = self.total_time or 1.0
+    print("-"*72)
+    print("Simulation Profile")
+    print("-"*72)
+    print()
+    print("blocks called:         {:8}".format( len( stats )        ))
+    print("time in blocks (s):    {:8.3f}".format( self.total_time  ))
+    print()
+    print("self(ms)  self%  total(ms)     calls  us/call  kind   block")
+    print("--------  -----  ---------  --------  -------  -----  -----")
+    for path, name, kind, calls, total_, self_ in stats[:n]:
+      print("{:8.2f}  {:5.1f}  {:9.2f}  {:8}  {:7.2f}  {:5}  {}.{}".format(
+                   self_ * 1e3, 100.0 * self_ / total, total_ * 1e3, calls,
+                   total_ * 1e6 / calls, kind, path, name ))
+    print("-"*72)
+
+  #-----------------------------------------------------------------------
+  # write_collapsed
+  #-----------------------------------------------------------------------
+  # Write the self time of each block in microseconds, in the collapsed
+  # stack format read by flamegraph.pl and speedscope: one line per block
+  # with the model hierarchy and the block name as the stack.
+  def write_collapsed( self, filename ):
+    with open( filename, 'w' ) as f:
+      for path, name, kind, calls, total_, self_ in self.stats():
+        usecs = int( round( self_ * 1e6 ) )
+        if usecs > 0:
+          f.write( "{};{} {}\n".format( path.replace( '.', ';' ), name,
+                                         usecs ) )
+
+#-------------------------------------------------------------------------
+# _model_path
+#-------------------------------------------------------------------------
+# Hierarchical path of a model, from the top-level model.
+def _model_path( model ):
+  names = []
+  while model is not None:
+    names.append( model.name )
+    model = model.parent
+  return '.'.join( reversed( names ) )
@@ -10,12 +10,15 @@ from __future__ import print_function
 
 import pprint
 import collections
+import functools
 import inspect
 import warnings
 import sim_utils as sim
 
 from sys               import flags
 from SimulationMetrics import SimulationMetrics, DummyMetrics
+from SimulationProfile import SimulationProfile
+from SimulationActivity import SimulationActivity
 
 #-----------------------------------------------------------------------
 # SimulationTool
@@ -30,7 +33,30 @@ class SimulationTool( object ):
   # __init__
   #---------------------------------------------------------------------
   # Construct a simulator based on the provided model.
-  def __init__( self, model, collect_metrics = False ):
+  #
+  # If lean is set, the elaboration-only structures of the model (the
+  # Signal and ConnectionEdge graph, the nets and the per-model
+  # sensitivity lists) are released once the simulator is built, only
+  # the signal_values index is kept. The model can no longer be
+  # translated or passed to another SimulationTool afterwards.
+  #
+  # Combinational blocks and slice connections whose inputs are constant
+  # are evaluated once here and never registered. If prune_unobserved
+  # is set, blocks and slice connections which can not affect the
+  # top-level ports or the line trace are removed as well, so internal
+  # signals they drive are no longer updated. The number of removed
+  # blocks and slice callbacks is kept in optimization_report.
+  #
+  # If profile is set, the wall-clock time spent in each block and slice
+  # callback is measured and kept in profile (see SimulationProfile),
+  # otherwise profile is None.
+  #
+  # If activity is set, the value changes and bit toggles of every net
+  # are counted and kept in activity (see SimulationActivity), otherwise
+  # activity is None. If activity is an integer, they are also counted
+  # per window of that many cycles.
+  def __init__( self, model, collect_metrics = False, lean = False,
+                prune_unobserved = False, profile = False, activity = False ):
 
     # Check that the model has been elaborated
     if not model.is_elaborated():
@@ -38,36 +64,49 @@ class SimulationTool( object ):
                        "Provided model has not been elaborated yet!!!"
                        "".format( self.__class__.__name__ ) )
 
+    # Check that the model was not released by a lean simulator
+    if sim.is_released( model ):
+      raise Exception( "cannot initialize {0} tool.\n"
+                       "Provided model was released by a lean simulator!!!"
+                       "".format( self.__class__.__name__ ) )
+
     self.model                = model
     self.ncycles              = 0
 
     self._event_queue         = EventQueue()
     self._sequential_blocks   = []
     self._register_queue      = []
-    self._current_func        = None
 
     self._nets                = None # TODO: remove me
+    self._signal_values       = None
 
     #self._DEBUG_signal_cbs    = collections.defaultdict(list)
 
 
     # Only collect metrics if they are enabled, otherwise replace
-    # with a dummy collection class.
+    # with a dummy collection class. collect_metrics can also be a
+    # SimulationMetrics instance, e.g., to aggregate the metrics by
+    # window instead of by cycle. The implementations of cycle and
+    # eval_combinational collecting metrics are only used if enabled,
+    # the others make no calls to the metrics class at all.
+    #
+    # If the -O flag was passed to Python, use the perf implementation
+    # of cycle, otherwise use the dev version.
 
     if collect_metrics:
-      self.metrics            = SimulationMetrics()
+      self.metrics            = collect_metrics \
+                                if isinstance( collect_metrics,
+                                               SimulationMetrics ) \
+                                else SimulationMetrics()
+      self.cycle              = self._metrics_cycle
+      self.eval_combinational = self._metrics_eval
     else:
       self.metrics            = DummyMetrics()
-
-    # If the -O flag was passed to Python, use the perf implementation
-    # of cycle, otherwise use the dev version.
-
-    if flags.optimize:
-      self.cycle              = self._perf_cycle
+      self.cycle              = self._perf_cycle if flags.optimize else \
+                                self._dev_cycle
       self.eval_combinational = self._perf_eval
-    else:
-      self.cycle              = self._dev_cycle
-      self.eval_combinational = self._dev_eval
+
+    self.profile = SimulationProfile() if profile else None
 
 
     # Construct a simulator for the provided model.
@@ -77,13 +116,29 @@ class SimulationTool( object ):
     sequential_blocks       = sim.register_seq_blocks( model )
 
     sim.insert_signal_values( self, nets )
+    sim.insert_memory_values( self, model )
+    sim.insert_seq_state    ( self, model )
+    sim.collect_comb_senses ( model )
+
+    removed, self.optimization_report = \
+      sim.optimize_blocks( model, slice_connections, prune_unobserved )
 
-    sim.register_comb_blocks  ( model, self._event_queue )
-    sim.create_slice_callbacks( slice_connections, self._event_queue )
+    sim.register_comb_blocks  ( model, self._event_queue, removed,
+                                self.metrics, self.profile )
+    sim.create_slice_callbacks( slice_connections, self._event_queue, removed,
+                                self.metrics, self.profile )
     sim.register_cffi_updates ( model )
 
     self._nets              = nets
-    self._sequential_blocks = sequential_blocks
+    self._sequential_blocks = [ x for x in sequential_blocks
+                                if id( x ) not in removed ]
+
+    if self.profile:
+      self._sequential_blocks = [ self.profile.wrap( x, 'tick' )
+                                  for x in self._sequential_blocks ]
+
+    self.metrics.reg_nets( [ next( iter( net ) )._signalvalue
+                             for net in nets ] )
 
     # Setup vcd dumping if it's configured
 
@@ -91,6 +146,33 @@ class SimulationTool( object ):
       from vcd import VCDUtil
       VCDUtil( self, model.vcd_file )
 
+    # In lean mode, keep the name index and drop everything else only
+    # needed to build the simulator
+
+    if lean:
+      self._signal_values = sim.create_signal_index( model )
+      self._nets          = None
+      sim.release_elaboration_state( model )
+
+    # Count the activity of the nets if enabled
+
+    self.activity = None
+    if activity:
+      window = None if activity is True else activity
+      self.activity = SimulationActivity( self, window )
+
+  #---------------------------------------------------------------------
+  # signal_values
+  #---------------------------------------------------------------------
+  # Dictionary mapping the hierarchical name of every port, wire and
+  # memory in the design (e.g. 'top.sub.in_') to its SignalValue.
+  # Connected signals share the SignalValue of their net.
+  @property
+  def signal_values( self ):
+    if self._signal_values is None:
+      self._signal_values = sim.create_signal_index( self.model )
+    return self._signal_values
+
   #---------------------------------------------------------------------
   # reset
   #---------------------------------------------------------------------
@@ -116,12 +198,13 @@ class SimulationTool( object ):
   # well as any @combinational blocks that have been added to the event
   # queue.
   #
-  # Note: see _debug_cycle and _perf_cycle for actual implementations.
+  # Note: see _dev_cycle, _metrics_cycle and _perf_cycle for actual
+  # implementations.
   def cycle( self ):
     pass
 
   #---------------------------------------------------------------------
-  # _debug_cycle
+  # _dev_cycle
   #---------------------------------------------------------------------
   # Implementation of cycle() for use during develop-test-debug loops.
   def _dev_cycle( self ):
@@ -133,6 +216,33 @@ class SimulationTool( object ):
     self.model.clk.value = 0
     self.model.clk.value = 1
 
+    # Call all rising edge triggered functions
+    for func in self._sequential_blocks:
+      func()
+
+    # Then flop the shadow state on all registers. Each register is
+    # queued at most once per cycle (see sim_utils.insert_signal_values).
+    self._flop_registers()
+
+    # Call all events generated by synchronous logic
+    self.eval_combinational()
+
+    # Increment the simulator cycle count
+    self.ncycles += 1
+
+  #---------------------------------------------------------------------
+  # _metrics_cycle
+  #---------------------------------------------------------------------
+  # Implementation of cycle() collecting metrics.
+  def _metrics_cycle( self ):
+
+    # Call all events generated by input changes
+    self.eval_combinational()
+
+    # Clock generation needed by VCD tracing
+    self.model.clk.value = 0
+    self.model.clk.value = 1
+
     # Distinguish between events caused by input vectors changing (above)
     # and events caused by clocked logic (below).
     self.metrics.start_tick()
@@ -141,10 +251,9 @@ class SimulationTool( object ):
     for func in self._sequential_blocks:
       func()
 
-    # Then flop the shadow state on all registers
-    while self._register_queue:
-      reg = self._register_queue.pop()
-      reg.flop()
+    # Then flop the shadow state on all registers. Each register is
+    # queued at most once per cycle (see sim_utils.insert_signal_values).
+    self._flop_registers()
 
     # Call all events generated by synchronous logic
     self.eval_combinational()
@@ -168,10 +277,9 @@ class SimulationTool( object ):
     for func in self._sequential_blocks:
       func()
 
-    # Then flop the shadow state on all registers
-    while self._register_queue:
-      reg = self._register_queue.pop()
-      reg.flop()
+    # Then flop the shadow state on all registers. Each register is
+    # queued at most once per cycle (see sim_utils.insert_signal_values).
+    self._flop_registers()
 
     # Call all events generated by synchronous logic
     self.eval_combinational()
@@ -179,79 +287,128 @@ class SimulationTool( object ):
     # Increment the simulator cycle count
     self.ncycles += 1
 
+  #---------------------------------------------------------------------
+  # _flop_registers
+  #---------------------------------------------------------------------
+  # Flop every register written during this cycle.
+  def _flop_registers( self ):
+    queue = self._register_queue
+    for reg in queue:
+      reg._queued = False
+      reg.flop()
+    del queue[:]
+
   #---------------------------------------------------------------------
   # eval_combinational
   #---------------------------------------------------------------------
   # Evaluate all combinational logic blocks currently in the eventqueue.
+  #
+  # Note: see _metrics_eval and _perf_eval for actual implementations.
   def eval_combinational( self ):
     pass
 
   #---------------------------------------------------------------------
-  # _debug_eval
+  # _metrics_eval
   #---------------------------------------------------------------------
-  # Implementation of eval_combinational() for use during
-  # develop-test-debug loops.
-  def _dev_eval( self ):
-    while self._event_queue.len():
-      self._current_func = func = self._event_queue.deq()
+  # Implementation of eval_combinational() collecting metrics.
+  def _metrics_eval( self ):
+    queue = self._event_queue
+    self._metrics_schedule()
+    while queue.len():
+      func = queue.deq()
       self.metrics.incr_comb_evals( func )
       func()
-      self._current_func = None
+      self._metrics_schedule()
+      queue.done( func )
+
+  #---------------------------------------------------------------------
+  # _metrics_schedule
+  #---------------------------------------------------------------------
+  # Count the events for all changed nets and the callbacks they place
+  # on the event queue, then schedule them.
+  def _metrics_schedule( self ):
+    queue = self._event_queue
+    for net_id in queue.dirty:
+      net = queue.nets[ net_id ]
+      self.metrics.incr_add_events()
+      self.metrics.incr_add_callbk( len( net._fanout ) )
+      if net._field_callbacks:
+        changed = net._uint ^ net._event_uint
+        self.metrics.incr_add_callbk(
+          len( [ 1 for mask, i in net._field_callbacks if changed & mask ] ) )
+    queue.schedule()
 
   #---------------------------------------------------------------------
   # _perf_eval
   #---------------------------------------------------------------------
   # Implementation of eval_combinataional () for use when benchmarking
-  # models.
+  # models. Nets changed by a block are scheduled before the block is
+  # marked as done, so that it does not trigger itself.
   def _perf_eval( self ):
-    while self._event_queue.len():
-      self._current_func = func = self._event_queue.deq()
+    queue    = self._event_queue
+    fifo     = queue.fifo
+    func_bv  = queue.func_bv
+    dirty    = queue.dirty
+    schedule = queue.schedule
+    if dirty:
+      schedule()
+    while fifo:
+      func = fifo.pop()
       func()
-      self._current_func = None
+      if dirty:
+        schedule()
+      func_bv[ func.id ] = False
 
   #---------------------------------------------------------------------
   # add_event
   #---------------------------------------------------------------------
   # Add an event to the simulator event queue for later execution.
   #
-  # This function will check if the written SignalValue instance has any
-  # registered events (functions decorated with @combinational), and if
-  # so, adds them to the event queue.
+  # Marks the written SignalValue instance as changed, the registered
+  # events (functions decorated with @combinational) sensitive to it are
+  # added to the event queue by the next eval_combinational(). Writes
+  # to .value of nets with registered events do the same.
   def add_event( self, signal_value ):
-    # TODO: debug_event
-    #print("    ADDEVENT: VALUE", signal_value.v,  end='')
-    #print(signal_value in self._DEBUG_signal_cbs, end='')
-    #print([x.fullname for x in signal_value._DEBUG_signal_names], end='')
-    #print(self._DEBUG_signal_cbs[signal_value])
-
-    self.metrics.incr_add_events()
-
-    # Place all other callbacks in the event queue for execution later
-
-    for func in signal_value._callbacks:
-      self.metrics.incr_add_callbk()
-      if func != self._current_func:
-        self._event_queue.enq( func.cb, func.id )
+    self._event_queue.dirty.append( signal_value._net_id )
 
 #-----------------------------------------------------------------------
 # EventQueue
 #-----------------------------------------------------------------------
+# Queue of callbacks to evaluate, each callback is identified by the id
+# returned by get_id(). A callback is only queued once: it stays marked
+# in func_bv from enq() until done() is called after evaluating it.
+#
+# Each net read by combinational blocks also has an integer id, returned
+# by get_net_id(). Writes to the net append its id to the dirty list
+# (see get_notifier), without calling back into the simulator. The
+# fan-out of all dirty nets is queued in bulk by schedule().
 class EventQueue( object ):
 
   def __init__( self, initsize = 1000 ):
     self.fifo     = collections.deque()
     self.func_bv  = [ False ] * initsize
+    self.funcs    = []
     self.func_ids = 0
+    self.nets     = []
+    self.dirty    = []
 
   def enq( self, event, id ):
     if not self.func_bv[ id ]:
       self.func_bv[ id ] = True
       self.fifo.appendleft( event )
 
+  def enq_ids( self, ids ):
+    func_bv = self.func_bv
+    for id in ids:
+      if not func_bv[ id ]:
+        func_bv[ id ] = True
+        self.fifo.appendleft( self.funcs[ id ] )
+
   def deq( self ):
-    event = self.fifo.pop()
+    return self.fifo.pop()
+
+  def done( self, event ):
     self.func_bv[ event.id ] = False
-    return event
 
   def len( self ):
     return len( self.fifo )
@@ -259,9 +416,48 @@ class EventQueue( object ):
   def __len__( self ):
     return len( self.fifo )
 
-  def get_id( self ):
+  def get_id( self, func ):
     id = self.func_ids
+    self.funcs.append( func )
     self.func_ids += 1
     if self.func_ids > len( self.func_bv ):
       self.func_bv.extend( [ False ] * 1000 )
     return id
+
+  def get_net_id( self, net ):
+    self.nets.append( net )
+    return len( self.nets ) - 1
+
+  # Return the function notifying a write to the net. The dirty list is
+  # only ever cleared in place, so the function stays valid.
+  def get_notifier( self, net ):
+    return functools.partial( self.dirty.append, net._net_id )
+
+  # Queue the callbacks sensitive to all the nets written since the last
+  # call. Callbacks only reading some of the bits of a net (e.g., a
+  # BitStruct field) are queued if any of those bits changed since the
+  # last call.
+  def schedule( self ):
+
+    func_bv = self.func_bv
+    funcs   = self.funcs
+    fifo    = self.fifo
+    nets    = self.nets
+
+    for net_id in self.dirty:
+      net = nets[ net_id ]
+      for id in net._fanout:
+        if not func_bv[ id ]:
+          func_bv[ id ] = True
+          fifo.appendleft( funcs[ id ] )
+
+      if net._field_callbacks:
+        uint    = net._uint
+        changed = uint ^ net._event_uint
+        net._event_uint = uint
+        for mask, id in net._field_callbacks:
+          if changed & mask and not func_bv[ id ]:
+            func_bv[ id ] = True
+            fifo.appendleft( funcs[ id ] )
+
+    del self.dirty[:]
@@ -0,0 +1,127 @@
+#=======================================================================
+# SimulationTool_activity_test.py
+#=======================================================================
+# Tests for the per-net activity counted by SimulationTool.
+
+import csv
+import json
+
+from pymtl import *
+
+#-----------------------------------------------------------------------
+# Counter
+#-----------------------------------------------------------------------
+
+class Counter( Model ):
+
+  def __init__( s ):
+
+    s.en    = InPort ( 1 )
+    s.out   = OutPort( 4 )
+    s.count = Wire   ( 4 )
+    s.mem   = MemoryArray( 4, 2 )
+
+    @s.tick
+    def seq():
+      if s.en:
+        s.count.next = s.count + 1
+        s.mem[0].next = s.count
+
+    @s.combinational
+    def comb():
+      s.out.value = s.count
+
+#-----------------------------------------------------------------------
+# Top
+#-----------------------------------------------------------------------
+
+class Top( Model ):
+
+  def __init__( s ):
+
+    s.en  = InPort ( 2 )
+    s.out = [ OutPort( 4 ) for _ in range( 2 ) ]
+
+    s.counters = [ Counter() for _ in range( 2 ) ]
+
+    for i in range( 2 ):
+      s.connect( s.en[i],  s.counters[i].en  )
+      s.connect( s.out[i], s.counters[i].out )
+
+#-----------------------------------------------------------------------
+# test_activity
+#-----------------------------------------------------------------------
+def test_activity( tmpdir ):
+
+  model = Top()
+  model.elaborate()
+  sim = SimulationTool( model, activity=2 )
+
+  # Only the first counter counts, from 0 to 5
+
+  model.en.value = 1
+  for i in range( 5 ):
+    sim.cycle()
+
+  assert model.out[0] == 5
+  assert sim.activity.ncycles == 5
+
+  nets = dict( ( x['name'], x ) for x in sim.activity.net_stats() )
+
+  # Transitions 0>1>2>3>4>5 toggle 1+2+1+3+1 bits
+
+  count = nets[ 'top.counters[0].count' ]
+  assert count['changes']  == 5
+  assert count['toggles']  == 8
+  assert count['activity'] == 8.0 / ( 4 * 5 )
+  assert count['fanout']   == 1
+  assert count['evals']    == 5
+
+  assert nets[ 'top.out[0]' ]['aliases'] == [ 'top.counters[0].out' ]
+  assert nets[ 'top.out[0]' ]['toggles'] == 8
+  assert nets[ 'top.out[1]' ]['changes'] == 0
+  assert nets[ 'top.counters[0].mem' ]['changes'] == 4
+
+  # Windows of two cycles, the current one holds the fifth cycle
+
+  windows = sim.activity.window_changes()
+  assert len( windows ) == 3
+  net_id  = model.counters[0].count._net_id
+  assert [ w[ net_id ] for w in windows ] == [ 2, 2, 1 ]
+
+  # Subtrees share the clock, the first counter also has en, count, out
+  # and mem changing, the top-level model en
+
+  models = sim.activity.model_stats()
+  assert models[ 'top.counters[0]' ]['changes'] - \
+         models[ 'top.counters[1]' ]['changes'] == 1 + 5 + 5 + 4
+  assert models[ 'top' ]['changes'] - \
+         models[ 'top.counters[0]' ]['changes'] == 1
+
+  # Exports
+
+  filename = str( tmpdir.join( 'activity.csv' ) )
+  sim.activity.write_csv( filename )
+  rows = dict( ( x['name'], x ) for x in csv.DictReader( open( filename ) ) )
+  assert rows[ 'top.counters[0].count' ]['toggles'] == '8'
+
+  filename = str( tmpdir.join( 'activity.json' ) )
+  sim.activity.write_json( filename )
+  data = json.load( open( filename ) )
+  assert data['ncycles'] == 5
+  nets = dict( ( x['name'], x ) for x in data['nets'] )
+  assert nets[ 'top.counters[0].count' ]['windows'] == [ 2, 2, 1 ]
+  assert data['models'][ 'top.counters[0]' ]['nets'] == 6
+
+  sim.activity.clear()
+  assert sum( sim.activity.changes() ) == 0
+
+#-----------------------------------------------------------------------
+# test_activity_disabled
+#-----------------------------------------------------------------------
+def test_activity_disabled():
+
+  model = Top()
+  model.elaborate()
+  sim = SimulationTool( model )
+  assert sim.activity is None
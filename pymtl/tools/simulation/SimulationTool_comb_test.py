@@ -1710,3 +1710,144 @@ def test_InferFuncCall( setup_sim ):
   assert model.o1c == 0xFF
   assert model.o2c == 0xF
   assert model.o3c == 0x4
+
+#-----------------------------------------------------------------------
+# FieldSensitivity
+#-----------------------------------------------------------------------
+# Blocks reading single fields of a BitStruct net only run when one of
+# their fields changes.
+
+class FieldSensitivityMsg( BitStructDefinition ):
+  def __init__( s ):
+    s.data = BitField( 8 )
+    s.dest = BitField( 4 )
+    s.src  = BitField( 4 )
+
+class FieldSensitivity( Model ):
+  def __init__( s ):
+    s.in_   = InPort ( FieldSensitivityMsg() )
+    s.dest  = OutPort( 4 )
+    s.both  = OutPort( 8 )
+    s.whole = OutPort( 16 )
+    s.evals = []
+
+    @s.combinational
+    def read_dest():
+      s.evals.append( 'dest' )
+      s.dest.value = s.in_.dest
+
+    @s.combinational
+    def read_both():
+      s.evals.append( 'both' )
+      s.both.value = concat( s.in_.src, s.in_.dest )
+
+    @s.combinational
+    def read_whole():
+      s.evals.append( 'whole' )
+      s.whole.value = s.in_.dest + s.in_
+
+def test_FieldSensitivity():
+
+  model = FieldSensitivity()
+  model.elaborate()
+  sim   = SimulationTool( model )
+  sim.reset()
+
+  def write( field, value ):
+    del model.evals[:]
+    getattr( model.in_, field ).value = value
+    sim.eval_combinational()
+    return sorted( model.evals )
+
+  assert write( 'data', 0x12 ) == [ 'whole' ]
+  assert write( 'dest', 0x3  ) == [ 'both', 'dest', 'whole' ]
+  assert write( 'src',  0x4  ) == [ 'both', 'whole' ]
+  assert write( 'src',  0x4  ) == []
+
+  assert model.dest  == 0x3
+  assert model.both  == 0x43
+  assert model.whole == model.in_ + 0x3
+
+  # Writing the whole net only runs the blocks whose fields changed
+
+  def write_msg( **fields ):
+    msg = FieldSensitivityMsg()
+    msg.value = model.in_
+    for name, value in fields.items():
+      setattr( msg, name, value )
+    del model.evals[:]
+    model.in_.value = msg
+    sim.eval_combinational()
+    return sorted( model.evals )
+
+  assert write_msg( data=0x56         ) == [ 'whole' ]
+  assert write_msg( data=0x78, dest=5 ) == [ 'both', 'dest', 'whole' ]
+
+  assert model.dest  == 0x5
+  assert model.both  == 0x45
+  assert model.whole == model.in_ + 0x5
+
+#-----------------------------------------------------------------------
+# FanoutDedup
+#-----------------------------------------------------------------------
+# Blocks reading a net several times are in its fan-out only once.
+
+class FanoutDedup( Model ):
+
+  def __init__( s ):
+
+    s.in_  = InPort ( 8 )
+    s.out0 = OutPort( 8 )
+    s.out1 = OutPort( 8 )
+
+    @s.combinational
+    def comb0():
+      s.out0.value = s.in_ + s.in_ + s.in_[0:4]
+
+    @s.combinational
+    def comb1():
+      if s.in_ > 4:
+        s.out1.value = s.in_
+      else:
+        s.out1.value = 0
+
+def test_FanoutDedup():
+
+  model = FanoutDedup()
+  model.elaborate()
+  sim   = SimulationTool( model, collect_metrics=True )
+  sim.reset()
+
+  assert len( model.in_._fanout ) == 2
+
+  model.in_.value = 5
+  sim.cycle()
+  assert model.out0 == 15
+  assert model.out1 == 5
+  assert sim.metrics.callbk_per_event == 2.0
+
+#-----------------------------------------------------------------------
+# test_DirtyNets
+#-----------------------------------------------------------------------
+# Writes only record the id of the net, its fan-out is scheduled by the
+# next eval_combinational().
+def test_DirtyNets():
+
+  model = FanoutDedup()
+  model.elaborate()
+  sim   = SimulationTool( model )
+  sim.reset()
+
+  queue = sim._event_queue
+  assert queue.nets[ model.in_._net_id ] is model.in_
+
+  model.in_.value = 5
+  model.in_.value = 6
+  assert queue.dirty == [ model.in_._net_id ] * 2
+  assert model.out0  == 0
+
+  sim.eval_combinational()
+  assert queue.dirty == []
+  assert len( queue ) == 0
+  assert model.out0  == 18
+  assert model.out1  == 6
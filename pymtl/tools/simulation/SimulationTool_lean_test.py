@@ -0,0 +1,160 @@
+#=======================================================================
+# SimulationTool_lean_test.py
+#=======================================================================
+# Tests for SimulationTool with lean construction, which releases the
+# elaboration-only structures of the model.
+
+import gc
+import random
+import weakref
+import pytest
+
+from pymtl      import *
+from pclib.ifcs import InValRdyBundle, OutValRdyBundle
+from pclib.rtl  import NormalQueue
+
+#-----------------------------------------------------------------------
+# QueueTop
+#-----------------------------------------------------------------------
+# Port bundles, submodules, slice connections, lists of ports and a
+# MemoryArray (in the RegisterFile of the queue).
+
+class QueueTop( Model ):
+
+  def __init__( s ):
+
+    s.enq   = InValRdyBundle ( 16 )
+    s.deq   = OutValRdyBundle( 16 )
+    s.hi    = OutPort( 8 )
+    s.free  = OutPort[2]( 3 )
+    s.sum   = Wire( 3 )
+
+    s.queue = NormalQueue( 4, 16 )
+
+    s.connect( s.enq,     s.queue.enq              )
+    s.connect( s.deq,     s.queue.deq              )
+    s.connect( s.hi,      s.queue.deq.msg[8:16]    )
+    s.connect( s.free[0], s.queue.num_free_entries )
+
+    @s.combinational
+    def comb():
+      s.sum.value     = s.queue.num_free_entries + 1
+      s.free[1].value = s.sum
+
+  def line_trace( s ):
+    return s.queue.line_trace()
+
+#-----------------------------------------------------------------------
+# run_queue
+#-----------------------------------------------------------------------
+# Drive the queue with random stimulus, return the outputs every cycle.
+
+def run_queue( model, sim, ncycles=100 ):
+
+  rng   = random.Random( 0xdeadbeef )
+  trace = []
+
+  sim.reset()
+  for i in range( ncycles ):
+    model.enq.val.value = rng.randint( 0, 1 )
+    model.enq.msg.value = rng.getrandbits( 16 )
+    model.deq.rdy.value = rng.randint( 0, 1 )
+    sim.eval_combinational()
+    trace.append( ( int( model.enq.rdy ), int( model.deq.val ),
+                    int( model.deq.msg ), int( model.hi ),
+                    int( model.free[0] ), int( model.free[1] ),
+                    model.line_trace() ) )
+    sim.cycle()
+
+  return trace
+
+#-----------------------------------------------------------------------
+# test_lean_matches
+#-----------------------------------------------------------------------
+def test_lean_matches():
+
+  ref = QueueTop()
+  ref.elaborate()
+  ref_trace = run_queue( ref, SimulationTool( ref ) )
+
+  model = QueueTop()
+  model.elaborate()
+  assert run_queue( model, SimulationTool( model, lean=True ) ) == ref_trace
+
+#-----------------------------------------------------------------------
+# test_lean_releases_graph
+#-----------------------------------------------------------------------
+def test_lean_releases_graph():
+
+  model = QueueTop()
+  model.elaborate()
+
+  wire  = weakref.ref( model.sum )
+  port  = weakref.ref( model.enq.msg )
+  edge  = weakref.ref( next( iter( model.get_connections() ) ) )
+  sub   = weakref.ref( model.queue.dpath.enq_bits )
+
+  sim = SimulationTool( model, lean=True )
+  gc.collect()
+
+  assert wire() is None
+  assert port() is None
+  assert edge() is None
+  assert sub()  is None
+
+  assert model.get_connections() == set()
+  assert model.get_ports()       == []
+  assert model.queue._newsenses  is None
+
+  # The simulator keeps working
+  run_queue( model, sim, 10 )
+
+#-----------------------------------------------------------------------
+# test_signal_values
+#-----------------------------------------------------------------------
+@pytest.mark.parametrize( 'lean', [ False, True ] )
+def test_signal_values( lean ):
+
+  model = QueueTop()
+  model.elaborate()
+  sim   = SimulationTool( model, lean=lean )
+  index = sim.signal_values
+
+  # Connected signals share the SignalValue of their net
+  assert index['top.enq.msg']                  is model.enq.msg
+  assert index['top.queue.enq.msg']            is model.enq.msg
+  assert index['top.queue.dpath.enq_bits']     is model.enq.msg
+  assert index['top.free[1]']                  is model.free[1]
+  assert index['top.sum']                      is model.sum
+  assert index['top.queue.dpath.queue.regs']   is model.queue.dpath.queue.regs
+
+  model.enq.msg.value = 0xabcd
+  assert index['top.queue.dpath.queue.wr_data'] == 0xabcd
+
+#-----------------------------------------------------------------------
+# test_lean_twice
+#-----------------------------------------------------------------------
+def test_lean_twice():
+
+  model = QueueTop()
+  model.elaborate()
+  SimulationTool( model, lean=True )
+
+  with pytest.raises( Exception ):
+    SimulationTool( model )
+
+#-----------------------------------------------------------------------
+# test_lean_vcd
+#-----------------------------------------------------------------------
+def test_lean_vcd( tmpdir ):
+
+  model = QueueTop()
+  model.vcd_file = str( tmpdir.join( 'lean.vcd' ) )
+  model.elaborate()
+  sim = SimulationTool( model, lean=True )
+  run_queue( model, sim, 10 )
+  sim.vcd.flush()
+
+  lines = tmpdir.join( 'lean.vcd' ).read().splitlines()
+  assert '$var reg 8 {} hi $end'.format( model.hi._vcd_symbol ) in lines
+  assert len( [ x for x in lines if x.startswith( '#' ) ] ) > 20
@@ -0,0 +1,393 @@
+#=======================================================================
+# SimulationTool_mem_test.py
+#=======================================================================
+# MemoryArray tests for the SimulationTool class.
+
+import pytest
+
+from pymtl                   import *
+from pymtl.tools.translation import verilog
+from cStringIO               import StringIO
+
+#=======================================================================
+# Test Config
+#=======================================================================
+
+#-----------------------------------------------------------------------
+# test_fixture
+#-----------------------------------------------------------------------
+# ensures that tests get their setup function from the local module
+@pytest.fixture
+def setup_sim( request ):
+  return request.module.local_setup_sim
+
+#-----------------------------------------------------------------------
+# local_setup_sim
+#-----------------------------------------------------------------------
+# - elaborate the module
+# - create a simulator with the SimulationTool
+#
+def local_setup_sim( model ):
+  model.elaborate()
+  sim = SimulationTool( model )
+  return model, sim
+
+#=======================================================================
+# Tests
+#=======================================================================
+
+#-----------------------------------------------------------------------
+# MemoryArray elaboration
+#-----------------------------------------------------------------------
+def test_MemoryArrayElaborate():
+
+  class Mem( Model ):
+    def __init__( s ):
+      s.mem = MemoryArray( 8, 16 )
+
+  model = Mem()
+  model.elaborate()
+  assert model.get_memories() == [ model.mem ]
+  assert model.get_wires()    == []
+  assert model.mem.fullname   == 'top.mem'
+  assert len( model.mem )     == 16
+  assert model.mem[ 0 ].nbits == 8
+
+#-----------------------------------------------------------------------
+# MemoryArray read/write
+#-----------------------------------------------------------------------
+class MemRW( Model ):
+  def __init__( s, nentries, nbits ):
+    s.wen   = InPort ( 1 )
+    s.waddr = InPort ( clog2( nentries ) )
+    s.wdata = InPort ( nbits )
+    s.raddr = InPort ( clog2( nentries ) )
+    s.rdata = OutPort( nbits )
+
+    s.mem   = MemoryArray( nbits, nentries )
+
+    @s.posedge_clk
+    def seq_logic():
+      if s.wen:
+        s.mem[ s.waddr ].next = s.wdata
+
+    @s.combinational
+    def comb_logic():
+      s.rdata.value = s.mem[ s.raddr ]
+
+@pytest.mark.parametrize( 'nbits', [ 1, 8, 16, 32, 64, 128 ] )
+def test_MemoryArrayReadWrite( setup_sim, nbits ):
+  model, sim = setup_sim( MemRW( 8, nbits ) )
+  data = [ (2**nbits - 1 - i) % 2**nbits for i in range( 8 ) ]
+  sim.reset()
+
+  # Write every entry, writes are not visible until the next cycle
+  for i in range( 8 ):
+    model.wen.value   = 1
+    model.waddr.value = i
+    model.wdata.value = data[i]
+    model.raddr.value = i
+    sim.eval_combinational()
+    assert model.rdata == 0
+    sim.cycle()
+    assert model.rdata == data[i]
+
+  # Reading a new address wakes up the combinational block
+  model.wen.value = 0
+  for i in range( 8 ):
+    model.raddr.value = i
+    sim.eval_combinational()
+    assert model.rdata == data[i]
+
+#-----------------------------------------------------------------------
+# MemoryArray register queue
+#-----------------------------------------------------------------------
+def test_MemoryArrayRegisterQueue( setup_sim ):
+
+  class MemReset( Model ):
+    def __init__( s ):
+      s.out = OutPort( 8 )
+      s.mem = MemoryArray( 8, 1024 )
+
+      @s.posedge_clk
+      def seq_logic():
+        if s.reset:
+          for i in xrange( 1024 ):
+            s.mem[ i ].next = 0xab
+
+      @s.combinational
+      def comb_logic():
+        s.out.value = s.mem[ 1023 ]
+
+  model, sim = setup_sim( MemReset() )
+
+  # All entry writes in a cycle are flopped through a single queue entry
+  queued = []
+  notify = model.mem.notify_sim_seq_update
+  def counting_notify():
+    queued.append( model.mem )
+    notify()
+  model.mem.notify_sim_seq_update = counting_notify
+
+  sim.reset()
+  assert len( queued ) == 2
+  assert model.out == 0xab
+  assert model.mem.uint_list() == [ 0xab ] * 1024
+
+  # Entry copies are detached from the memory
+  entry = model.mem[3][:]
+  entry.value = 0
+  assert model.mem[3] == 0xab
+
+#-----------------------------------------------------------------------
+# MemoryArray fill
+#-----------------------------------------------------------------------
+class MemFill( Model ):
+  def __init__( s, nentries, nbits ):
+    s.fill  = InPort ( 1 )
+    s.wen   = InPort ( 1 )
+    s.waddr = InPort ( clog2( nentries ) )
+    s.wdata = InPort ( nbits )
+    s.raddr = InPort ( clog2( nentries ) )
+    s.rdata = OutPort( nbits )
+
+    s.mem   = MemoryArray( nbits, nentries )
+
+    @s.posedge_clk
+    def seq_logic():
+      if s.reset:
+        s.mem.next = 0xab
+      if s.fill:
+        s.mem.next = 0x12
+      if s.wen:
+        s.mem[ s.waddr ].next = s.wdata
+
+    @s.combinational
+    def comb_logic():
+      s.rdata.value = s.mem[ s.raddr ]
+
+def test_MemoryArrayFill( setup_sim ):
+
+  model, sim = setup_sim( MemFill( 1024, 8 ) )
+
+  # A fill is flopped through a single queue entry
+  queued = []
+  notify = model.mem.notify_sim_seq_update
+  def counting_notify():
+    queued.append( model.mem )
+    notify()
+  model.mem.notify_sim_seq_update = counting_notify
+
+  sim.reset()
+  assert len( queued ) == 2
+  assert model.mem.uint_list() == [ 0xab ] * 1024
+
+  # Entry writes in the same cycle apply on top of the fill
+  model.fill.value  = 1
+  model.wen.value   = 1
+  model.waddr.value = 7
+  model.wdata.value = 0x34
+  model.raddr.value = 7
+  sim.cycle()
+  assert model.rdata == 0x34
+  assert model.mem.uint_list() == [ 0x12 ] * 7 + [ 0x34 ] + [ 0x12 ] * 1016
+
+  # Filling with the current value does not wake up readers
+  model.fill.value = 0
+  model.wen.value  = 0
+  sim.cycle()
+  model.mem.fill_next( 0x12 )
+  model.mem.write_next( 7, 0x34 )
+  evals = []
+  model.mem.notify_sim_comb_update = lambda: evals.append( 1 )
+  model.mem.flop()
+  assert evals == []
+
+  with pytest.raises( ValueError ):
+    model.mem.next = 0x100
+
+def test_MemoryArrayFillVCD( tmpdir ):
+
+  model = MemFill( 4, 8 )
+  model.vcd_file = str( tmpdir.join( 'fill.vcd' ) )
+  model, sim = local_setup_sim( model )
+  sim.reset()
+  model.fill.value = 1
+  sim.cycle()
+  sim.vcd.flush()
+
+  lines = tmpdir.join( 'fill.vcd' ).read().splitlines()
+  defs  = [ x.split() for x in lines if x.startswith( '$var' ) ]
+  syms  = dict( ( x[4], x[3] ) for x in defs if x[4].startswith( 'mem(' ) )
+  for i in range( 4 ):
+    assert 'b10101011 {}'.format( syms['mem({})'.format( i )] ) in lines
+    assert 'b00010010 {}'.format( syms['mem({})'.format( i )] ) in lines
+
+#-----------------------------------------------------------------------
+# MemoryArray slice writes
+#-----------------------------------------------------------------------
+def test_MemoryArraySliceWrite( setup_sim ):
+
+  class MemBytes( Model ):
+    def __init__( s ):
+      s.wben  = InPort ( 4 )
+      s.addr  = InPort ( 2 )
+      s.wdata = InPort ( 32 )
+      s.rdata = OutPort( 32 )
+      s.mem   = MemoryArray( 32, 4 )
+
+      @s.posedge_clk
+      def seq_logic():
+        for i in range( 4 ):
+          if s.wben[i]:
+            s.mem[s.addr][i*8:i*8+8].next = s.wdata[i*8:i*8+8]
+
+      @s.combinational
+      def comb_logic():
+        s.rdata.value = s.mem[ s.addr ]
+
+  model, sim = setup_sim( MemBytes() )
+  sim.reset()
+
+  model.addr.value  = 1
+  model.wdata.value = 0xdeadbeef
+  model.wben.value  = 0b0101
+  sim.cycle()
+  assert model.rdata == 0x00ad00ef
+
+  model.wdata.value = 0x12345678
+  model.wben.value  = 0b1010
+  sim.cycle()
+  assert model.rdata == 0x12ad56ef
+
+#-----------------------------------------------------------------------
+# MemoryArray combinational writes
+#-----------------------------------------------------------------------
+def test_MemoryArrayCombWrite( setup_sim ):
+
+  class MemComb( Model ):
+    def __init__( s ):
+      s.in_ = InPort ( 8 )
+      s.out = OutPort( 8 )
+      s.mem = MemoryArray( 8, 2 )
+
+      @s.combinational
+      def write_logic():
+        s.mem[0].value = s.in_ + 1
+
+      @s.combinational
+      def read_logic():
+        s.out.value = s.mem[0]
+
+  model, sim = setup_sim( MemComb() )
+  for i in range( 10 ):
+    model.in_.value = i
+    sim.eval_combinational()
+    assert model.out == i + 1
+
+#-----------------------------------------------------------------------
+# MemoryArray of BitStructs
+#-----------------------------------------------------------------------
+class MemPair( BitStructDefinition ):
+  def __init__( s, nbits ):
+    s.a = BitField( nbits )
+    s.b = BitField( nbits )
+
+def test_MemoryArrayBitStruct( setup_sim ):
+
+  class MemStruct( Model ):
+    def __init__( s ):
+      s.wen   = InPort ( 1 )
+      s.addr  = InPort ( 2 )
+      s.wdata = InPort ( 8 )
+      s.out_a = OutPort( 8 )
+      s.out_b = OutPort( 8 )
+      s.mem   = MemoryArray( MemPair( 8 ), 4 )
+
+      @s.posedge_clk
+      def seq_logic():
+        if s.wen:
+          s.mem[ s.addr ].b.next = s.wdata
+          s.mem[ s.addr ].a.next = s.mem[ s.addr ].b
+
+      @s.combinational
+      def comb_logic():
+        s.out_a.value = s.mem[ s.addr ].a
+        s.out_b.value = s.mem[ s.addr ].b
+
+  model, sim = setup_sim( MemStruct() )
+  sim.reset()
+
+  model.wen.value   = 1
+  model.addr.value  = 3
+  model.wdata.value = 0x12
+  sim.cycle()
+  assert model.out_a == 0x00
+  assert model.out_b == 0x12
+
+  model.wdata.value = 0x34
+  sim.cycle()
+  assert model.out_a == 0x12
+  assert model.out_b == 0x34
+
+  # Entries and their copies have the type of the memory dtype
+  entry = model.mem[ 3 ]
+  assert isinstance( entry, BitStruct )
+  assert entry.a == 0x12 and entry.b == 0x34
+  value = entry.copy()
+  assert isinstance( value, BitStruct )
+  assert value.a == 0x12 and value.b == 0x34
+  assert model.mem[ 2 ].a == 0
+
+#-----------------------------------------------------------------------
+# MemoryArray VCD
+#-----------------------------------------------------------------------
+def test_MemoryArrayVCD( tmpdir ):
+
+  model = MemRW( 4, 8 )
+  model.vcd_file = str( tmpdir.join( 'mem.vcd' ) )
+  model, sim = local_setup_sim( model )
+  sim.reset()
+  model.wen.value   = 1
+  model.waddr.value = 2
+  model.wdata.value = 0x5a
+  sim.cycle()
+  sim.cycle()
+  sim.vcd.flush()
+
+  lines = tmpdir.join( 'mem.vcd' ).read().splitlines()
+  defs  = [ x.split() for x in lines if x.startswith( '$var' ) ]
+  syms  = dict( ( x[4], x[3] ) for x in defs if x[4].startswith( 'mem(' ) )
+  assert sorted( syms ) == [ 'mem(0)', 'mem(1)', 'mem(2)', 'mem(3)' ]
+  assert 'b01011010 {}'.format( syms['mem(2)'] ) in lines
+  assert 'b00000000 {}'.format( syms['mem(2)'] ) in lines
+
+#-----------------------------------------------------------------------
+# MemoryArray translation
+#-----------------------------------------------------------------------
+def test_MemoryArrayTranslate():
+
+  model = MemRW( 64, 8 )
+  model.elaborate()
+  out = StringIO()
+  verilog.translate( model, out )
+  code = out.getvalue()
+
+  # A single reg array, no per-entry wires or assigns
+  assert '  reg    [   7:0] mem[0:63];\n' in code
+  assert 'assign' not in code
+  assert 'mem[waddr] <= wdata;' in code
+  assert 'rdata = mem[raddr];' in code
+
+def test_MemoryArrayFillTranslate():
+
+  model = MemFill( 16, 8 )
+  model.elaborate()
+  out = StringIO()
+  verilog.translate( model, out )
+  code = out.getvalue()
+
+  assert 'integer mem_i;' in code
+  assert 'for (mem_i=0; mem_i < 16; mem_i=mem_i+1)' in code
+  assert 'mem[mem_i] <= 171;' in code
+  assert 'mem[waddr] <= wdata;' in code
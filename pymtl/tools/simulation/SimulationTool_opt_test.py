@@ -0,0 +1,174 @@
+#=======================================================================
+# SimulationTool_opt_test.py
+#=======================================================================
+# Tests for constant folding and pruning of unobserved logic done by
+# SimulationTool at construction.
+
+import pytest
+
+from pymtl      import *
+from pclib.test import run_test_vector_sim
+
+#-----------------------------------------------------------------------
+# ConstChain
+#-----------------------------------------------------------------------
+# Combinational blocks and slices downstream of constants.
+
+class ConstChain( Model ):
+
+  def __init__( s ):
+
+    s.in_  = InPort ( 8 )
+    s.out  = OutPort( 8 )
+    s.hi   = OutPort( 4 )
+
+    s.a    = Wire( 8 )
+    s.b    = Wire( 8 )
+    s.c    = Wire( 8 )
+    s.d    = Wire( 4 )
+
+    s.connect( s.a,       5 )
+    s.connect( s.c[4:8],  s.d      )
+    s.connect( s.hi,      s.d )
+
+    @s.combinational
+    def comb_b():
+      s.b.value = s.a + 1
+
+    @s.combinational
+    def comb_c():
+      s.c.value = s.b * 16
+
+    @s.combinational
+    def comb_out():
+      s.out.value = s.in_ + s.c
+
+#-----------------------------------------------------------------------
+# test_fold_constants
+#-----------------------------------------------------------------------
+def test_fold_constants():
+
+  model = ConstChain()
+  model.elaborate()
+  sim   = SimulationTool( model )
+
+  report = sim.optimization_report
+  assert report['folded_blocks'] == 2
+  assert report['folded_slices'] == 1
+  assert report['pruned_blocks'] == 0
+  assert report['pruned_slices'] == 0
+
+  sim.reset()
+  for i in range( 4 ):
+    model.in_.value = i
+    sim.eval_combinational()
+    assert model.b   == 6
+    assert model.out == i + 0x60
+    assert model.hi  == 6
+
+#-----------------------------------------------------------------------
+# test_fold_test_vectors
+#-----------------------------------------------------------------------
+# Blocks reading the inputs of the top-level model are not folded.
+def test_fold_test_vectors():
+
+  run_test_vector_sim( ConstChain(), [
+    ('in_ out* hi*'),
+    [ 0,  0x60, 6 ],
+    [ 3,  0x63, 6 ],
+  ])
+
+#-----------------------------------------------------------------------
+# Pruned
+#-----------------------------------------------------------------------
+# Only out, the line trace and the impure block are observable.
+
+class Pruned( Model ):
+
+  def __init__( s ):
+
+    s.in_    = InPort ( 8 )
+    s.out    = OutPort( 8 )
+
+    s.traced = Wire( 8 )
+    s.unused = Wire( 8 )
+    s.slice  = Wire( 4 )
+    s.count  = Wire( 8 )
+    s.log    = []
+
+    s.connect( s.unused[0:4], s.slice )
+
+    @s.combinational
+    def comb_out():
+      s.out.value = s.in_ + 1
+
+    @s.combinational
+    def comb_traced():
+      s.traced.value = s.in_ + 2
+
+    @s.combinational
+    def comb_unused():
+      s.unused.value = s.in_ + 3
+
+    @s.tick
+    def seq_count():
+      s.count.next = s.count + 1
+
+  def line_trace( s ):
+    return "{}".format( s.traced )
+
+class PrunedImpure( Pruned ):
+
+  def __init__( s ):
+
+    super( PrunedImpure, s ).__init__()
+
+    @s.combinational
+    def comb_log():
+      s.log.append( s.in_.uint() )
+
+#-----------------------------------------------------------------------
+# test_prune
+#-----------------------------------------------------------------------
+def test_prune():
+
+  model = Pruned()
+  model.elaborate()
+  sim   = SimulationTool( model, prune_unobserved=True )
+
+  report = sim.optimization_report
+  assert report['pruned_blocks'] == 2
+  assert report['pruned_slices'] == 1
+
+  sim.reset()
+  model.in_.value = 4
+  sim.cycle()
+  assert model.out    == 5
+  assert model.traced == 6
+  assert model.unused == 0
+  assert model.count  == 0
+  assert model.line_trace() == '06'
+
+#-----------------------------------------------------------------------
+# test_prune_off
+#-----------------------------------------------------------------------
+@pytest.mark.parametrize( 'cls,kwargs', [
+  ( Pruned,       {} ),
+  ( PrunedImpure, { 'prune_unobserved' : True } ),
+])
+def test_prune_off( cls, kwargs ):
+
+  model = cls()
+  model.elaborate()
+  sim   = SimulationTool( model, **kwargs )
+
+  report = sim.optimization_report
+  assert report['pruned_blocks'] == 0
+  assert report['pruned_slices'] == 0
+
+  sim.reset()
+  model.in_.value = 4
+  sim.cycle()
+  assert model.unused == 7
+  assert model.slice  == 7
+  assert model.count  == 3
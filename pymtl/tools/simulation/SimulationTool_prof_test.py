@@ -0,0 +1,135 @@
+#=======================================================================
+# SimulationTool_prof_test.py
+#=======================================================================
+# Tests for the per-block profile collected by SimulationTool.
+
+import itertools
+
+from pymtl import *
+
+from SimulationProfile import SimulationProfile
+
+#-----------------------------------------------------------------------
+# Inner
+#-----------------------------------------------------------------------
+# A register, a combinational block and a slice connection.
+
+class Inner( Model ):
+
+  def __init__( s ):
+
+    s.in_ = InPort ( 8 )
+    s.out = OutPort( 8 )
+    s.hi  = OutPort( 4 )
+    s.reg = Wire   ( 8 )
+
+    s.connect( s.hi, s.reg[4:8] )
+
+    @s.tick
+    def seq():
+      s.reg.next = s.in_
+
+    @s.combinational
+    def comb():
+      s.out.value = s.reg + 1
+
+#-----------------------------------------------------------------------
+# Outer
+#-----------------------------------------------------------------------
+
+class Outer( Model ):
+
+  def __init__( s ):
+
+    s.in_   = InPort ( 8 )
+    s.out   = [ OutPort( 8 ) for _ in range( 2 ) ]
+    s.hi    = [ OutPort( 4 ) for _ in range( 2 ) ]
+    s.count = OutPort( 8 )
+
+    s.inner = [ Inner() for _ in range( 2 ) ]
+
+    for i in range( 2 ):
+      s.connect( s.in_,    s.inner[i].in_ )
+      s.connect( s.out[i], s.inner[i].out )
+      s.connect( s.hi[i],  s.inner[i].hi  )
+
+    @s.tick_fl
+    def counter():
+      yield
+      s.count.next = s.count + 1
+
+#-----------------------------------------------------------------------
+# test_profile
+#-----------------------------------------------------------------------
+# Blocks are accounted for per model instance.
+def test_profile( tmpdir ):
+
+  model = Outer()
+  model.elaborate()
+  sim = SimulationTool( model, profile=True )
+  assert isinstance( sim.profile, SimulationProfile )
+
+  for i in range( 4 ):
+    model.in_.value = 0x10 * ( i + 1 )
+    sim.cycle()
+
+  assert model.out[1] == 0x41
+  assert model.hi [0] == 0x4
+  assert model.count  == 2
+
+  stats = { x[:3]: x[3:] for x in sim.profile.stats() }
+
+  for i in range( 2 ):
+    path = 'top.inner[{}]'.format( i )
+    assert stats[ ( path, 'seq',  'tick'  ) ][0] == 4
+    assert stats[ ( path, 'comb', 'comb'  ) ][0] >= 4
+    assert stats[ ( path, 'reg',  'slice' ) ][0] >= 4
+
+  assert stats[ ( 'top', 'counter', 'tick' ) ][0] == 4
+
+  for calls, total, self_ in stats.values():
+    assert 0 <= self_ <= total
+
+  # Collapsed stacks, one line per block
+
+  filename = str( tmpdir.join( 'profile.txt' ) )
+  sim.profile.write_collapsed( filename )
+  for line in open( filename ):
+    stack, usecs = line.split()
+    assert stack.startswith( 'top;' )
+    assert int( usecs ) > 0
+
+  sim.profile.clear()
+  assert sim.profile.stats() == []
+
+#-----------------------------------------------------------------------
+# test_self_time
+#-----------------------------------------------------------------------
+# With a timer advancing by one at every call, a block calling no other
+# profiled block takes one unit of time per call.
+def test_self_time():
+
+  profile = SimulationProfile( timer=itertools.count().next )
+
+  model = Outer()
+  model.elaborate()
+
+  def leaf():
+    pass
+
+  leaf = profile.wrap( leaf, 'slice', model, 'leaf' )
+
+  def block():
+    leaf()
+    leaf()
+
+  block = profile.wrap( block, 'comb', model, 'block' )
+  block()
+
+  stats = { x[:3]: x[3:] for x in profile.stats() }
+
+  # block reads the timer at t=0 and t=5, the leaves at t=1,2 and t=3,4
+
+  assert stats[ ( 'top', 'leaf',  'slice' ) ] == ( 2, 2.0, 2.0 )
+  assert stats[ ( 'top', 'block', 'comb'  ) ] == ( 1, 5.0, 3.0 )
+  assert profile.total_time == 5.0
@@ -475,3 +475,42 @@ def test_GetMSB( setup_sim ):
   model.in_.value = 0b10000; sim.cycle(); assert model.out == 1
   model.in_.value = 0b00001; sim.cycle(); assert model.out == 0
 
+
+#-----------------------------------------------------------------------
+# ShadowState
+#-----------------------------------------------------------------------
+# Shadow state is only allocated for nets written with .next, writes
+# made outside of sequential blocks allocate it on demand.
+class ShadowState( Model ):
+  def __init__( s ):
+    s.in_  = InPort ( 8 )
+    s.out  = OutPort( 8 )
+    s.comb = OutPort( 8 )
+    s.misc = Wire   ( 8 )
+
+    @s.posedge_clk
+    def seq_logic():
+      s.out.next = s.in_
+      s.helper()
+
+    @s.combinational
+    def comb_logic():
+      s.comb.value = s.in_ + s.misc
+
+  def helper( s ):
+    s.misc[0:4].next = s.in_[0:4]
+
+def test_ShadowState():
+  model, sim = local_setup_sim( ShadowState() )
+  assert     '_next' in model.out .__dict__
+  assert not '_next' in model.comb.__dict__
+  assert not '_next' in model.misc.__dict__
+
+  model.in_.value = 0x35
+  sim.cycle()
+  assert model.out  == 0x35
+  assert model.misc == 0x05
+  assert model.comb == 0x3a
+  assert '_next' in model.misc.__dict__
+  sim.cycle()
+  assert model.comb == 0x3a
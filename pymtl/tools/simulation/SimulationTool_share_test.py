@@ -0,0 +1,121 @@
+#=======================================================================
+# SimulationTool_share_test.py
+#=======================================================================
+# Tests for sharing the analysis of blocks across instances of the same
+# model class.
+
+import pytest
+
+from pymtl      import *
+from pymtl      import PyMTLError
+from pclib.rtl  import NormalQueue
+from sim_utils  import _block_infos, get_block_info
+
+#-----------------------------------------------------------------------
+# Incr
+#-----------------------------------------------------------------------
+
+class Incr( Model ):
+
+  def __init__( s, nbits ):
+
+    s.in_ = InPort ( nbits )
+    s.out = OutPort( nbits )
+    s.reg = Wire   ( nbits )
+
+    @s.tick
+    def seq():
+      s.reg.next = s.in_
+
+    @s.combinational
+    def comb():
+      s.out.value = s.reg + 1
+
+#-----------------------------------------------------------------------
+# IncrChain
+#-----------------------------------------------------------------------
+
+class IncrChain( Model ):
+
+  def __init__( s, ninsts, nbits ):
+
+    s.in_   = InPort ( nbits )
+    s.out   = OutPort( nbits )
+    s.incrs = [ Incr( nbits ) for x in range( ninsts ) ]
+
+    s.connect( s.in_, s.incrs[0].in_ )
+    for i in range( 1, ninsts ):
+      s.connect( s.incrs[i].in_, s.incrs[i-1].out )
+    s.connect( s.out, s.incrs[-1].out )
+
+#-----------------------------------------------------------------------
+# test_shared_block_info
+#-----------------------------------------------------------------------
+def test_shared_block_info():
+
+  model = IncrChain( 4, 8 )
+  model.elaborate()
+  sim = SimulationTool( model )
+
+  # Every instance has its own functions but they share their code and
+  # thus their analysis
+  funcs = [ x.get_combinational_blocks()[0] for x in model.incrs ]
+  assert len( set( funcs ) ) == 4
+  assert len( set( f.func_code for f in funcs ) ) == 1
+  assert funcs[0].func_code in _block_infos
+  assert len( set( id( get_block_info( f ) ) for f in funcs ) ) == 1
+
+  # Sensitivity is still per instance
+  sim.reset()
+  model.in_.value = 3
+  for i in range( 4 ):
+    sim.cycle()
+    assert model.incrs[i].out == 3 + 1 + i
+  assert model.out == 7
+
+#-----------------------------------------------------------------------
+# test_shared_queues
+#-----------------------------------------------------------------------
+# Instances with different constructor arguments share analysis too.
+def test_shared_queues():
+
+  class Queues( Model ):
+    def __init__( s ):
+      s.a = NormalQueue( 2, 8  )
+      s.b = NormalQueue( 4, 16 )
+      s.connect( s.a.deq.rdy, 1 )
+      s.connect( s.b.deq.rdy, 1 )
+
+  model = Queues()
+  model.elaborate()
+  sim = SimulationTool( model )
+  sim.reset()
+
+  for q, msg in [ ( model.a, 0xab ), ( model.b, 0xabcd ) ]:
+    q.enq.val.value = 1
+    q.enq.msg.value = msg
+  sim.cycle()
+  sim.eval_combinational()
+  assert model.a.deq.val and model.a.deq.msg == 0xab
+  assert model.b.deq.val and model.b.deq.msg == 0xabcd
+
+#-----------------------------------------------------------------------
+# test_checks_not_cached
+#-----------------------------------------------------------------------
+# Mistakes in use of .value/.next are reported for every instance, only
+# blocks which passed the checks are skipped afterwards.
+def test_checks_not_cached():
+
+  class BadNext( Model ):
+    def __init__( s ):
+      s.in_ = InPort ( 8 )
+      s.out = OutPort( 8 )
+      @s.combinational
+      def comb():
+        s.out.next = s.in_
+
+  for i in range( 2 ):
+    model = BadNext()
+    model.elaborate()
+    with pytest.raises( PyMTLError ):
+      SimulationTool( model )
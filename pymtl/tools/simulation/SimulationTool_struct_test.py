@@ -749,6 +749,34 @@ def test_ConnectPairs( setup_sim ):
     sim.cycle()
     for j in range( 4 ):  model.b[j]      == i+j
 
+#-----------------------------------------------------------------------
+# SliceFanout
+#-----------------------------------------------------------------------
+# Slice connections from the same source net share one callback.
+
+class SliceFanout( Model ):
+  def __init__( s ):
+    s.in_ = InPort ( 16 )
+    s.out = OutPort( 16 )
+    s.hi  = OutPort(  4 )
+    s.bit = OutPort(  1 )
+    s.connect( s.out[0:8],  s.in_[8:16]  )
+    s.connect( s.out[8:16], s.in_[0:8]   )
+    s.connect( s.hi,        s.in_[12:16] )
+    s.connect( s.bit,       s.in_[3]     )
+
+def test_SliceFanout( setup_sim ):
+  model, sim = setup_sim( SliceFanout() )
+  if not is_translated( model ):
+    callbacks = [ x for x in model.in_._slices if x.__name__ == 'slice_cb' ]
+    assert len( callbacks ) == 1
+  for value in [ 0x1234, 0xff08, 0x00f0, 0x0000 ]:
+    model.in_.value = value
+    sim.eval_combinational()
+    assert model.out == ( value >> 8 ) | ( value & 0xff ) << 8
+    assert model.hi  == value >> 12
+    assert model.bit == ( value >> 3 ) & 1
+
 #=======================================================================
 # BitStructs
 #=======================================================================
@@ -248,6 +248,119 @@ class DetectLoadsAndStores( ast.NodeVisitor ):
   #    raise Exception( "Unsupported concurrent block code!" )
 
 
+#------------------------------------------------------------------------
+# DetectReads
+#------------------------------------------------------------------------
+# AST traversal class which detects all the variables read anywhere in a
+# block or method, not only in assignments and if statements. Names are
+# built like GetVariableName does, but expressions it cannot name (e.g.,
+# "{}".format) are skipped instead of raising an error. Used by the
+# simulator to find what line traces and blocks observe.
+class DetectReads( ast.NodeVisitor ):
+
+  def __init__( self ):
+    self.reads = []
+
+  def enter( self, node ):
+    self.visit( node )
+    return self.reads
+
+  def visit_FunctionDef( self, node ):
+    for x in node.body:
+      self.visit( x )
+
+  def visit_Name( self, node ):
+    if isinstance( node.ctx, _ast.Load ):
+      self.reads.append( node.id )
+
+  def visit_Attribute( self, node ):
+    name = get_variable_name( node )
+    if name is None:
+      self.generic_visit( node )
+      return
+    if isinstance( node.ctx, _ast.Load ):
+      self.reads.append( name )
+    # Indexes can read other variables
+    while isinstance( node, (ast.Attribute, ast.Subscript) ):
+      if isinstance( node, ast.Subscript ):
+        self.visit( node.slice )
+      node = node.value
+
+  visit_Subscript = visit_Attribute
+
+#------------------------------------------------------------------------
+# get_variable_name
+#------------------------------------------------------------------------
+# Return the name of a Name/Attribute/Subscript chain like
+# GetVariableName, or None if the chain starts with anything else.
+def get_variable_name( node ):
+  if   isinstance( node, ast.Name ):
+    return node.id
+  elif isinstance( node, ast.Attribute ):
+    base = get_variable_name( node.value )
+    return base and base + '.' + node.attr
+  elif isinstance( node, ast.Subscript ):
+    base = get_variable_name( node.value )
+    return base and base + '[?]'
+  return None
+
+#------------------------------------------------------------------------
+# DetectSideEffects
+#------------------------------------------------------------------------
+# AST traversal class which detects if a block may do anything else than
+# writing signals: method calls (other than on values), expression
+# statements, augmented assignments to anything but local variables,
+# prints, asserts, raises, etc. Blocks without side effects only affect
+# the rest of the design through the signals they write.
+class DetectSideEffects( ast.NodeVisitor ):
+
+  pure_methods = ( 'uint', 'int' )
+
+  def __init__( self ):
+    self.found  = False
+    self.nested = False
+
+  def enter( self, node ):
+    self.visit( node )
+    return self.found
+
+  # Only the outermost function is the block itself
+  def visit_FunctionDef( self, node ):
+    if self.nested:
+      self.found = True
+    self.nested = True
+    for x in node.body:
+      self.visit( x )
+
+  def visit_Call( self, node ):
+    if isinstance( node.func, ast.Attribute ) and \
+       node.func.attr not in self.pure_methods:
+      self.found = True
+    self.generic_visit( node )
+
+  def visit_Expr( self, node ):
+    if not isinstance( node.value, ast.Str ):
+      self.found = True
+    self.generic_visit( node )
+
+  def visit_AugAssign( self, node ):
+    if not isinstance( node.target, ast.Name ):
+      self.found = True
+    self.generic_visit( node )
+
+  def visit_side_effect( self, node ):
+    self.found = True
+
+  visit_Global   = visit_side_effect
+  visit_Exec     = visit_side_effect
+  visit_Delete   = visit_side_effect
+  visit_Print    = visit_side_effect
+  visit_Raise    = visit_side_effect
+  visit_Assert   = visit_side_effect
+  visit_ClassDef = visit_side_effect
+  visit_Lambda   = visit_side_effect
+  visit_Yield    = visit_side_effect
+
 #------------------------------------------------------------------------
 # GetVariableName
 #------------------------------------------------------------------------
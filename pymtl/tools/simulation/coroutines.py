@@ -0,0 +1,96 @@
+#=======================================================================
+# coroutines.py
+#=======================================================================
+# Generator-based alternative to greenlets for pausable functional-level
+# (FL) code. A @tick_fl block written as a generator pauses until the
+# next cycle at every bare yield:
+#
+#   @s.tick_fl
+#   def logic():
+#     data = yield s.mem.read( addr, 4 )
+#     yield s.mem.write( addr + 4, data, 4 )
+#
+# Yielding another generator calls it, the caller resumes once it is
+# done. Python 2 generators cannot return values, so a generator
+# returns a value to its caller by raising Return( value ).
+
+import types
+
+#-----------------------------------------------------------------------
+# Return
+#-----------------------------------------------------------------------
+class Return( Exception ):
+
+  def __init__( self, value=None ):
+    super( Return, self ).__init__( value )
+    self.value = value
+
+#-----------------------------------------------------------------------
+# Coroutine
+#-----------------------------------------------------------------------
+# Runs a generator and all the generators it calls, keeping them on an
+# explicit stack.
+class Coroutine( object ):
+
+  def __init__( self, gen ):
+    self.stack = [ gen ]
+    self.value = None
+
+  #---------------------------------------------------------------------
+  # step
+  #---------------------------------------------------------------------
+  # Resume the coroutine until it pauses or is done. Returns True once
+  # it is done, its return value is then available in .value.
+  def step( self ):
+
+    stack = self.stack
+    value = self.value
+
+    while stack:
+      try:
+        x = stack[-1].send( value )
+      except StopIteration:
+        stack.pop()
+        value = None
+        continue
+      except Return as e:
+        stack.pop()
+        value = e.value
+        continue
+
+      if isinstance( x, types.GeneratorType ):
+        stack.append( x )
+        value = None
+        continue
+
+      self.value = None
+      return False
+
+    self.value = value
+    return True
+
+  #---------------------------------------------------------------------
+  # done
+  #---------------------------------------------------------------------
+  def done( self ):
+    return not self.stack
+
+#-----------------------------------------------------------------------
+# wait
+#-----------------------------------------------------------------------
+# Run a generator from code executing inside a greenlet, switching back
+# to the parent greenlet every time the generator pauses. Returns the
+# value returned by the generator. This is how greenlet-based FL code
+# uses the same adapters as generator-based FL code.
+def wait( gen ):
+
+  # Only needed by greenlet-based FL code, imported here to keep
+  # importing pymtl light.
+
+  import greenlet
+
+  coroutine = Coroutine( gen )
+  while not coroutine.step():
+    greenlet.greenlet.getcurrent().parent.switch(0)
+
+  return coroutine.value
@@ -0,0 +1,68 @@
+#=======================================================================
+# coroutines_test.py
+#=======================================================================
+
+from pymtl import *
+
+from coroutines import Coroutine, Return
+
+#-----------------------------------------------------------------------
+# test_Coroutine
+#-----------------------------------------------------------------------
+def test_Coroutine():
+
+  trace = []
+
+  def add( a, b ):
+    trace.append( 'add' )
+    yield
+    raise Return( a + b )
+
+  def nop():
+    if False: yield
+
+  def top():
+    x = yield add( 1, 2 )
+    yield nop()
+    y = yield add( x, 3 )
+    trace.append( y )
+
+  coroutine = Coroutine( top() )
+
+  assert not coroutine.step()
+  assert trace == [ 'add' ]
+  assert not coroutine.step()
+  assert trace == [ 'add', 'add' ]
+  assert coroutine.step()
+  assert trace == [ 'add', 'add', 6 ]
+  assert coroutine.done()
+
+#-----------------------------------------------------------------------
+# test_GeneratorTick
+#-----------------------------------------------------------------------
+# A tick_fl generator pauses until the next cycle at every yield, and is
+# restarted in the cycle after it is done.
+def test_GeneratorTick():
+
+  class Counter( Model ):
+    def __init__( s ):
+      s.out   = OutPort( 8 )
+      s.trace = []
+
+      @s.tick_fl
+      def logic():
+        s.trace.append( 'start' )
+        for i in range( 2 ):
+          yield
+          s.trace.append( i )
+        s.out.next = s.out + 1
+
+  model = Counter()
+  model.elaborate()
+  sim = SimulationTool( model )
+
+  for i in range( 6 ):
+    sim.cycle()
+
+  assert model.trace == [ 'start', 0, 1 ] * 2
+  assert model.out   == 2
@@ -2,19 +2,95 @@
 # sim_utils.py
 #=======================================================================
 
+import re
+import inspect
 import warnings
-import greenlet
+import collections
 
 from ..ast_helpers            import get_method_ast
+from ...model.Model           import Model
+from ...model.PortBundle      import PortBundle
 from ...datatypes.SignalValue import SignalValue
+from ...datatypes.Bits        import Bits
+from ...datatypes.MemoryValue import MemoryValue
+
+from coroutines  import Coroutine
 
 from ast_visitor import (
   DetectLoadsAndStores,
   DetectDecorators,
+  DetectReads,
+  DetectSideEffects,
   DetectIncorrectValueNext,
   DetectMissingValueNext
 )
 
+#-----------------------------------------------------------------------
+# Block analysis cache
+#-----------------------------------------------------------------------
+# All instances of a model class share the code of their blocks, so the
+# results of analysing a block's AST are computed once per code object
+# and reused by every instance (and every simulator). Checks which also
+# evaluate the block's closure are done once per code object and model
+# class_name, which identifies the class and its constructor arguments.
+# Construction time of tiled designs thus depends on the number of
+# unique classes instead of the number of instances.
+
+_BlockInfo = collections.namedtuple( '_BlockInfo',
+                                     'loads stores decorators reads side_effects' )
+
+_block_infos    = {}
+_checked_blocks = set()
+
+#-----------------------------------------------------------------------
+# get_block_info
+#-----------------------------------------------------------------------
+# Return the names loaded and stored by a block, its decorators, all
+# the names it reads anywhere and whether it has side effects other than
+# writing signals.
+def get_block_info( func ):
+  code = func.func_code
+  try:
+    return _block_infos[ code ]
+  except KeyError:
+    tree, _       = get_method_ast( func )
+    loads, stores = DetectLoadsAndStores().enter( tree )
+    decorators    = DetectDecorators().enter( tree )
+    reads         = DetectReads().enter( tree )
+    side_effects  = DetectSideEffects().enter( tree )
+    info = _BlockInfo( tuple( loads ), tuple( stores ), tuple( decorators ),
+                       tuple( reads ), side_effects )
+    return _block_infos.setdefault( code, info )
+
+#-----------------------------------------------------------------------
+# check_block
+#-----------------------------------------------------------------------
+# Check there were no mistakes in use of .value/.next in a sequential
+# (attr='next') or combinational (attr='value') block of model.
+def check_block( func, model, attr ):
+  key = ( func.func_code, model.class_name )
+  if key in _checked_blocks:
+    return
+  other = { 'next' : 'value', 'value' : 'next' }[ attr ]
+  tree, _ = get_method_ast( func )
+  DetectIncorrectValueNext( func, other ).visit( tree )
+  DetectMissingValueNext  ( func, attr  ).visit( tree )
+  _checked_blocks.add( key )
+
+#-----------------------------------------------------------------------
+# _compile_cached
+#-----------------------------------------------------------------------
+# Attribute names repeat across instances of the same class, compile the
+# statements and expressions built from them only once.
+_compiled = {}
+
+def _compile_cached( src, mode ):
+  try:
+    return _compiled[ src, mode ]
+  except KeyError:
+    return _compiled.setdefault( ( src, mode ),
+                                 compile( src, '<string>', mode ) )
+
 #-----------------------------------------------------------------------
 # collect_signals
 #-----------------------------------------------------------------------
@@ -97,20 +173,11 @@ def insert_signal_values( sim, nets ):
   # Utility functions which create SignalValue callbacks.
 
   #-------------------------------------------------------------------
-  # create_comb_update_cb
-  #-------------------------------------------------------------------
-  def create_comb_update_cb( sim, svalue ):
-    def notify_sim_comb_update():
-      sim.add_event( svalue )
-    return notify_sim_comb_update
-
+  # alloc_next
   #-------------------------------------------------------------------
-  # create_seq_update_cb
-  #-------------------------------------------------------------------
-  def create_seq_update_cb( sim, svalue ):
-    def notify_sim_seq_update():
-      sim._register_queue.append( svalue )
-    return notify_sim_seq_update
+  # Shadow state allocator shared by all nets of this simulator.
+  def alloc_next( svalue ):
+    return _alloc_seq_state( sim, svalue )
 
   # Each grouping represents a single SignalValue object. Perform a swap
   # so that all attributes currently pointing to Signal objects in this
@@ -126,20 +193,26 @@ def insert_signal_values( sim, nets ):
 
     # TODO: should this be visible to sim?
     svalue       = temp.dtype()
-    svalue._next = temp.dtype()
 
     #svalue._DEBUG_signal_names = group
 
-    # Add a callback to the SignalValue to notify SimulationTool every
-    # time a sequential update occurs (.next is written).
-    # TODO: currently all signals get this, necessary?
-    svalue.notify_sim_seq_update = create_seq_update_cb ( sim, svalue )
+    # Shadow state (_next) and the callback notifying SimulationTool
+    # every time a sequential update occurs (.next is written) are only
+    # needed by registers. Bits nets get them from insert_seq_state if
+    # they are written in a sequential block, or on first access to
+    # _next otherwise (e.g., .next writes made by helper methods).
+    if isinstance( svalue, Bits ):
+      svalue._alloc_next = alloc_next
+    else:
+      _alloc_seq_state( sim, svalue, temp.dtype() )
 
-    # Create a callback for the SignalValue to notify SimulationTool
-    # every time a combinational update occurs (.value is written).
-    # We just store the callback for now, only add it later if we detect
-    # that a combinational block is sensitive to us.
-    svalue._ucb                   = create_comb_update_cb( sim, svalue )
+    # Give the SignalValue an integer id in the event queue, used to
+    # notify SimulationTool every time a combinational update occurs
+    # (.value is written). The notification is only added later if we
+    # detect that a combinational block is sensitive to us. Translation
+    # tools reuse this function without a simulator.
+    if sim is not None:
+      svalue._net_id              = sim._event_queue.get_net_id( svalue )
 
     # Modify model attributes currently referencing Signal objects to
     # reference SignalValue objects instead.
@@ -153,12 +226,92 @@ def insert_signal_values( sim, nets ):
       else:
         # We need 'in locals()' because of the nested function above,
         # see: http://stackoverflow.com/a/4484946
-        exec( "x.parent.{} = svalue".format( x.name ) ) in locals()
+        exec _compile_cached( "x.parent.{} = svalue".format( x.name ),
+                              'exec' ) in locals()
 
       # Also give signals a pointer to the SignalValue object.
       # (Needed for VCD tracing and slice logic generator).
       x._signalvalue = svalue
 
+#---------------------------------------------------------------------
+# _alloc_seq_state
+#---------------------------------------------------------------------
+# Allocate the shadow state of a net and add a callback to notify
+# SimulationTool every time a sequential update occurs. Nets written
+# more than once per cycle are only queued once, the _queued flag is
+# cleared when the simulator flops the net.
+def _alloc_seq_state( sim, svalue, next_value=None ):
+
+  def notify_sim_seq_update():
+    if not svalue._queued:
+      svalue._queued = True
+      sim._register_queue.append( svalue )
+
+  svalue._next                 = svalue() if next_value is None else next_value
+  svalue._queued               = False
+  svalue.notify_sim_seq_update = notify_sim_seq_update
+  sim.metrics.reg_seq_state( svalue )
+  return svalue._next
+
+#---------------------------------------------------------------------
+# insert_seq_state
+#---------------------------------------------------------------------
+# Allocate shadow state for all nets written with .next in sequential
+# blocks, found with DetectLoadsAndStores.
+def insert_seq_state( sim, model ):
+
+  for func in model.get_tick_blocks() + model.get_posedge_clk_blocks():
+    for name in get_block_info( func ).stores:
+      base, _, attr = name.rpartition( '.' )
+      if attr in ( 'next', 'n' ):
+        _add_seq_state( sim, model, base )
+
+  for m in model.get_submodules():
+    insert_seq_state( sim, m )
+
+#---------------------------------------------------------------------
+# _add_seq_state
+#---------------------------------------------------------------------
+# Utility function to recursively allocate shadow state for signals or
+# lists of signals, see _add_senses.
+def _add_seq_state( sim, model, name ):
+  obj = _attr_name_to_object( model, name )
+  if   isinstance( obj, tuple ):
+    obj_list, list_name, attr = obj
+    for i, o in enumerate( obj_list ):
+      obj_name = "{}[{}]{}".format( list_name, i, attr )
+      _add_seq_state( sim, model, obj_name )
+
+  # Only nets (which have a _net_id) get simulator callbacks
+  elif isinstance( obj, Bits ):
+    target_bits = obj._target_bits
+    if hasattr( target_bits, '_net_id' ) and \
+       '_next' not in target_bits.__dict__:
+      _alloc_seq_state( sim, target_bits )
+
+#---------------------------------------------------------------------
+# insert_memory_values
+#---------------------------------------------------------------------
+# Replace each MemoryArray in the model hierarchy with a MemoryValue.
+# Memories are never connected, so unlike other signals they need no
+# net construction: every MemoryArray maps to exactly one MemoryValue.
+def insert_memory_values( sim, model ):
+
+  def create_seq_update_cb( sim, mvalue ):
+    def notify_sim_seq_update():
+      sim._register_queue.append( mvalue )
+    return notify_sim_seq_update
+
+  for mem in model.get_memories():
+    mvalue = MemoryValue( mem.dtype.nbits, mem.nentries, mem.dtype )
+    mvalue.notify_sim_seq_update = create_seq_update_cb ( sim, mvalue )
+    mvalue._net_id               = sim._event_queue.get_net_id( mvalue )
+    setattr( mem.parent, mem.name, mvalue )
+    mem._signalvalue = mvalue
+
+  for m in model.get_submodules():
+    insert_memory_values( sim, m )
+
 #---------------------------------------------------------------------
 # register_seq_blocks
 #---------------------------------------------------------------------
@@ -178,78 +331,120 @@ def register_seq_blocks( model ):
   for i in all_models:
     for func in i.get_tick_blocks() + i.get_posedge_clk_blocks():
 
-      # Grab the AST and src code of each function
-      tree, src = get_method_ast( func )
-
       # Check there were no mistakes in use of .value/.next
-      DetectIncorrectValueNext( func, 'value' ).visit( tree )
-      DetectMissingValueNext  ( func, 'next'  ).visit( tree )
-
-      # If function is decorated with tick_fl, wrap it with a greenlet
-      if 'tick_fl' in DetectDecorators().enter( tree ):
-        func = _pausable_tick( func )
+      check_block( func, i, 'next' )
+
+      # If function is decorated with tick_fl, wrap it so that it can
+      # pause (generator functions are driven directly, other functions
+      # are run in a greenlet). The wrappers keep the model and name of
+      # the block, for SimulationProfile.
+      if 'tick_fl' in get_block_info( func ).decorators:
+        if inspect.isgeneratorfunction( func ):
+          func = _generator_tick( func )
+        else:
+          func = _pausable_tick( func )
 
       sequential_blocks.append( func )
 
     for func in i.get_combinational_blocks():
-
-      tree, _ = get_method_ast( func )
-      DetectIncorrectValueNext( func, 'next'  ).visit( tree )
-      DetectMissingValueNext  ( func, 'value' ).visit( tree )
+      check_block( func, i, 'value' )
 
   return sequential_blocks
 
 #---------------------------------------------------------------------
-# register_comb_blocks
+# collect_comb_senses
 #---------------------------------------------------------------------
-# Register all decorated @combinational functions with the simulator.
-# Combinational logic blocks are registered with SignalValue objects
-# and get added to the event queue when values are updated.
-def register_comb_blocks( model, event_queue ):
-
-  # Get the sensitivity list of each event driven (combinational) block
-  # TODO: do before or after we swap value nodes?
+# Get the sensitivity list of each event driven (combinational) block.
+# TODO: do before or after we swap value nodes?
+def collect_comb_senses( model ):
 
   for func in model.get_combinational_blocks():
-    tree, _ = get_method_ast( func )
-    loads, stores = DetectLoadsAndStores().enter( tree )
-    for name in loads:
+    for name in get_block_info( func ).loads:
       _add_senses( func, model, name )
 
+  for m in model.get_submodules():
+    collect_comb_senses( m )
+
+#---------------------------------------------------------------------
+# register_comb_blocks
+#---------------------------------------------------------------------
+# Register all decorated @combinational functions with the simulator.
+# Combinational logic blocks are registered with SignalValue objects
+# and get added to the event queue when values are updated. Blocks
+# whose id is in removed (see optimize_blocks) are skipped.
+#
+# Each net keeps the fan-out of blocks sensitive to it as a tuple of
+# event queue ids, without duplicates: a block reading a net several
+# times (e.g., through slices or BitStruct fields) is only added once.
+#
+# If a profile is given (see SimulationProfile), the callback placed on
+# the event queue is the block wrapped by the profile.
+def register_comb_blocks( model, event_queue, removed=(), metrics=None,
+                          profile=None ):
+
   # Iterate through all @combinational decorated function names we
   # detected, retrieve their associated function pointer, then add
-  # entries for each item in the function's sensitivity list to
-  # svalue_callbacks
+  # the block to the fan-out of each net in its sensitivity list.
   # TODO: merge this code with above to reduce mem of data structures?
-  # TODO: sensitivity_list contains duplicate items if a signal is
-  #       accessed via slices or bitstruct accesses, use set instead?
 
   for func_ptr, sensitivity_list in model._newsenses.items():
-    func_ptr.id = event_queue.get_id()
-    func_ptr.cb = func_ptr
-    #self.metrics.reg_eval( func_ptr.cb )
-    for signal_value in sensitivity_list:
+    if id( func_ptr ) in removed:
+      continue
+    func_ptr.cb = profile.wrap( func_ptr, 'comb' ) if profile else func_ptr
+    func_ptr.id = func_ptr.cb.id = event_queue.get_id( func_ptr.cb )
+    if metrics:
+      metrics.reg_eval( func_ptr.cb )
+    for signal_value, mask in _merge_field_senses( sensitivity_list ):
 
       # Only add "notify_sim" funcs if @comb blocks are sensitive to us
-      signal_value.notify_sim_comb_update = signal_value._ucb
+      if 'notify_sim_comb_update' not in signal_value.__dict__:
+        signal_value.notify_sim_comb_update = \
+          event_queue.get_notifier( signal_value )
 
-      # Prime the simulation by putting all events on the event_queue
-      # This will make sure all nodes come out of reset in a consistent
-      # state. TODO: put this in reset() instead?
-      signal_value.register_callback( func_ptr )
-      event_queue.enq( func_ptr.cb, func_ptr.id )
+      if mask is None:
+        signal_value.register_callback( func_ptr.id )
+      else:
+        signal_value.register_field_callback( func_ptr.id, mask )
+        signal_value._event_uint = signal_value._uint
 
       #self._DEBUG_signal_cbs[ signal_value ].append( func_ptr )
 
+    # Prime the simulation by putting all events on the event_queue
+    # This will make sure all nodes come out of reset in a consistent
+    # state. TODO: put this in reset() instead?
+    event_queue.enq( func_ptr.cb, func_ptr.id )
+
   # Recursively perform for submodules
   for m in model.get_submodules():
-    register_comb_blocks( m, event_queue )
+    register_comb_blocks( m, event_queue, removed, metrics, profile )
+
+#-----------------------------------------------------------------------
+# _merge_field_senses
+#-----------------------------------------------------------------------
+# Merge all the accesses of a block to the same net: whole net reads are
+# kept once, field accesses are merged into a single mask and dropped if
+# the block also reads the whole net.
+def _merge_field_senses( sensitivity_list ):
+
+  full   = { id( x ) for x, mask in sensitivity_list if mask is None }
+  senses = collections.OrderedDict()
+  fields = collections.OrderedDict()
+
+  for signal_value, mask in sensitivity_list:
+    key = id( signal_value )
+    if   mask is None:  senses[ key ] = ( signal_value, mask )
+    elif key in full:   pass
+    elif key in fields: fields[ key ] = ( signal_value, fields[ key ][1] | mask )
+    else:               fields[ key ] = ( signal_value, mask )
+
+  return senses.values() + fields.values()
 
 #-----------------------------------------------------------------------
 # _add_senses
 #-----------------------------------------------------------------------
 # Utility function to recursively add signals/lists of signals to
-# the sensitivity list.
+# the sensitivity list. Reads of a single field or slice of a net
+# (e.g., s.in_.msg.dest) only make the block sensitive to those bits.
 def _add_senses( func, model, name ):
   obj = _attr_name_to_object( model, name )
   # If name_to_object returned a tuple, this is a list inside of a
@@ -265,14 +460,21 @@ def _add_senses( func, model, name ):
   elif isinstance( obj, SignalValue ):
 
     # Distinguish between attributes storing signals (InPort/OutPort/Wire)
-    # and SignalValues (e.g., Bits), by checking the _ucb attribute.
+    # and SignalValues (e.g., Bits), by checking the _net_id attribute.
     target_bits = obj._target_bits
-    if hasattr( target_bits, '_ucb' ):
-      model._newsenses[ func ].append( target_bits )
+    if hasattr( target_bits, '_net_id' ):
+      mask = None
+      if target_bits is not obj:
+        mask = ( ( 1 << obj.nbits ) - 1 ) << obj._offset
+      model._newsenses[ func ].append( ( target_bits, mask ) )
     elif model._debug:
       warnings.warn( "Cannot add SignalValue '{}' to sensitivity list."
                      "".format( name ), Warning )
 
+  # A read of any memory entry makes the block sensitive to the memory.
+  elif isinstance( obj, MemoryValue ):
+    model._newsenses[ func ].append( ( obj, None ) )
+
 #-----------------------------------------------------------------------
 # _attr_name_to_object
 #-----------------------------------------------------------------------
@@ -298,8 +500,9 @@ def _attr_name_to_object( model, name ):
   # list. Return a tuple containing the list object, the list name
   # and the attribute string the appears after the list indexing.
   try:
-    x = eval( name )
+    x = eval( _compile_cached( name, 'eval' ) )
     if   isinstance( x, SignalValue ): return x
+    elif isinstance( x, MemoryValue ): return x
     elif isinstance( x, list        ): return ( x, name, extra )
     else:                              raise NameError
   except NameError:
@@ -314,46 +517,557 @@ def _attr_name_to_object( model, name ):
 #-----------------------------------------------------------------------
 # All ConnectionEdges that contain bit slicing need to be turned into
 # combinational blocks.  This significantly simplifies the connection
-# graph update logic.
-def create_slice_callbacks( slice_connects, event_queue ):
+# graph update logic. Connections whose id is in removed (see
+# optimize_blocks) are skipped.
+#
+# Connections are compiled into precomputed shift and mask updates of
+# the destination integer, and all the connections from the same source
+# net are fused into a single callback. If a profile is given, the
+# callbacks are wrapped by the profile and accounted for under the name
+# of the source signal.
+def create_slice_callbacks( slice_connects, event_queue, removed=(),
+                            metrics=None, profile=None ):
+
+  fanout = collections.OrderedDict()
 
   for c in slice_connects:
+    if id( c ) in removed:
+      continue
     src = c.src_node._signalvalue
     # If slice is connect to a Constant, don't create a callback.
     # Just write the constant value now.
     if isinstance( src, int ):
-      dest      = c.dest_node._signalvalue
-      dest_addr = c.dest_slice if c.dest_slice != None else slice( None )
-      dest[ dest_addr ].v = src
-    # If slice is connected to another Signal, create a callback
-    # and put it on the combinational event queue.
+      _write_constant_slice( c )
+    # If slice is connected to another Signal, add it to the updates
+    # done by the callback of the source net.
     else:
-      func_ptr     = _create_slice_cb_closure( c )
-      signal_value = c.src_node._signalvalue
-      signal_value.register_slice( func_ptr )
-      func_ptr.id = event_queue.get_id()
-      func_ptr.cb = func_ptr
-      event_queue.enq( func_ptr.cb, func_ptr.id )
-      #self.metrics.reg_eval( func_ptr.cb, is_slice = True )
-      #self._DEBUG_signal_cbs[ signal_value ].append( func_ptr )
+      fanout.setdefault( id( src ), ( src, [], c.src_node ) )[1].append(
+        _get_slice_update( c ) )
+
+  # Create a callback per source net and put it on the combinational
+  # event queue.
+  for signal_value, updates, src_node in fanout.values():
+    func_ptr = _create_slice_cb_closure( signal_value, updates )
+    if profile:
+      func_ptr = profile.wrap( func_ptr, 'slice', src_node.parent,
+                               src_node.name )
+    signal_value.register_slice( func_ptr )
+    func_ptr.id = event_queue.get_id( func_ptr )
+    func_ptr.cb = func_ptr
+    event_queue.enq( func_ptr.cb, func_ptr.id )
+    if metrics:
+      metrics.reg_eval( func_ptr.cb, is_slice = True )
+    #self._DEBUG_signal_cbs[ signal_value ].append( func_ptr )
 
 #-----------------------------------------------------------------------
-# _create_slice_cb_closure
+# _write_constant_slice
 #-----------------------------------------------------------------------
-# Utility function to create our callback
-def _create_slice_cb_closure( c ):
-  src       = c.src_node._signalvalue
+def _write_constant_slice( c ):
   dest      = c.dest_node._signalvalue
-  src_addr  = c.src_slice  if c.src_slice  != None else slice( None )
-  dest_bits = dest[ c.dest_slice ] if c.dest_slice != None else dest
-  def slice_cb():
-    # We need to slice the src each time.  This is because writing
-    # to a BitSlice will updates the Bits it was sliced from, but
-    # not vice versa.
-    dest_bits.v = src[ src_addr ]
+  dest_addr = c.dest_slice if c.dest_slice != None else slice( None )
+  dest[ dest_addr ].v = c.src_node._signalvalue
+
+#-----------------------------------------------------------------------
+# _get_slice_update
+#-----------------------------------------------------------------------
+# Return the update done by a slice connection as a tuple ( dest,
+# shift, mask, dest_shift, keep ): the bits of the source are shifted
+# right by shift and masked with mask, then shifted left by dest_shift
+# and merged with the bits of the destination selected by keep.
+def _get_slice_update( c ):
+
+  def lsb( addr ):
+    if   addr is None:              return 0
+    elif isinstance( addr, slice ): return int( addr.start )
+    else:                           return int( addr )
+
+  dest       = c.dest_node._signalvalue
+  mask       = ( 1 << c.nbits ) - 1
+  dest_shift = lsb( c.dest_slice )
+  keep       = dest._mask & ~( mask << dest_shift )
+
+  return dest, lsb( c.src_slice ), mask, dest_shift, keep
+
+#-----------------------------------------------------------------------
+# _create_slice_cb_closure
+#-----------------------------------------------------------------------
+# Utility function to create the callback of a source net, applying a
+# list of updates from _get_slice_update. The destination integer is
+# written directly, values are already masked.
+def _create_slice_cb_closure( src, updates ):
+
+  if len( updates ) == 1:
+
+    [( dest, shift, mask, dest_shift, keep )] = updates
+
+    def slice_cb():
+      value = ( ( src._uint >> shift ) & mask ) << dest_shift | \
+              ( dest._uint & keep )
+      if value != dest._uint:
+        dest._uint = value
+        dest.notify_sim_comb_update()
+        for func in dest._slices: func()
+
+  else:
+
+    updates = tuple( updates )
+
+    def slice_cb():
+      uint = src._uint
+      for dest, shift, mask, dest_shift, keep in updates:
+        value = ( ( uint >> shift ) & mask ) << dest_shift | \
+                ( dest._uint & keep )
+        if value != dest._uint:
+          dest._uint = value
+          dest.notify_sim_comb_update()
+          for func in dest._slices: func()
+
   return slice_cb
 
 
+#-----------------------------------------------------------------------
+# optimize_blocks
+#-----------------------------------------------------------------------
+# Constant propagation and dead block elimination, done before any block
+# is registered with the simulator.
+#
+# Combinational blocks and slice connections whose inputs are all
+# constant would only run once, when the simulator is primed. They are
+# evaluated here instead and never registered. The nets they drive
+# become constant in turn if nothing else can write them, so folding
+# carries on downstream. Blocks are only folded if they are pure (see
+# DetectSideEffects) and the only driver of the nets they write.
+#
+# If prune is set, only the top-level ports and what the line trace of
+# the model reads are observable: blocks and slice connections which
+# can not affect them are removed. Pruning is skipped if any block may
+# read or write signals the analysis can not see (side effects, stores
+# to unknown objects), if the line trace can not be analysed, or if the
+# model dumps a VCD file.
+#
+# Returns the set of ids of the removed blocks and connections, to pass
+# to register_comb_blocks and create_slice_callbacks, and a dictionary
+# counting them.
+def optimize_blocks( model, slice_connects, prune=False ):
+
+  report  = { 'folded_blocks' : 0, 'folded_slices' : 0,
+              'pruned_blocks' : 0, 'pruned_slices' : 0 }
+  removed = set()
+
+  # Analyse every block: the nets it reads and writes and whether that
+  # is all it does. Blocks of models wrapping C code are opaque.
+
+  blocks   = []
+  drivers  = collections.defaultdict( list )
+  external = set( id( p._signalvalue ) for p in model.get_inports() )
+  opaque   = []
+  clean    = True
+
+  def visit_models( m ):
+    if hasattr( m, '_cffi_update' ):
+      opaque.append( m )
+      external.update( id( p._signalvalue ) for p in m.get_ports() )
+    for func in m.get_combinational_blocks():
+      blocks.append( _Block( m, func, 'comb' ) )
+    for func in m.get_tick_blocks() + m.get_posedge_clk_blocks():
+      blocks.append( _Block( m, func, 'seq' ) )
+    for subm in m.get_submodules():
+      visit_models( subm )
+
+  visit_models( model )
+  opaque_ids = set( id( m ) for m in opaque )
+
+  for blk in blocks:
+    for net in blk.writes:
+      drivers[ id( net ) ].append( blk )
+    if not ( blk.pure and blk.complete ) and id( blk.model ) not in opaque_ids:
+      clean = False
+
+  # Slices from a constant are written now, as create_slice_callbacks
+  # would, so that the nets they drive can be folded.
+
+  slices = []
+  tied   = set()
+  for c in slice_connects:
+    if isinstance( c.src_node._signalvalue, int ):
+      _write_constant_slice( c )
+      removed.add( id( c ) )
+      tied.add( id( c ) )
+    else:
+      slices.append( c )
+    drivers[ id( c.dest_node._signalvalue ) ].append( c )
+
+  # Fold blocks and slices until no more inputs become constant. Nets
+  # written by opaque or impure blocks could change behind our back, so
+  # if there are any only tied nets are constant.
+
+  def is_removed( drv ):
+    return id( drv.func if isinstance( drv, _Block ) else drv ) in removed
+
+  def only_driver( blk, net ):
+    return drivers[ id( net ) ] == [ blk ] and id( net ) not in external
+
+  constant = set()
+  for blk in blocks:
+    constant.update( id( net ) for net in blk.reads if net.constant )
+  for c in slices:
+    if c.src_node._signalvalue.constant:
+      constant.add( id( c.src_node._signalvalue ) )
+  for c in slice_connects:
+    dest = c.dest_node._signalvalue
+    if id( c ) in tied and id( dest ) not in external and \
+       all( id( x ) in tied for x in drivers[ id( dest ) ] ):
+      constant.add( id( dest ) )
+
+  changed = True
+  while changed:
+    changed = False
+
+    for blk in blocks:
+      if blk.kind != 'comb' or id( blk.func ) in removed or not blk.senses:
+        continue
+      if not ( blk.pure and blk.complete and blk.writes ):
+        continue
+      if not all( only_driver( blk, net ) for net in blk.writes ):
+        continue
+      if all( id( net ) in constant for net in blk.reads ):
+        blk.func()
+        removed.add( id( blk.func ) )
+        report[ 'folded_blocks' ] += 1
+        if clean and not opaque:
+          constant.update( id( net ) for net in blk.writes )
+        changed = True
+
+    for c in slices:
+      if id( c ) not in removed and id( c.src_node._signalvalue ) in constant:
+        _create_slice_cb_closure( c.src_node._signalvalue,
+                                  [ _get_slice_update( c ) ] )()
+        removed.add( id( c ) )
+        report[ 'folded_slices' ] += 1
+        dest = c.dest_node._signalvalue
+        if clean and not opaque and id( dest ) not in external and \
+           all( is_removed( x ) for x in drivers[ id( dest ) ] ):
+          constant.add( id( dest ) )
+        changed = True
+
+  # Remove everything the observable nets do not depend on
+
+  if not prune or getattr( model, 'vcd_file', None ) or not clean:
+    return removed, report
+
+  observed = _get_observed_nets( model )
+  if observed is None:
+    return removed, report
+
+  for m in opaque:
+    observed.extend( _get_model_nets( m ) )
+
+  live     = set( id( blk ) for blk in blocks if id( blk.model ) in opaque_ids )
+  live_net = set()
+  worklist = observed + [ net for blk in blocks if id( blk ) in live
+                          for net in blk.reads ]
+
+  while worklist:
+    net = worklist.pop()
+    if id( net ) in live_net:
+      continue
+    live_net.add( id( net ) )
+    for drv in drivers[ id( net ) ]:
+      if id( drv ) in live:
+        continue
+      live.add( id( drv ) )
+      if isinstance( drv, _Block ):
+        worklist.extend( drv.reads )
+      else:
+        worklist.append( drv.src_node._signalvalue )
+
+  for blk in blocks:
+    if id( blk ) in live or id( blk.func ) in removed:
+      continue
+    if blk.kind == 'seq' or blk.senses:
+      removed.add( id( blk.func ) )
+      report[ 'pruned_blocks' ] += 1
+
+  for c in slices:
+    if id( c ) not in live and id( c ) not in removed:
+      removed.add( id( c ) )
+      report[ 'pruned_slices' ] += 1
+
+  return removed, report
+
+#-----------------------------------------------------------------------
+# _Block
+#-----------------------------------------------------------------------
+# A combinational or sequential block along with the nets it reads and
+# writes, see optimize_blocks. The block is pure if it only affects the
+# rest of the design through the nets it writes, and complete if all
+# the signals it accesses could be resolved.
+class _Block( object ):
+
+  def __init__( self, model, func, kind ):
+
+    info = get_block_info( func )
+
+    self.model  = model
+    self.func   = func
+    self.kind   = kind
+    self.senses = [ net for net, mask in model._newsenses.get( func, [] ) ]
+    self.pure   = not info.side_effects and \
+                  _closure_is_simple( func, model )
+
+    reads,  reads_ok  = _resolve_nets( model, info.reads,  store=False )
+    writes, writes_ok = _resolve_nets( model, info.stores, store=True  )
+
+    self.reads    = self.senses + reads
+    self.writes   = writes
+    self.complete = reads_ok and writes_ok
+
+#-----------------------------------------------------------------------
+# _closure_is_simple
+#-----------------------------------------------------------------------
+# Check that a block can only reach signals through its model: all the
+# variables it closes over are the model itself or plain values.
+def _closure_is_simple( func, model ):
+  for cell in func.func_closure or ():
+    x = cell.cell_contents
+    if x is model:
+      continue
+    if isinstance( x, ( SignalValue, MemoryValue, Model, PortBundle,
+                        list, tuple, dict, set ) ):
+      return False
+  return True
+
+#-----------------------------------------------------------------------
+# _resolve_nets
+#-----------------------------------------------------------------------
+# Return the nets accessed through a list of names found by the AST
+# visitors, and whether all of them could be resolved. Local variables
+# are skipped, names rooted at anything but the model are unresolved.
+# A store to something which is not a signal is unresolved too, since
+# it changes state the analysis does not track.
+_value_attr = re.compile( r'\.(value|v|next|n)$' )
+_name_root  = re.compile( r'^(\w+)(.*)$' )
+
+def _resolve_nets( model, names, store ):
+
+  nets     = []
+  complete = True
+
+  for name in names:
+    root, rest = _name_root.match( name ).groups()
+    if root not in ( 's', 'self' ):
+      if store and rest:
+        complete = False
+      continue
+
+    objs = _eval_objects( model, _value_attr.sub( '', name ) )
+    if objs is None:
+      complete = False
+      continue
+
+    for obj in objs:
+      net = _get_net( obj )
+      if net is not None:
+        nets.append( net )
+      elif store:
+        complete = False
+      else:
+        found = []
+        if _collect_nets( obj, found, [] ):
+          nets.extend( found )
+        else:
+          complete = False
+
+  return nets, complete
+
+#-----------------------------------------------------------------------
+# _eval_objects
+#-----------------------------------------------------------------------
+# Evaluate a name found by the AST visitors on a model. Indexing with
+# unknown indexes ('[?]') returns all the elements of a list, indexing
+# a signal or a memory returns the signal or memory itself. Returns None
+# if the name can not be evaluated.
+def _eval_objects( model, name, item=None ):
+
+  base, sep, rest = name.partition( '[?]' )
+  env = { 's' : model, 'self' : model, '_item' : item }
+  try:
+    x = eval( _compile_cached( base, 'eval' ), {}, env )
+  except Exception:
+    return None
+
+  if not sep or isinstance( x, ( SignalValue, MemoryValue ) ):
+    return [ x ]
+  if not isinstance( x, list ):
+    return None
+
+  objs = []
+  for item in x:
+    sub = _eval_objects( model, '_item' + rest, item )
+    if sub is None:
+      return None
+    objs.extend( sub )
+  return objs
+
+#-----------------------------------------------------------------------
+# _get_net
+#-----------------------------------------------------------------------
+# Return the net (SignalValue or MemoryValue with a simulator callback)
+# a signal, slice or field belongs to, or None for anything else.
+def _get_net( obj ):
+  if isinstance( obj, SignalValue ):
+    obj = getattr( obj, '_target_bits', obj )
+  elif not isinstance( obj, MemoryValue ):
+    return None
+  return obj if '_net_id' in obj.__dict__ else None
+
+#-----------------------------------------------------------------------
+# _get_model_nets
+#-----------------------------------------------------------------------
+# Return the nets of all signals and memories in a model hierarchy.
+def _get_model_nets( model ):
+  nets = [ x._signalvalue for x in model.get_ports() + model.get_wires() +
+                                   model.get_memories() ]
+  for m in model.get_submodules():
+    nets.extend( _get_model_nets( m ) )
+  return nets
+
+#-----------------------------------------------------------------------
+# _collect_nets
+#-----------------------------------------------------------------------
+# Add the nets an object read by a block or a line trace gives access
+# to. Lists and bundles give access to their elements, models to all
+# their signals, bound methods to their owner. Methods of models are
+# added to methods so that their own reads can be analysed. Returns
+# False for objects which are opaque but may hold signals.
+def _collect_nets( obj, nets, methods ):
+
+  net = _get_net( obj )
+  if net is not None:
+    nets.append( net )
+  elif isinstance( obj, ( list, tuple ) ):
+    return all( [ _collect_nets( x, nets, methods ) for x in obj ] )
+  elif isinstance( obj, PortBundle ):
+    nets.extend( x._signalvalue for x in obj.get_ports() )
+  elif isinstance( obj, Model ):
+    nets.extend( _get_model_nets( obj ) )
+    methods.append( obj.line_trace )
+  elif inspect.ismethod( obj ) and obj.__self__ is not None:
+    if isinstance( obj.__self__, Model ):
+      methods.append( obj )
+    else:
+      return _collect_nets( obj.__self__, nets, methods )
+  elif isinstance( obj, dict ):
+    return _collect_nets( obj.values(), nets, methods )
+  return True
+
+#-----------------------------------------------------------------------
+# _get_observed_nets
+#-----------------------------------------------------------------------
+# Return the nets observable from outside of a model: its ports, and
+# everything its line trace reads, following calls to methods of models
+# (e.g., the line traces of submodules). Returns None if a method can
+# not be analysed.
+def _get_observed_nets( model ):
+
+  nets    = [ x._signalvalue for x in model.get_ports() ]
+  methods = [ model.line_trace ]
+  visited = set()
+
+  while methods:
+    method = methods.pop()
+    owner  = method.__self__
+    key    = ( id( owner ), method.__func__ )
+    if key in visited:
+      continue
+    visited.add( key )
+
+    try:
+      tree, _ = get_method_ast( method )
+    except ( IOError, TypeError, SyntaxError ):
+      return None
+
+    args = inspect.getargspec( method ).args
+    for name in DetectReads().enter( tree ):
+      root, rest = _name_root.match( name ).groups()
+      if root not in ( 's', 'self' ) + tuple( args[:1] ):
+        continue
+      if root not in ( 's', 'self' ):
+        name = 's' + rest
+      objs = _eval_objects( owner, _value_attr.sub( '', name ) )
+      if objs is None:
+        return None
+      for obj in objs:
+        if not _collect_nets( obj, nets, methods ):
+          return None
+
+  return nets
+
+#-----------------------------------------------------------------------
+# create_signal_index
+#-----------------------------------------------------------------------
+# Map the hierarchical name of every port, wire and memory in the model
+# hierarchy to its SignalValue (or MemoryValue).
+def create_signal_index( model ):
+
+  index = {}
+
+  def recurse_models( m, prefix ):
+    for x in m.get_ports() + m.get_wires() + m.get_memories():
+      index[ intern( prefix + x.name ) ] = x._signalvalue
+    for subm in m.get_submodules():
+      recurse_models( subm, prefix + subm.name + '.' )
+
+  recurse_models( model, model.name + '.' )
+  return index
+
+#-----------------------------------------------------------------------
+# release_elaboration_state
+#-----------------------------------------------------------------------
+# Drop the references the model hierarchy holds to structures only
+# needed to build a simulator: Signal objects, ConnectionEdges and
+# sensitivity lists. Model attributes already reference SignalValues,
+# and the simulator callbacks reference SignalValues and functions only.
+def release_elaboration_state( model ):
+
+  # Bundles and port lists keep their own list of ports, point them to
+  # the SignalValues instead
+  def release_ports( obj ):
+    ports = getattr( obj, '_ports', None )
+    if ports is None:
+      return
+    for port in ports:
+      release_ports( port )
+    obj._ports = [ getattr( x, '_signalvalue', x ) for x in ports ]
+
+  def recurse_models( m ):
+
+    for x in m.get_ports() + m.get_wires():
+      x.connections = ()
+    for x in m.get_ports( preserve_hierarchy=True ):
+      release_ports( x )
+
+    m._connections = set()
+    m._inports     = []
+    m._outports    = []
+    m._hports      = []
+    m._wires       = []
+    m._memories    = []
+    m._newsenses   = None
+
+    for subm in m.get_submodules():
+      recurse_models( subm )
+
+  recurse_models( model )
+  model._released = True
+
+#-----------------------------------------------------------------------
+# is_released
+#-----------------------------------------------------------------------
+# Returns True if release_elaboration_state() was called on the model.
+def is_released( model ):
+  return getattr( model, '_released', False )
+
 #---------------------------------------------------------------------
 # _pausable_tick
 #---------------------------------------------------------------------
@@ -362,6 +1076,11 @@ def _create_slice_cb_closure( c ):
 # GreenletWrapper explicitly.
 def _pausable_tick( func ):
 
+  # Only needed by models using tick_fl, imported here to keep importing
+  # pymtl light.
+
+  import greenlet
+
   # The inner_wrapper function is the one which we will wrap in a
   # greenlet. It calls the tick function forever. It pauses after each
   # call to the tick function, but the tick function itself can also
@@ -389,8 +1108,31 @@ def _pausable_tick( func ):
   def outer_wrapper():
     func._pausable_tick.switch()
 
+  outer_wrapper._model   = func._model
+  outer_wrapper.__name__ = func.__name__
   return outer_wrapper
 
+#---------------------------------------------------------------------
+# _generator_tick
+#---------------------------------------------------------------------
+# Pausable tick blocks written as generators (see coroutines.py). The
+# generator is resumed once per cycle, a new one is only started in the
+# cycle after the previous one is done so that we always only do one
+# tick per cycle, like _pausable_tick.
+def _generator_tick( func ):
+
+  coroutine = [ None ]
+
+  def generator_tick():
+    if coroutine[0] is None:
+      coroutine[0] = Coroutine( func() )
+    if coroutine[0].step():
+      coroutine[0] = None
+
+  generator_tick._model   = func._model
+  generator_tick.__name__ = func.__name__
+  return generator_tick
+
 #-----------------------------------------------------------------------
 # register_cffi_updates
 #-----------------------------------------------------------------------
@@ -64,6 +64,7 @@ def write_vcd_signal_defs( o, model ):
 
   vcd_symbol = _gen_vcd_symbol()
   all_nets   = set()
+  all_mems   = []
 
   # Inner utility function to perform recursive descent of the model.
   def recurse_models( model, level ):
@@ -89,6 +90,21 @@ def write_vcd_signal_defs( o, model ):
 
       all_nets.add( net )
 
+    # Define one signal per memory entry. Memory entries are never
+    # connected, so each one gets its own symbol.
+    for i in model.get_memories():
+
+      mem = i._signalvalue
+      mem._vcd_symbols = [ vcd_symbol.next() for x in xrange( len( mem ) ) ]
+
+      for addr, symbol in enumerate( mem._vcd_symbols ):
+        print( "$var {type} {nbits} {symbol} {name} $end".format(
+            type='reg', nbits=mem.nbits, symbol=symbol,
+            name=mangle_name( '{}[{}]'.format( i.name, addr ) ),
+        ), file=o )
+
+      all_mems.append( mem )
+
     # Recursively visit all submodels.
     for submodel in model.get_submodules():
       recurse_models( submodel, level+1 )
@@ -106,14 +122,19 @@ def write_vcd_signal_defs( o, model ):
     print( "b{value} {symbol}".format(
         value=net.bin(), symbol=net._vcd_symbol,
     ), file=o )
+  for mem in all_mems:
+    for value, symbol in zip( mem._data, mem._vcd_symbols ):
+      print( "b{value:0{nbits}b} {symbol}".format(
+          value=value, nbits=mem.nbits, symbol=symbol,
+      ), file=o )
 
-  return all_nets
+  return all_nets, all_mems
 
 #-----------------------------------------------------------------------
 # insert_vcd_callbacks
 #-----------------------------------------------------------------------
 # Add callbacks which write the vcd file for each net in the design.
-def insert_vcd_callbacks( sim, nets ):
+def insert_vcd_callbacks( sim, nets, mems=() ):
 
   # A utility function which creates callbacks that write a nets current
   # value to the vcd file. The returned callback function is a closure
@@ -143,6 +164,17 @@ def insert_vcd_callbacks( sim, nets ):
   for net in nets:
     net.register_slice( create_vcd_callback( sim, net ) )
 
+  # Memories instead notify us of every entry whose value changed.
+  def create_vcd_mem_callback( sim, mem ):
+    def cb( addr ):
+      print( 'b{:0{}b} {}\n'.format( mem._data[ addr ], mem.nbits,
+                                      mem._vcd_symbols[ addr ] ),
+             file=sim.vcd )
+    return cb
+
+  for mem in mems:
+    mem.register_entry_callback( create_vcd_mem_callback( sim, mem ) )
+
 #-----------------------------------------------------------------------
 # _gen_vcd_symbol
 #-----------------------------------------------------------------------
@@ -192,9 +224,9 @@ class VCDUtil():
     # Write out vcd header, signal definitions, and initial state
 
     write_vcd_header( outfile, simulator.model )
-    nets = write_vcd_signal_defs( outfile, simulator.model )
+    nets, mems = write_vcd_signal_defs( outfile, simulator.model )
 
     # Enable vcd mode on the simulator, set simulator output file name
 
     simulator.vcd = outfile
-    insert_vcd_callbacks( simulator, nets )
+    insert_vcd_callbacks( simulator, nets, mems )
@@ -17,6 +17,7 @@ from SimulationTool_comb_test   import *
 from SimulationTool_mix_test    import *
 from SimulationTool_struct_test import *
 from SimulationTool_wire_test   import *
+from SimulationTool_mem_test    import *
 
 #=======================================================================
 # Test Config
@@ -1,2 +1,12 @@
-from verilator_sim import TranslationTool
-from cpp_sim       import get_cpp
+#=======================================================================
+# pymtl.tools.translation
+#=======================================================================
+# The translation tools are not imported here, so that importing a
+# single translator (or VerilogModel) does not load all of them. The
+# tools are stand-ins which import the actual tool on the first call,
+# pymtl re-exports the same objects.
+
+from pymtl import _lazy_tool
+
+TranslationTool = _lazy_tool( '.tools.translation.verilator_sim', 'TranslationTool' )
+get_cpp         = _lazy_tool( '.tools.translation.cpp_sim',       'get_cpp'         )
@@ -6,10 +6,15 @@
 from pymtl                   import *
 from cpp_helpers             import gen_cheader, gen_cdef, gen_pywrapper
 from ..ast_helpers           import get_method_ast, print_simple_ast, print_ast
-from ...datatypes.SignalValue import SignalValueWrapper
+from ...datatypes.SignalValue import SignalValue, SignalValueWrapper
+from ...model.signals        import Signal, Constant, MemoryArray
 from ..simulation            import sim_utils
+from ..simulation.ast_visitor import DetectLoadsAndStores
+from exceptions              import CppTranslationError
 
 import sys
+import inspect
+import operator
 import ast, _ast
 import collections
 import StringIO
@@ -20,6 +25,17 @@ compiler = "g++ -O3 -fPIC -shared -o {libname} {csource}"
 #-----------------------------------------------------------------------
 # CLogicTransl
 #-----------------------------------------------------------------------
+# Translates the sequential and combinational blocks of a model into a
+# C++ simulator. All model state lives in a state struct, so a single
+# compiled library can simulate any number of independent instances.
+# The simulator exposes the following functions, operating on a state
+# created by create_model() and an interface struct holding every
+# toplevel port except the clock:
+#
+#  - eval( state, top ):      apply the inputs and settle combinational
+#                             logic
+#  - cycle( state, top ):     simulate one rising clock edge
+#  - cycles( state, top, n ): simulate n clock edges with constant inputs
 # TODO: same as Verilog, reduce code dup
 def CLogicTransl( model, o=sys.stdout ):
 
@@ -27,15 +43,30 @@ def CLogicTransl( model, o=sys.stdout ):
     c_variables = StringIO.StringIO()
 
     signals    = sim_utils.collect_signals( model )
-    nets, _    = sim_utils.signals_to_nets( signals )
+    nets, slice_connects = sim_utils.signals_to_nets( signals )
     seq_blocks = sim_utils.register_seq_blocks( model )
+
+    # Number nets deterministically so the same model always produces
+    # the same source, which is what get_cpp's caching relies on
+    nets = sorted( nets, key=lambda x: min( signal_cname( y ) for y in x ) )
+
     # TODO: update translation so that this is unneeded?
     sim_utils.insert_signal_values( None, nets )
 
+    # Combinational blocks and slice connections are executed in
+    # dependency order
+    slices      = translate_slices( slice_connects )
+    comb_blocks = order_comb_blocks( model, slices )
+
     # Visit tick functions, save register information
     ast_next  = []
     localvars = {}
-    for func in seq_blocks:
+    funcs = []
+    for x in seq_blocks + comb_blocks:
+      funcs.extend( x.blocks if isinstance( x, CombLoop ) else [ x ] )
+    for func in funcs:
+      if isinstance( func, SliceAssignment ):
+        continue
       r, l = translate_func( func, c_functions )
       ast_next.extend( r )
       localvars.update( l )
@@ -51,10 +82,12 @@ def CLogicTransl( model, o=sys.stdout ):
     for x in model.get_ports():
       x.cpp_name = 'top_'+mangle_name( x.name )
 
-    # Separate input and output ports
+    # Separate input and output ports, the clock is implicit in cycle()
     for port in top_ports:
       name = port[0]
-      if   name in inport_names:
+      if   name == 'top_clk':
+        continue
+      elif name in inport_names:
         top_inports.append( port )
       elif name in outport_names:
         top_outports.append( port )
@@ -64,36 +97,46 @@ def CLogicTransl( model, o=sys.stdout ):
     # print locals
     print >> c_variables
     print >> c_variables, '/* LOCALS ' + '-'*60 + '*/'
+    memories = []
     for var, obj in localvars.items():
-      rvar = var.replace('.','_')
+      rvar = cpp_name( var )
       if rvar not in all_ports:
-        if   isinstance( obj, int ):
+        if   isinstance( obj, MemoryArray ):
+          if var.endswith('.next'):
+            memories.append( declare_memory_next( cpp_name( var[:-5] ), obj,
+                                                  c_variables ) )
+        elif isinstance( obj, int ):
           var_type = get_type( obj, o )
           print >> c_variables, "{} {} = {};".format( var_type, rvar, obj )
         # TODO: super hacky handling of lists
         elif isinstance( obj, list ):
           var_type = get_type( obj[0], o )
-          split = var.split('.')
+          nxt   = '__next' if var.endswith('.next') else ''
+          split = var[:-5].split('.') if nxt else var.split('.')
           pfx = '_'.join( split[0:2] )
           sfx = '_'+'_'.join( split[2:]  ) if split[2:] else ''
-          vx = [ '&{}_IDX{:03}{}'.format(pfx,i,sfx) for i in range(len(obj)) ]
+          vx = [ '&{}_IDX{:03}{}{}'.format(pfx,i,sfx,nxt)
+                 for i in range(len(obj)) ]
           # Declare the variables if they don't exist yet
           for x in vx:
             if x[1:] not in all_ports:
               print >> c_variables, "{} {};".format( var_type, x[1:])
-          print >> c_variables, "{} * {}[] = {{ {} }};".format(
-              var_type, rvar, ', '.join(vx ) )
+          print >> c_variables, "{} * {}[{}] = {{ {} }};".format(
+              var_type, rvar, len(vx), ', '.join(vx ) )
         else:
           var_type = get_type( obj, o )
           print >> c_variables, "{} {};".format( var_type, rvar )
 
+    declared = set()
+    for var, obj in localvars.items():
+      if isinstance( obj, MemoryArray ):
+        rvar = cpp_name( var[:-5] if var.endswith('.next') else var )
+        if rvar not in declared:
+          declare_memory( rvar, obj, c_variables )
+          declared.add( rvar )
 
-    # Declare parameters
-    params = []
-    for name, net, type_ in top_inports[:2]:
-      params.append( '    {}   _{}'.format( type_, name ) )
-    params  .append( '    iface_t * top') 
-    params = ',\n'.join( params )
+    iface = iface_name( model )
+    state = state_name( model )
 
     # Create the C header
     print >> o, '#include <stdio.h>'
@@ -103,52 +146,396 @@ def CLogicTransl( model, o=sys.stdout ):
     print >> o, '#define  False false'
     print >> o
 
-    print >> o, gen_cheader( params, top_ports[2:] )
-    print >> o, c_variables.getvalue()
-    print >> o, c_functions.getvalue()
+    print >> o, gen_cheader( iface, top_inports + top_outports )
+    # All nets, locals and blocks are members of the state struct
 
-    print   >> o, 'unsigned int ncycles;\n\n'
+    print   >> o, 'struct {} {{'.format( state )
+    print   >> o
+    for line in c_variables.getvalue().splitlines():
+      print >> o, '  ' + line if line else ''
+    print   >> o, c_functions.getvalue()
+
+    print   >> o, '  unsigned int ncycles = 0;\n'
 
-    # Create the cycle function
-    print   >> o, '/* cycle */'
-    print   >> o, 'void cycle({}) {{'.format( '\n'+params+'\n' )
+    # Helpers shared by eval, cycle and cycles
 
-    # Set input ports from params
+    print   >> o, '  /* set_inports */'
+    print   >> o, '  void set_inports( {} * top ) {{'.format( iface )
+    for name, _, type_, nbits in top_inports:
+      print >> o, '    {} = top->{}{};'.format( name, name[4:], mask( type_, nbits ) )
+    print   >> o, '  }'
     print   >> o
-    print   >> o, '  /* Set inports */'
-    print   >> o, '  top_clk   = _top_clk;'
-    print   >> o, '  top_reset = _top_reset;'
-    for name, _, _ in top_inports[2:]:
-      print >> o, '  {} = top->{};'.format( name, name[4:] )
 
-    # Execute all ticks
+    print   >> o, '  /* get_outports */'
+    print   >> o, '  void get_outports( {} * top ) {{'.format( iface )
+    for name, _, _, _ in top_outports:
+      print >> o, '    top->{} = {};'.format( name[4:], name )
+    print   >> o, '  }'
     print   >> o
-    print   >> o, '  /* Execute all ticks */'
+
+    # Blocks in a loop through the nets they share are evaluated until
+    # the nets they write settle, which takes at most one pass per net
+    # unless the logic itself has a combinational loop
+
+    net_names = {}
+    for id_, n in enumerate( nets ):
+      if not isinstance( next( iter( n ) ).dtype(), Bits ):
+        continue
+      for signal in n:
+        net_names[ id( signal._signalvalue ) ] = 'net_{:05}'.format( id_ )
+
+    def call( x, indent ):
+      if isinstance( x, SliceAssignment ):
+        print >> o, indent + x.stmt
+      else:
+        print >> o, indent + '{}_{}();'.format( model_cname( x._model ),
+                                                 x.func_name )
+
+    print   >> o, '  /* eval_comb */'
+    print   >> o, '  void eval_comb() {'
+    for x in comb_blocks:
+      if not isinstance( x, CombLoop ):
+        call( x, '    ' )
+        continue
+      names = sorted( set( net_names[ y ] for y in x.stores
+                           if y in net_names ) )
+      print >> o, '    /* settle {} */'.format(
+                    ', '.join( block_name( y ) for y in x.blocks ) )
+      print >> o, '    for ( unsigned int i = 0; ; i++ ) {'
+      print >> o, '      assert( i <= {} );'.format( len( names ) )
+      for j, name in enumerate( names ):
+        print >> o, '      unsigned long long prev{} = {};'.format( j, name )
+      for y in x.blocks:
+        call( y, '      ' )
+      print >> o, '      if ( {} ) break;'.format( ' && '.join(
+                    [ 'prev{} == {}'.format( j, name )
+                      for j, name in enumerate( names ) ] or [ 'true' ] ) )
+      print >> o, '    }'
+    print   >> o, '  }'
+    print   >> o
+
+    print   >> o, '  /* tick */'
+    print   >> o, '  void tick() {'
+    print   >> o
+    print   >> o, '    /* Execute all ticks */'
     for x in seq_blocks:
-      print >> o, '  {}_{}();'.format( mangle_idxs(x._model.name), x.func_name)
-    print   >> o, '  ncycles++;'
+      print >> o, '    {}_{}();'.format( model_cname( x._model ), x.func_name)
+    print   >> o, '    ncycles++;'
+    print   >> o
+    print   >> o, '    /* Update all registers */'
+    for name, type_, nbits in shadows:
+      print >> o, '    {0} = {0}__next{1};'.format( name, mask( type_, nbits ) )
+    for name, type_, nbits in memories:
+      print >> o, '    for ( unsigned int i = 0; i < {}__ndirty; i++ ) {{'.format( name )
+      print >> o, '      unsigned int addr = {}__dirty_list[ i ];'.format( name )
+      print >> o, '      {0}[ addr ] = {0}__next[ addr ]{1};'.format( name, mask( type_, nbits ) )
+      print >> o, '      {}__dirty[ addr ] = false;'.format( name )
+      print >> o, '    }'
+      print >> o, '    {}__ndirty = 0;'.format( name )
+    print   >> o, '  }'
+    print   >> o
 
-    # Update all registers
+    print   >> o, '  /* eval */'
+    print   >> o, '  void eval( {} * top ) {{'.format( iface )
+    print   >> o, '    set_inports( top );'
+    print   >> o, '    eval_comb();'
+    print   >> o, '    get_outports( top );'
+    print   >> o, '  }'
     print   >> o
-    print   >> o, '  /* Update all registers */'
-    for s in shadows:
-      print >> o, '  {0} = {0}_next;'.format( s )
 
-    # Update params from output ports
+    print   >> o, '  /* cycle */'
+    print   >> o, '  void cycle( {} * top ) {{'.format( iface )
+    print   >> o, '    set_inports( top );'
+    print   >> o, '    eval_comb();'
+    print   >> o, '    tick();'
+    print   >> o, '    eval_comb();'
+    print   >> o, '    get_outports( top );'
+    print   >> o, '  }'
     print   >> o
-    print   >> o, '  /* Assign all outputs */'
-    for name, _, _ in top_outports:
-      print >> o, '  top->{} = {};'.format( name[4:], name )
 
+    print   >> o, '  /* cycles */'
+    print   >> o, '  void cycles( {} * top, unsigned int n ) {{'.format( iface )
+    print   >> o, '    set_inports( top );'
+    print   >> o, '    eval_comb();'
+    print   >> o, '    for ( unsigned int i = 0; i < n; i++ ) {'
+    print   >> o, '      tick();'
+    print   >> o, '      eval_comb();'
+    print   >> o, '    }'
+    print   >> o, '    get_outports( top );'
+    print   >> o, '  }'
+    print   >> o
+    print   >> o, '};'
+    print   >> o
+
+    # Create the exposed functions, each forwarding to the given state
+
+    print   >> o, 'void * create_model() {'
+    print   >> o, '  return new {}();'.format( state )
+    print   >> o, '}'
+    print   >> o
+    print   >> o, 'void destroy_model( void * state ) {'
+    print   >> o, '  delete ({} *) state;'.format( state )
+    print   >> o, '}'
+    print   >> o
+    print   >> o, 'void eval( void * state, {} * top ) {{'.format( iface )
+    print   >> o, '  (({} *) state)->eval( top );'.format( state )
+    print   >> o, '}'
+    print   >> o
+    print   >> o, 'void cycle( void * state, {} * top ) {{'.format( iface )
+    print   >> o, '  (({} *) state)->cycle( top );'.format( state )
+    print   >> o, '}'
+    print   >> o
+    print   >> o, 'void cycles( void * state, {} * top, unsigned int n ) {{'.format( iface )
+    print   >> o, '  (({} *) state)->cycles( top, n );'.format( state )
+    print   >> o, '}'
+    print   >> o
+    print   >> o, 'unsigned int get_ncycles( void * state ) {'
+    print   >> o, '  return (({} *) state)->ncycles;'.format( state )
     print   >> o, '}'
     print   >> o
 
     # Create the cdef and Python wrapper
-    cdef        = gen_cdef( params, top_ports[2:] )
-    CSimWrapper = gen_pywrapper( top_inports, top_outports )
+    cdef        = gen_cdef( iface, top_inports + top_outports )
+    CSimWrapper = gen_pywrapper( iface, top_inports, top_outports )
 
     return cdef, CSimWrapper
 
+#-----------------------------------------------------------------------
+# iface_name
+#-----------------------------------------------------------------------
+def iface_name( model ):
+  return '{}_iface_t'.format( model.class_name )
+
+#-----------------------------------------------------------------------
+# state_name
+#-----------------------------------------------------------------------
+def state_name( model ):
+  return '{}_state_t'.format( model.class_name )
+
+#-----------------------------------------------------------------------
+# mask
+#-----------------------------------------------------------------------
+# Expression suffix truncating a value to nbits, empty if the C type is
+# exactly nbits wide.
+def mask( type_, nbits ):
+  if nbits is None or nbits == type_width( type_ ):
+    return ''
+  return ' & 0x{:x}{}'.format( (1 << nbits) - 1,
+                               'ULL' if type_width( type_ ) > 32 else '' )
+
+def type_width( type_ ):
+  return { 'bool'               :  1,
+           'unsigned int'       : 32,
+           'unsigned long long' : 64 }.get( type_ )
+
+#-----------------------------------------------------------------------
+# order_comb_blocks
+#-----------------------------------------------------------------------
+# Topologically sort the combinational blocks and slice connections of
+# the design so that each executes after everything writing a net it
+# reads. One pass through the sorted list then settles all
+# combinational logic.
+#
+# Dependencies are tracked per block, so two blocks each reading a net
+# written by the other (e.g., the val/rdy handshake of two chained
+# bypass queues) form a loop even if their nets do not. Such blocks
+# are grouped in a CombLoop, evaluated until the nets they write
+# settle.
+
+CombLoop = collections.namedtuple( 'CombLoop', 'blocks stores' )
+
+def order_comb_blocks( model, slices ):
+
+  def all_models( m ):
+    yield m
+    for subm in m.get_submodules():
+      for x in all_models( subm ):
+        yield x
+
+  blocks = [ func for m in all_models( model )
+                  for func in m.get_combinational_blocks() ]
+
+  loads  = {}
+  stores = {}
+  for func in blocks:
+    tree, _ = get_method_ast( func )
+    l, s    = DetectLoadsAndStores().enter( tree )
+    loads [ func ] = set( name_to_ids( func._model, l ) )
+    stores[ func ] = set( name_to_ids( func._model, s ) )
+
+  for x in slices:
+    loads [ x ] = x.loads
+    stores[ x ] = x.stores
+
+  blocks = blocks + slices
+
+  # Block dependencies through shared nets
+  writers = collections.defaultdict( set )
+  for func in blocks:
+    for x in stores[ func ]:
+      writers[ x ].add( func )
+
+  deps = {}
+  for func in blocks:
+    deps[ func ] = set( w for x in loads[ func ] for w in writers[ x ]
+                        if w is not func )
+
+  # Collapse the loops into single nodes
+  groups = strongly_connected( blocks, deps )
+  group  = {}
+  for g in groups:
+    for func in g:
+      group[ func ] = g
+  gdeps = {}
+  for g in groups:
+    gdeps[ g ] = set( group[ d ] for f in g for d in deps[ f ] ) - set([ g ])
+
+  # Kahn's algorithm, keeping declaration order between independent
+  # blocks so the generated source is deterministic
+  ordered = []
+  done    = set()
+  while len( done ) < len( groups ):
+    ready = [ g for g in groups if g not in done and gdeps[ g ] <= done ]
+    for g in ready:
+      if len( g ) == 1:
+        ordered.append( g[0] )
+      else:
+        ordered.append( CombLoop( g, frozenset( x for f in g
+                                               for x in stores[ f ] ) ) )
+    done.update( ready )
+
+  return ordered
+
+#-----------------------------------------------------------------------
+# strongly_connected
+#-----------------------------------------------------------------------
+# Tarjan's algorithm, iterative to handle long chains of blocks.
+# Returns the strongly connected components of the dependency graph as
+# tuples, in the order of their first node in nodes, each keeping the
+# order of nodes.
+def strongly_connected( nodes, deps ):
+
+  index    = {}
+  lowlink  = {}
+  stack    = []
+  on_stack = set()
+  comps    = []
+
+  for root in nodes:
+    if root in index:
+      continue
+    work = [ ( root, iter( deps[ root ] ) ) ]
+    index[ root ] = lowlink[ root ] = len( index )
+    stack.append( root )
+    on_stack.add( root )
+    while work:
+      node, children = work[-1]
+      for child in children:
+        if child not in index:
+          index[ child ] = lowlink[ child ] = len( index )
+          stack.append( child )
+          on_stack.add( child )
+          work.append( ( child, iter( deps[ child ] ) ) )
+          break
+        elif child in on_stack:
+          lowlink[ node ] = min( lowlink[ node ], index[ child ] )
+      else:
+        work.pop()
+        if work:
+          parent = work[-1][0]
+          lowlink[ parent ] = min( lowlink[ parent ], lowlink[ node ] )
+        if lowlink[ node ] == index[ node ]:
+          comp = set()
+          while True:
+            x = stack.pop()
+            on_stack.discard( x )
+            comp.add( x )
+            if x is node:
+              break
+          comps.append( comp )
+
+  order = dict( ( x, i ) for i, x in enumerate( nodes ) )
+  comps = [ tuple( sorted( c, key=order.get ) ) for c in comps ]
+  return sorted( comps, key=lambda c: order[ c[0] ] )
+
+def block_name( block ):
+  if isinstance( block, SliceAssignment ):
+    return block.stmt
+  return model_cname( block._model ) + '.' + block.func_name
+
+#-----------------------------------------------------------------------
+# translate_slices
+#-----------------------------------------------------------------------
+# Translate connections involving bit slices, which are not part of
+# any net, into assignments executed along with the combinational
+# blocks. Ids of the nets read and written are kept for ordering.
+
+SliceAssignment = collections.namedtuple( 'SliceAssignment',
+                                          'stmt loads stores' )
+
+def translate_slices( slice_connects ):
+
+  def bounds( addr, nbits ):
+    if addr is None:
+      return 0, nbits
+    if isinstance( addr, slice ):
+      return addr.start, addr.stop
+    return addr, addr + 1
+
+  slices = []
+  for c in sorted( slice_connects, key=lambda x: ( signal_cname( x.dest_node ),
+                                                   str( x.dest_slice ),
+                                                   signal_cname( x.src_node ) ) ):
+
+    src, dest = c.src_node, c.dest_node
+
+    if src.nbits > 64 or dest.nbits > 64:
+      raise CppTranslationError( "Signals wider than 64 bits are not supported!" )
+
+    src_lo,  src_hi  = bounds( c.src_slice,  src.nbits  )
+    dest_lo, dest_hi = bounds( c.dest_slice, dest.nbits )
+    field = ( 1 << ( src_hi - src_lo ) ) - 1
+
+    if isinstance( src, Constant ):
+      loads = set()
+      value = '0x{:x}ULL'.format( ( src._signalvalue >> src_lo ) & field )
+    else:
+      loads = set([ id( src._signalvalue ) ])
+      value = '(({} >> {}) & 0x{:x}ULL)'.format(
+                signal_cname( src ), src_lo, field )
+
+    target = signal_cname( dest )
+    if c.dest_slice is None:
+      stmt = '{} = {};'.format( target, value )
+    else:
+      stmt = '{0} = ({0} & ~(0x{1:x}ULL << {2})) | ({3} << {2});'.format(
+               target, field, dest_lo, value )
+
+    slices.append( SliceAssignment( stmt, frozenset( loads ),
+                                    frozenset([ id( dest._signalvalue ) ]) ) )
+
+  return slices
+
+#-----------------------------------------------------------------------
+# name_to_ids
+#-----------------------------------------------------------------------
+# Convert names collected from a block's AST into ids of the nets'
+# SignalValues, expanding lists of signals indexed inside the block.
+def name_to_ids( model, names ):
+  ids = []
+  for name in names:
+    if name.endswith( ('.value','.next') ):
+      name = name.rsplit( '.', 1 )[0]
+    obj = sim_utils._attr_name_to_object( model, name )
+    if   isinstance( obj, tuple ):
+      obj_list, list_name, attr = obj
+      ids.extend( name_to_ids( model, [ "{}[{}]{}".format( list_name, i, attr )
+                                        for i in range( len( obj_list ) ) ] ) )
+    elif isinstance( obj, SignalValue ):
+      ids.append( id( obj._target_bits ) )
+    elif isinstance( obj, MemoryArray ):
+      ids.append( id( obj ) )
+  return ids
 
 #-----------------------------------------------------------------------
 # declare_signals
@@ -164,51 +551,87 @@ def declare_signals( nets, ast_next, o ):
   for id_, n in enumerate( nets ):
 
     # each net is a set, convert it to a list
-    net   = list( n )
+    net   = sorted( n, key=signal_cname )
 
     # returns the type, if it is an object/class generate the C def
-    type_ = get_type( net[0].dtype(), o ) # TODO: add obj decl to extern
+    dtype = net[0].dtype()
+    type_ = get_type( dtype, o ) # TODO: add obj decl to extern
+    nbits = dtype.nbits if isinstance( dtype, Bits ) else None
+
+    # declare the net, nets connected to a constant start at its value
+    consts = [ x for x in net if isinstance( x, Constant ) ]
+    init   = consts[0]._signalvalue if consts else 0
 
-    # declare the net
     cname = 'net_{:05}'.format( id_ )
-    print   >>o, '{}  {} = 0;'.format( type_, cname);
+    print   >>o, '{}  {} = {};'.format( type_, cname, init );
 
     # create references for each signal connected to the net
     for signal in net:
 
-      name = mangle_name( signal.fullname )
+      if isinstance( signal, Constant ):
+        continue
+
+      name = signal_cname( signal )
       print >>o, '{} &{}      =  {};'      .format( type_, name, cname );
 
-      # only create "next" if this signal was written to in @tick
-      # NOTE: this will declare "net_next" twice if two different signals
+      # only create "next" if this signal was written to in @tick, the
+      # double underscore keeps it apart from signals named like x_next
+      # NOTE: this will declare "net__next" twice if two different signals
       #       attached to the net write next; this is okay because that is
       #       invalid code!
       sig = re.sub('\[[0-9]*\]', '', signal.name)
-      mod = mangle_idxs( signal.parent.name )
+      mod = model_cname( signal.parent )
       fullname = mod + '.' + sig
       if fullname in ast_next:
-        print >>o, '{}  {}_next = 0;'      .format( type_, cname );
-        print >>o, '{} &{}_next = {}_next;'.format( type_, name, cname );
-        shadows.append( name )
+        print >>o, '{}  {}__next = 0;'       .format( type_, cname );
+        print >>o, '{} &{}__next = {}__next;'.format( type_, name, cname );
+        shadows.append( (name, type_, nbits) )
 
-        all_ports.append( name+'_next' )
+        all_ports.append( name+'__next' )
       all_ports.append( name )
 
       # ports attached to top will be exposed in the CSim wrapper
-      # special case clock/reset, since they won't be exposed, want them
-      # to be known locations in the cycle(...) function call
-      if   name == 'top_clk':
-        clk_port   = (name, cname, type_)
-      elif name == 'top_reset':
-        reset_port = (name, cname, type_)
-      elif name.startswith('top'):
-        print >>o, '{} *   _{}      = &{};'.format( type_, name[4:], cname );
-        top_ports.append( (name, cname, type_) );
+      if name.startswith('top_') and name[4:] == mangle_name( signal.name ):
+        if   name == 'top_clk':
+          clk_port   = (name, cname, type_, nbits)
+        elif name == 'top_reset':
+          reset_port = (name, cname, type_, nbits)
+        else:
+          top_ports.append( (name, cname, type_, nbits) );
 
   top_ports = [clk_port, reset_port] + sorted(top_ports)
 
   return top_ports, all_ports, shadows
 
+#-----------------------------------------------------------------------
+# declare_memory
+#-----------------------------------------------------------------------
+# MemoryArrays are plain C arrays. Entries written with .next go to a
+# shadow array, and the entries written in a cycle are recorded so
+# that updating the memory on a clock edge only touches those. An entry
+# is copied to the shadow array when first written in a cycle, so that
+# writes to some of its bits keep the others.
+def declare_memory( name, mem, o ):
+  type_ = get_type( Bits( mem._entry.nbits ) )
+  print >> o, '{} {}[{}] = {{}};'.format( type_, name, len( mem ) )
+
+def declare_memory_next( name, mem, o ):
+  type_ = get_type( Bits( mem._entry.nbits ) )
+  n     = len( mem )
+  print >> o, '{} {}__next[{}];'                   .format( type_, name, n )
+  print >> o, 'bool {}__dirty[{}] = {{}};'          .format( name, n )
+  print >> o, 'unsigned int {}__dirty_list[{}];'    .format( name, n )
+  print >> o, 'unsigned int {}__ndirty = 0;'        .format( name )
+  print >> o, 'unsigned int {}__mark( unsigned int addr ) {{'.format( name )
+  print >> o, '  if ( !{}__dirty[ addr ] ) {{'      .format( name )
+  print >> o, '    {}__dirty[ addr ] = true;'       .format( name )
+  print >> o, '    {0}__dirty_list[ {0}__ndirty++ ] = addr;'.format( name )
+  print >> o, '    {0}__next[ addr ] = {0}[ addr ];'.format( name )
+  print >> o, '  }'
+  print >> o, '  return addr;'
+  print >> o, '}'
+  return name, type_, mem._entry.nbits
+
 #-----------------------------------------------------------------------
 # get_type
 #-----------------------------------------------------------------------
@@ -219,8 +642,13 @@ def get_type( signal, o=None ):
   elif isinstance( signal, int ):
     return 'unsigned int'
   elif isinstance( signal, Bits ):
-    assert not isinstance( signal, BitStruct )
-    return 'unsigned int'    # TODO: make a setbitwidth object
+    if isinstance( signal, BitStruct ):
+      raise CppTranslationError( "BitStruct signals are not supported!" )
+    if signal.nbits <= 32:
+      return 'unsigned int'
+    if signal.nbits <= 64:
+      return 'unsigned long long'
+    raise CppTranslationError( "Signals wider than 64 bits are not supported!" )
   elif isinstance( signal, SignalValueWrapper ):
     if not o:
       raise Exception( "NESTED TYPES NOT ALLOWED" )
@@ -233,7 +661,8 @@ def get_type( signal, o=None ):
   elif isinstance( signal, pclib.cl.queues.Queue ):
     return 'std::queue<'+ get_type( signal._kind )+ '>'
   else:
-    raise Exception( "UNTRANSLATABLE TYPE!")
+    raise CppTranslationError( "Untranslatable type: {}".format(
+                               type( signal ).__name__ ) )
     #print( "UNTRANSLATABLE TYPE!")
 
 #-----------------------------------------------------------------------
@@ -266,10 +695,16 @@ def translate_func( func, o, model=None ):
   if not model:
     model = func._model
 
+  # Reject what cannot be translated before generating any code, so
+  # that errors point at the PyMTL source instead of the C++ compiler
+  bound       = get_bound_names( tree )
+  local_names = get_local_names( tree )
+  CheckSupported( model, func, bound ).visit( tree )
+
   tree = RemoveCopy().visit( tree )
   tree = ReorderSubscriptNext().visit( tree )
   #print_simple_ast( tree )                         # DEBUG
-  InferTypes( model, func ).visit( tree )
+  InferTypes( model, func, bound ).visit( tree )
   #print_simple_ast( tree )                         # DEBUG
   #print src                                        # DEBUG
   #new_tree = TypeAST( model, func ).visit( tree )  # DEBUG
@@ -281,7 +716,7 @@ def translate_func( func, o, model=None ):
     print >> behavioral_code, "  // " + line
 
   # Print the Verilog translation
-  visitor = TranslateLogic( model, func, behavioral_code )
+  visitor = TranslateLogic( model, func, behavioral_code, local_names, bound )
   #visitor.visit( new_tree )
   visitor.visit( tree )
 
@@ -333,16 +768,47 @@ opmap = {
     ast.Or       : '||',
 }
 
+#-----------------------------------------------------------------------
+# const_ops
+#-----------------------------------------------------------------------
+# Operators folded when computing widths and bounds of slices.
+
+const_ops = {
+    ast.Add      : operator.add,
+    ast.Sub      : operator.sub,
+    ast.Mult     : operator.mul,
+    ast.FloorDiv : operator.floordiv,
+    ast.Div      : operator.floordiv,
+    ast.Mod      : operator.mod,
+    ast.LShift   : operator.lshift,
+    ast.RShift   : operator.rshift,
+    ast.BitOr    : operator.or_,
+    ast.BitAnd   : operator.and_,
+    ast.BitXor   : operator.xor,
+}
+
+#-----------------------------------------------------------------------
+# max_nbits
+#-----------------------------------------------------------------------
+# Widest of the given widths, ignoring unknown ones.
+def max_nbits( *nbits ):
+  known = [ x for x in nbits if x ]
+  return max( known ) if known else None
+
 #-----------------------------------------------------------------------
 # TranslateLogic
 #-----------------------------------------------------------------------
 class TranslateLogic( ast.NodeVisitor ):
 
 
-  def __init__( self, model, func, o ):
+  def __init__( self, model, func, o, local_names=(), bound=() ):
     self.model  = model
     self.func   = func
 
+    self.local_names = set( local_names )
+    self.local_nbits = {}
+    self.bound       = set( bound )
+
     self.o      = o
     self.ident  = 0
     self.elseif = False
@@ -377,15 +843,24 @@ class TranslateLogic( ast.NodeVisitor ):
       args  = []
 
     print >> self.o
-    print >> self.o, '  // logic for {}_{}()'.format( self.model.name, node.name )
+    print >> self.o, '  // logic for {}_{}()'.format( model_cname( self.model ), node.name )
     print >> self.o, '  {} {}_{}( {} ) {{'.format(
         rtype,
-        mangle_idxs(self.model.name),
+        model_cname( self.model ),
         node.name,
         ', '.join(args)
         )
     #print >> self.o, '    printf("EXECUTING {}_{}\\n");'.format(
     #                             self.model.name, node.name )
+
+    # Declare the temporaries of the block, sized like the values
+    # assigned to them, or as wide as possible if unknown
+    self.local_nbits = self.infer_local_nbits( node )
+    for name in sorted( self.local_names ):
+      nbits = self.local_nbits.get( name )
+      print >> self.o, '    {} {} = 0;'.format( get_type( Bits( nbits or 64 ) ),
+                                               name )
+
     # Visit each line in the function, translate one at a time.
     self.ident += 2
     for x in node.body:
@@ -399,13 +874,228 @@ class TranslateLogic( ast.NodeVisitor ):
   def visit_Assign(self, node):
     # TODO: implement multiple left hand targets?
     assert len(node.targets) == 1
+
+    # Writing .next of a MemoryArray itself fills every entry
+    target = getattr( node.targets[0], '_object', None )
+    if isinstance( target, MemoryArray ) and self._is_next( node.targets[0] ):
+      name = self._capture( node.targets[0] )[:-len('__next')]
+      print >> self.o, (self.ident+2)*" ",
+      print >> self.o, 'for ( unsigned int i = 0; i < {}; i++ )'.format( len( target ) )
+      print >> self.o, (self.ident+4)*" ",
+      print >> self.o, '{0}__next[ {0}__mark( i ) ] ='.format( name ),
+      self.visit( node.value )
+      print >> self.o, ';'
+      return
+
+    # Writing bits of a signal only replaces those bits
+    if isinstance( node.targets[0], _ast.Subscript ) and \
+       self._is_bits( node.targets[0].value ):
+      lo, field = self._field( node.targets[0] )
+      print >> self.o, (self.ident+2)*" ",
+      print >> self.o, '{0} = ({0} & ~({1} << ({2}))) | ' \
+                       '(((unsigned long long)({3}) & {1}) << ({2}));'.format(
+                         self._capture( node.targets[0].value ), field, lo,
+                         self._capture( node.value ) )
+      return
+
     #if debug:
     print >> self.o, (self.ident+2)*" ",
     self.visit( node.targets[0] )
     print >> self.o, "{}".format( self.assign ),
-    self.visit( node.value )
+
+    # Truncate values written to signals and temporaries narrower than
+    # their C type, register writes are truncated when the register is
+    # updated
+    if isinstance( target, Signal ):
+      target = Bits( target.nbits )
+    if isinstance( node.targets[0], _ast.Name ):
+      nbits  = self.local_nbits.get( node.targets[0].id )
+      target = Bits( nbits ) if nbits else None
+    if isinstance( target, Bits ) and not self._is_next( node.targets[0] ):
+      print >> self.o, '(',
+      self.visit( node.value )
+      print >> self.o, '){}'.format( mask( get_type( target ), target.nbits ) ),
+    else:
+      self.visit( node.value )
     print >> self.o, ';'
 
+  def _is_next( self, node ):
+    return isinstance( node, _ast.Attribute ) and node.attr in ('next','n')
+
+  # Signals, entries of memories and temporaries are indexed by bit,
+  # lists of signals and memories by element
+  def _is_bits( self, node ):
+    obj = getattr( node, '_object', None )
+    return not isinstance( obj, (list, MemoryArray) )
+
+  # Lowest bit and mask of the bits selected by a subscript
+  def _field( self, node ):
+    if isinstance( node.slice, _ast.Slice ):
+      lo    = self._capture( node.slice.lower )
+      nbits = self.slice_nbits( node.slice )
+      if nbits:
+        field = '0x{:x}ULL'.format( (1 << nbits) - 1 )
+      else:
+        field = '(~0ULL >> (64 - (({}) - ({}))))'.format(
+                  self._capture( node.slice.upper ), lo )
+      return lo, field
+    return self._capture( node.slice.value ), '1ULL'
+
+  # Translate a node to a string instead of the output
+  def _capture( self, node ):
+    stash  = self.o
+    self.o = StringIO.StringIO()
+    self.visit( node )
+    value  = self.o.getvalue().strip()
+    self.o = stash
+    return value
+
+  #---------------------------------------------------------------------
+  # lookup
+  #---------------------------------------------------------------------
+  # Value of a name the block closes over, or of a global of its module.
+  def lookup( self, name ):
+    closure = get_closure_dict( self.func )
+    if name in closure:
+      return closure[ name ]
+    return self.func.func_globals.get( name )
+
+  #---------------------------------------------------------------------
+  # const_value
+  #---------------------------------------------------------------------
+  # Value of an integer expression known at translation time, or None.
+  def const_value( self, node ):
+
+    if   isinstance( node, _ast.Num ):
+      return node.n
+
+    elif isinstance( node, _ast.Name ):
+      value = None if node.id in self.bound else self.lookup( node.id )
+
+    elif isinstance( node, _ast.Attribute ):
+      value = getattr( node, '_object', None )
+
+    elif isinstance( node, _ast.BinOp ) and type( node.op ) in const_ops:
+      left  = self.const_value( node.left  )
+      right = self.const_value( node.right )
+      if left is None or right is None:
+        return None
+      return const_ops[ type( node.op ) ]( left, right )
+
+    elif isinstance( node, _ast.UnaryOp ) and isinstance( node.op, _ast.USub ):
+      value = self.const_value( node.operand )
+      return None if value is None else -value
+
+    else:
+      return None
+
+    if isinstance( value, (int, long) ) and not isinstance( value, bool ):
+      return value
+    return None
+
+  #---------------------------------------------------------------------
+  # slice_nbits
+  #---------------------------------------------------------------------
+  # Width of a slice, either constant or of the form x[a:a+n].
+  def slice_nbits( self, node ):
+    lo = self.const_value( node.lower )
+    hi = self.const_value( node.upper )
+    if lo is not None and hi is not None:
+      return hi - lo
+    if isinstance( node.upper, _ast.BinOp ) and \
+       isinstance( node.upper.op, _ast.Add ) and \
+       ast.dump( node.upper.left ) == ast.dump( node.lower ):
+      return self.const_value( node.upper.right )
+    return None
+
+  #---------------------------------------------------------------------
+  # expr_nbits
+  #---------------------------------------------------------------------
+  # Width of the value of an expression following the Bits semantics of
+  # PyMTL, None for plain integers or if it cannot be inferred.
+  def expr_nbits( self, node ):
+
+    if   isinstance( node, _ast.Name ):
+      if node.id in self.local_nbits:
+        return self.local_nbits[ node.id ]
+      value = None if node.id in self.bound else self.lookup( node.id )
+      return value.nbits if isinstance( value, Bits ) else None
+
+    elif isinstance( node, _ast.Attribute ):
+      obj = getattr( node, '_object', None )
+      return obj.nbits if isinstance( obj, (Signal, Bits) ) else None
+
+    elif isinstance( node, _ast.Subscript ):
+      obj = getattr( node.value, '_object', None )
+      if   isinstance( obj, MemoryArray ):
+        return obj._entry.nbits
+      elif isinstance( obj, list ):
+        elem = getattr( node, '_object', None )
+        return elem.nbits if isinstance( elem, (Signal, Bits) ) else None
+      elif isinstance( node.slice, _ast.Slice ):
+        return self.slice_nbits( node.slice )
+      return 1
+
+    elif isinstance( node, _ast.BinOp ):
+      left = self.expr_nbits( node.left )
+      if isinstance( node.op, (_ast.LShift, _ast.RShift) ):
+        return left
+      return max_nbits( left, self.expr_nbits( node.right ) )
+
+    elif isinstance( node, _ast.BoolOp ):
+      return max_nbits( *[ self.expr_nbits( x ) for x in node.values ] )
+
+    elif isinstance( node, _ast.IfExp ):
+      return max_nbits( self.expr_nbits( node.body ),
+                        self.expr_nbits( node.orelse ) )
+
+    elif isinstance( node, _ast.Compare ):
+      return 1
+
+    elif isinstance( node, _ast.UnaryOp ):
+      if isinstance( node.op, _ast.Not ):
+        return 1
+      return self.expr_nbits( node.operand )
+
+    elif isinstance( node, _ast.Call ) and isinstance( node.func, _ast.Name ):
+      name = node.func.id
+      if   name in ( 'zext', 'sext' ):
+        return self.const_value( node.args[1] )
+      elif name == 'concat':
+        nbits = [ self.expr_nbits( x ) for x in node.args ]
+        return None if None in nbits else sum( nbits )
+      elif name in ( 'reduce_and', 'reduce_or', 'reduce_xor' ):
+        return 1
+
+    return None
+
+  #---------------------------------------------------------------------
+  # infer_local_nbits
+  #---------------------------------------------------------------------
+  # Width of each temporary, the widest of the values assigned to it.
+  # Plain integers do not constrain the width.
+  def infer_local_nbits( self, node ):
+
+    assigns = [ x for x in ast.walk( node )
+                if isinstance( x, (_ast.Assign, _ast.AugAssign) ) ]
+
+    nbits = self.local_nbits = {}
+    for x in sorted( assigns, key=lambda x: ( x.lineno, x.col_offset ) ):
+      targets = x.targets if isinstance( x, _ast.Assign ) else [ x.target ]
+      for target in targets:
+        if not isinstance( target, _ast.Name ) or \
+           target.id not in self.local_names:
+          continue
+        value = self.expr_nbits( x.value )
+        if value is None and isinstance( x.value, _ast.Num ):
+          continue
+        if target.id in nbits:
+          old   = nbits[ target.id ]
+          value = None if None in ( old, value ) else max( old, value )
+        nbits[ target.id ] = value
+
+    return nbits
+
   #---------------------------------------------------------------------
   # visit_AugAssign
   #---------------------------------------------------------------------
@@ -445,6 +1135,18 @@ class TranslateLogic( ast.NodeVisitor ):
   # visit_UnaryOp
   #---------------------------------------------------------------------
   def visit_UnaryOp(self, node):
+
+    # Inverting or negating a value narrower than its C type sets the
+    # unused upper bits, mask them so the result is also correct in
+    # conditions. The operand may be wider than its own width (e.g., a
+    # slice of a 64-bit signal), so the mask assumes the widest type.
+    nbits = self.expr_nbits( node.operand )
+    if isinstance( node.op, (_ast.Invert, _ast.USub) ) and nbits:
+      print >> self.o, '(', opmap[type(node.op)],
+      self.visit(node.operand)
+      print >> self.o, '{} )'.format( mask( 'unsigned long long', nbits ) ),
+      return
+
     print >> self.o, opmap[type(node.op)],
     self.visit(node.operand)
 
@@ -453,12 +1155,13 @@ class TranslateLogic( ast.NodeVisitor ):
   #---------------------------------------------------------------------
   # Ternary operators (w = x if y else z).
   def visit_IfExp(self, node):
-    # TODO: verify this works
+    print >> self.o, '(',
     self.visit(node.test)
     print >> self.o, '?',
     self.visit(node.body)
     print >> self.o, ':',
     self.visit(node.orelse)
+    print >> self.o, ')',
 
   #---------------------------------------------------------------------
   # visit_Compare
@@ -496,12 +1199,20 @@ class TranslateLogic( ast.NodeVisitor ):
       #TypeAST( self.model, self.func ).visit( node )
       self.localvars[name] = node._object
 
-    print >> self.o, name.replace('.','_'),
+    print >> self.o, cpp_name( name ),
 
   #---------------------------------------------------------------------
   # visit_Name
   #---------------------------------------------------------------------
   def visit_Name( self, node ):
+
+    # Integer constants closed over by the block, e.g. parameters, or
+    # globals of its module
+    value = None if node.id in self.bound else self.lookup( node.id )
+    if isinstance( value, (int, long, Bits) ) and not isinstance( value, bool ):
+      print >> self.o, int( value ),
+      return
+
     name = VariableName( self ).visit( node ).replace('.', '_')
 
     print >> self.o, name,
@@ -510,6 +1221,30 @@ class TranslateLogic( ast.NodeVisitor ):
   # visit_Subscript
   #---------------------------------------------------------------------
   def visit_Subscript( self, node ):
+
+    # MemoryArray entries are stored directly in a C array, entries
+    # written with .next are marked for the register update
+    if isinstance( getattr( node.value, '_object', None ), MemoryArray ):
+      name = self._capture( node.value )
+      if self._is_next( node.value ):
+        name = name[:-len('__next')]
+        print >> self.o, '{0}__next[ {0}__mark('.format( name ),
+        self.visit( node.slice )
+        print >> self.o, ') ]',
+      else:
+        print >> self.o, '{}['.format( name ),
+        self.visit( node.slice )
+        print >> self.o, ']',
+      return
+
+    # Bits of a value are extracted with a shift and a mask, like the
+    # slice connections
+    if self._is_bits( node.value ):
+      lo, field = self._field( node )
+      print >> self.o, '(({} >> ({})) & {})'.format(
+                         self._capture( node.value ), lo, field ),
+      return
+
     print >> self.o, '(*',
     self.visit( node.value )
     print >> self.o, '[',
@@ -633,7 +1368,7 @@ class TranslateLogic( ast.NodeVisitor ):
   def visit_For(self, node):
 
     #try:
-      if node.iter.func.id != 'range':
+      if node.iter.func.id not in ( 'range', 'xrange' ):
         raise AttributeError()
 
       args    = node.iter.args
@@ -718,7 +1453,7 @@ class TranslateLogic( ast.NodeVisitor ):
   def visit_Assert(self, node):
     print >> self.o, self.ident*' ' + '  assert(',
     self.visit( node.test )
-    print >> self.o, ')',
+    print >> self.o, ');'
 
   #---------------------------------------------------------------------
   # visit_Return
@@ -738,6 +1473,49 @@ class TranslateLogic( ast.NodeVisitor ):
     if   isinstance( node.func, _ast.Name ):
       if   node.func.id == 'zext':
         self.visit( node.args[0] )
+      elif node.func.id == 'sext':
+        nbits = self.expr_nbits( node.args[0] )
+        if not nbits:
+          raise translation_error( self.model, self.func, node,
+                                   'Cannot infer the width of the value '
+                                   'passed to sext()' )
+        sign  = 1 << ( nbits - 1 )
+        field = ( 1 << self.const_value( node.args[1] ) ) - 1
+        print >> self.o, '((((unsigned long long)(',
+        self.visit( node.args[0] )
+        print >> self.o, ') ^ 0x{0:x}ULL) - 0x{0:x}ULL) & 0x{1:x}ULL)'.format(
+                           sign, field ),
+      elif node.func.id == 'concat':
+        nbits = [ self.expr_nbits( x ) for x in node.args ]
+        if None in nbits:
+          raise translation_error( self.model, self.func, node,
+                                   'Cannot infer the width of the values '
+                                   'passed to concat()' )
+        # The first value is the most significant
+        parts  = []
+        offset = sum( nbits )
+        for x, n in zip( node.args, nbits ):
+          offset -= n
+          parts.append( '((unsigned long long)({}) << {})'.format(
+                          self._capture( x ), offset ) )
+        print >> self.o, '(' + ' | '.join( parts ) + ')',
+      elif node.func.id == 'reduce_and':
+        nbits = self.expr_nbits( node.args[0] )
+        if not nbits:
+          raise translation_error( self.model, self.func, node,
+                                   'Cannot infer the width of the value '
+                                   'passed to reduce_and()' )
+        print >> self.o, '((',
+        self.visit( node.args[0] )
+        print >> self.o, ') == 0x{:x}ULL)'.format( (1 << nbits) - 1 ),
+      elif node.func.id == 'reduce_or':
+        print >> self.o, '((',
+        self.visit( node.args[0] )
+        print >> self.o, ') != 0)',
+      elif node.func.id == 'reduce_xor':
+        print >> self.o, '__builtin_parityll(',
+        self.visit( node.args[0] )
+        print >> self.o, ')',
       elif node.func.id == 'hex':
         self.visit( node.args[0] )
       elif node.func.id == 'len':
@@ -753,7 +1531,7 @@ class TranslateLogic( ast.NodeVisitor ):
       if hasattr( self.model, node.func.attr ):
         self.funcs.add( getattr( self.model, node.func.attr ) )
         fname = node.func.attr
-        print >> self.o, "{}_{}(".format( mangle_idxs(self.model.name),
+        print >> self.o, "{}_{}(".format( model_cname( self.model ),
                                           fname ),
         for i, arg in enumerate( node.args ):
           if i != 0: print >> self.o, ",",
@@ -775,7 +1553,7 @@ class TranslateLogic( ast.NodeVisitor ):
         print >> self.o, ")",
       # Queue
       elif node.func.attr == 'is_full':
-        maxlen = node.func.value._object.data.maxlen
+        maxlen = node.func.value._object.size
         print >> self.o, ".size() == {}".format(maxlen),
       elif node.func.attr == 'is_empty':
         print >> self.o, ".empty()",
@@ -803,6 +1581,17 @@ class TranslateLogic( ast.NodeVisitor ):
       raise Exception('Attempting to call a non-name! {}\n'
                       .format(node.func))
 
+  #---------------------------------------------------------------------
+  # visit_Expr
+  #---------------------------------------------------------------------
+  # Calls whose value is unused, docstrings are skipped.
+  def visit_Expr( self, node ):
+    if isinstance( node.value, _ast.Str ):
+      return
+    print >> self.o, (self.ident+2)*" ",
+    self.visit( node.value )
+    print >> self.o, ';'
+
   #---------------------------------------------------------------------
   # visit_Print
   #---------------------------------------------------------------------
@@ -819,7 +1608,10 @@ class VariableName( ast.NodeVisitor ):
     self.parent = parent
     self.model  = self.parent.model
 
+  # Signals of submodules are named after the path of the submodule
   def visit_Attribute( self, node ):
+    if isinstance( getattr( node, '_object', None ), Model ):
+      return model_cname( node._object )
     return self.visit( node.value ) + '.' + node.attr
 
   def visit_Subscript( self, node ):
@@ -832,11 +1624,11 @@ class VariableName( ast.NodeVisitor ):
     return val
 
   def visit_Self( self, node ):
-    return self.model.name
+    return model_cname( self.model )
 
   def visit_Name( self, node ):
     if node.id in ['s', 'self']:
-      return self.model.name
+      return model_cname( self.model )
     else:
       return node.id
 
@@ -861,18 +1653,23 @@ class ReorderSubscriptNext( ast.NodeTransformer ):
     else:
       kwargs = None
 
-    return _ast.Call(func=node.func,
-                     args=args,
-                     keyword=keywords,
-                     starargs=starargs,
-                     kwargs=kwargs)
+    return ast.copy_location( _ast.Call(func=node.func,
+                                        args=args,
+                                        keyword=keywords,
+                                        starargs=starargs,
+                                        kwargs=kwargs), node )
 
+  # Move the attribute below all the subscripts, so that in
+  # s.mem[addr][0:8].next the .next applies to s.mem
   def visit_Attribute( self, node ):
     self.generic_visit( node )
     if isinstance(node.value, _ast.Subscript):
-      subscript       = node.value
-      node.value      = subscript.value
-      subscript.value = node
+      subscript = node.value
+      inner     = subscript
+      while isinstance( inner.value, _ast.Subscript ):
+        inner = inner.value
+      node.value  = inner.value
+      inner.value = node
       return ast.copy_location( subscript, node )
 
     return node
@@ -885,14 +1682,137 @@ class RemoveCopy( ast.NodeTransformer ):
       return ast.copy_location( node.args[0], node )
     return node
 
+#-----------------------------------------------------------------------
+# CheckSupported
+#-----------------------------------------------------------------------
+# Raise a CppTranslationError pointing at the first construct of a block
+# which the translation does not support.
+class CheckSupported( ast.NodeVisitor ):
+
+  nodes = ( _ast.Module, _ast.FunctionDef, _ast.arguments,
+            _ast.Assign, _ast.AugAssign, _ast.Expr, _ast.If, _ast.For,
+            _ast.While, _ast.Break, _ast.Pass, _ast.Assert, _ast.Return,
+            _ast.Print, _ast.BinOp, _ast.BoolOp, _ast.UnaryOp, _ast.IfExp,
+            _ast.Compare, _ast.Attribute, _ast.Name, _ast.Subscript,
+            _ast.Index, _ast.Slice, _ast.Num, _ast.Call,
+            _ast.expr_context, _ast.operator, _ast.unaryop, _ast.cmpop,
+            _ast.boolop )
+
+  functions = ( 'zext', 'sext', 'concat', 'reduce_and', 'reduce_or',
+                'reduce_xor', 'hex', 'len', 'copy' )
+
+  methods   = ( 'uint', 'popleft', 'append', 'is_full', 'is_empty', 'peek',
+                'deq', 'enq' )
+
+  def __init__( self, model, func, bound ):
+    self.model = model
+    self.func  = func
+    self.names = set( bound ) | set( get_closure_dict( func ) ) | \
+                 set( func.func_globals ) | set([ 's', 'self', 'True', 'False' ])
+
+  def error( self, node, message ):
+    raise translation_error( self.model, self.func, node, message )
+
+  def generic_visit( self, node ):
+    if not isinstance( node, self.nodes ):
+      self.error( node, '{} is not supported'.format( type( node ).__name__ ) )
+    super( CheckSupported, self ).generic_visit( node )
+
+  def visit_FunctionDef( self, node ):
+    for x in node.args.defaults + node.body:
+      self.visit( x )
+
+  def visit_Expr( self, node ):
+    if isinstance( node.value, _ast.Str ):
+      return
+    if not isinstance( node.value, _ast.Call ):
+      self.error( node, 'Expressions can only be used as statements if '
+                        'they are calls' )
+    self.generic_visit( node )
+
+  def visit_Assign( self, node ):
+    targets = (_ast.Name, _ast.Attribute, _ast.Subscript)
+    if len( node.targets ) != 1 or not isinstance( node.targets[0], targets ):
+      self.error( node, 'Assignments can only have one item on the '
+                        'left-hand side' )
+    self.generic_visit( node )
+
+  def visit_AugAssign( self, node ):
+    if not isinstance( node.target, (_ast.Name, _ast.Attribute) ):
+      self.error( node, 'Augmented assignments to bits or list elements '
+                        'are not supported' )
+    self.generic_visit( node )
+
+  def visit_BinOp( self, node ):
+    if isinstance( node.op, _ast.Pow ):
+      self.error( node, 'The ** operator is not supported' )
+    self.generic_visit( node )
+
+  def visit_Compare( self, node ):
+    if len( node.ops ) != 1:
+      self.error( node, 'Chained comparisons are not supported' )
+    if type( node.ops[0] ) not in opmap:
+      self.error( node, 'The {} operator is not supported'.format(
+                          type( node.ops[0] ).__name__ ) )
+    self.generic_visit( node )
+
+  def visit_For( self, node ):
+    if not ( isinstance( node.iter, _ast.Call ) and
+             isinstance( node.iter.func, _ast.Name ) and
+             node.iter.func.id in ( 'range', 'xrange' ) and
+             1 <= len( node.iter.args ) <= 3 and
+             isinstance( node.target, _ast.Name ) ):
+      self.error( node, 'For loops can only iterate over range()' )
+    if node.orelse:
+      self.error( node, 'Else clauses of loops are not supported' )
+    for x in node.iter.args + node.body:
+      self.visit( x )
+
+  def visit_While( self, node ):
+    if node.orelse:
+      self.error( node, 'Else clauses of loops are not supported' )
+    self.generic_visit( node )
+
+  def visit_Assert( self, node ):
+    self.visit( node.test )
+
+  def visit_Subscript( self, node ):
+    if isinstance( node.slice, _ast.Slice ) and \
+       ( node.slice.lower is None or node.slice.upper is None or
+         node.slice.step  is not None ):
+      self.error( node, 'Slices must have a lower and an upper bound, and '
+                        'no step' )
+    self.generic_visit( node )
+
+  def visit_Call( self, node ):
+    if node.keywords or node.starargs or node.kwargs:
+      self.error( node, 'Keyword and variable arguments are not supported' )
+    func = node.func
+    if isinstance( func, _ast.Name ):
+      if func.id not in self.functions:
+        self.error( node, 'Unsupported free function: {}'.format( func.id ) )
+    elif isinstance( func, _ast.Attribute ):
+      if not ( hasattr( self.model, func.attr ) or func.attr in self.methods ):
+        self.error( node, 'Unsupported method: {}'.format( func.attr ) )
+      self.visit( func.value )
+    else:
+      self.error( node, 'Only functions and methods can be called' )
+    for x in node.args:
+      self.visit( x )
+
+  def visit_Name( self, node ):
+    if node.id not in self.names:
+      self.error( node, 'Unknown name: {}'.format( node.id ) )
+
 #-----------------------------------------------------------------------
 # InferTypes
 #-----------------------------------------------------------------------
 class InferTypes( ast.NodeVisitor ):
 
-  def __init__( self, model, func ):
+  def __init__( self, model, func, bound=() ):
     self.model       = model
     self.func        = func
+    self.bound       = set( bound )
     self.closed_vars = get_closure_dict( func )
     self.current_obj = None
     if not self.closed_vars:
@@ -932,7 +1852,8 @@ class InferTypes( ast.NodeVisitor ):
       new_node = node
       new_obj  = PyObj( node.id, self.closed_vars[ node.id ] )
     else:
-      print "WARNING: variable {} type is unknown".format( node.id )
+      if node.id not in self.bound | set([ 'range', 'xrange' ]):
+        print "WARNING: variable {} type is unknown".format( node.id )
       new_obj  = None
 
     self.current_obj = new_obj
@@ -956,6 +1877,42 @@ class PyObj( object ):
   def __repr__( self ):
     return "PyObj( name={} inst={} )".format( self.name, type(self.inst) )
 
+#-----------------------------------------------------------------------
+# get_bound_names
+#-----------------------------------------------------------------------
+# Names assigned in a block, including loop variables and arguments.
+def get_bound_names( tree ):
+  return set( x.id for x in ast.walk( tree ) if isinstance( x, _ast.Name )
+              and isinstance( x.ctx, (_ast.Store, _ast.Param) ) )
+
+#-----------------------------------------------------------------------
+# get_local_names
+#-----------------------------------------------------------------------
+# Temporaries of a block, which are declared at the top of the block.
+def get_local_names( tree ):
+  loops = set( x.target.id for x in ast.walk( tree )
+               if isinstance( x, _ast.For ) and
+                  isinstance( x.target, _ast.Name ) )
+  return set( x.id for x in ast.walk( tree ) if isinstance( x, _ast.Name )
+              and isinstance( x.ctx, _ast.Store ) ) - loops
+
+#-----------------------------------------------------------------------
+# translation_error
+#-----------------------------------------------------------------------
+# Create a CppTranslationError for the given node of a block, with the
+# location of the node in the source of the model.
+def translation_error( model, func, node, message ):
+  lines, start = inspect.getsourcelines( func )
+  lineno       = getattr( node, 'lineno', 1 )
+  return CppTranslationError(
+    'Cannot translate {}.{}() to C++!\n'
+    'File "{}", line {}:\n'
+    '  {}\n'
+    '{}'.format( type( model ).__name__, func.__name__,
+                 inspect.getsourcefile( func ), start + lineno - 1,
+                 lines[ lineno - 1 ].strip(), message )
+  )
+
 #----------------------------------------------------------------------
 # get_closure_dict
 #----------------------------------------------------------------------
@@ -976,6 +1933,39 @@ def mangle_idxs( name ):
   # Return the mangled name
   return re.sub( indexing, replacement_string, name )
 
+#-----------------------------------------------------------------------
+# model_cname
+#-----------------------------------------------------------------------
+# Prefix of the C++ names of the signals and blocks of a model: its
+# path from the toplevel model, so that submodules with the same name
+# in different parents do not clash. Levels are separated by a double
+# underscore, since a single one separates the model from its signals
+# (e.g., top__dpath_bypass_mux_sel vs. top__dpath__bypass_mux_sel).
+def model_cname( model ):
+  names = []
+  while model is not None:
+    names.append( mangle_idxs( model.name ) )
+    model = model.parent
+  return '__'.join( reversed( names ) )
+
+#-----------------------------------------------------------------------
+# signal_cname
+#-----------------------------------------------------------------------
+def signal_cname( signal ):
+  if isinstance( signal, Constant ):
+    return mangle_name( signal.fullname )
+  return model_cname( signal.parent ) + '_' + mangle_name( signal.name )
+
+#-----------------------------------------------------------------------
+# cpp_name
+#-----------------------------------------------------------------------
+# C++ name of a signal accessed in a block, values written with .next
+# go to the shadow of the signal (see declare_signals).
+def cpp_name( name ):
+  if name.endswith( '.next' ):
+    return name[:-5].replace( '.', '_' ) + '__next'
+  return name.replace( '.', '_' )
+
 #-----------------------------------------------------------------------
 # mangle_name
 #-----------------------------------------------------------------------
@@ -4,6 +4,8 @@
 
 from __future__ import print_function
 
+import os
+
 from pymtl                import *
 from ...model.signal_lists import PortList
 from cffi                 import FFI
@@ -26,35 +28,42 @@ def gen_cppsim( clib, cdef ):
 # gen_cdef
 #-----------------------------------------------------------------------
 # Create the string passed into ffi.cdef
-def gen_cdef( cycle_params, top_ports ):
+def gen_cdef( iface, top_ports ):
   str_    = '\n'
 
   str_   += 'typedef struct {\n'
-  for name, net, type_ in top_ports:
+  for name, net, type_, _ in top_ports:
     str_ += '  {} {};  // {}\n'.format( type_, name[4:], net )
-  str_   += '} iface_t;\n\n'
-
-  str_   += 'void cycle({});\n\n'.format('\n'+cycle_params+'\n')
-
-  str_   += 'unsigned int  ncycles;\n'
+  str_   += '}} {};\n\n'.format( iface )
+
+  str_   += 'void * create_model();\n'
+  str_   += 'void destroy_model( void * state );\n'
+  str_   += 'void eval( void * state, {} * top );\n'.format( iface )
+  str_   += 'void cycle( void * state, {} * top );\n'.format( iface )
+  str_   += 'void cycles( void * state, {} * top, unsigned int n );\n'.format( iface )
+  str_   += 'unsigned int get_ncycles( void * state );\n'
   return str_
 
 #-----------------------------------------------------------------------
 # gen_cheader
 #-----------------------------------------------------------------------
 # Create the header for the simulator
-def gen_cheader( cycle_params, top_ports ):
+def gen_cheader( iface, top_ports ):
   str_    = '\n'
 
   str_   += 'extern "C" {\n'
 
   str_   += '  typedef struct {\n'
-  for name, net, type_ in top_ports:
+  for name, net, type_, _ in top_ports:
     str_ += '    {} {};  // {}\n'.format( type_, name[4:], net )
-  str_   += '  } iface_t;\n\n'
+  str_   += '  }} {};\n\n'.format( iface )
 
-  str_   += '  extern void cycle({}  );\n'.format('\n'+cycle_params+'\n')
-  str_   += '  extern unsigned int ncycles;\n'
+  str_   += '  extern void * create_model();\n'
+  str_   += '  extern void destroy_model( void * state );\n'
+  str_   += '  extern void eval( void * state, {} * top );\n'.format( iface )
+  str_   += '  extern void cycle( void * state, {} * top );\n'.format( iface )
+  str_   += '  extern void cycles( void * state, {} * top, unsigned int n );\n'.format( iface )
+  str_   += '  extern unsigned int get_ncycles( void * state );\n'
 
   str_   += '};\n'
   return str_
@@ -63,7 +72,7 @@ def gen_cheader( cycle_params, top_ports ):
 # gen_pywrapper
 #-----------------------------------------------------------------------
 # Create the header for the simulator
-def gen_pywrapper( top_inports, top_outports ):
+def gen_pywrapper( iface, top_inports, top_outports ):
 
   def name_splitter( name ):
     sig, idx = name.split('_IDX')
@@ -86,7 +95,9 @@ def gen_pywrapper( top_inports, top_outports ):
       #self._model    = model
       self._cmodule  = cmodule
       self._ffi      = ffi
-      self._top      = ffi.new("iface_t *")
+      self._top      = ffi.new( iface + " *" )
+      self._state    = ffi.gc( cmodule.create_model(),
+                               cmodule.destroy_model )
 
       #-----------------------------------------------------------------
       # CSimWrapper
@@ -119,7 +130,7 @@ def gen_pywrapper( top_inports, top_outports ):
         return lambda self, value : setattr( top[0], name, value )
 
       # Add properties for all cffi exposed toplevel ports
-      for fullname, net, type_ in top_inports[2:] + top_outports:
+      for fullname, net, type_, _ in top_inports + top_outports:
 
         name = fullname[4:]
 
@@ -140,15 +151,23 @@ def gen_pywrapper( top_inports, top_outports ):
           setattr(self.__class__, name, property(fget, fset) )
 
     def reset( self ):
-      self.cycle( reset=1 )
-      self.cycle( reset=1 )
+      self._top.reset = 1
+      self.cycle()
+      self.cycle()
+      self._top.reset = 0
+
+    def eval( self ):
+      self._cmodule.eval( self._state, self._top )
+
+    def cycle( self ):
+      self._cmodule.cycle( self._state, self._top )
 
-    def cycle( self, clk=0, reset=0 ):
-      self._cmodule.cycle( clk, reset, self._top )
+    def cycles( self, n ):
+      self._cmodule.cycles( self._state, self._top, n )
 
     @property
     def ncycles( self ):
-      return self._cmodule.ncycles
+      return self._cmodule.get_ncycles( self._state )
 
   return CSimWrapper
 
@@ -157,53 +176,64 @@ def gen_pywrapper( top_inports, top_outports ):
 #-----------------------------------------------------------------------
 def create_cpp_py_wrapper( model, cdef, lib_file, wrapper_filename ):
 
-  template_dir      = os.path.dirname( os.path.abspath( __file__ ) )
-  template_filename = template_dir + os.path.sep + 'cpp_wrapper.templ.py'
-
   # translate pymtl      to cpp, cdef
   # compile   cpp        to so
   # create    so,cdef    w  cffi
   # create    pymtl_wrap w  pymtl_cppnames
 
-  port_defs   = []
-  set_inputs  = []
-  set_outputs = []
-
-  for x in model.get_ports( preserve_hierarchy=True ):
-    recurse_port_hierarchy( x, port_defs )
+  set_inputs = []
+  set_comb   = []
+  set_next   = []
 
   for x in model.get_inports():
-    if x.name in ['clk', 'reset']: continue  # TODO: remove me!
-    decl    = "lambda: setattr( s._top, '{}', s.{}.uint() )" \
-              .format( x.cpp_name[4:], x.name )
-    call    = "s._cffi_update[ s.{} ] = {}".format( x.name, decl )
-    set_inputs.append( call )
+    if x.name == 'clk': continue
+    set_inputs.append( "s._top.{} = s.{}".format( x.cpp_name[4:], x.name ) )
 
   for x in model.get_outports():
-    decl = "s.{}.value = s._top.{}".format( x.name, x.cpp_name[4:] )
-    set_outputs.append( decl )
+    set_comb.append( "s.{}.value = s._top.{}".format( x.name, x.cpp_name[4:] ) )
+    set_next.append( "s.{}.next  = s._top.{}".format( x.name, x.cpp_name[4:] ) )
 
   # pretty printing
   indent_four = '\n    '
   indent_six  = '\n      '
 
   # create source
-  with open( template_filename, 'r' ) as template, \
+  with open( get_cpp_py_template(), 'r' ) as template, \
        open( wrapper_filename,  'w' ) as output:
 
     py_src = template.read()
     py_src = py_src.format(
         model_name  = model.class_name,
+        iface       = '{}_iface_t'.format( model.class_name ),
         cdef        = cdef,
         lib_file    = lib_file,
-        port_defs   = indent_four.join( port_defs ),
-        set_inputs  = indent_four.join( set_inputs ),
-        set_outputs = indent_six .join( set_outputs ),
+        port_defs   = indent_four.join( get_port_defs( model ) ),
+        set_inputs  = indent_six .join( set_inputs ),
+        set_comb    = indent_six .join( set_comb ),
+        set_next    = indent_six .join( set_next ),
+        cycles_outputs = indent_four.join( set_comb ),
     )
 
     output.write( py_src )
     #print( py_src )
 
+#-----------------------------------------------------------------------
+# get_cpp_py_template
+#-----------------------------------------------------------------------
+def get_cpp_py_template():
+  template_dir = os.path.dirname( os.path.abspath( __file__ ) )
+  return template_dir + os.path.sep + 'cpp_wrapper.templ.py'
+
+#-----------------------------------------------------------------------
+# get_port_defs
+#-----------------------------------------------------------------------
+# Python statements recreating the port interface of a model.
+def get_port_defs( model ):
+  port_defs = []
+  for x in model.get_ports( preserve_hierarchy=True ):
+    recurse_port_hierarchy( x, port_defs )
+  return port_defs
+
 #-----------------------------------------------------------------------
 # recurse_port_hierarchy
 #-----------------------------------------------------------------------
@@ -5,37 +5,68 @@
 from cpp         import CLogicTransl as translate
 from cpp         import compiler
 from cpp_helpers import gen_cppsim, create_cpp_py_wrapper
+from cpp_helpers import get_cpp_py_template, get_port_defs
 from subprocess  import check_output, STDOUT, CalledProcessError
 
 import os
 import sys
-import filecmp
+import hashlib
+import StringIO
 
 #-----------------------------------------------------------------------
 # get_cpp
 #-----------------------------------------------------------------------
-def get_cpp( model_inst ):
+# Translates a model to C++, compiles it, and returns an instance of the
+# generated PyMTL wrapper. The library and wrapper names include a hash
+# of everything they are generated from, so an existing build is reused
+# whenever the translation is unchanged, and a changed model never picks
+# up a stale module previously imported in the same process. All
+# generated files are written to build_dir, which defaults to the
+# current working directory. Blocks using constructs the translation
+# does not support raise a CppTranslationError before anything is
+# written or compiled.
+def get_cpp( model_inst, build_dir=None ):
+
+  if build_dir is None:
+    build_dir = os.getcwd()
+  build_dir = os.path.abspath( build_dir )
 
   model_inst.elaborate()
 
-  # Translate the PyMTL module to cpp, if we've already done
-  # translation check if there's been any changes to the source
-  model_name   = model_inst.class_name
-  source_file  = model_name + '.cpp'
-  temp_file    = model_name + '.cpp.tmp'
-  wrapper_file = model_name + '_cpp.py'
-  lib_file     = 'lib{}_cpp.so'.format( model_name )
+  # Translate the PyMTL module to cpp
+  model_name = model_inst.class_name
+
+  buf  = StringIO.StringIO()
+  cdef, _ = translate( model_inst, buf )
+  source  = buf.getvalue()
+
+  with open( get_cpp_py_template() ) as template:
+    digest = hashlib.md5()
+    digest.update( source )
+    digest.update( compiler )
+    digest.update( template.read() )
+    digest.update( '\n'.join( get_port_defs( model_inst ) ) )
+    digest = digest.hexdigest()[:16]
+
+  source_file  = '{}_{}.cpp'.format( model_name, digest )
+  wrapper_file = '{}_{}_cpp.py'.format( model_name, digest )
+  lib_file     = 'lib{}_{}_cpp.so'.format( model_name, digest )
 
-  # Write the output to a temporary file
-  cdef = None
-  with open( temp_file, 'w+' ) as fd:
-    cdef, _ = translate( model_inst, fd )
+  build_path = lambda x: os.path.join( build_dir, x )
+
+  # Compile the module only if this translation has not been built yet
+  cached = ( os.path.exists( build_path( lib_file ) ) and
+             os.path.exists( build_path( wrapper_file ) ) )
+
+  if not cached:
+
+    with open( build_path( source_file ), 'w' ) as fd:
+      fd.write( source )
 
-  def do_work():
     cmd  = compiler.format( libname = lib_file,
                             csource = source_file )
     try:
-      result = check_output( cmd.split() , stderr=STDOUT )
+      result = check_output( cmd.split(), stderr=STDOUT, cwd=build_dir )
     except CalledProcessError as e:
       raise Exception( 'Module did not compile!\n\n'
                        'Command:\n' + ' '.join(e.cmd) + '\n\n'
@@ -43,27 +74,12 @@ def get_cpp( model_inst ):
                       )
     #csim, ffi = gen_cppsim ( lib_file, cdef )
     #sim       = CSimWrapper( csim, ffi )
-    create_cpp_py_wrapper( model_inst, cdef, lib_file, wrapper_file )
-
-  # Check if the temporary file matches an existing file (caching)
-  cached = False
-  # TODO: fix caching
-  #if os.path.exists( source_file ):
-  #  cached = filecmp.cmp( temp_file, source_file )
-  #  if not cached:
-  #    os.system( ' diff -y %s %s'%( temp_file, source_file ))
-
-  # Rename temp to actual output
-  os.rename( temp_file, source_file )
+    create_cpp_py_wrapper( model_inst, cdef, lib_file,
+                           build_path( wrapper_file ) )
 
-  # Compile the module only if we've updated the verilog source
-  if not cached:
-    print "NOT CACHED", source_file
-    # verilog_to_pymtl( model_inst, source_file )
-    do_work()
-
-  # Use some trickery to import the verilated version of the model
-  sys.path.append( os.getcwd() )
+  # Use some trickery to import the generated wrapper of the model
+  if build_dir not in sys.path:
+    sys.path.append( build_dir )
   __import__( wrapper_file[:-3] )
   imported_module = sys.modules[ wrapper_file[:-3] ]
 
@@ -72,4 +88,3 @@ def get_cpp( model_inst ):
   model_inst = model_class()
 
   return model_inst
-
@@ -0,0 +1,300 @@
+#=======================================================================
+# cpp_sim_test.py
+#=======================================================================
+
+import os
+import pytest
+import random
+
+from distutils.spawn import find_executable
+
+from pymtl     import *
+from pclib.rtl import *
+from pclib.rtl import onehot
+
+from exceptions import CppTranslationError
+
+#-----------------------------------------------------------------------
+# Test Config
+#-----------------------------------------------------------------------
+# Skip all tests in module if g++ is not installed
+
+pytestmark = pytest.mark.skipif( not find_executable('g++'),
+                                 reason='requires g++' )
+
+# Build all generated simulators in a temporary directory shared by the
+# tests of this module
+
+@pytest.fixture( scope='module' )
+def build_dir( tmpdir_factory ):
+  return str( tmpdir_factory.mktemp( 'cpp_sim' ) )
+
+#-----------------------------------------------------------------------
+# Accumulator
+#-----------------------------------------------------------------------
+# Mixes sequential and combinational logic, and overflows its width.
+
+class Accumulator( Model ):
+
+  def __init__( s, nbits ):
+
+    s.in_  = InPort ( nbits )
+    s.en   = InPort ( 1 )
+    s.out  = OutPort( nbits )
+    s.sum  = OutPort( nbits )
+
+    s.acc  = Wire( nbits )
+    s.next = Wire( nbits )
+
+    @s.combinational
+    def comb_next():
+      s.next.value = s.acc + s.in_
+
+    @s.combinational
+    def comb_sum():
+      s.sum.value = s.next
+
+    @s.posedge_clk
+    def seq():
+      if   s.reset: s.acc.next = 0
+      elif s.en:    s.acc.next = s.next
+      s.out.next = s.acc
+
+#-----------------------------------------------------------------------
+# NibbleSwap
+#-----------------------------------------------------------------------
+# Only slice connections between the ports.
+
+class NibbleSwap( Model ):
+
+  def __init__( s ):
+
+    s.in_ = InPort ( 8 )
+    s.out = OutPort( 8 )
+
+    s.connect( s.out[0:4], s.in_[4:8] )
+    s.connect( s.out[4:8], s.in_[0:4] )
+
+#-----------------------------------------------------------------------
+# SliceMix
+#-----------------------------------------------------------------------
+# Slice connections feeding and fed by combinational and sequential
+# logic, single bit slices and constants driving ports and slices.
+
+class SliceMix( Model ):
+
+  def __init__( s, nbits ):
+
+    half   = nbits / 2
+
+    s.in_  = InPort ( nbits )
+    s.out  = OutPort( nbits )
+    s.msb  = OutPort( 1 )
+    s.one  = OutPort( 1 )
+
+    s.lo   = Wire( half )
+    s.inc  = Wire( half )
+    s.reg  = Wire( nbits )
+
+    s.connect( s.lo,            s.in_[0:half]  )
+    s.connect( s.out[0:half],   s.inc          )
+    s.connect( s.out[half:nbits], 0b101        )
+    s.connect( s.msb,           s.reg[nbits-1] )
+    s.connect( s.one,           1              )
+
+    @s.combinational
+    def comb():
+      s.inc.value = s.lo + 1
+
+    @s.posedge_clk
+    def seq():
+      s.reg.next = s.in_
+
+#-----------------------------------------------------------------------
+# compare_sims
+#-----------------------------------------------------------------------
+# Drive a Python-simulated model and its C++ translation with the same
+# random stimulus and check all outputs match every cycle.
+
+def compare_sims( model_type, args, build_dir, ncycles=50 ):
+
+  ref = model_type( *args )
+  ref.elaborate()
+  ref_sim = SimulationTool( ref )
+
+  dut = get_cpp( model_type( *args ), build_dir )
+  dut.elaborate()
+  dut_sim = SimulationTool( dut )
+
+  ref_sim.reset()
+  dut_sim.reset()
+
+  rng = random.Random( 0xdeadbeef )
+
+  inports  = [ x.name for x in ref.get_inports()
+               if x.name not in ('clk', 'reset') ]
+  outports = [ x.name for x in ref.get_outports() ]
+
+  def port( model, name ):
+    return eval( 'model.' + name )
+
+  for i in range( ncycles ):
+
+    for name in inports:
+      value = rng.getrandbits( port( ref, name ).nbits )
+      port( ref, name ).value = value
+      port( dut, name ).value = value
+
+    ref_sim.eval_combinational()
+    dut_sim.eval_combinational()
+
+    for name in outports:
+      assert port( dut, name ) == port( ref, name ), \
+        'cycle {}: {}'.format( i, name )
+
+    ref_sim.cycle()
+    dut_sim.cycle()
+
+#-----------------------------------------------------------------------
+# Run Tests
+#-----------------------------------------------------------------------
+
+# The whole pclib RTL library, see also scripts/bench_cpp_sim.py
+
+pclib_rtl = [
+  ( Reg,                  (8,)   ),
+  ( RegEn,                (8,)   ),
+  ( RegRst,               (8,)   ),
+  ( RegEnRst,             (8,)   ),
+  ( Adder,                (16,)  ),
+  ( Adder,                (32,)  ),
+  ( Subtractor,           (16,)  ),
+  ( Incrementer,          (8,)   ),
+  ( ZeroExtender,         (8,16) ),
+  ( SignExtender,         (8,16) ),
+  ( SignExtender,         (32,64) ),
+  ( ZeroComparator,       (8,)   ),
+  ( EqComparator,         (8,)   ),
+  ( LtComparator,         (8,)   ),
+  ( GtComparator,         (8,)   ),
+  ( SignUnit,             (8,)   ),
+  ( UnsignUnit,           (8,)   ),
+  ( LeftLogicalShifter,   (8,3)  ),
+  ( RightLogicalShifter,  (8,3)  ),
+  ( Mux,                  (8,4)  ),
+  ( onehot.Mux,           (4,8)  ),
+  ( onehot.Demux,         (4,8)  ),
+  ( Decoder,              (3,8)  ),
+  ( RegisterFile,         ()     ),
+  ( RegisterFile,         (16,8,2,2)       ),
+  ( RegisterFile,         (16,8,1,1,True)  ),
+  ( RegisterFile,         (40,16)          ),
+  ( Crossbar,             (4,8)  ),
+  ( Bus,                  (4,8)  ),
+  ( PipeCtrl,             ()     ),
+  ( RoundRobinArbiter,    (4,)   ),
+  ( RoundRobinArbiterEn,  (4,)   ),
+  ( SRAMBitsComb_rst_1rw,  (16,26,0xa0a0a0) ),
+  ( SRAMBytesComb_rst_1rw, (16,4,0xa0a0a0)  ),
+  ( SingleElementNormalQueue,    (16,)  ),
+  ( SingleElementBypassQueue,    (16,)  ),
+  ( NormalQueue,                 (4,16) ),
+  ( NormalQueue,                 (3,16) ),
+  ( SingleElementPipelinedQueue, (16,)  ),
+  ( SingleElementSkidQueue,      (16,)  ),
+  ( TwoElementBypassQueue,       (16,)  ),
+]
+
+@pytest.mark.parametrize( 'model_type, args', pclib_rtl + [
+  ( Accumulator,  (4,)   ),
+  ( Accumulator,  (40,)  ),
+  ( NibbleSwap,   ()     ),
+  ( SliceMix,     (8,)   ),
+  ( SliceMix,     (40,)  ),
+])
+def test_compare( model_type, args, build_dir ):
+  compare_sims( model_type, args, build_dir, ncycles=200 )
+
+def test_cycles( build_dir ):
+
+  model = get_cpp( Accumulator( 8 ), build_dir )
+  model.elaborate()
+  sim = SimulationTool( model )
+  sim.reset()
+
+  model.in_.value = 3
+  model.en .value = 1
+  sim.eval_combinational()
+
+  model.cycles( 10 )
+  assert model.out == 27
+  assert model.sum == 33
+
+def test_cache( build_dir ):
+
+  first  = get_cpp( Accumulator( 8 ), build_dir ).__class__
+  second = get_cpp( Accumulator( 8 ), build_dir ).__class__
+  other  = get_cpp( Accumulator( 9 ), build_dir ).__class__
+
+  assert first is second
+  assert first is not other
+
+def test_build_dir( tmpdir ):
+
+  get_cpp( Accumulator( 7 ), str( tmpdir ) )
+  exts = sorted( os.path.splitext( x.basename )[1] for x in tmpdir.listdir()
+                 if not x.basename.endswith( '.pyc' ) )
+  assert exts == [ '.cpp', '.py', '.so' ]
+
+#-----------------------------------------------------------------------
+# test_instances
+#-----------------------------------------------------------------------
+# Instances of the same generated simulator have independent state.
+
+def test_instances( build_dir ):
+
+  models = [ get_cpp( Accumulator( 8 ), build_dir ) for _ in range( 2 ) ]
+  sims   = []
+  for model in models:
+    model.elaborate()
+    sims.append( SimulationTool( model ) )
+    sims[-1].reset()
+
+  assert models[0].__class__ is models[1].__class__
+
+  for i in range( 4 ):
+    for j, ( model, sim ) in enumerate( zip( models, sims ) ):
+      model.in_.value = j + 1
+      model.en .value = 1
+      sim.cycle()
+
+  assert models[0].out == 3
+  assert models[1].out == 6
+  assert models[0].ncycles != 0
+  assert models[0].ncycles == models[1].ncycles
+
+#-----------------------------------------------------------------------
+# test_unsupported
+#-----------------------------------------------------------------------
+# Constructs which cannot be translated are reported with their source
+# line before anything is compiled.
+
+class Unsupported( Model ):
+
+  def __init__( s ):
+
+    s.in_ = InPort ( 8 )
+    s.out = OutPort( 8 )
+
+    @s.combinational
+    def comb():
+      s.out.value = s.in_ ** 2
+
+def test_unsupported( tmpdir ):
+
+  with pytest.raises( CppTranslationError ) as e:
+    get_cpp( Unsupported(), str( tmpdir ) )
+
+  assert 's.out.value = s.in_ ** 2' in str( e.value )
+  assert 'Unsupported.comb()' in str( e.value )
+  assert tmpdir.listdir() == []
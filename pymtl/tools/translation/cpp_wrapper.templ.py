@@ -1,41 +1,83 @@
+#=======================================================================
+# {model_name}_cpp.py
+#=======================================================================
+# This wrapper makes a model translated to C++ appear as if it were a
+# normal PyMTL model. Each instance creates its own simulator state in
+# the shared library.
+
+import os
+
 from pymtl import *
 from cffi  import FFI
 
+#-----------------------------------------------------------------------
+# {model_name}
+#-----------------------------------------------------------------------
 class {model_name}( Model ):
 
-  def __init__( s ):
+  # FFI interface and shared library handle, shared by all instances
+  ffi      = None
+  _cmodule = None
+
+  @classmethod
+  def _load_library( cls ):
 
     ffi = FFI()
     ffi.cdef('''
       {cdef}
     ''')
 
-    s._cmodule = ffi.dlopen('./{lib_file}')
-    s._top     = ffi.new("iface_t *")
+    lib_dir      = os.path.dirname( os.path.abspath( __file__ ) )
+    cls._cmodule = ffi.dlopen( os.path.join( lib_dir, '{lib_file}' ) )
+    cls.ffi      = ffi
+
+  def __init__( s ):
+
+    # parse the cdef and load the library only for the first instance
+    if {model_name}.ffi is None:
+      {model_name}._load_library()
+
+    # each instance owns its model state, freed with the instance
+    s._top   = s.ffi.new("{iface} *")
+    s._state = s.ffi.gc( s._cmodule.create_model(),
+                         s._cmodule.destroy_model )
 
     class BundleProxy( PortBundle ):
       flip = False
 
     {port_defs}
 
-    # Set Input Callbacks
-    s._cffi_update = {{}}
-    {set_inputs}
-
   def elaborate_logic( s ):
 
-    #@s.combinational
-    #def logic():
+    @s.combinational
+    def logic():
+
+      # Set inputs
+      {set_inputs}
+
+      # Execute combinational logic
+      s._cmodule.eval( s._state, s._top )
+
+      # Set outputs
+      {set_comb}
 
-    @s.tick
+    @s.posedge_clk
     def seq_logic():
 
       # Cycle
-      s._cmodule.cycle( s.clk, s.reset, s._top )
+      s._cmodule.cycle( s._state, s._top )
 
       # Set outputs
-      {set_outputs}
+      {set_next}
+
+  def cycles( s, n ):
+    """Simulate n clock cycles inside the C++ model, holding the inputs
+    constant. Only the output ports are updated afterwards."""
+
+    s._cmodule.cycles( s._state, s._top, n )
+
+    {cycles_outputs}
 
   @property
   def ncycles( s ):
-    return s._cmodule.ncycles
+    return s._cmodule.get_ncycles( s._state )
@@ -10,6 +10,12 @@ class VerilogTranslationError( Exception ):
     super( VerilogTranslationError, self ).__init__( message )
     self.lineno = lineno
 
+#-----------------------------------------------------------------------
+# CppTranslationError
+#-----------------------------------------------------------------------
+class CppTranslationError( Exception ):
+  pass
+
 #-----------------------------------------------------------------------
 # VerilatorCompileError
 #-----------------------------------------------------------------------
@@ -171,6 +171,25 @@ def create_c_wrapper( model, c_wrapper_file, vcd_en, vlinetrace, verilator_xinit
   port_decls   = indent_zero.join( [ port_to_decl( x ) for x in ports ] )
   port_inits   = indent_two .join( [ port_to_init( x ) for x in ports ] )
 
+  # Create the statements used by run_cycles to move port values between
+  # the Verilated model and the stimulus/response buffers
+  run_inports, run_outports = get_run_ports( model )
+
+  run_set_inputs  = []
+  run_get_outputs = []
+
+  offset = 0
+  for port in run_inports:
+    run_set_inputs.extend( run_buf_stmts( port, 'in_buf', offset, True ) )
+    offset += get_nwords( port )
+  in_nwords = offset
+
+  offset = 0
+  for port in run_outports:
+    run_get_outputs.extend( run_buf_stmts( port, 'out_buf', offset, False ) )
+    offset += get_nwords( port )
+  out_nwords = offset
+
   # Convert verilator_xinit to number
   if   ( verilator_xinit == "zeros" ) : verilator_xinit_num = 0
   elif ( verilator_xinit == "ones"  ) : verilator_xinit_num = 1
@@ -186,6 +205,10 @@ def create_c_wrapper( model, c_wrapper_file, vcd_en, vlinetrace, verilator_xinit
                           port_externs  = port_externs,
                           port_decls    = port_decls,
                           port_inits    = port_inits,
+                          run_set_inputs  = indent_four.join( run_set_inputs ),
+                          run_get_outputs = indent_four.join( run_get_outputs ),
+                          in_nwords     = in_nwords,
+                          out_nwords    = out_nwords,
                           # What was this for? -cbatten
                           # vcd_prefix    = vcd_file[:-4],
                           vcd_timescale = get_vcd_timescale( model ),
@@ -199,6 +222,89 @@ def create_c_wrapper( model, c_wrapper_file, vcd_en, vlinetrace, verilator_xinit
 
   return port_decls.replace( indent_zero, indent_six )
 
+#-----------------------------------------------------------------------
+# get_run_ports
+#-----------------------------------------------------------------------
+# Ports packed into the stimulus/response records used by run_cycles.
+# The clock is generated inside run_cycles so it is not part of the
+# stimulus.
+
+def get_run_ports( model ):
+  inports  = [ x for x in model.get_inports() if x.name != 'clk' ]
+  outports = model.get_outports()
+  return inports, outports
+
+#-----------------------------------------------------------------------
+# get_nwords
+#-----------------------------------------------------------------------
+# Number of 32-bit words a port occupies in a run_cycles record.
+
+def get_nwords( port ):
+  return (port.nbits-1)/32 + 1
+
+#-----------------------------------------------------------------------
+# run_buf_stmts
+#-----------------------------------------------------------------------
+# Generate the C statements copying a port to/from a run_cycles buffer.
+# Ports wider than 64 bits are stored by Verilator as arrays of 32-bit
+# words, narrower ports are plain integers.
+
+def run_buf_stmts( port, buf, offset, is_input ):
+
+  name = 'model->' + port.verilator_name
+  word = lambda i: '{}[{}]'.format( buf, offset+i )
+
+  if   port.nbits <= 32:
+    pairs = [ ( name, word(0) ) ]
+  elif port.nbits <= 64:
+    if is_input:
+      return [ '{} = ((uint64_t) {} << 32) | {};'
+               .format( name, word(1), word(0) ) ]
+    return [ '{} = (uint32_t) {};'        .format( word(0), name ),
+             '{} = (uint32_t) ({} >> 32);'.format( word(1), name ) ]
+  else:
+    pairs = [ ( '{}[{}]'.format( name, i ), word(i) )
+              for i in range( get_nwords( port ) ) ]
+
+  if is_input:
+    return [ '{} = {};'.format( dst, src ) for dst, src in pairs ]
+  return [ '{} = {};'.format( src, dst ) for dst, src in pairs ]
+
+#-----------------------------------------------------------------------
+# check_run_buffer
+#-----------------------------------------------------------------------
+# Check that buf can hold ncycles records of nwords 32-bit words before
+# handing it to the C run_cycles loop, which does no bounds checking.
+# Accepts NumPy arrays with an unsigned 32-bit dtype and array.array or
+# memoryview objects with an unsigned 32-bit item type. Returns the cffi
+# buffer wrapping buf, which must be kept alive for the call.
+
+def check_run_buffer( ffi, buf, name, ncycles, nwords ):
+
+  dtype = getattr( buf, 'dtype', None )
+  if dtype is not None:
+    is_uint32 = dtype.kind == 'u' and dtype.itemsize == 4
+  else:
+    typecode  = getattr( buf, 'typecode', None ) or getattr( buf, 'format', '' )
+    is_uint32 = ( typecode.lstrip( '@=<' ) in ( 'I', 'L' ) and
+                  getattr( buf, 'itemsize', None ) == 4 )
+
+  if not is_uint32:
+    raise ValueError( '{} must be a buffer of uint32 words!'.format( name ) )
+
+  if ncycles < 0:
+    raise ValueError( 'ncycles must be >= 0, got {}!'.format( ncycles ) )
+
+  cdata  = ffi.from_buffer( buf )
+  nbytes = ncycles * nwords * 4
+  if len( cdata ) < nbytes:
+    raise ValueError(
+      '{} is too small for {} cycles of {} words: {} bytes < {} bytes!'
+      .format( name, ncycles, nwords, len( cdata ), nbytes )
+    )
+
+  return cdata
+
 #-----------------------------------------------------------------------
 # create_shared_lib
 #-----------------------------------------------------------------------
@@ -489,6 +595,12 @@ def create_verilator_py_wrapper( model, wrapper_filename, lib_file,
     set_comb.extend( comb  )
     set_next.extend( next_ )
 
+  run_inports, run_outports = get_run_ports( model )
+  run_in_nwords  = sum( get_nwords( x ) for x in run_inports  )
+  run_out_nwords = sum( get_nwords( x ) for x in run_outports )
+  run_inports  = [ ( x.name, x.nbits ) for x in run_inports  ]
+  run_outports = [ ( x.name, x.nbits ) for x in run_outports ]
+
   # pretty printing
   indent_four = '\n    '
   indent_six  = '\n      '
@@ -507,6 +619,11 @@ def create_verilator_py_wrapper( model, wrapper_filename, lib_file,
         set_comb    = indent_six .join( set_comb ),
         set_next    = indent_six .join( set_next ),
         vlinetrace  = '1' if vlinetrace else '0',
+        run_inports     = run_inports,
+        run_outports    = run_outports,
+        run_in_nwords   = run_in_nwords,
+        run_out_nwords  = run_out_nwords,
+        run_set_outputs = indent_four.join( set_comb ),
     )
 
     #py_src += 'XTraceEverOn()' # TODO: add for tracing?
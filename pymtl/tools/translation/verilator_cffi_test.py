@@ -0,0 +1,96 @@
+#=======================================================================
+# verilator_cffi_test.py
+#=======================================================================
+# Tests for the helpers generating and checking run_cycles buffers,
+# these do not require Verilator.
+
+import pytest
+
+from array          import array
+from cffi           import FFI
+from pymtl          import *
+from verilator_cffi import get_nwords, run_buf_stmts, check_run_buffer
+
+#-----------------------------------------------------------------------
+# run_buf_stmts
+#-----------------------------------------------------------------------
+
+def make_port( nbits, name ):
+  port = InPort( nbits )
+  port.verilator_name = name
+  return port
+
+def test_run_buf_stmts_narrow():
+  port = make_port( 8, 'in_' )
+  assert get_nwords( port ) == 1
+  assert run_buf_stmts( port, 'in_buf', 3, True ) == \
+    [ 'model->in_ = in_buf[3];' ]
+  assert run_buf_stmts( port, 'out_buf', 3, False ) == \
+    [ 'out_buf[3] = model->in_;' ]
+
+def test_run_buf_stmts_40():
+  port = make_port( 40, 'in_' )
+  assert get_nwords( port ) == 2
+  assert run_buf_stmts( port, 'in_buf', 1, True ) == \
+    [ 'model->in_ = ((uint64_t) in_buf[2] << 32) | in_buf[1];' ]
+  assert run_buf_stmts( port, 'out_buf', 1, False ) == [
+    'out_buf[1] = (uint32_t) model->in_;',
+    'out_buf[2] = (uint32_t) (model->in_ >> 32);',
+  ]
+
+def test_run_buf_stmts_100():
+  port = make_port( 100, 'in_' )
+  assert get_nwords( port ) == 4
+  assert run_buf_stmts( port, 'in_buf', 1, True ) == [
+    'model->in_[{}] = in_buf[{}];'.format( i, i+1 ) for i in range( 4 )
+  ]
+  assert run_buf_stmts( port, 'out_buf', 1, False ) == [
+    'out_buf[{}] = model->in_[{}];'.format( i+1, i ) for i in range( 4 )
+  ]
+
+#-----------------------------------------------------------------------
+# check_run_buffer
+#-----------------------------------------------------------------------
+
+def test_check_run_buffer():
+  ffi = FFI()
+
+  # 4 cycles of 3 words
+  buf   = array( 'I', [0] ) * 12
+  cdata = check_run_buffer( ffi, buf, 'in_buf', 4, 3 )
+  assert len( cdata ) == 48
+  check_run_buffer( ffi, buf, 'in_buf', 3, 3 )
+  check_run_buffer( ffi, buf, 'in_buf', 0, 3 )
+
+  with pytest.raises( ValueError ):
+    check_run_buffer( ffi, buf, 'in_buf', 5, 3 )
+  with pytest.raises( ValueError ):
+    check_run_buffer( ffi, buf, 'in_buf', 4, 4 )
+  with pytest.raises( ValueError ):
+    check_run_buffer( ffi, buf, 'in_buf', -1, 3 )
+
+@pytest.mark.parametrize( 'typecode', [ 'B', 'H', 'i', 'f', 'd' ] )
+def test_check_run_buffer_dtype( typecode ):
+  buf = array( typecode, [0] ) * 64
+  with pytest.raises( ValueError ):
+    check_run_buffer( FFI(), buf, 'in_buf', 1, 1 )
+
+def test_check_run_buffer_bytes():
+  with pytest.raises( ValueError ):
+    check_run_buffer( FFI(), bytearray( 64 ), 'in_buf', 1, 1 )
+
+def test_check_run_buffer_numpy():
+  numpy = pytest.importorskip( 'numpy' )
+  ffi   = FFI()
+
+  check_run_buffer( ffi, numpy.zeros( (4, 3), dtype=numpy.uint32 ),
+                    'in_buf', 4, 3 )
+  with pytest.raises( ValueError ):
+    check_run_buffer( ffi, numpy.zeros( (4, 3), dtype=numpy.int32 ),
+                      'in_buf', 4, 3 )
+  with pytest.raises( ValueError ):
+    check_run_buffer( ffi, numpy.zeros( (4, 3), dtype=numpy.uint64 ),
+                      'in_buf', 4, 3 )
+  with pytest.raises( ValueError ):
+    check_run_buffer( ffi, numpy.zeros( (3, 3), dtype=numpy.uint32 ),
+                      'in_buf', 4, 3 )
@@ -46,3 +46,113 @@ def test_reg8():
 
 def test_reg16():
   reg_test( Reg(16) )
+
+#-----------------------------------------------------------------------
+# Batched run_cycles
+#-----------------------------------------------------------------------
+
+def test_reg8_run_cycles():
+
+  import pytest
+  pytest.importorskip('numpy')
+
+  from pclib.test import run_test_vector_sim_batch
+
+  run_test_vector_sim_batch( Reg(8), [
+    ('in_ out*'),
+    [ 0x0a, '?'  ],
+    [ 0x0b, 0x0a ],
+    [ 0x0c, 0x0b ],
+    [ 0x00, 0x0c ],
+  ])
+
+#-----------------------------------------------------------------------
+# Batched run_cycles with wide ports
+#-----------------------------------------------------------------------
+# Uses array.array buffers so these run without NumPy. Ports wider than
+# 32 bits span several words, least significant word first.
+
+def pack_record( buf, ports, values ):
+  for name, nbits in ports:
+    value = values.get( name, 0 )
+    for i in range( (nbits-1)/32 + 1 ):
+      buf.append( (value >> (32*i)) & 0xffffffff )
+
+def unpack_record( buf, ports, offset ):
+  values = {}
+  for name, nbits in ports:
+    value = 0
+    for i in range( (nbits-1)/32 + 1 ):
+      value |= buf[ offset ] << (32*i)
+      offset += 1
+    values[ name ] = value
+  return values, offset
+
+def run_cycles_test( nbits ):
+
+  from array  import array
+  from random import Random
+
+  rgen  = Random( 0xdeadbeef )
+  data  = [ rgen.getrandbits( nbits ) for _ in range( 16 ) ]
+
+  model = TranslationTool( Reg( nbits ) )
+  model.elaborate()
+  sim   = SimulationTool( model )
+  sim.reset()
+
+  assert model.run_in_nwords  == 1 + (nbits-1)/32 + 1
+  assert model.run_out_nwords == (nbits-1)/32 + 1
+
+  in_buf = array( 'I' )
+  for value in data:
+    pack_record( in_buf, model.run_inports, { 'in_': value } )
+  out_buf = array( 'I', [0] ) * ( len( data ) * model.run_out_nwords )
+
+  model.run_cycles( len( data ), in_buf, out_buf )
+
+  # Outputs are captured before the clock edge of each cycle
+  offset = 0
+  for i in range( len( data ) ):
+    values, offset = unpack_record( out_buf, model.run_outports, offset )
+    if i > 0:
+      assert values['out'] == data[i-1]
+
+  # The last clock edge leaves the final input in the register
+  assert model.out == data[-1]
+
+def test_reg40_run_cycles():
+  run_cycles_test( 40 )
+
+def test_reg100_run_cycles():
+  run_cycles_test( 100 )
+
+def test_run_cycles_bad_buffers():
+
+  import pytest
+  from array import array
+
+  model = TranslationTool( Reg( 100 ) )
+  model.elaborate()
+  sim   = SimulationTool( model )
+  sim.reset()
+
+  in_nwords  = model.run_in_nwords
+  out_nwords = model.run_out_nwords
+
+  in_buf  = array( 'I', [0] ) * ( 4 * in_nwords  )
+  out_buf = array( 'I', [0] ) * ( 4 * out_nwords )
+
+  # Too few records
+  with pytest.raises( ValueError ):
+    model.run_cycles( 5, in_buf, out_buf )
+  with pytest.raises( ValueError ):
+    model.run_cycles( 4, in_buf, out_buf[:-1] )
+
+  # Not made of uint32 words
+  with pytest.raises( ValueError ):
+    model.run_cycles( 4, array( 'B', [0] ) * ( 16 * in_nwords ), out_buf )
+  with pytest.raises( ValueError ):
+    model.run_cycles( 4, in_buf, array( 'i', [0] ) * ( 4 * out_nwords ) )
+
+  model.run_cycles( 4, in_buf, out_buf )
@@ -52,6 +52,8 @@ extern "C" {{
   V{model_name}_t * create_model( const char * );
   void destroy_model( V{model_name}_t *);
   void eval( V{model_name}_t * );
+  void run_cycles( V{model_name}_t *, unsigned int,
+                   const uint32_t *, uint32_t * );
 
   #if VLINETRACE
   void trace( V{model_name}_t *, char * );
@@ -174,6 +176,43 @@ void eval( V{model_name}_t * m ) {{
 
 }}
 
+//----------------------------------------------------------------------
+// run_cycles()
+//----------------------------------------------------------------------
+// Simulate ncycles clock cycles without returning to Python. The in_buf
+// holds one record of {in_nwords} 32-bit words of input stimulus per
+// cycle, and one record of {out_nwords} words of outputs is written to
+// out_buf per cycle. Ports are packed in declaration order, least
+// significant word first. Each cycle mirrors what the Python wrapper
+// does: apply the inputs, settle the combinational logic, capture the
+// outputs, then toggle the clock.
+
+void run_cycles( V{model_name}_t * m, unsigned int ncycles,
+                 const uint32_t * in_buf, uint32_t * out_buf ) {{
+
+  V{model_name} * model = (V{model_name} *) m->model;
+
+  for ( unsigned int i = 0; i < ncycles; i++ ) {{
+
+    // apply input stimulus
+    {run_set_inputs}
+
+    // settle combinational logic, capture outputs
+    eval( m );
+    {run_get_outputs}
+
+    // rising clock edge
+    model->clk = 0;
+    eval( m );
+    model->clk = 1;
+    eval( m );
+
+    in_buf  += {in_nwords};
+    out_buf += {out_nwords};
+  }}
+
+}}
+
 //----------------------------------------------------------------------
 // trace()
 //----------------------------------------------------------------------
@@ -9,17 +9,33 @@ import os
 from pymtl import *
 from cffi  import FFI
 
+from pymtl.tools.translation.verilator_cffi import check_run_buffer
+
 #-----------------------------------------------------------------------
 # {model_name}
 #-----------------------------------------------------------------------
 class {model_name}( Model ):
   id_ = 0
 
-  def __init__( s ):
+  # Layout of the stimulus/response records used by run_cycles, as
+  # ( port name, nbits ) pairs in packing order
+  run_inports  = {run_inports}
+  run_outports = {run_outports}
+
+  # Number of 32-bit words in each stimulus/response record
+  run_in_nwords  = {run_in_nwords}
+  run_out_nwords = {run_out_nwords}
+
+  # FFI interface and shared library handle, shared by all instances
+  ffi  = None
+  _ffi = None
+
+  @classmethod
+  def _load_library( cls ):
 
     # initialize FFI, define the exposed interface
-    s.ffi = FFI()
-    s.ffi.cdef('''
+    ffi = FFI()
+    ffi.cdef('''
       typedef struct {{
 
         // Exposed port interface
@@ -36,6 +52,8 @@ class {model_name}( Model ):
       V{model_name}_t * create_model( const char * );
       void destroy_model( V{model_name}_t *);
       void eval( V{model_name}_t * );
+      void run_cycles( V{model_name}_t *, unsigned int,
+                       const uint32_t *, uint32_t * );
       void trace( V{model_name}_t *, char * );
 
     ''')
@@ -44,7 +62,15 @@ class {model_name}( Model ):
     # construction to the elaborate_logic function to allow the user to
     # set the vcd_file.
 
-    s._ffi = s.ffi.dlopen('./{lib_file}')
+    cls._ffi = ffi.dlopen('./{lib_file}')
+    cls.ffi  = ffi
+
+  def __init__( s ):
+
+    # parse the cdef and load the library only for the first instance,
+    # each instance then just creates its own model struct
+    if {model_name}.ffi is None:
+      {model_name}._load_library()
 
     # dummy class to emulate PortBundles
     class BundleProxy( PortBundle ):
@@ -105,6 +131,29 @@ class {model_name}( Model ):
       # FIXME: currently write all outputs, not just registered outs
       {set_next}
 
+  def run_cycles( s, ncycles, in_buf, out_buf ):
+    """Simulate ncycles cycles inside the C wrapper.
+
+    in_buf and out_buf must be writable, contiguous buffers of uint32
+    words (e.g., NumPy arrays) laid out as described by run_inports and
+    run_outports. Only the output ports are updated afterwards; the
+    Python-side input ports keep their previous values. Raises
+    ValueError if either buffer is not made of uint32 words or is too
+    small to hold ncycles records.
+    """
+
+    in_data  = check_run_buffer( s.ffi, in_buf,  'in_buf',
+                                 ncycles, s.run_in_nwords  )
+    out_data = check_run_buffer( s.ffi, out_buf, 'out_buf',
+                                 ncycles, s.run_out_nwords )
+
+    in_ptr  = s.ffi.cast( 'uint32_t *', in_data  )
+    out_ptr = s.ffi.cast( 'uint32_t *', out_data )
+    s._ffi.run_cycles( s._m, ncycles, in_ptr, out_ptr )
+
+    # set outputs
+    {run_set_outputs}
+
   def line_trace( s ):
     if {vlinetrace}:
       s._ffi.trace( s._m, s._line_trace_str )
@@ -7,12 +7,15 @@ from __future__ import print_function
 
 import sys
 import collections
+import inspect
 import tempfile
+import StringIO
 
 from subprocess         import check_output, STDOUT, CalledProcessError
 from verilog_structural import *
 from verilog_behavioral import translate_logic_blocks
 from exceptions         import IVerilogCompileError
+from ...datatypes.Bits  import Bits
 
 from ..integration      import verilog
 
@@ -44,11 +47,97 @@ def translate( model, o=sys.stdout, enable_blackbox=False, verilator_xinit='zero
       if x not in append_queue:
         append_queue.append( x )
     else:
-      translate_module( v, o, enable_blackbox, verilator_xinit )
+      translate_module_cached( v, o, enable_blackbox, verilator_xinit )
 
   # Append source code for imported modules and dependecies
   verilog.import_sources( append_queue, o )
 
+#-----------------------------------------------------------------------
+# translate_module_cached
+#-----------------------------------------------------------------------
+# Translating the concurrent blocks of a module dominates translation
+# time, and the same module is typically translated again and again
+# across TranslationTool calls in a test run. The generated text is
+# cached per module, keyed by everything that goes into it: the class
+# name and constructor args, the source of the classes defining the
+# model and its blocks, and the translation options.
+
+translation_cache = {}
+
+def translate_module_cached( model, o, enable_blackbox=False,
+                             verilator_xinit='zeros' ):
+
+  key = module_cache_key( model, enable_blackbox, verilator_xinit )
+
+  if key not in translation_cache:
+    buf = StringIO.StringIO()
+    translate_module( model, buf, enable_blackbox, verilator_xinit )
+    translation_cache[ key ] = buf.getvalue()
+
+  o.write( translation_cache[ key ] )
+
+def clear_translation_cache():
+  translation_cache.clear()
+
+#-----------------------------------------------------------------------
+# module_cache_key
+#-----------------------------------------------------------------------
+
+def module_cache_key( model, enable_blackbox, verilator_xinit ):
+
+  cls  = model.__class__
+  args = tuple( sorted( ( k, repr( v ) ) for k, v in model._args.items() ) )
+
+  # Code of every user class the model inherits from, which covers
+  # both the structural code in __init__ and the concurrent blocks
+  classes = tuple( class_digest( x ) for x in inspect.getmro( cls )
+                   if x.__module__ not in ( 'pymtl.model.Model', '__builtin__' ) )
+
+  # Blocks may be generated at elaboration time, so also include their
+  # code objects and any constants they close over
+  blocks = tuple( block_digest( func ) for func in
+                  model.get_posedge_clk_blocks()
+                + model.get_combinational_blocks() )
+
+  options = (
+    enable_blackbox,
+    verilator_xinit,
+    hasattr( model, 'vcd_file' ) and model.vcd_file != '',
+    model.vblackbox,
+    model.vbb_modulename,
+    repr( sorted( model.vannotate_arrays.items() ) ),
+    model.vmark_as_bram,
+  )
+
+  return ( model.class_name, cls.__module__, cls.__name__,
+           args, classes, blocks, options )
+
+#-----------------------------------------------------------------------
+# class_digest
+#-----------------------------------------------------------------------
+# The cache only lives as long as the process, so the code objects of
+# the methods a class defines identify its source without rereading
+# any files. A reloaded or redefined class gets new code objects.
+
+def class_digest( cls ):
+  methods = sorted( ( k, code_digest( v.func_code ) )
+                    for k, v in cls.__dict__.items()
+                    if inspect.isfunction( v ) )
+  return ( cls.__module__, cls.__name__, tuple( methods ) )
+
+def block_digest( func ):
+  cells = tuple( repr( x.cell_contents ) for x in func.func_closure or ()
+                 if isinstance( x.cell_contents, _constant_types ) )
+  return ( code_digest( func.func_code ), cells )
+
+_constant_types = ( int, long, float, bool, basestring, Bits )
+
+def code_digest( code ):
+  consts = tuple( code_digest( x ) if inspect.iscode( x ) else repr( x )
+                  for x in code.co_consts )
+  return ( code.co_filename, code.co_name, code.co_code, consts,
+           code.co_names )
+
 #-----------------------------------------------------------------------
 # translate_module
 #-----------------------------------------------------------------------
@@ -117,6 +117,7 @@ def ast_pipeline( tree, model, func ):
   #print_simple_ast( tree ) # DEBUG
 
   tree = visitors.AnnotateWithObjects( model, func ).visit( tree )
+  tree = visitors.ExpandMemoryFill   (             ).visit( tree )
   tree = visitors.RemoveModule       (             ).visit( tree )
   tree = visitors.SimplifyDecorator  (             ).visit( tree )
   tree = visitors.AnnotateAssignments(             ).visit( tree )
@@ -20,6 +20,10 @@ from ..simulation.SimulationTool_seq_test    import *
 from ..simulation.SimulationTool_comb_test   import *
 from ..simulation.SimulationTool_mix_test    import *
 from ..simulation.SimulationTool_transl_test import *
+from ..simulation.SimulationTool_mem_test    import (
+  test_MemoryArrayReadWrite, test_MemoryArraySliceWrite,
+  test_MemoryArrayCombWrite
+)
 
 # Skip all tests in module if verilator is not installed
 
@@ -0,0 +1,109 @@
+#=======================================================================
+# verilog_cache_test.py
+#=======================================================================
+
+import StringIO
+
+from pymtl     import *
+from pclib.rtl import Reg, RegEn, Mux
+
+import verilog
+import verilog_behavioral
+
+#-----------------------------------------------------------------------
+# Utility Functions
+#-----------------------------------------------------------------------
+
+def translate( model ):
+  model.elaborate()
+  buf = StringIO.StringIO()
+  verilog.translate( model, buf )
+  return buf.getvalue()
+
+class RegChain( Model ):
+  def __init__( s, nbits, nstages ):
+    s.in_ = InPort ( nbits )
+    s.out = OutPort( nbits )
+    s.regs = [ Reg( nbits ) for _ in range( nstages ) ]
+    s.connect( s.in_, s.regs[0].in_ )
+    for i in range( nstages-1 ):
+      s.connect( s.regs[i].out, s.regs[i+1].in_ )
+    s.connect( s.regs[-1].out, s.out )
+
+#-----------------------------------------------------------------------
+# test_cache_hit
+#-----------------------------------------------------------------------
+
+def test_cache_hit( monkeypatch ):
+
+  verilog.clear_translation_cache()
+  reference = translate( RegChain( 8, 3 ) )
+
+  # A second translation of the same design must not revisit any blocks
+
+  def fail( model ):
+    raise AssertionError( 'cache miss for {}'.format( model.class_name ) )
+
+  monkeypatch.setattr( verilog, 'translate_logic_blocks', fail )
+  assert translate( RegChain( 8, 3 ) ) == reference
+
+#-----------------------------------------------------------------------
+# test_cache_args
+#-----------------------------------------------------------------------
+
+def test_cache_args():
+
+  verilog.clear_translation_cache()
+
+  src8  = translate( Reg( 8  ) )
+  src16 = translate( Reg( 16 ) )
+
+  assert src8 != src16
+  assert src8  == translate( Reg( 8  ) )
+  assert src16 == translate( Reg( 16 ) )
+
+#-----------------------------------------------------------------------
+# test_cache_matches_uncached
+#-----------------------------------------------------------------------
+
+def test_cache_matches_uncached():
+
+  for model_type, args in [ ( RegEn, (4,) ), ( Mux, (8, 3) ) ]:
+
+    verilog.clear_translation_cache()
+    uncached = translate( model_type( *args ) )
+    cached   = translate( model_type( *args ) )
+
+    assert cached == uncached
+
+#-----------------------------------------------------------------------
+# test_cache_redefined_class
+#-----------------------------------------------------------------------
+# Classes with the same name and args but different structural code in
+# the same file must not share cache entries.
+
+def test_cache_redefined_class():
+
+  verilog.clear_translation_cache()
+
+  def define_wire():
+    class Wire8( Model ):
+      def __init__( s ):
+        s.in_ = InPort ( 8 )
+        s.out = OutPort( 8 )
+        s.connect( s.in_, s.out )
+    return Wire8
+
+  def define_zero():
+    class Wire8( Model ):
+      def __init__( s ):
+        s.in_ = InPort ( 8 )
+        s.out = OutPort( 8 )
+        s.connect( s.out, 0 )
+    return Wire8
+
+  first  = translate( define_wire()() )
+  second = translate( define_zero()() )
+
+  assert 'assign out = in_;'   in first
+  assert 'assign out = 8\'d0;' in second
@@ -8,6 +8,7 @@ import sys
 import collections
 
 from ...model.signals      import Signal, InPort, OutPort, Wire, Constant
+from ...model.signals      import MemoryArray
 from ...model.signal_lists import PortList, WireList
 from exceptions            import VerilogTranslationError
 
@@ -429,6 +430,20 @@ def array_declarations( model, symtab ):
       )
     return stmts
 
+  #---------------------------------------------------------------------
+  # helper to generate memory array declarations
+  #---------------------------------------------------------------------
+  def _gen_memory( mem ):
+
+    # Annotate arrays if vannotate_arrays is available
+    annotation = ''
+    if model.vannotate_arrays:
+      if mem.name in model.vannotate_arrays:
+        annotation = model.vannotate_arrays[mem.name] + ' '
+
+    return '  {}reg    [{:4}:0] {}[0:{}];\n' \
+           .format(annotation, mem.dtype.nbits-1, mem.name, len(mem)-1)
+
   #---------------------------------------------------------------------
   # print the array declarations
   #---------------------------------------------------------------------
@@ -436,8 +451,9 @@ def array_declarations( model, symtab ):
   scode  = '  // array declarations\n'
 
   for ports in arrays:
-    if ports.is_lhs: scode += _gen_array_to_output( ports )
-    else:            scode += _gen_input_to_array ( ports )
+    if   isinstance( ports, MemoryArray ): scode += _gen_memory( ports )
+    elif ports.is_lhs:                     scode += _gen_array_to_output( ports )
+    else:                                  scode += _gen_input_to_array ( ports )
 
   return scode + '\n'
 
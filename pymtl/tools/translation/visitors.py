@@ -10,6 +10,7 @@ import warnings
 
 from ..ast_helpers         import get_closure_dict, print_simple_ast
 from ...model.signals      import Wire, Signal, InPort, OutPort, _SignalSlice
+from ...model.signals      import MemoryArray
 from ...model.Model        import Model
 from ...model.PortBundle   import PortBundle
 from ...model.signal_lists import PortList, WireList
@@ -106,6 +107,57 @@ class AnnotateWithObjects( ast.NodeTransformer ):
 
     return node
 
+#-------------------------------------------------------------------------
+# ExpandMemoryFill
+#-------------------------------------------------------------------------
+# Expand writes to the .next of a MemoryArray itself, which set every
+# entry, into a loop over the entries:
+#
+#   s.mem.next = x   ->   for mem_i in range( nentries ):
+#                           s.mem[ mem_i ].next = x
+#
+class ExpandMemoryFill( ast.NodeTransformer ):
+
+  def visit_Assign( self, node ):
+
+    lhs = node.targets[0]
+    if not ( isinstance( lhs, ast.Attribute ) and lhs.attr in ['next','n']
+             and not isinstance( lhs.value, ast.Subscript )
+             and isinstance( lhs.value._object, MemoryArray ) ):
+      return node
+
+    mem  = lhs.value._object
+    name = '{}_i'.format( mem.name )
+
+    index = ast.Name( id=name, ctx=ast.Load() )
+    index._object = None
+
+    entry = ast.Subscript( value=lhs.value, slice=ast.Index( value=index ),
+                           ctx=ast.Load() )
+    entry._object = mem
+
+    target = ast.Attribute( value=entry, attr='next', ctx=ast.Store() )
+    target._object = mem._entry
+
+    loop_var = ast.Name( id=name, ctx=ast.Store() )
+    loop_var._object = None
+
+    func = ast.Name( id='range', ctx=ast.Load() )
+    func._object = None
+
+    nentries = ast.Num( n=len( mem ) )
+    nentries._object = len( mem )
+
+    loop = ast.For(
+      target = loop_var,
+      iter   = ast.Call( func=func, args=[ nentries ], keywords=[],
+                         starargs=None, kwargs=None ),
+      body   = [ ast.Assign( targets=[ target ], value=node.value ) ],
+      orelse = [],
+    )
+
+    return ast.fix_missing_locations( ast.copy_location( loop, node ) )
+
 #-------------------------------------------------------------------------
 # AnnotateAssignments
 #-------------------------------------------------------------------------
@@ -641,6 +693,8 @@ class InferTemporaryTypes( ast.NodeTransformer ):
         elif isinstance( node.value._object,    list   ) and \
              isinstance( node.value._object[0], Signal ):
           obj = Wire( node.value._object[0].nbits )
+        elif isinstance( node.value._object, MemoryArray ):
+          obj = Wire( node.value._object.dtype.nbits )
         else:
           raise VerilogTranslationError(
             'Type inference from unsupported list construct!'
@@ -837,6 +891,12 @@ class GetRegsIntsParamsTempsArrays( ast.NodeVisitor ):
       self.arrays   .add   ( node._object )
       self.arrayelms.update( node._object )
 
+    # MemoryArrays are always declared as reg arrays, entries share a
+    # single prototype Wire which must not be declared on its own
+    elif isinstance( node._object, MemoryArray ):
+      self.arrays   .add   ( node._object )
+      self.arrayelms.add   ( node._object._entry )
+
     # visit value to find nested subscripts
     self.visit( node.value )
 
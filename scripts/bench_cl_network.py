@@ -0,0 +1,157 @@
+#! /usr/bin/env python
+#========================================================================
+# bench_cl_network.py
+#========================================================================
+# Cycle-level (CL) benchmark on a ring network of nrouters routers built
+# from the pclib.cl primitives. Each router has an input queue adapter,
+# an inelastic pipeline adapter modeling the link to the next router and
+# a queue of packets to inject, with random destinations. Packets already
+# in the ring have priority over injected ones. The simulation runs
+# until all packets are delivered, then reports the number of cycles and
+# the simulation speed. In batch mode, the network ticks the adapters of
+# all the routers at once with xtick_all instead of each router ticking
+# its own. With --profile, also prints the blocks taking the most time
+# and writes their profile in the collapsed stack format read by
+# flamegraph.pl to the given file.
+#
+#  % bench_cl_network.py --nrouters 64 --npackets 32
+#  % bench_cl_network.py --mode router --profile ring.folded
+
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), '..' ) )
+
+from pymtl      import *
+from pclib.ifcs import InValRdyBundle, OutValRdyBundle
+from pclib.cl   import Queue, InValRdyQueueAdapter
+from pclib.cl   import OutValRdyInelasticPipeAdapter
+
+#-------------------------------------------------------------------------
+# RingRouter
+#-------------------------------------------------------------------------
+# Packets are 16 bits, the destination in the upper 8 bits and the
+# source in the lower 8 bits.
+
+class RingRouter( Model ):
+
+  def __init__( s, router_id, packets, stats, batch ):
+
+    s.in_ = InValRdyBundle ( 16 )
+    s.out = OutValRdyBundle( 16 )
+
+    s.router_id = router_id
+    s.stats     = stats
+
+    s.in_q   = InValRdyQueueAdapter( s.in_, size=2 )
+    s.out_q  = OutValRdyInelasticPipeAdapter( s.out, nstages=1 )
+    s.inject = Queue( max( len( packets ), 1 ) )
+
+    for packet in packets:
+      s.inject.enq( Bits( 16, packet ) )
+
+    if not batch:
+
+      @s.tick_cl
+      def logic():
+        s.in_q.xtick()
+        s.out_q.xtick()
+        s.route()
+
+  def route( s ):
+
+    if not s.in_q.empty():
+      if s.in_q.first().uint() >> 8 == s.router_id:
+        s.in_q.deq()
+        s.stats[0] += 1
+      elif not s.out_q.full():
+        s.out_q.enq( s.in_q.deq() )
+
+    elif not s.inject.is_empty() and not s.out_q.full():
+      s.out_q.enq( s.inject.deq() )
+
+#-------------------------------------------------------------------------
+# RingNetwork
+#-------------------------------------------------------------------------
+
+class RingNetwork( Model ):
+
+  def __init__( s, nrouters, npackets, batch, seed=0xdeadbeef ):
+
+    rgen = random.Random( seed )
+
+    s.stats    = [ 0 ]
+    s.npackets = nrouters * npackets
+
+    s.routers = []
+    for i in range( nrouters ):
+      packets = [ rgen.choice( [ x for x in range( nrouters ) if x != i ] )
+                  << 8 | i for _ in range( npackets ) ]
+      s.routers.append( RingRouter( i, packets, s.stats, batch ) )
+
+    for i in range( nrouters ):
+      s.connect( s.routers[i].out, s.routers[(i+1) % nrouters].in_ )
+
+    if batch:
+
+      in_qs  = [ router.in_q  for router in s.routers ]
+      out_qs = [ router.out_q for router in s.routers ]
+
+      @s.tick_cl
+      def logic():
+        InValRdyQueueAdapter.xtick_all( in_qs )
+        OutValRdyInelasticPipeAdapter.xtick_all( out_qs )
+        for router in s.routers:
+          router.route()
+
+  def done( s ):
+    return s.stats[0] == s.npackets
+
+#-------------------------------------------------------------------------
+# run
+#-------------------------------------------------------------------------
+
+def run( nrouters, npackets, batch, profile=None ):
+
+  net = RingNetwork( nrouters, npackets, batch )
+  net.elaborate()
+
+  sim = SimulationTool( net, profile=bool( profile ) )
+  sim.reset()
+
+  start = time.time()
+  while not net.done():
+    sim.cycle()
+  elapsed = time.time() - start
+
+  if profile:
+    sim.profile.print_report( 10 )
+    sim.profile.write_collapsed( profile )
+
+  return sim.ncycles, sim.ncycles / elapsed
+
+def main():
+
+  p = argparse.ArgumentParser()
+  p.add_argument( '--nrouters', type=int, default=64 )
+  p.add_argument( '--npackets', type=int, default=32 )
+  p.add_argument( '--mode',     choices=[ 'router', 'batch', 'all' ],
+                                default='all' )
+  p.add_argument( '--profile',  metavar='FILE' )
+  opts = p.parse_args()
+
+  modes = [ 'router', 'batch' ] if opts.mode == 'all' else [ opts.mode ]
+
+  print( '{:10} {:>10} {:>10}'.format( 'mode', 'cycles', 'cyc/s' ) )
+  for mode in modes:
+    ncycles, rate = run( opts.nrouters, opts.npackets, mode == 'batch',
+                         opts.profile )
+    print( '{:10} {:10} {:10.0f}'.format( mode, ncycles, rate ) )
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,60 @@
+#! /usr/bin/env python
+#========================================================================
+# bench_construction.py
+#========================================================================
+# Model construction microbenchmark. Instantiates many small models, one
+# at a time and with the list syntax, and reports the time per instance.
+# An empty model with a few arguments isolates the cost of collecting
+# the constructor arguments from the cost of creating the ports.
+#
+#  % bench_construction.py --ninsts 100000
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), '..' ) )
+
+from pymtl     import *
+from pclib.rtl import Adder, Mux
+
+#-------------------------------------------------------------------------
+# Empty
+#-------------------------------------------------------------------------
+
+class Empty( Model ):
+
+  def __init__( s, nbits, nports=2, name='empty' ):
+    pass
+
+#-------------------------------------------------------------------------
+# bench
+#-------------------------------------------------------------------------
+
+def bench( label, ninsts, func ):
+  start = time.time()
+  func()
+  elapsed = time.time() - start
+  print( '{:24} {:10.2f} s {:10.2f} us/inst'.format(
+    label, elapsed, elapsed / ninsts * 1e6 ) )
+
+def main():
+
+  p = argparse.ArgumentParser()
+  p.add_argument( '--ninsts', type=int, default=100000 )
+  opts = p.parse_args()
+
+  n = opts.ninsts
+
+  bench( 'Empty( 32 )',         n, lambda: [ Empty( 32 ) for x in xrange( n ) ] )
+  bench( 'Empty( 32, 4, "a" )', n, lambda: [ Empty( 32, 4, 'a' ) for x in xrange( n ) ] )
+  bench( 'Empty[n]( 32 )',      n, lambda: Empty[n]( 32 ) )
+  bench( 'Adder( 32 )',         n, lambda: [ Adder( 32 ) for x in xrange( n ) ] )
+  bench( 'Mux( 32, 4 )',        n, lambda: [ Mux( 32, 4 ) for x in xrange( n ) ] )
+  bench( 'Adder[n]( 32 )',      n, lambda: Adder[n]( 32 ) )
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,129 @@
+#! /usr/bin/env python
+#========================================================================
+# bench_cpp_sim.py
+#========================================================================
+# Compares build time and simulation speed of the PyMTL simulator, the
+# C++ backend (get_cpp) and, if installed, Verilator on every model of
+# the pclib RTL library. For the C++ backend both the cycle-by-cycle
+# SimulationTool path and the generated cycles() loop are measured.
+# Run from a scratch directory, generated files are written to the
+# current directory.
+#
+#  % bench_cpp_sim.py --ncycles 100000
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+from distutils.spawn import find_executable
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), '..' ) )
+
+from pymtl     import *
+from pclib.rtl import *
+from pclib.rtl import onehot
+
+# Every model of the pclib RTL library
+
+models = [
+  ( 'Reg(32)',                lambda: Reg( 32 )                      ),
+  ( 'RegEn(32)',              lambda: RegEn( 32 )                    ),
+  ( 'RegRst(32)',             lambda: RegRst( 32 )                   ),
+  ( 'RegEnRst(32)',           lambda: RegEnRst( 32 )                 ),
+  ( 'Adder(32)',              lambda: Adder( 32 )                    ),
+  ( 'Subtractor(32)',         lambda: Subtractor( 32 )               ),
+  ( 'Incrementer(32)',        lambda: Incrementer( 32 )              ),
+  ( 'ZeroExtender(16,32)',    lambda: ZeroExtender( 16, 32 )         ),
+  ( 'SignExtender(16,32)',    lambda: SignExtender( 16, 32 )         ),
+  ( 'ZeroComparator(32)',     lambda: ZeroComparator( 32 )           ),
+  ( 'EqComparator(32)',       lambda: EqComparator( 32 )             ),
+  ( 'LtComparator(32)',       lambda: LtComparator( 32 )             ),
+  ( 'GtComparator(32)',       lambda: GtComparator( 32 )             ),
+  ( 'SignUnit(32)',           lambda: SignUnit( 32 )                 ),
+  ( 'UnsignUnit(32)',         lambda: UnsignUnit( 32 )               ),
+  ( 'LeftLogicalShifter',     lambda: LeftLogicalShifter( 32, 5 )    ),
+  ( 'RightLogicalShifter',    lambda: RightLogicalShifter( 32, 5 )   ),
+  ( 'Mux(32,4)',              lambda: Mux( 32, 4 )                   ),
+  ( 'onehot.Mux(4,32)',       lambda: onehot.Mux( 4, 32 )            ),
+  ( 'onehot.Demux(4,32)',     lambda: onehot.Demux( 4, 32 )          ),
+  ( 'Decoder(3,8)',           lambda: Decoder( 3, 8 )                ),
+  ( 'RegisterFile',           lambda: RegisterFile()                 ),
+  ( 'Crossbar(4,32)',         lambda: Crossbar( 4, 32 )              ),
+  ( 'Bus(4,32)',              lambda: Bus( 4, 32 )                   ),
+  ( 'PipeCtrl',               lambda: PipeCtrl()                     ),
+  ( 'RoundRobinArbiter(4)',   lambda: RoundRobinArbiter( 4 )         ),
+  ( 'RoundRobinArbiterEn(4)', lambda: RoundRobinArbiterEn( 4 )       ),
+  ( 'SRAMBitsComb(16,32)',    lambda: SRAMBitsComb_rst_1rw( 16, 32 ) ),
+  ( 'SRAMBytesComb(16,4)',    lambda: SRAMBytesComb_rst_1rw( 16, 4 ) ),
+  ( 'SingleElemNormalQ',      lambda: SingleElementNormalQueue( 32 ) ),
+  ( 'SingleElemBypassQ',      lambda: SingleElementBypassQueue( 32 ) ),
+  ( 'NormalQueue(4,32)',      lambda: NormalQueue( 4, 32 )           ),
+  ( 'SingleElemPipeQ',        lambda: SingleElementPipelinedQueue( 32 ) ),
+  ( 'SingleElemSkidQ',        lambda: SingleElementSkidQueue( 32 )   ),
+  ( 'TwoElemBypassQ',         lambda: TwoElementBypassQueue( 32 )    ),
+]
+
+#-------------------------------------------------------------------------
+# run_sim
+#-------------------------------------------------------------------------
+# Returns ( build seconds, cycles per second ) for a model simulated
+# cycle by cycle through SimulationTool.
+
+def run_sim( build, ncycles ):
+
+  start = time.time()
+  model = build()
+  model.elaborate()
+  sim   = SimulationTool( model )
+  sim.reset()
+  build_time = time.time() - start
+
+  start = time.time()
+  for i in xrange( ncycles ):
+    sim.cycle()
+  return build_time, ncycles / ( time.time() - start )
+
+def main():
+
+  p = argparse.ArgumentParser()
+  p.add_argument( '--ncycles', type=int, default=100000 )
+  opts = p.parse_args()
+
+  has_verilator = find_executable( 'verilator' ) is not None
+
+  row = '{:22} {:>10} {:>12} {:>10} {:>12} {:>12} {:>10} {:>12}'
+  print( row.format( 'model', 'py build', 'py cyc/s', 'cpp build',
+                     'cpp cyc/s', 'loop cyc/s', 'v build', 'v cyc/s' ) )
+
+  for name, mk_model in models:
+
+    py_build, py_rate = run_sim( mk_model, opts.ncycles )
+
+    cpp_build, cpp_rate = run_sim( lambda: get_cpp( mk_model() ),
+                                   opts.ncycles )
+
+    model = get_cpp( mk_model() )
+    model.elaborate()
+    sim   = SimulationTool( model )
+    sim.reset()
+    start = time.time()
+    model.cycles( opts.ncycles )
+    loop_rate = opts.ncycles / ( time.time() - start )
+
+    if has_verilator:
+      v_build, v_rate = run_sim( lambda: TranslationTool( mk_model() ),
+                                 opts.ncycles )
+      v_build, v_rate = '{:.3f}'.format( v_build ), '{:.0f}'.format( v_rate )
+    else:
+      v_build, v_rate = '-', '-'
+
+    print( row.format( name,
+                       '{:.3f}'.format( py_build ), '{:.0f}'.format( py_rate ),
+                       '{:.3f}'.format( cpp_build ), '{:.0f}'.format( cpp_rate ),
+                       '{:.0f}'.format( loop_rate ), v_build, v_rate ) )
+
+if __name__ == "__main__":
+  main()
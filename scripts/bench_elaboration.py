@@ -0,0 +1,133 @@
+#! /usr/bin/env python
+#========================================================================
+# bench_elaboration.py
+#========================================================================
+# Elaboration benchmark on a generated size x size mesh of routers, each
+# with four input and four output val/rdy bundles connected to their
+# neighbors. Reports the time to construct and elaborate the design,
+# the number and approximate size of the live Python objects afterwards
+# (including instance dictionaries not tracked by the garbage collector)
+# and the resident set size.
+#
+#  % bench_elaboration.py --size 32
+
+from __future__ import print_function
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), '..' ) )
+
+from pymtl      import *
+from pclib.ifcs import InValRdyBundle, OutValRdyBundle
+
+NORTH, EAST, SOUTH, WEST = range( 4 )
+
+#-------------------------------------------------------------------------
+# live_bytes
+#-------------------------------------------------------------------------
+
+def live_bytes( objs ):
+  total = 0
+  for x in objs:
+    total += sys.getsizeof( x )
+    try:
+      d = object.__getattribute__( x, '__dict__' )
+    except (AttributeError, TypeError):
+      continue
+    if isinstance( d, dict ) and not gc.is_tracked( d ):
+      total += sys.getsizeof( d )
+  return total
+
+#-------------------------------------------------------------------------
+# rss_bytes
+#-------------------------------------------------------------------------
+# Current resident set size, or None if /proc is not available.
+
+def rss_bytes():
+  try:
+    with open( '/proc/self/statm' ) as f:
+      return int( f.read().split()[1] ) * os.sysconf( 'SC_PAGE_SIZE' )
+  except (IOError, OSError, ValueError):
+    return None
+
+#-------------------------------------------------------------------------
+# Router
+#-------------------------------------------------------------------------
+# Forwards each input to the output of the opposite direction.
+
+class Router( Model ):
+
+  def __init__( s, nbits ):
+
+    s.in_ = InValRdyBundle [4]( nbits )
+    s.out = OutValRdyBundle[4]( nbits )
+    s.sel = Wire( 2 )
+
+    for i in range( 4 ):
+      s.connect( s.out[i].msg, s.in_[ (i+2) % 4 ].msg )
+      s.connect( s.out[i].val, s.in_[ (i+2) % 4 ].val )
+      s.connect( s.in_[ (i+2) % 4 ].rdy, s.out[i].rdy )
+
+    s.connect( s.sel, s.in_[0].msg[0:2] )
+
+#-------------------------------------------------------------------------
+# Mesh
+#-------------------------------------------------------------------------
+
+class Mesh( Model ):
+
+  def __init__( s, size, nbits ):
+
+    s.routers = [ Router( nbits ) for x in xrange( size * size ) ]
+
+    for y in xrange( size ):
+      for x in xrange( size ):
+        r = s.routers[ y*size + x ]
+        if x + 1 < size:
+          e = s.routers[ y*size + x + 1 ]
+          s.connect( r.out[EAST], e.in_[WEST] )
+          s.connect( e.out[WEST], r.in_[EAST] )
+        if y + 1 < size:
+          n = s.routers[ (y+1)*size + x ]
+          s.connect( r.out[NORTH], n.in_[SOUTH] )
+          s.connect( n.out[SOUTH], r.in_[NORTH] )
+
+def main():
+
+  p = argparse.ArgumentParser()
+  p.add_argument( '--size',  type=int, default=32 )
+  p.add_argument( '--nbits', type=int, default=32 )
+  opts = p.parse_args()
+
+  start = time.time()
+  model = Mesh( opts.size, opts.nbits )
+  construct = time.time() - start
+
+  start = time.time()
+  model.elaborate()
+  elaborate = time.time() - start
+
+  gc.collect()
+  objs  = gc.get_objects()
+  nobjs = len( objs )
+  live  = live_bytes( objs )
+  del objs
+  rss   = rss_bytes()
+
+  nports = sum( len( r.get_ports() ) for r in model.routers )
+
+  print( 'routers    : {:10}'.format( len( model.routers ) ) )
+  print( 'ports      : {:10}'.format( nports ) )
+  print( 'construct  : {:10.2f} s'.format( construct ) )
+  print( 'elaborate  : {:10.2f} s'.format( elaborate ) )
+  print( 'objects    : {:10}'.format( nobjs ) )
+  print( 'live       : {:10.1f} MB'.format( live / 2.0**20 ) )
+  if rss is not None:
+    print( 'rss        : {:10.1f} MB'.format( rss / 2.0**20 ) )
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,120 @@
+#! /usr/bin/env python
+#========================================================================
+# bench_fl.py
+#========================================================================
+# Functional-level (FL) benchmark comparing greenlet-based and
+# generator-based @tick_fl blocks on the mem-copy workload of
+# BytesMemPortAdapter_test: a model copies nbytes through a
+# BytesMemPortAdapter connected to a test memory. Reports the number of
+# cycles and the simulation speed for each mode.
+#
+#  % bench_fl.py --nbytes 1024
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), '..' ) )
+
+from pymtl      import *
+from pclib.ifcs import InValRdyBundle, OutValRdyBundle, MemMsg4B
+from pclib.fl   import BytesMemPortAdapter
+from pclib.test import TestMemory
+
+#-------------------------------------------------------------------------
+# mem_copy
+#-------------------------------------------------------------------------
+
+def mem_copy( mem, src_ptr, dest_ptr, nbytes ):
+  for i in xrange( nbytes ):
+    mem[dest_ptr+i] = mem[src_ptr+i]
+
+def mem_copy_gen( mem, src_ptr, dest_ptr, nbytes ):
+  for i in xrange( nbytes ):
+    data = yield mem.read( src_ptr+i )
+    yield mem.write( dest_ptr+i, data )
+
+#-------------------------------------------------------------------------
+# MemCopy
+#-------------------------------------------------------------------------
+
+class MemCopy( Model ):
+
+  def __init__( s, fl_mode, nbytes ):
+
+    s.memreq  = InValRdyBundle ( MemMsg4B().req  )
+    s.memresp = OutValRdyBundle( MemMsg4B().resp )
+    s.mem     = BytesMemPortAdapter( s.memreq, s.memresp )
+    s.done    = False
+
+    if fl_mode == 'greenlet':
+
+      @s.tick_fl
+      def logic():
+        if not s.reset and not s.done:
+          mem_copy( s.mem, 0x1000, 0x2000, nbytes )
+          s.done = True
+
+    else:
+
+      @s.tick_fl
+      def logic():
+        if not s.reset and not s.done:
+          yield mem_copy_gen( s.mem, 0x1000, 0x2000, nbytes )
+          s.done = True
+
+#-------------------------------------------------------------------------
+# Harness
+#-------------------------------------------------------------------------
+
+class Harness( Model ):
+
+  def __init__( s, fl_mode, nbytes ):
+
+    s.mcopy = MemCopy( fl_mode, nbytes )
+    s.mem   = TestMemory( MemMsg4B(), 1 )
+
+    s.connect( s.mcopy.memreq,  s.mem.reqs[0]  )
+    s.connect( s.mcopy.memresp, s.mem.resps[0] )
+
+#-------------------------------------------------------------------------
+# run
+#-------------------------------------------------------------------------
+
+def run( fl_mode, nbytes ):
+
+  th = Harness( fl_mode, nbytes )
+  th.elaborate()
+  th.mem.write_mem( 0x1000, bytearray( x & 0xff for x in xrange( nbytes ) ) )
+
+  sim = SimulationTool( th )
+  sim.reset()
+
+  start = time.time()
+  while not th.mcopy.done:
+    sim.cycle()
+  elapsed = time.time() - start
+
+  assert th.mem.read_mem( 0x2000, nbytes ) == th.mem.read_mem( 0x1000, nbytes )
+  return sim.ncycles, sim.ncycles / elapsed
+
+def main():
+
+  p = argparse.ArgumentParser()
+  p.add_argument( '--nbytes', type=int, default=1024 )
+  p.add_argument( '--mode',   choices=[ 'greenlet', 'generator', 'all' ],
+                              default='all' )
+  opts = p.parse_args()
+
+  modes = [ 'greenlet', 'generator' ] if opts.mode == 'all' else [ opts.mode ]
+
+  print( '{:10} {:>10} {:>10}'.format( 'mode', 'cycles', 'cyc/s' ) )
+  for mode in modes:
+    ncycles, rate = run( mode, opts.nbytes )
+    print( '{:10} {:10} {:10.0f}'.format( mode, ncycles, rate ) )
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,67 @@
+#! /usr/bin/env python
+#========================================================================
+# bench_import.py
+#========================================================================
+# Import-time benchmark. Runs "from pymtl import *" (or the given
+# statement) in fresh interpreters and reports the fastest and median
+# wall-clock time and the number of modules loaded, along with the heavy
+# dependencies which should only be loaded on first use. Exits with an
+# error if any of them were loaded or if --max-ms is exceeded.
+#
+#  % bench_import.py --nruns 20
+#  % bench_import.py --stmt "from pclib.rtl import *"
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+root = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), '..' )
+
+heavy = [ 'pytest', 'cffi', 'pyparsing', 'greenlet',
+          'pymtl.tools.translation.verilog',
+          'pymtl.tools.translation.cpp' ]
+
+template = '''
+import sys, time, json
+start = time.time()
+{}
+elapsed = time.time() - start
+print( json.dumps( [ elapsed, sorted( sys.modules ) ] ) )
+'''
+
+def main():
+
+  p = argparse.ArgumentParser()
+  p.add_argument( '--nruns',  type=int,   default=10 )
+  p.add_argument( '--stmt',   default='from pymtl import *' )
+  p.add_argument( '--max-ms', type=float, default=None )
+  opts = p.parse_args()
+
+  env   = dict( os.environ, PYTHONPATH=root )
+  times = []
+  for i in range( opts.nruns ):
+    out = subprocess.check_output(
+      [ sys.executable, '-c', template.format( opts.stmt ) ], env=env )
+    elapsed, modules = json.loads( out )
+    times.append( elapsed * 1000 )
+
+  times.sort()
+  loaded = [ x for x in heavy if x in modules ]
+
+  print( 'statement : {}'.format( opts.stmt ) )
+  print( 'fastest   : {:8.1f} ms'.format( times[0] ) )
+  print( 'median    : {:8.1f} ms'.format( times[ len( times ) // 2 ] ) )
+  print( 'modules   : {:8}'.format( len( modules ) ) )
+  print( 'heavy     : {}'.format( ', '.join( loaded ) or 'none' ) )
+
+  if loaded:
+    sys.exit( 'error: heavy modules loaded on import' )
+  if opts.max_ms is not None and times[0] > opts.max_ms:
+    sys.exit( 'error: import slower than {} ms'.format( opts.max_ms ) )
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,117 @@
+#! /usr/bin/env python
+#========================================================================
+# bench_register_flop.py
+#========================================================================
+# Measures simulation speed of register-heavy models from the pclib RTL
+# library, together with the number of registers flopped per cycle.
+# Each register is flopped at most once per cycle, even if its .next is
+# written several times. Registers whose value does not change skip the
+# comparison and callback work entirely.
+#
+#  % bench_register_flop.py --ncycles 100000
+
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), '..' ) )
+
+from pymtl     import *
+from pclib.rtl import Reg, RegEn, RegRst, RegEnRst, NormalQueue
+
+#-------------------------------------------------------------------------
+# RegChain
+#-------------------------------------------------------------------------
+# A chain of nregs registers of the given type, the first register is
+# driven by the input port.
+
+class RegChain( Model ):
+
+  def __init__( s, RegType, nregs, nbits ):
+
+    s.in_  = InPort ( nbits )
+    s.out  = OutPort( nbits )
+
+    s.regs = [ RegType( nbits ) for x in xrange( nregs ) ]
+
+    s.connect( s.regs[0].in_, s.in_ )
+    for i in xrange( 1, nregs ):
+      s.connect( s.regs[i].in_, s.regs[i-1].out )
+    s.connect( s.out, s.regs[-1].out )
+
+    if hasattr( s.regs[0], 'en' ):
+      for reg in s.regs:
+        s.connect( reg.en, 1 )
+
+#-------------------------------------------------------------------------
+# Drivers
+#-------------------------------------------------------------------------
+# Each driver sets the inputs of the model for the given cycle.
+
+def drive_chain( model, i ):
+  model.in_.value = random.randint( 0, 1 )
+
+def drive_queue( model, i ):
+  model.enq.val.value = random.randint( 0, 1 )
+  model.enq.msg.value = i & 0xffffffff
+  model.deq.rdy.value = random.randint( 0, 1 )
+
+models = [
+  ( 'RegChain(Reg,64)',      lambda: RegChain( Reg,      64, 32 ), drive_chain ),
+  ( 'RegChain(RegEn,64)',    lambda: RegChain( RegEn,    64, 32 ), drive_chain ),
+  ( 'RegChain(RegRst,64)',   lambda: RegChain( RegRst,   64, 32 ), drive_chain ),
+  ( 'RegChain(RegEnRst,64)', lambda: RegChain( RegEnRst, 64, 32 ), drive_chain ),
+  ( 'NormalQueue(16,32)',    lambda: NormalQueue( 16, 32 ),        drive_queue ),
+  ( 'NormalQueue(64,32)',    lambda: NormalQueue( 64, 32 ),        drive_queue ),
+]
+
+#-------------------------------------------------------------------------
+# run_sim
+#-------------------------------------------------------------------------
+# Returns ( cycles per second, registers flopped per cycle ).
+
+def run_sim( build, drive, ncycles ):
+
+  random.seed( 0xdeadbeef )
+
+  model = build()
+  model.elaborate()
+  sim   = SimulationTool( model )
+  sim.reset()
+
+  # Count flops by wrapping the simulator's flop phase
+  nflops     = [ 0 ]
+  flop_phase = sim._flop_registers
+  def counting_flop_phase():
+    nflops[0] += len( sim._register_queue )
+    flop_phase()
+  sim._flop_registers = counting_flop_phase
+
+  start = time.time()
+  for i in xrange( ncycles ):
+    drive( model, i )
+    sim.cycle()
+  elapsed = time.time() - start
+
+  return ncycles / elapsed, float( nflops[0] ) / ncycles
+
+def main():
+
+  p = argparse.ArgumentParser()
+  p.add_argument( '--ncycles', type=int, default=20000 )
+  opts = p.parse_args()
+
+  row = '{:24} {:>12} {:>12}'
+  print( row.format( 'model', 'cyc/s', 'flops/cyc' ) )
+
+  for name, build, drive in models:
+    rate, flops = run_sim( build, drive, opts.ncycles )
+    print( row.format( name, '{:.0f}'.format( rate ),
+                       '{:.1f}'.format( flops ) ) )
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,120 @@
+#! /usr/bin/env python
+#========================================================================
+# bench_sim_memory.py
+#========================================================================
+# Memory benchmark for SimulationTool on a design with many instances
+# of the same queue. Builds the simulator in the default and in the lean
+# construction mode, each in a fresh interpreter, and reports the number
+# of live Python objects, their approximate size and the resident set
+# size once construction is done, along with the simulation speed. The
+# interpreter does not always return freed memory to the system, so the
+# resident set size mostly shows as headroom for later allocations.
+#
+#  % bench_sim_memory.py --ninsts 256
+
+from __future__ import print_function
+
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), '..' ) )
+
+from pymtl      import *
+from pclib.ifcs import InValRdyBundle, OutValRdyBundle
+from pclib.rtl  import NormalQueue
+
+#-------------------------------------------------------------------------
+# QueueChain
+#-------------------------------------------------------------------------
+# A chain of ninsts queues.
+
+class QueueChain( Model ):
+
+  def __init__( s, ninsts, nbits ):
+
+    s.enq    = InValRdyBundle ( nbits )
+    s.deq    = OutValRdyBundle( nbits )
+
+    s.queues = [ NormalQueue( 2, nbits ) for x in xrange( ninsts ) ]
+
+    s.connect( s.enq, s.queues[0].enq )
+    for i in xrange( 1, ninsts ):
+      s.connect( s.queues[i].enq, s.queues[i-1].deq )
+    s.connect( s.deq, s.queues[-1].deq )
+
+#-------------------------------------------------------------------------
+# rss_bytes
+#-------------------------------------------------------------------------
+# Current resident set size, or None if /proc is not available.
+
+def rss_bytes():
+  try:
+    with open( '/proc/self/statm' ) as f:
+      return int( f.read().split()[1] ) * os.sysconf( 'SC_PAGE_SIZE' )
+  except (IOError, OSError, ValueError):
+    return None
+
+#-------------------------------------------------------------------------
+# run_mode
+#-------------------------------------------------------------------------
+# Build and run the simulator in the current interpreter, print one
+# line of results.
+
+def run_mode( opts ):
+
+  model = QueueChain( opts.ninsts, 32 )
+  model.elaborate()
+
+  start = time.time()
+  sim   = SimulationTool( model, lean=( opts.mode == 'lean' ) )
+  build = time.time() - start
+
+  gc.collect()
+  objs  = gc.get_objects()
+  nobjs = len( objs )
+  live  = sum( sys.getsizeof( x ) for x in objs )
+  del objs
+  rss   = rss_bytes()
+
+  sim.reset()
+  model.deq.rdy.value = 1
+  start = time.time()
+  for i in xrange( opts.ncycles ):
+    model.enq.val.value = i & 1
+    model.enq.msg.value = i
+    sim.cycle()
+  rate = opts.ncycles / ( time.time() - start )
+
+  print( '{:8} {:>10} {:>10.1f} {:>10} {:>10.2f} {:>10.0f}'.format(
+    opts.mode, nobjs, live / 2.0**20,
+    '{:.1f}'.format( rss / 2.0**20 ) if rss is not None else '?',
+    build, rate ) )
+
+def main():
+
+  p = argparse.ArgumentParser()
+  p.add_argument( '--ninsts',  type=int, default=256  )
+  p.add_argument( '--ncycles', type=int, default=1000 )
+  p.add_argument( '--mode',    choices=[ 'default', 'lean' ] )
+  opts = p.parse_args()
+
+  if opts.mode:
+    run_mode( opts )
+    return
+
+  print( '{:8} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+    'mode', 'objects', 'live (MB)', 'rss (MB)', 'build (s)', 'cyc/s' ) )
+
+  for mode in [ 'default', 'lean' ]:
+    sys.stdout.flush()
+    subprocess.check_call( [ sys.executable, __file__,
+                             '--ninsts',  str( opts.ninsts  ),
+                             '--ncycles', str( opts.ncycles ),
+                             '--mode',    mode ] )
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,125 @@
+#! /usr/bin/env python
+#========================================================================
+# bench_slices.py
+#========================================================================
+# Slice connection benchmark on a purely structural datapath: a chain of
+# stages, each unpacking a message into byte fields with slice
+# connections and packing them back in reverse order in a submodule.
+# Every change of the input ripples through all the slice callbacks.
+# Reports the number of slice connections and slice callbacks, and the
+# simulation speed.
+#
+#  % bench_slices.py --nstages 64
+
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), '..' ) )
+
+from pymtl import *
+
+#-------------------------------------------------------------------------
+# Pack
+#-------------------------------------------------------------------------
+# Packs nfields byte fields into a message, in reverse order.
+
+class Pack( Model ):
+
+  def __init__( s, nfields ):
+
+    s.in_ = InPort[ nfields ]( 8 )
+    s.out = OutPort( 8*nfields )
+
+    for i in range( nfields ):
+      j = nfields - 1 - i
+      s.connect( s.out[ 8*j : 8*j+8 ], s.in_[i] )
+
+#-------------------------------------------------------------------------
+# Stage
+#-------------------------------------------------------------------------
+# Unpacks the message into byte fields feeding a Pack, and also taps the
+# low nibble of every field.
+
+class Stage( Model ):
+
+  def __init__( s, nfields ):
+
+    s.in_  = InPort ( 8*nfields )
+    s.out  = OutPort( 8*nfields )
+    s.tap  = OutPort[ nfields ]( 4 )
+
+    s.pack = Pack( nfields )
+
+    for i in range( nfields ):
+      s.connect( s.pack.in_[i], s.in_[ 8*i : 8*i+8 ] )
+      s.connect( s.tap[i],      s.in_[ 8*i : 8*i+4 ] )
+
+    s.connect( s.out, s.pack.out )
+
+#-------------------------------------------------------------------------
+# Chain
+#-------------------------------------------------------------------------
+
+class Chain( Model ):
+
+  def __init__( s, nstages, nfields ):
+
+    s.in_    = InPort ( 8*nfields )
+    s.out    = OutPort( 8*nfields )
+
+    s.stages = [ Stage( nfields ) for x in xrange( nstages ) ]
+
+    s.connect( s.in_, s.stages[0].in_ )
+    for i in xrange( 1, nstages ):
+      s.connect( s.stages[i].in_, s.stages[i-1].out )
+    s.connect( s.out, s.stages[-1].out )
+
+#-------------------------------------------------------------------------
+# count_slice_connects
+#-------------------------------------------------------------------------
+
+def count_slice_connects( model ):
+  n = sum( 1 for c in model.get_connections()
+           if c.src_slice is not None or c.dest_slice is not None )
+  return n + sum( count_slice_connects( m ) for m in model.get_submodules() )
+
+def main():
+
+  p = argparse.ArgumentParser()
+  p.add_argument( '--nstages', type=int, default=64   )
+  p.add_argument( '--nfields', type=int, default=8    )
+  p.add_argument( '--ncycles', type=int, default=500  )
+  opts = p.parse_args()
+
+  model = Chain( opts.nstages, opts.nfields )
+  model.elaborate()
+
+  nconnects = count_slice_connects( model )
+
+  start = time.time()
+  sim   = SimulationTool( model )
+  build = time.time() - start
+
+  values     = { id( x ) : x for x in sim.signal_values.values() }
+  ncallbacks = sum( len( x._slices ) for x in values.values() )
+
+  rng = random.Random( 0xdeadbeef )
+  sim.reset()
+  start = time.time()
+  for i in xrange( opts.ncycles ):
+    model.in_.value = rng.getrandbits( 8*opts.nfields )
+    sim.cycle()
+  rate = opts.ncycles / ( time.time() - start )
+
+  print( 'slices     : {:10}'.format( nconnects ) )
+  print( 'callbacks  : {:10}'.format( ncallbacks ) )
+  print( 'build      : {:10.2f} s'.format( build ) )
+  print( 'cyc/s      : {:10.0f}'.format( rate ) )
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,54 @@
+#! /usr/bin/env python
+#========================================================================
+# bench_verilator_instances.py
+#========================================================================
+# Startup benchmark for designs with many instances of the same
+# Verilator-imported model. Translates and verilates the model once,
+# then reports how long it takes to construct and elaborate N copies of
+# the generated wrapper. Run from a scratch directory, the generated
+# files are written to the current directory.
+#
+#  % bench_verilator_instances.py --ninsts 256 --nbits 32
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), '..' ) )
+
+from pymtl     import *
+from pclib.rtl import Reg
+
+def main():
+
+  p = argparse.ArgumentParser()
+  p.add_argument( '--ninsts', type=int, default=256 )
+  p.add_argument( '--nbits',  type=int, default=32  )
+  opts = p.parse_args()
+
+  # Translate and verilate once, this also loads the wrapper module
+
+  start = time.time()
+  model = TranslationTool( Reg( opts.nbits ) )
+  print( 'translate + first instance : {:8.3f} s'.format( time.time() - start ) )
+
+  # Instantiate many copies of the wrapper
+
+  model_class = model.__class__
+
+  start = time.time()
+  insts = []
+  for i in range( opts.ninsts ):
+    inst = model_class()
+    inst.elaborate()
+    insts.append( inst )
+  elapsed = time.time() - start
+
+  print( '{} instances              : {:8.3f} s'.format( opts.ninsts, elapsed ) )
+  print( 'per instance               : {:8.3f} ms'.format( 1e3 * elapsed / opts.ninsts ) )
+
+if __name__ == "__main__":
+  main()